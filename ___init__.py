@@ -1,14 +1,14 @@
-"""
-Sistema de Gestión PYME - Plataforma integral para la gestión de pequeñas y medianas empresas.
-
-Módulos principales:
-- auth: Sistema de autenticación y usuarios
-- modules: Módulos funcionales (finanzas, CRM, inventario, etc.)
-- utils: Utilidades y herramientas
-- plugins: Sistema de plugins extensible
-- api: API REST para integraciones
-"""
-
-__version__ = '1.0.0'
-__author__ = 'Sistema de Gestión PYME'
-__description__ = 'Plataforma integral de gestión para PYMES'
+"""
+Sistema de Gestión PYME - Plataforma integral para la gestión de pequeñas y medianas empresas.
+
+Módulos principales:
+- auth: Sistema de autenticación y usuarios
+- modules: Módulos funcionales (finanzas, CRM, inventario, etc.)
+- utils: Utilidades y herramientas
+- plugins: Sistema de plugins extensible
+- api: API REST para integraciones
+"""
+
+__version__ = '1.0.0'
+__author__ = 'Sistema de Gestión PYME'
+__description__ = 'Plataforma integral de gestión para PYMES'
@@ -0,0 +1,94 @@
+# sistema_pyme/api/api_database.py
+"""
+Capa de acceso asíncrono a la base de datos para la API REST.
+
+Las consultas de sqlite3 son bloqueantes; aquí se ejecutan en executors
+dedicados para que el event loop de uvicorn siga atendiendo otras
+peticiones mientras corre una consulta lenta:
+
+- Lecturas: un executor con tantos hilos como lectores tiene el pool.
+- Escrituras: un executor de un solo hilo, que serializa al escritor.
+"""
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+import database as db
+
+T = TypeVar('T')
+
+
+class AsyncDatabase:
+    def __init__(self, db_path: str = db.DEFAULT_DB_PATH, read_workers: Optional[int] = None):
+        self.db_path = db_path
+        self.pool = db.get_pool(db_path)
+        self._read_executor = ThreadPoolExecutor(
+            max_workers=read_workers or self.pool.max_readers,
+            thread_name_prefix='api-db-read')
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='api-db-write')
+
+    def _read(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        with self.pool.reader() as conn:
+            return func(conn)
+
+    def _write(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        with self.pool.writer() as conn:
+            return func(conn)
+
+    async def run_read(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Ejecutar func(conn) con un lector del pool sin bloquear el event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_executor, self._read, func)
+
+    async def run_write(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Ejecutar func(conn) en una transacción del escritor sin bloquear el event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._write_executor, self._write, func)
+
+    async def fetch_all(self, query: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """Obtener todas las filas de una consulta como diccionarios"""
+        def query_rows(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+        return await self.run_read(query_rows)
+
+    async def fetch_one(self, query: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        """Obtener la primera fila de una consulta como diccionario"""
+        def query_row(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+            row = conn.execute(query, params).fetchone()
+            return dict(row) if row else None
+        return await self.run_read(query_row)
+
+    async def execute(self, query: str, params: Sequence[Any] = ()) -> Dict[str, int]:
+        """Ejecutar una sentencia de escritura y confirmar la transacción"""
+        def execute_write(conn: sqlite3.Connection) -> Dict[str, int]:
+            c = conn.execute(query, params)
+            return {"lastrowid": c.lastrowid or 0, "rowcount": c.rowcount}
+        return await self.run_write(execute_write)
+
+    def close(self) -> None:
+        """Detener los executors (las conexiones pertenecen al pool)"""
+        self._read_executor.shutdown(wait=True)
+        self._write_executor.shutdown(wait=True)
+
+
+_async_db: Optional[AsyncDatabase] = None
+
+
+def get_async_db() -> AsyncDatabase:
+    """Dependencia de FastAPI: instancia compartida de AsyncDatabase"""
+    global _async_db
+    if _async_db is None:
+        _async_db = AsyncDatabase()
+    return _async_db
+
+
+def close_async_db() -> None:
+    """Liberar la instancia compartida (apagado de la API)"""
+    global _async_db
+    if _async_db is not None:
+        _async_db.close()
+        _async_db = None
+
+
+__all__ = ['AsyncDatabase', 'get_async_db', 'close_async_db']
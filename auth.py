@@ -1,306 +1,458 @@
-# auth.py
-import streamlit as st
-import sqlite3
-import bcrypt
-import pyotp
-import qrcode
-import io
-from datetime import datetime, timedelta
-import secrets
-
-class AuthSystem:
-    def __init__(self, conn):
-        self.conn = conn
-        self.init_auth_tables()
-    
-    def init_auth_tables(self):
-        c = self.conn.cursor()
-        
-        # Tabla de usuarios
-        c.execute('''CREATE TABLE IF NOT EXISTS users
-                    (id INTEGER PRIMARY KEY, username TEXT UNIQUE, 
-                     email TEXT UNIQUE, password_hash TEXT, role TEXT,
-                     is_active INTEGER, created_at TIMESTAMP,
-                     last_login TIMESTAMP, two_factor_secret TEXT)''')
-        
-        # Tabla de sesiones
-        c.execute('''CREATE TABLE IF NOT EXISTS sessions
-                    (id INTEGER PRIMARY KEY, user_id INTEGER, session_token TEXT,
-                     created_at TIMESTAMP, expires_at TIMESTAMP,
-                     FOREIGN KEY(user_id) REFERENCES users(id))''')
-        
-        # Tabla de permisos
-        c.execute('''CREATE TABLE IF NOT EXISTS permissions
-                    (id INTEGER PRIMARY KEY, role TEXT, module TEXT,
-                     can_view INTEGER, can_edit INTEGER, can_delete INTEGER)''')
-        
-        self.conn.commit()
-        self.create_default_roles()
-    
-    def create_default_roles(self):
-        c = self.conn.cursor()
-        
-        # Roles por defecto
-        roles_permissions = [
-            ('admin', 'dashboard', 1, 1, 1),
-            ('admin', 'data_import', 1, 1, 1),
-            ('admin', 'finance', 1, 1, 1),
-            ('admin', 'crm', 1, 1, 1),
-            ('admin', 'hr', 1, 1, 1),
-            ('admin', 'inventory', 1, 1, 1),
-            ('admin', 'admin', 1, 1, 1),
-            ('manager', 'dashboard', 1, 1, 0),
-            ('manager', 'finance', 1, 1, 0),
-            ('manager', 'crm', 1, 1, 0),
-            ('analyst', 'dashboard', 1, 0, 0),
-            ('analyst', 'finance', 1, 0, 0),
-            ('user', 'dashboard', 1, 0, 0)
-        ]
-        
-        for role, module, can_view, can_edit, can_delete in roles_permissions:
-            c.execute('''INSERT OR IGNORE INTO permissions 
-                        (role, module, can_view, can_edit, can_delete)
-                        VALUES (?, ?, ?, ?, ?)''',
-                     (role, module, can_view, can_edit, can_delete))
-        
-        # Crear usuario admin por defecto si no existe - SIN 2FA
-        c.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'")
-        if c.fetchone()[0] == 0:
-            # Hash de la contraseña admin123
-            password_hash = bcrypt.hashpw('admin123'.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            c.execute('''INSERT INTO users 
-                        (username, email, password_hash, role, is_active, 
-                         created_at, two_factor_secret)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                     ('admin', 'admin@sistema.pyme', password_hash, 'admin', 1,
-                      datetime.now(), None))  # two_factor_secret = None para admin
-        
-        self.conn.commit()
-    
-    def hash_password(self, password):
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    
-    def verify_password(self, password, hashed_password):
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
-    
-    def create_user(self, username, email, password, role='user'):
-        c = self.conn.cursor()
-        
-        # Generar secreto para 2FA
-        two_factor_secret = pyotp.random_base32()
-        
-        try:
-            c.execute('''INSERT INTO users 
-                        (username, email, password_hash, role, is_active, 
-                         created_at, two_factor_secret)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                     (username, email, self.hash_password(password), role, 1,
-                      datetime.now(), two_factor_secret))
-            self.conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
-    
-    def authenticate_user(self, username, password):
-        c = self.conn.cursor()
-        c.execute('''SELECT id, username, password_hash, role, two_factor_secret 
-                     FROM users WHERE username = ? AND is_active = 1''', (username,))
-        user = c.fetchone()
-        
-        if user and self.verify_password(password, user[2]):
-            # Actualizar último login
-            c.execute('''UPDATE users SET last_login = ? WHERE id = ?''',
-                     (datetime.now(), user[0]))
-            self.conn.commit()
-            
-            user_data = {
-                'id': user[0],
-                'username': user[1],
-                'role': user[3],
-                'two_factor_secret': user[4]
-            }
-            
-            # ✅ EXCEPCIÓN: Si es admin, saltar 2FA automáticamente
-            if username == 'admin':
-                # Crear sesión inmediatamente para admin
-                session_token = self.create_session(user_data['id'])
-                return {**user_data, 'skip_2fa': True, 'session_token': session_token}
-            
-            return user_data
-        return None
-    
-    def generate_2fa_qr(self, secret, username):
-        """Generar código QR para 2FA"""
-        try:
-            # Generar URL de autenticación
-            totp = pyotp.TOTP(secret)
-            auth_url = totp.provisioning_uri(
-                name=username,
-                issuer_name='Sistema PYME'
-            )
-            
-            # Generar QR
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(auth_url)
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convertir a bytes para Streamlit
-            img_bytes = io.BytesIO()
-            img.save(img_bytes, format='PNG')
-            img_bytes.seek(0)
-            
-            return img_bytes
-            
-        except Exception as e:
-            st.error(f"Error generando QR: {str(e)}")
-            return None
-    
-    def verify_2fa(self, secret, token):
-        try:
-            return pyotp.TOTP(secret).verify(token)
-        except:
-            return False
-    
-    def create_session(self, user_id):
-        c = self.conn.cursor()
-        session_token = secrets.token_urlsafe(32)
-        expires_at = datetime.now() + timedelta(hours=24)
-        
-        c.execute('''INSERT INTO sessions 
-                    (user_id, session_token, created_at, expires_at)
-                    VALUES (?, ?, ?, ?)''',
-                 (user_id, session_token, datetime.now(), expires_at))
-        self.conn.commit()
-        
-        return session_token
-    
-    def validate_session(self, session_token):
-        c = self.conn.cursor()
-        c.execute('''SELECT user_id, expires_at FROM sessions 
-                     WHERE session_token = ? AND expires_at > ?''',
-                 (session_token, datetime.now()))
-        session = c.fetchone()
-        
-        if session:
-            return session[0]  # user_id
-        return None
-    
-    def has_permission(self, user_role, module, action):
-        c = self.conn.cursor()
-        c.execute(f'''SELECT {action} FROM permissions 
-                     WHERE role = ? AND module = ?''', (user_role, module))
-        result = c.fetchone()
-        return result and result[0] == 1
-    
-    def get_user_role(self, user_id):
-        c = self.conn.cursor()
-        c.execute('SELECT role FROM users WHERE id = ?', (user_id,))
-        result = c.fetchone()
-        return result[0] if result else 'user'
-
-def render_login_register(auth_system):
-    """Renderizar interfaz de login/registro"""
-    tab1, tab2 = st.tabs(["Iniciar Sesión", "Registrarse"])
-    
-    with tab1:
-        with st.form("login_form"):
-            username = st.text_input("Usuario")
-            password = st.text_input("Contraseña", type="password")
-            submitted = st.form_submit_button("Iniciar Sesión")
-            
-            if submitted:
-                user = auth_system.authenticate_user(username, password)
-                if user:
-                    # ✅ Si es admin, acceder directamente
-                    if user.get('skip_2fa', False):
-                        st.session_state.auth_token = user['session_token']
-                        st.session_state.user = {
-                            'id': user['id'],
-                            'username': user['username'],
-                            'role': user['role']
-                        }
-                        st.rerun()
-                    else:
-                        # Verificación 2FA para usuarios normales
-                        if '2fa_verified' not in st.session_state:
-                            st.session_state['2fa_user'] = user
-                            st.session_state['show_2fa'] = True
-                            st.rerun()
-                else:
-                    st.error("Credenciales inválidas")
-    
-    with tab2:
-        with st.form("register_form"):
-            new_username = st.text_input("Nuevo usuario")
-            new_email = st.text_input("Email")
-            new_password = st.text_input("Nueva contraseña", type="password")
-            confirm_password = st.text_input("Confirmar contraseña", type="password")
-            submitted = st.form_submit_button("Registrarse")
-            
-            if submitted:
-                if new_password != confirm_password:
-                    st.error("Las contraseñas no coinciden")
-                elif auth_system.create_user(new_username, new_email, new_password):
-                    st.success("Usuario creado exitosamente")
-                else:
-                    st.error("El usuario ya existe")
-    
-    # Modal para 2FA - Solo para usuarios que no son admin
-    if st.session_state.get('show_2fa', False):
-        user = st.session_state.get('2fa_user', {})
-        
-        # Verificar que no sea admin
-        if user.get('username') != 'admin':
-            st.write("## 🔐 Verificación en Dos Pasos")
-            
-            # Mostrar instrucciones claras
-            st.info("""
-            **Para acceder, necesitas verificación en dos pasos:**
-            1. Escanea el código QR con Google Authenticator, Authy o Microsoft Authenticator
-            2. Ingresa el código de 6 dígitos que aparece en tu app
-            3. Los códigos NO se envían por email/SMS
-            """)
-            
-            # Generar y mostrar QR inmediatamente
-            if 'qr_generated' not in st.session_state:
-                qr_image = auth_system.generate_2fa_qr(
-                    user.get('two_factor_secret', ''), 
-                    user.get('username', '')
-                )
-                st.session_state.qr_image = qr_image
-                st.session_state.qr_generated = True
-            
-            if st.session_state.get('qr_image'):
-                st.image(st.session_state.qr_image, caption="Escanee con su app de autenticación")
-            else:
-                st.error("No se pudo generar el código QR")
-            
-            # Input para el código
-            token = st.text_input("Código de 6 dígitos", max_chars=6, key="2fa_token")
-            
-            if st.button("✅ Verificar Código", key="verify_2fa"):
-                if user and token and len(token) == 6:
-                    if auth_system.verify_2fa(user.get('two_factor_secret', ''), token):
-                        # Autenticación exitosa
-                        session_token = auth_system.create_session(user['id'])
-                        st.session_state.auth_token = session_token
-                        st.session_state.user = user
-                        st.session_state.show_2fa = False
-                        st.session_state.qr_generated = False
-                        st.rerun()
-                    else:
-                        st.error("❌ Código inválido. Intenta nuevamente.")
-                else:
-                    st.error("⚠️ Por favor ingresa un código de 6 dígitos")
-            
-            # Opción para reintentar
-            if st.button("🔄 Generar nuevo código QR", key="new_qr"):
-                st.session_state.qr_generated = False
+# auth.py
+import streamlit as st
+import sqlite3
+import pyotp
+import io
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from lazy_imports import lazy_import
+from migrations import apply_migrations
+from session_store import SessionStore
+from password_hasher import get_password_hasher, HasherSaturatedError, LoginThrottledError
+
+# qrcode (y PIL) solo hace falta al activar 2FA
+qrcode = lazy_import('qrcode')
+
+PERMISSION_ACTIONS = ('can_view', 'can_edit', 'can_delete')
+
+class AuthSystem:
+    def __init__(self, conn, session_cache_ttl=60, session_cache_size=1024, permissions_ttl=300,
+                 hasher=None, max_sessions_per_user=5):
+        self.conn = conn
+        # Hashing bcrypt en un pool de procesos (ver password_hasher.py)
+        self.hasher = hasher or get_password_hasher()
+        # Caché en proceso: sesiones validadas (TTL + LRU), roles y matriz de permisos
+        self.session_cache_ttl = session_cache_ttl
+        self.session_cache_size = session_cache_size
+        self.permissions_ttl = permissions_ttl
+        self._cache_lock = threading.RLock()
+        # Serializa las transacciones sobre self.conn entre los hilos de Streamlit
+        # y el barrendero de sesiones, que comparten la conexión
+        self._db_lock = threading.RLock()
+        self._session_cache = OrderedDict()
+        self._role_cache = {}
+        self._permissions = None
+        self._permissions_loaded_at = 0.0
+        self.init_auth_tables()
+        # Sesiones con expiración deslizante y barrido de expiradas (ver session_store.py)
+        self.sessions = SessionStore(conn, max_sessions_per_user=max_sessions_per_user, lock=self._db_lock)
+    
+    def init_auth_tables(self):
+        # Las tablas users, sessions y permissions se crean en migrations.py
+        apply_migrations(self.conn)
+        self.create_default_roles()
+    
+    def create_default_roles(self):
+        with self._db_lock:
+            try:
+                self._create_default_roles()
+            except Exception:
+                self.conn.rollback()
+                raise
+        self.invalidate_cache(users=True, permissions=True)
+
+    def _create_default_roles(self):
+        c = self.conn.cursor()
+        
+        # Roles por defecto
+        roles_permissions = [
+            ('admin', 'dashboard', 1, 1, 1),
+            ('admin', 'data_import', 1, 1, 1),
+            ('admin', 'finance', 1, 1, 1),
+            ('admin', 'crm', 1, 1, 1),
+            ('admin', 'hr', 1, 1, 1),
+            ('admin', 'inventory', 1, 1, 1),
+            ('admin', 'admin', 1, 1, 1),
+            ('manager', 'dashboard', 1, 1, 0),
+            ('manager', 'finance', 1, 1, 0),
+            ('manager', 'crm', 1, 1, 0),
+            ('analyst', 'dashboard', 1, 0, 0),
+            ('analyst', 'finance', 1, 0, 0),
+            ('user', 'dashboard', 1, 0, 0)
+        ]
+        
+        for role, module, can_view, can_edit, can_delete in roles_permissions:
+            c.execute('''INSERT OR IGNORE INTO permissions 
+                        (role, module, can_view, can_edit, can_delete)
+                        VALUES (?, ?, ?, ?, ?)''',
+                     (role, module, can_view, can_edit, can_delete))
+        
+        # Crear usuario admin por defecto si no existe - SIN 2FA
+        c.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'")
+        if c.fetchone()[0] == 0:
+            # Hash de la contraseña admin123
+            password_hash = self.hash_password('admin123')
+            c.execute('''INSERT INTO users 
+                        (username, email, password_hash, role, is_active, 
+                         created_at, two_factor_secret)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                     ('admin', 'admin@sistema.pyme', password_hash, 'admin', 1,
+                      datetime.now(), None))  # two_factor_secret = None para admin
+        
+        self.conn.commit()
+    
+    def hash_password(self, password):
+        return self.hasher.hash(password)
+    
+    def verify_password(self, password, hashed_password):
+        return self.hasher.verify(password, hashed_password)
+    
+    def create_user(self, username, email, password, role='user'):
+        c = self.conn.cursor()
+        
+        # Generar secreto para 2FA
+        two_factor_secret = pyotp.random_base32()
+        password_hash = self.hash_password(password)
+        
+        with self._db_lock:
+            try:
+                c.execute('''INSERT INTO users 
+                            (username, email, password_hash, role, is_active, 
+                             created_at, two_factor_secret)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                         (username, email, password_hash, role, 1,
+                          datetime.now(), two_factor_secret))
+                self.conn.commit()
+            except sqlite3.IntegrityError:
+                self.conn.rollback()
+                return False
+        self.invalidate_cache(users=True)
+        return True
+    
+    def authenticate_user(self, username, password, client_ip=None):
+        # Limitar intentos por usuario e IP antes de gastar un hash bcrypt
+        throttle_keys = [f"user:{username}"] + ([f"ip:{client_ip}"] if client_ip else [])
+        self.hasher.check_throttle(throttle_keys)
+        
+        c = self.conn.cursor()
+        c.execute('''SELECT id, username, password_hash, role, two_factor_secret 
+                     FROM users WHERE username = ? AND is_active = 1''', (username,))
+        user = c.fetchone()
+        
+        if user and self.verify_password(password, user[2]):
+            # Solo se olvida el usuario: el contador de la IP caduca solo, o quien
+            # controle una cuenta podría vaciarlo entre intentos contra otras
+            self.hasher.reset_attempts(throttle_keys[:1])
+            
+            # Actualizar último login (y el hash si cambió el coste configurado)
+            new_hash = self.hash_password(password) if self.hasher.needs_rehash(user[2]) else None
+            with self._db_lock:
+                if new_hash:
+                    c.execute('''UPDATE users SET last_login = ?, password_hash = ? WHERE id = ?''',
+                             (datetime.now(), new_hash, user[0]))
+                else:
+                    c.execute('''UPDATE users SET last_login = ? WHERE id = ?''',
+                             (datetime.now(), user[0]))
+                self.conn.commit()
+            
+            user_data = {
+                'id': user[0],
+                'username': user[1],
+                'role': user[3],
+                'two_factor_secret': user[4]
+            }
+            
+            # ✅ EXCEPCIÓN: Si es admin, saltar 2FA automáticamente
+            if username == 'admin':
+                # Crear sesión inmediatamente para admin
+                session_token = self.create_session(user_data['id'])
+                return {**user_data, 'skip_2fa': True, 'session_token': session_token}
+            
+            return user_data
+        
+        self.hasher.register_failure(throttle_keys)
+        return None
+    
+    def generate_2fa_qr(self, secret, username):
+        """Generar código QR para 2FA"""
+        try:
+            # Generar URL de autenticación
+            totp = pyotp.TOTP(secret)
+            auth_url = totp.provisioning_uri(
+                name=username,
+                issuer_name='Sistema PYME'
+            )
+            
+            # Generar QR
+            qr = qrcode.QRCode(
+                version=1,
+                error_correction=qrcode.constants.ERROR_CORRECT_L,
+                box_size=10,
+                border=4,
+            )
+            qr.add_data(auth_url)
+            qr.make(fit=True)
+            
+            img = qr.make_image(fill_color="black", back_color="white")
+            
+            # Convertir a bytes para Streamlit
+            img_bytes = io.BytesIO()
+            img.save(img_bytes, format='PNG')
+            img_bytes.seek(0)
+            
+            return img_bytes
+            
+        except Exception as e:
+            st.error(f"Error generando QR: {str(e)}")
+            return None
+    
+    def verify_2fa(self, secret, token):
+        try:
+            return pyotp.TOTP(secret).verify(token)
+        except:
+            return False
+    
+    def create_session(self, user_id):
+        return self.sessions.create(user_id)
+    
+    def validate_session(self, session_token):
+        if not session_token:
+            return None
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._session_cache.get(session_token)
+            # Una entrada de otra generación puede ser de una sesión ya eliminada
+            if cached and cached[1] > now and cached[2] == self.sessions.generation:
+                self._session_cache.move_to_end(session_token)
+                return cached[0]
+            if cached:
+                del self._session_cache[session_token]
+        
+        generation = self.sessions.generation
+        session = self.sessions.validate(session_token)
+        if session:
+            self._cache_session(session_token, session[0], session[1], generation)
+            return session[0]  # user_id
+        return None
+    
+    def _cache_session(self, session_token, user_id, expires_at, generation):
+        """Guardar una sesión validada.
+
+        La entrada nunca sobrevive a la expiración real y, con expiración
+        deslizante, caduca cuando la sesión debe renovarse: la siguiente
+        validación va a la base de datos y la renueva.
+        """
+        ttl = self.session_cache_ttl
+        try:
+            expires = expires_at if isinstance(expires_at, datetime) else datetime.fromisoformat(str(expires_at))
+            remaining = (expires - datetime.now()).total_seconds()
+            if self.sessions.sliding:
+                remaining -= self.sessions.ttl.total_seconds() / 2
+            ttl = min(ttl, remaining)
+        except ValueError:
+            pass
+        if ttl <= 0:
+            return
+        with self._cache_lock:
+            self._session_cache[session_token] = (user_id, time.monotonic() + ttl, generation)
+            self._session_cache.move_to_end(session_token)
+            while len(self._session_cache) > self.session_cache_size:
+                self._session_cache.popitem(last=False)
+    
+    def revoke_session(self, session_token):
+        """Cerrar una sesión (logout)"""
+        revoked = self.sessions.revoke(session_token)
+        with self._cache_lock:
+            self._session_cache.pop(session_token, None)
+        return revoked
+    
+    def revoke_user_sessions(self, user_id):
+        """Cerrar todas las sesiones de un usuario; devuelve cuántas había"""
+        revoked = self.sessions.revoke_user(user_id)
+        with self._cache_lock:
+            for token in [t for t, entry in self._session_cache.items() if entry[0] == user_id]:
+                del self._session_cache[token]
+        return revoked
+    
+    def _load_permissions(self):
+        """Materializar la matriz rol -> módulo -> acción con una sola consulta"""
+        with self._cache_lock:
+            if (self._permissions is not None and
+                    time.monotonic() - self._permissions_loaded_at < self.permissions_ttl):
+                return self._permissions
+            
+            c = self.conn.cursor()
+            c.execute('''SELECT role, module, can_view, can_edit, can_delete FROM permissions''')
+            matrix = {}
+            for role, module, can_view, can_edit, can_delete in c.fetchall():
+                matrix.setdefault(role, {})[module] = {
+                    'can_view': can_view == 1,
+                    'can_edit': can_edit == 1,
+                    'can_delete': can_delete == 1,
+                }
+            self._permissions = matrix
+            self._permissions_loaded_at = time.monotonic()
+            return matrix
+    
+    def has_permission(self, user_role, module, action):
+        if action not in PERMISSION_ACTIONS:
+            raise ValueError(f"Acción de permiso no válida: {action}")
+        return self._load_permissions().get(user_role, {}).get(module, {}).get(action, False)
+    
+    def get_allowed_modules(self, user_role, action='can_view'):
+        """Módulos en los que el rol tiene el permiso indicado (para construir el menú)"""
+        if action not in PERMISSION_ACTIONS:
+            raise ValueError(f"Acción de permiso no válida: {action}")
+        modules = self._load_permissions().get(user_role, {})
+        return [module for module, actions in modules.items() if actions[action]]
+    
+    def set_permission(self, role, module, can_view, can_edit, can_delete):
+        """Crear o actualizar los permisos de un rol sobre un módulo"""
+        with self._db_lock:
+            c = self.conn.cursor()
+            c.execute('''INSERT INTO permissions (role, module, can_view, can_edit, can_delete)
+                         VALUES (?, ?, ?, ?, ?)
+                         ON CONFLICT(role, module) DO UPDATE SET
+                             can_view = excluded.can_view,
+                             can_edit = excluded.can_edit,
+                             can_delete = excluded.can_delete''',
+                     (role, module, int(can_view), int(can_edit), int(can_delete)))
+            self.conn.commit()
+        self.invalidate_cache(permissions=True)
+    
+    def get_user_role(self, user_id):
+        with self._cache_lock:
+            if user_id in self._role_cache:
+                return self._role_cache[user_id]
+        
+        c = self.conn.cursor()
+        c.execute('SELECT role FROM users WHERE id = ?', (user_id,))
+        result = c.fetchone()
+        role = result[0] if result else 'user'
+        if result:
+            with self._cache_lock:
+                self._role_cache[user_id] = role
+        return role
+    
+    def update_user_role(self, user_id, role):
+        """Cambiar el rol de un usuario"""
+        with self._db_lock:
+            c = self.conn.cursor()
+            c.execute('UPDATE users SET role = ? WHERE id = ?', (role, user_id))
+            self.conn.commit()
+        self.invalidate_cache(users=True)
+        return c.rowcount > 0
+    
+    def invalidate_cache(self, sessions=False, users=False, permissions=False):
+        """Invalidar las cachés afectadas por escrituras en sessions/users/permissions"""
+        with self._cache_lock:
+            if sessions:
+                self._session_cache.clear()
+            if users:
+                self._role_cache.clear()
+                # Un usuario desactivado no debe conservar sesiones en caché
+                self._session_cache.clear()
+            if permissions:
+                self._permissions = None
+
+def render_login_register(auth_system):
+    """Renderizar interfaz de login/registro"""
+    tab1, tab2 = st.tabs(["Iniciar Sesión", "Registrarse"])
+    
+    with tab1:
+        with st.form("login_form"):
+            username = st.text_input("Usuario")
+            password = st.text_input("Contraseña", type="password")
+            submitted = st.form_submit_button("Iniciar Sesión")
+            
+            if submitted:
+                user = None
+                try:
+                    # None en conexiones locales: entonces solo se limita por usuario
+                    user = auth_system.authenticate_user(username, password,
+                                                         client_ip=st.context.ip_address)
+                    if not user:
+                        st.error("Credenciales inválidas")
+                except LoginThrottledError as e:
+                    st.error(f"Demasiados intentos. Intenta nuevamente en {int(e.retry_after) + 1} segundos")
+                except HasherSaturatedError:
+                    st.error("El servidor está ocupado. Intenta nuevamente en unos segundos")
+                
+                if user:
+                    # ✅ Si es admin, acceder directamente
+                    if user.get('skip_2fa', False):
+                        st.session_state.auth_token = user['session_token']
+                        st.session_state.user = {
+                            'id': user['id'],
+                            'username': user['username'],
+                            'role': user['role']
+                        }
+                        st.rerun()
+                    else:
+                        # Verificación 2FA para usuarios normales
+                        if '2fa_verified' not in st.session_state:
+                            st.session_state['2fa_user'] = user
+                            st.session_state['show_2fa'] = True
+                            st.rerun()
+    
+    with tab2:
+        with st.form("register_form"):
+            new_username = st.text_input("Nuevo usuario")
+            new_email = st.text_input("Email")
+            new_password = st.text_input("Nueva contraseña", type="password")
+            confirm_password = st.text_input("Confirmar contraseña", type="password")
+            submitted = st.form_submit_button("Registrarse")
+            
+            if submitted:
+                if new_password != confirm_password:
+                    st.error("Las contraseñas no coinciden")
+                elif auth_system.create_user(new_username, new_email, new_password):
+                    st.success("Usuario creado exitosamente")
+                else:
+                    st.error("El usuario ya existe")
+    
+    # Modal para 2FA - Solo para usuarios que no son admin
+    if st.session_state.get('show_2fa', False):
+        user = st.session_state.get('2fa_user', {})
+        
+        # Verificar que no sea admin
+        if user.get('username') != 'admin':
+            st.write("## 🔐 Verificación en Dos Pasos")
+            
+            # Mostrar instrucciones claras
+            st.info("""
+            **Para acceder, necesitas verificación en dos pasos:**
+            1. Escanea el código QR con Google Authenticator, Authy o Microsoft Authenticator
+            2. Ingresa el código de 6 dígitos que aparece en tu app
+            3. Los códigos NO se envían por email/SMS
+            """)
+            
+            # Generar y mostrar QR inmediatamente
+            if 'qr_generated' not in st.session_state:
+                qr_image = auth_system.generate_2fa_qr(
+                    user.get('two_factor_secret', ''), 
+                    user.get('username', '')
+                )
+                st.session_state.qr_image = qr_image
+                st.session_state.qr_generated = True
+            
+            if st.session_state.get('qr_image'):
+                st.image(st.session_state.qr_image, caption="Escanee con su app de autenticación")
+            else:
+                st.error("No se pudo generar el código QR")
+            
+            # Input para el código
+            token = st.text_input("Código de 6 dígitos", max_chars=6, key="2fa_token")
+            
+            if st.button("✅ Verificar Código", key="verify_2fa"):
+                if user and token and len(token) == 6:
+                    if auth_system.verify_2fa(user.get('two_factor_secret', ''), token):
+                        # Autenticación exitosa
+                        session_token = auth_system.create_session(user['id'])
+                        st.session_state.auth_token = session_token
+                        st.session_state.user = user
+                        st.session_state.show_2fa = False
+                        st.session_state.qr_generated = False
+                        st.rerun()
+                    else:
+                        st.error("❌ Código inválido. Intenta nuevamente.")
+                else:
+                    st.error("⚠️ Por favor ingresa un código de 6 dígitos")
+            
+            # Opción para reintentar
+            if st.button("🔄 Generar nuevo código QR", key="new_qr"):
+                st.session_state.qr_generated = False
                 st.rerun()
\ No newline at end of file
@@ -0,0 +1,378 @@
+# sistema_pyme/backup/backup_scheduler.py
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from backup.backup_system import BackupInProgressError, BackupSystem, FileLock
+
+_FIELD_RANGES = [
+    (0, 59),   # minuto
+    (0, 23),   # hora
+    (1, 31),   # día del mes
+    (1, 12),   # mes
+    (0, 7),    # día de la semana (0 y 7 = domingo)
+]
+
+
+def _parse_field(field: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Paso inválido en expresión cron: {field}")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(v) for v in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Valor fuera de rango en expresión cron: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Expresión cron de 5 campos: minuto hora día-mes mes día-semana.
+
+    Soporta '*', listas (1,15), rangos (1-5) y pasos (*/15, 8-18/2).
+    Como en cron, si se restringen día del mes y día de la semana basta
+    con que coincida uno de los dos.
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"La expresión cron debe tener 5 campos: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_field(field, low, high) for field, (low, high) in zip(fields, _FIELD_RANGES)
+        )
+        # cron acepta 7 como domingo; datetime.weekday() usa 0 = lunes
+        self.weekdays = {(d - 1) % 7 for d in weekdays}
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = dt.weekday() in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, dt: datetime) -> datetime:
+        """Primer instante (al minuto) estrictamente posterior a dt"""
+        candidate = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year = candidate.year + (candidate.month == 12)
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"La expresión cron nunca se cumple: {self.expression!r}")
+
+
+def cron_for_interval(interval_hours: int) -> str:
+    """Expresión cron equivalente a 'cada interval_hours horas'.
+
+    Solo hay equivalente exacto si el intervalo divide el día (1, 2, 3, 4,
+    6, 8, 12 o 24 horas) o es una semana (168): */5 en horas deja un hueco
+    de 4 horas a medianoche y */2 en el día del mes vuelve a empezar el día
+    1. Para cualquier otro intervalo se lanza ValueError; schedule_for_interval
+    los programa con IntervalSchedule.
+    """
+    if interval_hours < 1:
+        raise ValueError("El intervalo debe ser de al menos una hora")
+    if interval_hours < 24 and 24 % interval_hours == 0:
+        return "0 * * * *" if interval_hours == 1 else f"0 */{interval_hours} * * *"
+    if interval_hours == 24:
+        return "0 0 * * *"
+    if interval_hours == 24 * 7:
+        return "0 0 * * 0"
+    raise ValueError(f"Un intervalo de {interval_hours} horas no tiene equivalente cron exacto; "
+                     f"use una expresión cron")
+
+
+class IntervalSchedule:
+    """Ejecución cada N horas contadas desde la anterior (como schedule.every(N).hours).
+
+    Sirve para los intervalos que cron no expresa (5, 36, 48 horas...).
+    """
+
+    def __init__(self, interval_hours: int):
+        if interval_hours < 1:
+            raise ValueError("El intervalo debe ser de al menos una hora")
+        self.interval = timedelta(hours=interval_hours)
+        self.expression = f"cada {interval_hours} horas"
+
+    def next_after(self, dt: datetime) -> datetime:
+        return dt + self.interval
+
+
+def schedule_for_interval(interval_hours: int):
+    """CronSchedule si el intervalo tiene cron exacto; si no, IntervalSchedule"""
+    try:
+        return CronSchedule(cron_for_interval(interval_hours))
+    except ValueError:
+        return IntervalSchedule(interval_hours)
+
+
+@dataclass
+class RetentionPolicy:
+    """Retención GFS: cuántos periodos de cada tipo conservan un backup"""
+    hourly: int = 24
+    daily: int = 7
+    weekly: int = 4
+    monthly: int = 6
+
+
+def select_backups_to_keep(manifests: List[Dict[str, Any]], policy: RetentionPolicy) -> Set[str]:
+    """Nombres de los backups que conserva la política.
+
+    En cada nivel se conserva el backup más reciente de los últimos N
+    periodos con backups; además se conserva la cadena de bases de cada
+    incremental conservado, sin la cual no se podría restaurar.
+    """
+    ordered = sorted(manifests, key=lambda m: m['created'], reverse=True)
+    buckets = [
+        (policy.hourly, lambda dt: dt.strftime('%Y%m%d%H')),
+        (policy.daily, lambda dt: dt.strftime('%Y%m%d')),
+        (policy.weekly, lambda dt: dt.strftime('%G%V')),
+        (policy.monthly, lambda dt: dt.strftime('%Y%m')),
+    ]
+
+    keep: Set[str] = set()
+    for count, bucket_of in buckets:
+        seen: Set[str] = set()
+        for manifest in ordered:
+            if len(seen) >= count:
+                break
+            bucket = bucket_of(datetime.fromisoformat(manifest['created']))
+            if bucket not in seen:
+                seen.add(bucket)
+                keep.add(manifest['name'])
+
+    by_name = {m['name']: m for m in manifests}
+    for name in list(keep):
+        base = by_name.get(name, {}).get('base')
+        while base and base not in keep:
+            keep.add(base)
+            base = by_name.get(base, {}).get('base')
+    return keep
+
+
+def prune_backups(backup_system: BackupSystem, policy: RetentionPolicy) -> List[str]:
+    """Borrar los backups que la política no conserva; devuelve sus nombres"""
+    manifests = backup_system._read_manifests()
+    keep = select_backups_to_keep(manifests, policy)
+    removed = []
+    for manifest in manifests:
+        if manifest['name'] not in keep:
+            backup_system.delete_backup(manifest['name'])
+            removed.append(manifest['name'])
+    return removed
+
+
+class BackupScheduler:
+    """Programador de backups automáticos.
+
+    Un hilo duerme exactamente hasta la siguiente ejecución (sin sondeo
+    periódico), hace un incremental (o un completo cada full_every backups)
+    y aplica la retención. La ejecución sale de la expresión cron o, con
+    interval_hours, de sumar el intervalo al último backup. Un lock de
+    archivo en el directorio de backups garantiza que solo un proceso
+    programa backups a la vez; el que no lo obtiene lo reintenta cada
+    lock_retry segundos.
+    """
+
+    def __init__(self, backup_system: BackupSystem, cron: str = "0 0 * * *",
+                 retention: Optional[RetentionPolicy] = None, incremental: bool = True,
+                 full_every: int = 7, interval_hours: Optional[int] = None,
+                 lock_retry: float = 60.0):
+        self.backup_system = backup_system
+        self.schedule = schedule_for_interval(interval_hours) if interval_hours else CronSchedule(cron)
+        self.retention = retention or RetentionPolicy()
+        self.incremental = incremental
+        self.full_every = full_every
+        self.lock_retry = lock_retry
+
+        self._lock = FileLock(os.path.join(backup_system.backup_dir, '.scheduler.lock'))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._retry: Optional[threading.Timer] = None
+        self._state_lock = threading.Lock()
+        self._since_full = 0
+        self.next_run: Optional[datetime] = None
+        self.last_run: Optional[datetime] = None
+        self._last_attempt: Optional[datetime] = None
+        self.last_backup: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.runs = 0
+        self.skipped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """Arrancar el hilo; False si otro proceso ya programa los backups.
+
+        En ese caso se reintenta el lock cada lock_retry segundos, de modo
+        que este proceso toma el relevo cuando el otro termina.
+        """
+        with self._state_lock:
+            self._stop.clear()
+            return self._start_locked()
+
+    def _start_locked(self) -> bool:
+        if self.running:
+            return True
+        if not self._lock.acquire(blocking=False):
+            if self._retry is not None:
+                self._retry.cancel()
+            self._retry = threading.Timer(self.lock_retry, self._retry_start)
+            self._retry.daemon = True
+            self._retry.start()
+            return False
+        self._retry = None
+        if self._last_attempt is None:
+            latest = self.backup_system._latest_manifest()
+            if latest is not None:
+                self._last_attempt = datetime.fromisoformat(latest['created'])
+        self._thread = threading.Thread(target=self._run, name="backup-scheduler", daemon=True)
+        self._thread.start()
+        return True
+
+    def _retry_start(self) -> None:
+        with self._state_lock:
+            # Un temporizador cancelado o reemplazado no debe arrancar nada
+            if self._retry is not threading.current_thread() or self._stop.is_set():
+                return
+            self._start_locked()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._state_lock:
+            self._stop.set()
+            if self._retry is not None:
+                self._retry.cancel()
+                self._retry = None
+            if self._thread is not None:
+                self._thread.join(timeout)
+                self._thread = None
+            self._lock.release()
+
+    def _next_run(self) -> datetime:
+        """Siguiente ejecución contada desde el último intento (o desde ahora).
+
+        Si ya pasó (el programador estuvo parado), se ejecuta en el acto.
+        """
+        now = datetime.now()
+        if self._last_attempt is None:
+            return self.schedule.next_after(now)
+        return max(self.schedule.next_after(self._last_attempt), now)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.next_run = self._next_run()
+            delay = (self.next_run - datetime.now()).total_seconds()
+            if self._stop.wait(max(delay, 0)):
+                break
+            self.run_once()
+
+    def run_once(self) -> Optional[str]:
+        """Ejecutar un backup programado y la retención"""
+        incremental = self.incremental and 0 < self._since_full < self.full_every
+        self._last_attempt = datetime.now()
+        try:
+            path = self.backup_system.create_backup("automatic", incremental=incremental, wait=False)
+        except BackupInProgressError:
+            self.skipped += 1
+            return None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Error en backup automático: {e}")
+            return None
+
+        self._since_full = self._since_full + 1 if incremental else 1
+        self.runs += 1
+        self.last_run = datetime.now()
+        self.last_backup = path
+        self.last_error = None
+        try:
+            prune_backups(self.backup_system, self.retention)
+        except OSError as e:
+            print(f"Error aplicando retención de backups: {e}")
+        return path
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'waiting_lock': self._retry is not None,
+            'cron': self.schedule.expression,
+            'next_run': self.next_run,
+            'last_run': self.last_run,
+            'last_backup': self.last_backup,
+            'last_error': self.last_error,
+            'runs': self.runs,
+            'skipped': self.skipped,
+        }
+
+    def settings(self) -> Dict[str, Any]:
+        """Opciones efectivas, para comparar programadores"""
+        return {
+            'backup_dir': os.path.abspath(self.backup_system.backup_dir),
+            'schedule': self.schedule.expression,
+            'retention': self.retention,
+            'incremental': self.incremental,
+            'full_every': self.full_every,
+        }
+
+
+_scheduler: Optional[BackupScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_backup_scheduler(backup_system: BackupSystem, **options: Any) -> BackupScheduler:
+    """Programador único del proceso (se crea con las opciones de la primera llamada).
+
+    Las llamadas posteriores con otras opciones lanzan ValueError en lugar
+    de ignorarlas: hay que llamar antes a stop_backup_scheduler().
+    """
+    global _scheduler
+    options = {k: v for k, v in options.items() if v is not None}
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = BackupScheduler(backup_system, **options)
+            return _scheduler
+        current = _scheduler.settings()
+        requested = BackupScheduler(backup_system, **options).settings()
+        changed = [key for key in current if current[key] != requested[key]]
+        if changed:
+            raise ValueError(f"El programador de backups ya existe con otra configuración "
+                             f"({', '.join(changed)}); deténgalo con stop_backup_scheduler()")
+        return _scheduler
+
+
+def stop_backup_scheduler() -> None:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.stop()
+            _scheduler = None
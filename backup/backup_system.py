@@ -1,137 +1,725 @@
-# sistema_pyme/backup/backup_system.py
-import sqlite3
-import os
-import shutil
-import zipfile
-from datetime import datetime
-import schedule
-import time
-from threading import Thread
-
-class BackupSystem:
-    def __init__(self, db_path: str, backup_dir: str = "data/backups"):
-        self.db_path = db_path
-        self.backup_dir = backup_dir
-        os.makedirs(backup_dir, exist_ok=True)
-    
-    def create_backup(self, backup_type: str = "manual") -> str:
-        """Crear un backup de la base de datos"""
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"backup_{timestamp}_{backup_type}.db"
-            backup_path = os.path.join(self.backup_dir, backup_filename)
-            
-            # Conectar y hacer backup
-            conn = sqlite3.connect(self.db_path)
-            with open(backup_path, 'w') as f:
-                for line in conn.iterdump():
-                    f.write('%s\n' % line)
-            conn.close()
-            
-            # Comprimir backup
-            zip_path = f"{backup_path}.zip"
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                zipf.write(backup_path, os.path.basename(backup_path))
-            
-            # Eliminar archivo sin comprimir
-            os.remove(backup_path)
-            
-            # Registrar en log
-            self._log_backup(backup_type, zip_path, True, "Backup completado exitosamente")
-            
-            return zip_path
-            
-        except Exception as e:
-            error_msg = f"Error al crear backup: {str(e)}"
-            self._log_backup(backup_type, "", False, error_msg)
-            raise Exception(error_msg)
-    
-    def restore_backup(self, backup_path: str) -> bool:
-        """Restaurar desde un backup"""
-        try:
-            # Verificar que el backup existe
-            if not os.path.exists(backup_path):
-                raise Exception("Archivo de backup no encontrado")
-            
-            # Crear conexión temporal
-            temp_db = "data/restore_temp.db"
-            if os.path.exists(temp_db):
-                os.remove(temp_db)
-            
-            conn = sqlite3.connect(temp_db)
-            conn.close()
-            
-            # Restaurar datos
-            os.remove(temp_db)
-            shutil.copy2(backup_path, self.db_path)
-            
-            self._log_restore(backup_path, True, "Restauración completada exitosamente")
-            return True
-            
-        except Exception as e:
-            error_msg = f"Error al restaurar backup: {str(e)}"
-            self._log_restore(backup_path, False, error_msg)
-            return False
-    
-    def list_backups(self) -> list:
-        """Listar todos los backups disponibles"""
-        backups = []
-        for file in os.listdir(self.backup_dir):
-            if file.endswith('.zip'):
-                file_path = os.path.join(self.backup_dir, file)
-                file_time = os.path.getmtime(file_path)
-                backups.append({
-                    'name': file,
-                    'path': file_path,
-                    'size': os.path.getsize(file_path),
-                    'created': datetime.fromtimestamp(file_time)
-                })
-        
-        return sorted(backups, key=lambda x: x['created'], reverse=True)
-    
-    def _log_backup(self, backup_type: str, backup_path: str, success: bool, message: str):
-        """Registrar operación de backup en log"""
-        log_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'type': 'backup',
-            'backup_type': backup_type,
-            'backup_path': backup_path,
-            'success': success,
-            'message': message
-        }
-        
-        # Guardar en archivo de log
-        log_file = os.path.join(self.backup_dir, 'backup_log.json')
-        with open(log_file, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
-    
-    def _log_restore(self, backup_path: str, success: bool, message: str):
-        """Registrar operación de restauración en log"""
-        log_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'type': 'restore',
-            'backup_path': backup_path,
-            'success': success,
-            'message': message
-        }
-        
-        # Guardar en archivo de log
-        log_file = os.path.join(self.backup_dir, 'backup_log.json')
-        with open(log_file, 'a') as f:
-            f.write(json.dumps(log_entry) + '\n')
-    
-    def start_automatic_backups(self, interval_hours: int = 24):
-        """Iniciar backups automáticos programados"""
-        def backup_job():
-            self.create_backup("automatic")
-        
-        # Programar backup diario
-        schedule.every(interval_hours).hours.do(backup_job)
-        
-        # Ejecutar en segundo plano
-        def run_scheduler():
-            while True:
-                schedule.run_pending()
-                time.sleep(3600)  # Revisar cada hora
-        
-        Thread(target=run_scheduler, daemon=True).start()
\ No newline at end of file
+# sistema_pyme/backup/backup_system.py
+import sqlite3
+import os
+import json
+import gzip
+import hashlib
+import queue
+import struct
+import threading
+import zipfile
+from datetime import datetime
+import time
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, List, Optional
+
+import database as db
+from migrations import VERSIONED_TABLES, apply_migrations
+
+if TYPE_CHECKING:
+    from backup.backup_scheduler import BackupScheduler, RetentionPolicy
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional; gzip siempre está disponible
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CHUNK_SIZE = 1024 * 1024
+PAGE_HASH_SIZE = 16
+PAGE_RECORD_HEADER = struct.Struct('>I')
+MANIFEST_SUFFIX = '.manifest.json'
+# Backups anteriores a los manifiestos: volcado SQL (iterdump) dentro de un zip
+LEGACY_SUFFIX = '.zip'
+
+
+def open_compressed(path: str, mode: str, compression: str, level: int = 6) -> BinaryIO:
+    """Abrir un archivo comprimido con gzip o zstd para lectura/escritura en streaming"""
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("Compresión zstd no disponible: instale el paquete 'zstandard'")
+        raw = open(path, mode)
+        if 'w' in mode:
+            return zstandard.ZstdCompressor(level=level).stream_writer(raw, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    if compression == 'gzip':
+        if 'w' in mode:
+            return gzip.open(path, mode, compresslevel=level)
+        return gzip.open(path, mode)
+    raise ValueError(f"Compresión no soportada: {compression}")
+
+
+def read_exact(stream: BinaryIO, size: int) -> bytes:
+    """Leer exactamente size bytes (menos solo al final del stream)"""
+    data = stream.read(size)
+    while data and len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 de un archivo leído en bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Sha256Thread:
+    """SHA-256 calculado en otro hilo con los bloques que se le pasan.
+
+    hashlib libera el GIL con bloques grandes, así que el hash avanza a la
+    vez que la descompresión que produce los bloques. Los bloques no deben
+    modificarse después de pasarlos.
+    """
+
+    def __init__(self, max_pending: int = 8):
+        self._digest = hashlib.sha256()
+        self._queue: 'queue.Queue[Optional[bytes]]' = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, name="restore-sha256", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        for chunk in iter(self._queue.get, None):
+            self._digest.update(chunk)
+
+    def update(self, chunk: bytes) -> None:
+        self._queue.put(chunk)
+
+    def hexdigest(self) -> str:
+        """Esperar a los bloques pendientes y devolver el hash (una sola vez)"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        return self._digest.hexdigest()
+
+
+class BackupInProgressError(Exception):
+    """Ya hay un backup en curso sobre el mismo directorio"""
+
+
+class FileLock:
+    """Lock exclusivo entre procesos (y entre hilos) sobre un archivo"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+
+    def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        fh = open(self.path, 'a+')
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    fh.seek(0)
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+                self._fh = fh
+                return True
+            except OSError:
+                if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                    fh.close()
+                    return False
+                time.sleep(0.1)
+
+    def release(self) -> None:
+        if self._fh is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            else:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> 'FileLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+
+class _TooManyRestarts(Exception):
+    """Interrumpe un backup por pasos que se reinicia demasiadas veces"""
+
+
+class BackupSystem:
+    """Backups en caliente con la API de backup de SQLite.
+
+    - Full: copia página a página (pages_per_step páginas por paso, con una
+      pausa entre pasos para no acaparar la E/S) y se comprime en streaming.
+    - Incremental: se comparan los hashes de página con el backup anterior y
+      solo se guardan las páginas que cambiaron.
+
+    Cada backup tiene un manifiesto JSON con tipo, base, tamaños y checksums;
+    list_backups() lee los manifiestos en vez de inspeccionar los archivos.
+
+    Con latency_budget_ms, entre pasos se mide una consulta de sondeo y la
+    pausa crece mientras la latencia supere el presupuesto.
+    """
+
+    def __init__(self, db_path: str, backup_dir: str = "data/backups",
+                 compression: str = "gzip", compression_level: int = 6,
+                 pages_per_step: int = 1024, step_pause: float = 0.005,
+                 max_restarts: int = 5, latency_budget_ms: Optional[float] = None,
+                 max_step_pause: float = 1.0):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        if compression == 'zstd' and zstandard is None:
+            print("⚠️ zstandard no está instalado; se usará gzip para los backups")
+            compression = 'gzip'
+        self.compression = compression
+        self.compression_level = compression_level
+        self.pages_per_step = pages_per_step
+        self.step_pause = step_pause
+        self.max_restarts = max_restarts
+        self.latency_budget_ms = latency_budget_ms
+        self.max_step_pause = max_step_pause
+        self.last_restore_stats: Optional[Dict[str, Any]] = None
+        self._adaptive_pause = 0.0
+        self._throttle_stats = self._empty_throttle_stats()
+        os.makedirs(backup_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Creación de backups
+    # ------------------------------------------------------------------
+    def create_backup(self, backup_type: str = "manual", incremental: bool = False,
+                      wait: bool = True) -> str:
+        """Crear un backup (completo o incremental) y devolver la ruta del archivo.
+
+        Nunca se solapan dos backups del mismo directorio, ni siquiera desde
+        procesos distintos: con wait=False se lanza BackupInProgressError.
+        """
+        lock = FileLock(os.path.join(self.backup_dir, '.backup.lock'))
+        if not lock.acquire(blocking=wait):
+            raise BackupInProgressError("Ya hay un backup en curso")
+        try:
+            return self._create_backup(backup_type, incremental)
+        finally:
+            lock.release()
+
+    def _create_backup(self, backup_type: str, incremental: bool) -> str:
+        snapshot_path = None
+        self._throttle_stats = self._empty_throttle_stats()
+        try:
+            started = time.perf_counter()
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            name = f"backup_{timestamp}_{backup_type}"
+            snapshot_path = os.path.join(self.backup_dir, f".{name}.snapshot")
+
+            self._snapshot(snapshot_path)
+            page_size, page_hashes = self._page_hashes(snapshot_path)
+
+            parent = self._latest_manifest() if incremental else None
+            if parent is not None and parent.get('page_size') != page_size:
+                parent = None
+
+            if parent is None:
+                manifest = self._write_full(name, snapshot_path)
+            else:
+                manifest = self._write_incremental(name, snapshot_path, page_size,
+                                                   page_hashes, parent)
+
+            with open(os.path.join(self.backup_dir, f"{name}.pages"), 'wb') as f:
+                f.write(b''.join(page_hashes))
+
+            manifest.update({
+                'name': name,
+                'backup_type': backup_type,
+                'created': datetime.now().isoformat(),
+                'compression': self.compression,
+                'compression_level': self.compression_level,
+                'page_size': page_size,
+                'page_count': len(page_hashes),
+                'db_size': os.path.getsize(snapshot_path),
+                'sha256': file_sha256(snapshot_path),
+                'page_hashes': f"{name}.pages",
+                'duration_s': round(time.perf_counter() - started, 3),
+                'throttle': dict(self._throttle_stats),
+            })
+            archive_path = os.path.join(self.backup_dir, manifest['archive'])
+            manifest['archive_size'] = os.path.getsize(archive_path)
+            manifest['archive_sha256'] = file_sha256(archive_path)
+
+            # El manifiesto se escribe al final: un backup sin manifiesto está incompleto
+            manifest_path = os.path.join(self.backup_dir, f"{name}{MANIFEST_SUFFIX}")
+            with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(manifest_path + '.tmp', manifest_path)
+
+            # Registrar en log
+            self._log_backup(backup_type, archive_path, True, "Backup completado exitosamente")
+            
+            return archive_path
+            
+        except Exception as e:
+            error_msg = f"Error al crear backup: {str(e)}"
+            self._log_backup(backup_type, "", False, error_msg)
+            raise Exception(error_msg)
+        finally:
+            if snapshot_path and os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+
+    def _snapshot(self, snapshot_path: str) -> None:
+        """Copiar la base con Connection.backup en pasos de pages_per_step páginas.
+
+        Si otra conexión escribe durante la copia, SQLite reinicia el backup;
+        tras max_restarts reinicios se termina en un único paso.
+        """
+        restarts = 0
+        last_remaining = None
+
+        def progress(status: int, remaining: int, total: int) -> None:
+            nonlocal restarts, last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > self.max_restarts:
+                    raise _TooManyRestarts()
+            last_remaining = remaining
+            self._throttle()
+
+        with db.get_read_connection(self.db_path) as source:
+            target = sqlite3.connect(snapshot_path)
+            try:
+                try:
+                    source.backup(target, pages=self.pages_per_step, progress=progress)
+                except _TooManyRestarts:
+                    print(f"⚠️ Backup reiniciado {restarts} veces; copiando en un solo paso")
+                    source.backup(target, pages=-1)
+                # La copia no debe depender de un -wal: dejarla en modo rollback
+                target.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                target.close()
+
+    def _page_hashes(self, snapshot_path: str) -> tuple:
+        """Tamaño de página y hash corto de cada página del snapshot"""
+        with open(snapshot_path, 'rb') as f:
+            header = f.read(100)
+            page_size = struct.unpack('>H', header[16:18])[0] if len(header) >= 18 else 4096
+            page_size = 65536 if page_size == 1 else page_size
+            f.seek(0)
+            hashes = [hashlib.blake2b(page, digest_size=PAGE_HASH_SIZE).digest()
+                      for page in iter(lambda: f.read(page_size), b'')]
+        return page_size, hashes
+
+    def _archive_name(self, name: str, suffix: str) -> str:
+        extension = 'zst' if self.compression == 'zstd' else 'gz'
+        return f"{name}.{suffix}.{extension}"
+
+    def _write_full(self, name: str, snapshot_path: str) -> Dict[str, Any]:
+        archive = self._archive_name(name, 'db')
+        with open(snapshot_path, 'rb') as src, \
+                open_compressed(os.path.join(self.backup_dir, archive), 'wb',
+                                self.compression, self.compression_level) as dst:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                dst.write(chunk)
+                self._throttle()
+        return {'type': 'full', 'archive': archive, 'base': None}
+
+    def _write_incremental(self, name: str, snapshot_path: str, page_size: int,
+                           page_hashes: List[bytes], parent: Dict[str, Any]) -> Dict[str, Any]:
+        with open(os.path.join(self.backup_dir, parent['page_hashes']), 'rb') as f:
+            data = f.read()
+        previous = [data[i:i + PAGE_HASH_SIZE] for i in range(0, len(data), PAGE_HASH_SIZE)]
+
+        archive = self._archive_name(name, 'pages')
+        changed = 0
+        with open(snapshot_path, 'rb') as src, \
+                open_compressed(os.path.join(self.backup_dir, archive), 'wb',
+                                self.compression, self.compression_level) as dst:
+            for page_no, page_hash in enumerate(page_hashes):
+                if page_no < len(previous) and previous[page_no] == page_hash:
+                    continue
+                src.seek(page_no * page_size)
+                dst.write(PAGE_RECORD_HEADER.pack(page_no))
+                dst.write(src.read(page_size))
+                changed += 1
+                if changed % 256 == 0:
+                    self._throttle()
+        return {'type': 'incremental', 'archive': archive, 'base': parent['name'],
+                'changed_pages': changed}
+
+    @staticmethod
+    def _empty_throttle_stats() -> Dict[str, Any]:
+        return {'probes': 0, 'over_budget': 0, 'max_latency_ms': 0.0, 'paused_s': 0.0}
+
+    def _throttle(self) -> None:
+        """Pausa entre pasos; se adapta a la latencia medida si hay presupuesto"""
+        if self.latency_budget_ms is not None:
+            started = time.perf_counter()
+            with db.get_read_connection(self.db_path) as conn:
+                conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            stats = self._throttle_stats
+            stats['probes'] += 1
+            stats['max_latency_ms'] = round(max(stats['max_latency_ms'], latency_ms), 3)
+            if latency_ms > self.latency_budget_ms:
+                stats['over_budget'] += 1
+                self._adaptive_pause = min(max(self._adaptive_pause * 2, 0.01), self.max_step_pause)
+            else:
+                self._adaptive_pause /= 2
+
+        pause = self.step_pause + self._adaptive_pause
+        if pause:
+            self._throttle_stats['paused_s'] = round(self._throttle_stats['paused_s'] + pause, 3)
+            time.sleep(pause)
+
+    # ------------------------------------------------------------------
+    # Manifiestos
+    # ------------------------------------------------------------------
+    def _read_manifests(self) -> List[Dict[str, Any]]:
+        manifests = []
+        for file in os.listdir(self.backup_dir):
+            if file.endswith(MANIFEST_SUFFIX):
+                try:
+                    with open(os.path.join(self.backup_dir, file), encoding='utf-8') as f:
+                        manifests.append(json.load(f))
+                except (OSError, ValueError) as e:
+                    print(f"Manifiesto de backup inválido {file}: {e}")
+        return sorted(manifests, key=lambda m: m.get('created', ''), reverse=True)
+
+    def _latest_manifest(self) -> Optional[Dict[str, Any]]:
+        manifests = self._read_manifests()
+        return manifests[0] if manifests else None
+
+    def delete_backup(self, name: str) -> None:
+        """Borrar un backup (archivo, hashes de página y manifiesto)"""
+        manifest = self.get_manifest(name)
+        files = [f"{name}{MANIFEST_SUFFIX}", f"{name}.pages"]
+        if manifest is not None:
+            files.insert(0, manifest['archive'])
+        elif name.endswith(LEGACY_SUFFIX):
+            files.insert(0, name)
+        for file in files:
+            path = os.path.join(self.backup_dir, file)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def get_manifest(self, name: str) -> Optional[Dict[str, Any]]:
+        """Manifiesto de un backup por nombre"""
+        path = os.path.join(self.backup_dir, f"{name}{MANIFEST_SUFFIX}")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def restore_backup(self, backup_path: str, verify: str = "quick") -> bool:
+        """Restaurar desde un backup (ruta del archivo o nombre del backup).
+
+        Las páginas de los incrementales de la cadena se cargan primero (solo
+        las cambiadas); después el completo se descomprime en streaming a un
+        staging junto a la base aplicando esas páginas al vuelo, mientras otro
+        hilo calcula el SHA-256 de los mismos bloques: el staging no se vuelve
+        a leer para el checksum. Con el checksum correcto se pasa quick_check
+        o integrity_check y solo entonces se copia sobre la base activa con
+        la API de backup de SQLite (ver _swap_into_live). Las métricas quedan
+        en last_restore_stats.
+
+        Los backups legacy (.zip sin manifiesto) se restauran ejecutando su
+        volcado SQL en el staging; el CRC del zip hace de checksum.
+
+        No hace falta reiniciar: las conexiones abiertas (recursos de main.py,
+        la API, el programador) siguen siendo válidas y ven la base restaurada
+        en su siguiente transacción.
+        """
+        staging_path = f"{self.db_path}.restore"
+        try:
+            started = time.perf_counter()
+            legacy = self._legacy_archive(backup_path)
+            if legacy is not None:
+                chain = [{'name': os.path.basename(legacy)}]
+                restored_bytes = self._write_legacy_staging(legacy, staging_path)
+            else:
+                chain = self._restore_chain(backup_path)
+                target = chain[-1]
+
+                # 1. Páginas de los incrementales, del más antiguo al más nuevo (gana el último)
+                pages: Dict[int, bytes] = {}
+                for manifest in chain[1:]:
+                    self._read_pages(manifest, pages)
+
+                # 2. Descomprimir el completo con las páginas aplicadas y el checksum en paralelo
+                digest = Sha256Thread()
+                try:
+                    restored_bytes = self._write_staging(chain[0], target, pages, staging_path, digest)
+                finally:
+                    checksum = digest.hexdigest()
+                if checksum != target['sha256']:
+                    raise Exception("Checksum del backup no coincide")
+            decompress_s = time.perf_counter() - started
+
+            # 3. Verificar la estructura antes de tocar la base activa
+            check = 'integrity_check' if verify == 'full' else 'quick_check'
+            conn = sqlite3.connect(staging_path)
+            try:
+                result = conn.execute(f"PRAGMA {check}").fetchone()[0]
+            finally:
+                conn.close()
+            if result != 'ok':
+                raise Exception(f"{check} falló: {result}")
+
+            # 4. Copiar el staging sobre la base activa sin cerrar sus conexiones
+            self._swap_into_live(staging_path)
+
+            duration = time.perf_counter() - started
+            size = os.path.getsize(staging_path)
+            self.last_restore_stats = {
+                'backup': chain[-1]['name'],
+                'chain': [m['name'] for m in chain],
+                'db_size': size,
+                'bytes_written': restored_bytes,
+                'decompress_s': round(decompress_s, 3),
+                'verify_s': round(duration - decompress_s, 3),
+                'duration_s': round(duration, 3),
+                'throughput_mb_s': round(size / (1024 * 1024) / duration, 2) if duration else None,
+            }
+
+            self._log_restore(backup_path, True, "Restauración completada exitosamente")
+            return True
+            
+        except Exception as e:
+            error_msg = f"Error al restaurar backup: {str(e)}"
+            self._log_restore(backup_path, False, error_msg)
+            return False
+        finally:
+            if os.path.exists(staging_path):
+                os.remove(staging_path)
+
+    def _swap_into_live(self, staging_path: str) -> None:
+        """Sustituir el contenido de la base activa por el del staging.
+
+        La copia la hace SQLite en una sola transacción de escritura sobre la
+        base activa, coordinada con las demás conexiones (de este y de otros
+        procesos) por sus locks y su WAL: nadie ve una base a medias y no se
+        borra ningún archivo que otra conexión tenga abierto.
+
+        Antes de copiar, el staging se migra al esquema actual y sus
+        contadores de table_versions se colocan por encima de los de la base
+        activa: las cachés por versión (cache.py, kpi_engine) no pueden
+        confundir los datos restaurados con resultados ya guardados.
+        """
+        staging = sqlite3.connect(staging_path)
+        try:
+            apply_migrations(staging)
+            with db.get_pool(self.db_path).writer() as live:
+                try:
+                    current = db.get_table_versions(live)
+                except sqlite3.OperationalError:  # base anterior a la migración 8
+                    current = {}
+                for table in VERSIONED_TABLES:
+                    staging.execute("UPDATE table_versions SET version = version + ? WHERE table_name = ?",
+                                    (current.get(table, (0, 0))[0] + 1, table))
+                staging.commit()
+                staging.backup(live)
+        finally:
+            staging.close()
+
+    def _restore_chain(self, backup_path: str) -> List[Dict[str, Any]]:
+        """Manifiestos desde el backup completo hasta el pedido"""
+        archive = os.path.basename(backup_path)
+        manifest = next((m for m in self._read_manifests()
+                         if archive in (m['archive'], m['name'])), None)
+        if manifest is None:
+            raise Exception("Archivo de backup no encontrado")
+
+        chain = [manifest]
+        while chain[0].get('base'):
+            base = self.get_manifest(chain[0]['base'])
+            if base is None:
+                raise Exception(f"Falta el backup base {chain[0]['base']}")
+            chain.insert(0, base)
+        return chain
+
+    def _legacy_archive(self, backup_path: str) -> Optional[str]:
+        """Ruta del backup si es un .zip legacy (sin manifiesto que lo reclame)"""
+        archive = os.path.basename(backup_path)
+        path = os.path.join(self.backup_dir, archive)
+        if not archive.endswith(LEGACY_SUFFIX) or not os.path.isfile(path):
+            return None
+        if any(m['archive'] == archive for m in self._read_manifests()):
+            return None
+        return path
+
+    def _write_legacy_staging(self, archive_path: str, staging_path: str) -> int:
+        """Reconstruir en staging_path la base de un backup legacy.
+
+        El volcado se ejecuta sentencia a sentencia según se descomprime, sin
+        cargarlo entero en memoria. zipfile comprueba el CRC al terminar de
+        leer el miembro. Devuelve los bytes del volcado leídos.
+        """
+        with zipfile.ZipFile(archive_path) as zf:
+            members = [m for m in zf.namelist() if m.endswith('.db')]
+            if len(members) != 1:
+                raise Exception(f"Backup legacy sin volcado: {os.path.basename(archive_path)}")
+            conn = sqlite3.connect(staging_path, isolation_level=None)
+            try:
+                read = 0
+                statement = ''
+                with zf.open(members[0]) as raw:
+                    for line in raw:
+                        read += len(line)
+                        statement += line.decode('utf-8')
+                        if sqlite3.complete_statement(statement):
+                            conn.execute(statement)
+                            statement = ''
+                if statement.strip():
+                    raise Exception("Volcado del backup legacy truncado")
+                if conn.in_transaction:
+                    conn.execute('COMMIT')
+            finally:
+                conn.close()
+        return read
+
+    def _read_pages(self, manifest: Dict[str, Any], pages: Dict[int, bytes]) -> None:
+        """Añadir a pages las páginas guardadas por un incremental"""
+        page_size = manifest['page_size']
+        with open_compressed(os.path.join(self.backup_dir, manifest['archive']), 'rb',
+                             manifest.get('compression', 'gzip')) as src:
+            while True:
+                header = read_exact(src, PAGE_RECORD_HEADER.size)
+                if not header:
+                    break
+                page_no, = PAGE_RECORD_HEADER.unpack(header)
+                page = read_exact(src, page_size)
+                if len(page) != page_size:
+                    raise Exception(f"Backup incremental truncado: {manifest['name']}")
+                pages[page_no] = page
+
+    def _write_staging(self, full: Dict[str, Any], target: Dict[str, Any], pages: Dict[int, bytes],
+                       staging_path: str, digest: Sha256Thread) -> int:
+        """Escribir en staging_path la base de target: el completo full con pages encima.
+
+        Cada bloque se escribe y se pasa a digest ya con sus páginas aplicadas
+        y recortado al tamaño final. Devuelve los bytes escritos.
+        """
+        page_size = target['page_size']
+        size = target['page_count'] * page_size
+        # Bloques de páginas enteras: una página nunca queda partida entre dos bloques
+        block = max(CHUNK_SIZE // page_size, 1) * page_size
+        offset = 0
+
+        def emit(data: bytes) -> None:
+            nonlocal offset
+            if pages:
+                first = offset // page_size
+                patched = bytearray(data)
+                for page_no in range(first, first + len(data) // page_size):
+                    page = pages.get(page_no)
+                    if page is not None:
+                        start = (page_no - first) * page_size
+                        patched[start:start + page_size] = page
+                data = bytes(patched)
+            dst.write(data)
+            digest.update(data)
+            offset += len(data)
+
+        with open_compressed(os.path.join(self.backup_dir, full['archive']), 'rb',
+                             full.get('compression', 'gzip')) as src, \
+                open(staging_path, 'wb') as dst:
+            while offset < size:
+                data = read_exact(src, min(block, size - offset))
+                if not data:
+                    break
+                emit(data)
+            # La base creció después del completo: el resto son páginas de los incrementales
+            for page_no in range(offset // page_size, size // page_size):
+                if page_no not in pages:
+                    raise Exception(f"Falta la página {page_no} en la cadena de {target['name']}")
+                emit(pages[page_no])
+        return offset
+
+    def list_backups(self) -> list:
+        """Listar todos los backups disponibles, del más reciente al más antiguo.
+
+        Los de manifiesto y también los .zip legacy (type 'legacy'), que
+        restore_backup sigue sabiendo restaurar.
+        """
+        backups = []
+        archives = set()
+        for manifest in self._read_manifests():
+            archives.add(manifest['archive'])
+            backups.append({
+                'name': manifest['name'],
+                'path': os.path.join(self.backup_dir, manifest['archive']),
+                'size': manifest.get('archive_size', 0),
+                'created': datetime.fromisoformat(manifest['created']),
+                'type': manifest.get('type', 'full'),
+                'base': manifest.get('base'),
+                'backup_type': manifest.get('backup_type'),
+                'sha256': manifest.get('sha256'),
+            })
+        for file in os.listdir(self.backup_dir):
+            if file.endswith(LEGACY_SUFFIX) and file not in archives:
+                file_path = os.path.join(self.backup_dir, file)
+                backups.append({
+                    'name': file,
+                    'path': file_path,
+                    'size': os.path.getsize(file_path),
+                    'created': datetime.fromtimestamp(os.path.getmtime(file_path)),
+                    'type': 'legacy',
+                    'base': None,
+                    'backup_type': None,
+                    'sha256': None,
+                })
+        return sorted(backups, key=lambda b: b['created'], reverse=True)
+    
+    def _log_backup(self, backup_type: str, backup_path: str, success: bool, message: str):
+        """Registrar operación de backup en log"""
+        log_entry = {
+            'timestamp': datetime.now().isoformat(),
+            'type': 'backup',
+            'backup_type': backup_type,
+            'backup_path': backup_path,
+            'success': success,
+            'message': message
+        }
+        
+        # Guardar en archivo de log
+        log_file = os.path.join(self.backup_dir, 'backup_log.json')
+        with open(log_file, 'a') as f:
+            f.write(json.dumps(log_entry) + '\n')
+    
+    def _log_restore(self, backup_path: str, success: bool, message: str):
+        """Registrar operación de restauración en log"""
+        log_entry = {
+            'timestamp': datetime.now().isoformat(),
+            'type': 'restore',
+            'backup_path': backup_path,
+            'success': success,
+            'message': message
+        }
+        
+        # Guardar en archivo de log
+        log_file = os.path.join(self.backup_dir, 'backup_log.json')
+        with open(log_file, 'a') as f:
+            f.write(json.dumps(log_entry) + '\n')
+    
+    def start_automatic_backups(self, interval_hours: int = 24, cron: Optional[str] = None,
+                                retention: Optional['RetentionPolicy'] = None) -> 'BackupScheduler':
+        """Iniciar backups automáticos programados.
+
+        Acepta cualquier intervalo en horas; cron, si se da, tiene prioridad.
+        Es idempotente: el programador es único por proceso y, entre
+        procesos, solo programa el que obtiene el lock del directorio.
+        """
+        from backup.backup_scheduler import get_backup_scheduler
+
+        scheduler = get_backup_scheduler(self, cron=cron,
+                                         interval_hours=None if cron else interval_hours,
+                                         retention=retention)
+        scheduler.start()
+        return scheduler
\ No newline at end of file
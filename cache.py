@@ -0,0 +1,208 @@
+# sistema_pyme/cache.py
+"""
+Caché compartida por todo el proceso.
+
+- Recursos: objetos de larga vida (AuthSystem, EventSystem, BackupSystem...)
+  creados una sola vez por proceso y reutilizados en cada rerun de
+  Streamlit y en cualquier otro punto de entrada (get_resource / @resource).
+- Versiones de tablas: TableVersionTracker mantiene una conexión propia y
+  consulta PRAGMA data_version, que solo cambia cuando otra conexión
+  confirma una escritura. Mientras no cambie, las versiones de
+  table_versions (ver database.get_table_versions) se sirven de memoria
+  sin leer ninguna página de la base.
+- Resultados: QueryCache guarda el resultado de cada consulta o función
+  de consulta con la clave (consulta, parámetros, versiones de las tablas
+  que lee). Una escritura en una tabla invalida solo sus resultados, y una
+  página sin cambios se pinta sin tocar la base de datos.
+
+Los resultados se comparten entre sesiones: no deben modificarse.
+"""
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import database as db
+from migrations import VERSIONED_TABLES
+
+T = TypeVar('T')
+
+_resources: Dict[str, Any] = {}
+_closers: Dict[str, Callable[[Any], None]] = {}
+_resource_locks: Dict[str, threading.Lock] = {}
+_resources_lock = threading.Lock()
+
+
+def get_resource(name: str, factory: Callable[[], T], close: Optional[Callable[[T], None]] = None) -> T:
+    """Recurso name del proceso, creado con factory() la primera vez.
+
+    Cada nombre tiene su propio lock: una fábrica lenta (p. ej. cargar
+    plugins) no bloquea la creación de los demás recursos.
+    """
+    with _resources_lock:
+        if name in _resources:
+            return _resources[name]
+        lock = _resource_locks.setdefault(name, threading.Lock())
+    with lock:
+        with _resources_lock:
+            if name in _resources:
+                return _resources[name]
+        value = factory()
+        with _resources_lock:
+            _resources[name] = value
+            if close is not None:
+                _closers[name] = close
+        return value
+
+
+def resource(func: Callable[[], T]) -> Callable[[], T]:
+    """Decorador: la función devuelve siempre el mismo recurso del proceso.
+
+    La clave es el nombre cualificado de la función, así que sigue siendo
+    la misma aunque Streamlit vuelva a ejecutar el script y redefina la
+    función en cada rerun.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @wraps(func)
+    def wrapper() -> T:
+        return get_resource(name, func)
+    return wrapper
+
+
+def drop_resource(name: str) -> None:
+    """Olvidar un recurso (y cerrarlo si se registró cómo)"""
+    with _resources_lock:
+        value = _resources.pop(name, None)
+        closer = _closers.pop(name, None)
+    if value is not None and closer is not None:
+        closer(value)
+
+
+def clear_resources() -> None:
+    """Olvidar todos los recursos (apagado de la aplicación y tests)"""
+    with _resources_lock:
+        names = list(_resources)
+    for name in names:
+        drop_resource(name)
+
+
+class TableVersionTracker:
+    """Versiones de las tablas de una base, releídas solo cuando alguien escribe"""
+
+    def __init__(self, db_path: str = db.DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._versions: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    def versions(self, tables: Iterable[str] = VERSIONED_TABLES) -> Dict[str, Tuple[int, int]]:
+        """Versión de cada tabla de tables"""
+        tables = list(tables)
+        pool = db.get_pool(self.db_path)
+        with self._lock:
+            if pool.is_memory:
+                # Una base en memoria solo tiene una conexión: data_version no ve sus commits
+                with pool.reader() as conn:
+                    return db.get_table_versions(conn, tables)
+            if self._conn is None:
+                self._conn = pool.dedicated_reader()
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version or not set(tables) <= self._versions.keys():
+                # Si alguien escribe entre las dos lecturas, data_version ya habrá
+                # cambiado en la siguiente llamada y se releerán las versiones
+                self._versions = db.get_table_versions(self._conn)
+                self._data_version = data_version
+                self.refreshes += 1
+            return {table: self._versions[table] for table in tables}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._data_version = None
+
+
+_TABLE_PATTERN = re.compile(r'\b(?:from|join)\s+["`\[]?(\w+)', re.IGNORECASE)
+
+
+def tables_in(sql: str) -> Tuple[str, ...]:
+    """Tablas versionadas que aparecen en FROM/JOIN de una consulta"""
+    return tuple(sorted({name.lower() for name in _TABLE_PATTERN.findall(sql)} & set(VERSIONED_TABLES)))
+
+
+class QueryCache:
+    """Caché LRU de resultados de consultas invalidada por versión de tabla.
+
+    Las tablas que determinan un resultado se deducen del SQL o se indican
+    con tables=. Para las tablas derivadas (rollups de ventas) basta la
+    tabla de origen: se escriben en la misma transacción.
+    """
+
+    def __init__(self, db_path: str = db.DEFAULT_DB_PATH, max_entries: int = 512,
+                 tracker: Optional[TableVersionTracker] = None):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.tracker = tracker or get_version_tracker(db_path)
+        self._cache: "OrderedDict[Hashable, Tuple[Any, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key: Hashable, tables: Sequence[str], compute: Callable[[sqlite3.Connection], T]) -> T:
+        versions = tuple(sorted(self.tracker.versions(tables).items()))
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == versions:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Versiones leídas antes de consultar: un resultado nunca queda
+        # guardado con una versión más nueva que los datos que vio
+        with db.get_read_connection(self.db_path) as conn:
+            value = compute(conn)
+        with self._lock:
+            self._cache[key] = (versions, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return value
+
+    def fetch_all(self, sql: str, params: Sequence[Any] = (),
+                  tables: Optional[Sequence[str]] = None) -> List[Tuple[Any, ...]]:
+        """Filas de una consulta (como tuplas)"""
+        key = ('sql', sql, tuple(sorted(params.items())) if isinstance(params, dict) else tuple(params))
+        tables = tables_in(sql) if tables is None else tables
+        return self._get(key, tables, lambda conn: [tuple(row) for row in conn.execute(sql, params)])
+
+    def call(self, func: Callable[..., T], *args: Any, tables: Sequence[str], **kwargs: Any) -> T:
+        """Resultado de func(conn, *args, **kwargs) con una conexión de lectura"""
+        key = ('call', func.__module__, func.__qualname__, args, tuple(sorted(kwargs.items())))
+        return self._get(key, tables, lambda conn: func(conn, *args, **kwargs))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+def _path_key(db_path: str) -> str:
+    return db_path if db_path == ':memory:' else os.path.abspath(db_path)
+
+
+def get_version_tracker(db_path: str = db.DEFAULT_DB_PATH) -> TableVersionTracker:
+    """Seguimiento de versiones de tablas compartido para una base de datos"""
+    return get_resource(f"table_versions:{_path_key(db_path)}", lambda: TableVersionTracker(db_path),
+                        close=TableVersionTracker.close)
+
+
+def get_query_cache(db_path: str = db.DEFAULT_DB_PATH) -> QueryCache:
+    """Caché de consultas compartida para una base de datos"""
+    return get_resource(f"query_cache:{_path_key(db_path)}", lambda: QueryCache(db_path))
@@ -1,129 +1,418 @@
-# sistema_pyme/database.py
-import sqlite3
-import json
-import threading
-from datetime import datetime
-from typing import Optional, Dict, Any, List, Union
-from contextlib import contextmanager
-
-# Variable local para almacenar conexiones por hilo
-_local = threading.local()
-
-def get_connection(db_path='data/sistema_pyme.db') -> sqlite3.Connection:
-    """Obtener conexión a la base de datos (una por hilo)"""
-    if not hasattr(_local, 'conn') or _local.conn is None:
-        _local.conn = sqlite3.connect(db_path, check_same_thread=False)
-        _local.conn.row_factory = sqlite3.Row
-    return _local.conn
-
-@contextmanager
-def get_db_connection(db_path='data/sistema_pyme.db'):
-    """Context manager para manejar conexiones de base de datos"""
-    conn = get_connection(db_path)
-    try:
-        yield conn
-    finally:
-        # No cerramos la conexión para reutilizarla en el mismo hilo
-        pass
-
-def close_connection():
-    """Cerrar la conexión actual del hilo"""
-    if hasattr(_local, 'conn') and _local.conn:
-        _local.conn.close()
-        _local.conn = None
-
-def init_db(db_path='data/sistema_pyme.db') -> sqlite3.Connection:
-    """Inicializar la base de datos y crear tablas si no existen"""
-    conn = get_connection(db_path)
-    c = conn.cursor()
-    
-    # Tabla de negocios
-    c.execute('''CREATE TABLE IF NOT EXISTS businesses
-                (id INTEGER PRIMARY KEY, name TEXT, type TEXT, 
-                 description TEXT, created_at TIMESTAMP)''')
-    
-    # Tabla de eventos del sistema
-    c.execute('''CREATE TABLE IF NOT EXISTS system_events
-                (id INTEGER PRIMARY KEY, event_type TEXT, event_data TEXT,
-                 created_by INTEGER, created_at TIMESTAMP)''')
-    
-    # Tabla de notificaciones
-    c.execute('''CREATE TABLE IF NOT EXISTS notifications
-                (id INTEGER PRIMARY KEY, type TEXT, title TEXT, message TEXT,
-                 priority TEXT, read BOOLEAN, user_id INTEGER, created_at TIMESTAMP)''')
-    
-    conn.commit()
-    return conn
-
-def save_business(conn: sqlite3.Connection, name: str, business_type: str, description: Optional[str] = None) -> None:
-    """Guardar un nuevo negocio en la base de datos"""
-    c = conn.cursor()
-    c.execute("INSERT INTO businesses (name, type, description, created_at) VALUES (?, ?, ?, ?)",
-             (name, business_type, description, datetime.now()))
-    conn.commit()
-
-def get_current_business(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
-    """Obtener el negocio actual de la base de datos"""
-    c = conn.cursor()
-    c.execute("SELECT * FROM businesses ORDER BY id DESC LIMIT 1")
-    business = c.fetchone()
-    
-    if business:
-        return {
-            'id': business[0],
-            'name': business[1],
-            'type': business[2],
-            'description': business[3]
-        }
-    return None
-
-def log_event(conn: sqlite3.Connection, event_type: str, event_data: Any, user_id: Optional[int] = None) -> int:
-    """Registrar un evento en el sistema"""
-    c = conn.cursor()
-    c.execute('''INSERT INTO system_events 
-                (event_type, event_data, created_by, created_at)
-                VALUES (?, ?, ?, ?)''',
-             (event_type, json.dumps(event_data), user_id, datetime.now()))
-    conn.commit()
-    return c.lastrowid or 0
-
-def get_recent_events(conn: sqlite3.Connection, limit: int = 50) -> List[Any]:
-    """Obtener eventos recientes"""
-    c = conn.cursor()
-    c.execute('''SELECT event_type, event_data, created_by, created_at 
-                FROM system_events ORDER BY created_at DESC LIMIT ?''', (limit,))
-    results = c.fetchall()
-    return results if results else []
-
-def create_notification(conn: sqlite3.Connection, notif_type: str, title: str, message: str, 
-                       priority: str = "medium", user_id: Optional[int] = None) -> int:
-    """Crear una nueva notificación"""
-    c = conn.cursor()
-    c.execute('''INSERT INTO notifications 
-                (type, title, message, priority, read, user_id, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)''',
-             (notif_type, title, message, priority, False, user_id, datetime.now()))
-    conn.commit()
-    return c.lastrowid or 0
-
-def get_user_notifications(conn: sqlite3.Connection, user_id: int, unread_only: bool = True) -> List[Any]:
-    """Obtener notificaciones de un usuario"""
-    c = conn.cursor()
-    if unread_only:
-        c.execute('''SELECT * FROM notifications 
-                    WHERE user_id = ? AND read = FALSE ORDER BY created_at DESC''',
-                 (user_id,))
-    else:
-        c.execute('''SELECT * FROM notifications 
-                    WHERE user_id = ? ORDER BY created_at DESC''',
-                 (user_id,))
-    results = c.fetchall()
-    return results if results else []
-
-def mark_notification_as_read(conn: sqlite3.Connection, notification_id: int, user_id: int) -> bool:
-    """Marcar notificación como leída"""
-    c = conn.cursor()
-    c.execute('''UPDATE notifications SET read = TRUE 
-                WHERE id = ? AND user_id = ?''', (notification_id, user_id))
-    conn.commit()
+# sistema_pyme/database.py
+import os
+import sqlite3
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Sequence, Tuple, Union, Iterator
+from contextlib import contextmanager
+
+from migrations import VERSIONED_TABLES, apply_migrations
+from event_store import EventStore
+
+DEFAULT_DB_PATH = 'data/sistema_pyme.db'
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """No se pudo obtener una conexión del pool dentro del tiempo límite"""
+
+
+class ConnectionPool:
+    """Pool de conexiones SQLite en modo WAL.
+
+    Mantiene un único escritor serializado y un conjunto acotado de lectores
+    de solo lectura. En WAL los lectores no bloquean al escritor ni viceversa,
+    lo que evita los errores "database is locked" bajo carga concurrente.
+
+    El escritor del pool solo se usa dentro de writer(): quien lo tiene es el
+    único que hace commit o rollback sobre él. Los objetos de larga vida que
+    hacen commit por su cuenta (AuthSystem, EventSystem...) abren su propia
+    conexión con dedicated_writer(); SQLite serializa sus escrituras con las
+    del pool mediante el lock del archivo y busy_timeout. El pool recuerda
+    esas conexiones y las cierra en close() si su dueño no lo ha hecho.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, max_readers: int = 8,
+                 timeout: float = 10.0, busy_timeout_ms: int = 5000,
+                 cache_size_kib: int = 20000, mmap_size: int = 256 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_readers = max_readers
+        self.timeout = timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.is_memory = db_path == ':memory:'
+
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_init_lock = threading.Lock()
+        # Lock simple (no reentrante): puede liberarse desde otro hilo, como hace
+        # FastAPI al cerrar dependencias en su threadpool
+        self._writer_lock = threading.Lock()
+        self._idle_readers: List[sqlite3.Connection] = []
+        self._dedicated_writers: List[sqlite3.Connection] = []
+        self._readers_created = 0
+        self._readers_in_use = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = {
+            'reader_checkouts': 0,
+            'reader_waits': 0,
+            'reader_timeouts': 0,
+            'reader_wait_ms': 0.0,
+            'writer_checkouts': 0,
+            'writer_timeouts': 0,
+            'writer_wait_ms': 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Creación de conexiones
+    # ------------------------------------------------------------------
+    def _apply_common_pragmas(self, conn: sqlite3.Connection) -> None:
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+
+    def _open_writer(self) -> sqlite3.Connection:
+        if not self.is_memory:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               timeout=self.busy_timeout_ms / 1000)
+        conn.row_factory = sqlite3.Row
+        self._apply_common_pragmas(conn)
+        if not self.is_memory:
+            conn.execute("PRAGMA journal_mode = WAL")
+            # En WAL, NORMAL es seguro ante caídas de la aplicación y evita un fsync por commit
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _open_reader(self) -> sqlite3.Connection:
+        uri = Path(self.db_path).absolute().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               timeout=self.busy_timeout_ms / 1000)
+        conn.row_factory = sqlite3.Row
+        self._apply_common_pragmas(conn)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def dedicated_reader(self) -> sqlite3.Connection:
+        """Conexión de solo lectura propia, fuera del pool (la cierra quien la pide)"""
+        return self._open_reader()
+
+    def dedicated_writer(self) -> sqlite3.Connection:
+        """Conexión escritora propia, fuera del pool (la cierra quien la pide).
+
+        Sus transacciones son independientes de las de writer(): un commit
+        hecho en ella nunca confirma un lote a medias de otro hilo.
+        """
+        if self.is_memory:
+            # Otra conexión a :memory: sería otra base de datos vacía
+            raise sqlite3.ProgrammingError("Una base en memoria solo tiene una conexión: use writer()")
+        if self._closed:
+            raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+        conn = self._open_writer()
+        with self._writer_init_lock:
+            self._dedicated_writers = [c for c in self._dedicated_writers if _is_open(c)] + [conn]
+        return conn
+
+    def _shared_writer(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+        with self._writer_init_lock:
+            if self._writer is None:
+                self._writer = self._open_writer()
+            return self._writer
+
+    # ------------------------------------------------------------------
+    # Checkout de conexiones
+    # ------------------------------------------------------------------
+    @contextmanager
+    def writer(self, timeout: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        """Obtener el escritor en exclusiva; hace commit al salir o rollback si hay error"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        if not self._writer_lock.acquire(timeout=timeout):
+            with self._cond:
+                self._stats['writer_timeouts'] += 1
+            raise PoolTimeoutError(f"Tiempo de espera agotado obteniendo el escritor de {self.db_path}")
+        try:
+            with self._cond:
+                self._stats['writer_checkouts'] += 1
+                self._stats['writer_wait_ms'] += (time.perf_counter() - start) * 1000
+            conn = self._shared_writer()
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        finally:
+            self._writer_lock.release()
+
+    @contextmanager
+    def reader(self, timeout: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        """Obtener una conexión de solo lectura del pool"""
+        if self.is_memory:
+            # Una base en memoria solo es visible desde su propia conexión
+            with self.writer(timeout) as conn:
+                yield conn
+            return
+
+        conn = self._checkout_reader(self.timeout if timeout is None else timeout)
+        try:
+            yield conn
+        finally:
+            self._release_reader(conn)
+
+    def _checkout_reader(self, timeout: float) -> sqlite3.Connection:
+        start = time.perf_counter()
+        deadline = start + timeout
+        # El escritor crea el archivo y activa WAL antes de abrir lectores
+        if self._writer is None:
+            self._shared_writer()
+        with self._cond:
+            waited = False
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("El pool de conexiones está cerrado")
+                if self._idle_readers:
+                    conn = self._idle_readers.pop()
+                    break
+                if self._readers_created < self.max_readers:
+                    self._readers_created += 1
+                    try:
+                        conn = self._open_reader()
+                    except Exception:
+                        self._readers_created -= 1
+                        raise
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._stats['reader_timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"Tiempo de espera agotado: {self.max_readers} lectores en uso en {self.db_path}")
+                waited = True
+                self._cond.wait(remaining)
+
+            self._readers_in_use += 1
+            self._stats['reader_checkouts'] += 1
+            if waited:
+                self._stats['reader_waits'] += 1
+            self._stats['reader_wait_ms'] += (time.perf_counter() - start) * 1000
+            return conn
+
+    def _release_reader(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._cond:
+            self._readers_in_use -= 1
+            if self._closed:
+                conn.close()
+                self._readers_created -= 1
+            else:
+                self._idle_readers.append(conn)
+            self._cond.notify()
+
+    # ------------------------------------------------------------------
+    # Estado y cierre
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso del pool"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'db_path': self.db_path,
+                'max_readers': self.max_readers,
+                'readers_created': self._readers_created,
+                'readers_idle': len(self._idle_readers),
+                'readers_in_use': self._readers_in_use,
+                'writer_open': self._writer is not None,
+                'dedicated_writers': sum(_is_open(c) for c in self._dedicated_writers),
+            })
+        return stats
+
+    def close(self) -> None:
+        """Cerrar todas las conexiones del pool"""
+        with self._cond:
+            self._closed = True
+            for conn in self._idle_readers:
+                conn.close()
+            self._readers_created -= len(self._idle_readers)
+            self._idle_readers = []
+            self._cond.notify_all()
+        with self._writer_init_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            for conn in self._dedicated_writers:
+                conn.close()
+            self._dedicated_writers = []
+
+
+def _is_open(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.in_transaction
+    except sqlite3.ProgrammingError:
+        return False
+    return True
+
+
+# Pools por ruta de base de datos, compartidos por todo el proceso
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(db_path: str) -> str:
+    return db_path if db_path == ':memory:' else os.path.abspath(db_path)
+
+
+def get_pool(db_path: str = DEFAULT_DB_PATH, **pool_options: Any) -> ConnectionPool:
+    """Obtener (o crear) el pool de conexiones de una base de datos"""
+    key = _pool_key(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(db_path, **pool_options)
+            _pools[key] = pool
+        return pool
+
+
+def open_connection(db_path: str = DEFAULT_DB_PATH) -> sqlite3.Connection:
+    """Abrir una conexión escritora nueva para un objeto de larga vida.
+
+    Cada llamada abre otra conexión: la cierra quien la pide (o close_pool).
+    """
+    return get_pool(db_path).dedicated_writer()
+
+
+@contextmanager
+def get_db_connection(db_path: str = DEFAULT_DB_PATH) -> Iterator[sqlite3.Connection]:
+    """Context manager que obtiene el escritor serializado del pool"""
+    with get_pool(db_path).writer() as conn:
+        yield conn
+
+
+@contextmanager
+def get_read_connection(db_path: str = DEFAULT_DB_PATH) -> Iterator[sqlite3.Connection]:
+    """Context manager que obtiene un lector de solo lectura del pool"""
+    with get_pool(db_path).reader() as conn:
+        yield conn
+
+
+def pool_stats() -> List[Dict[str, Any]]:
+    """Estadísticas de todos los pools abiertos"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+def close_pool(db_path: Optional[str] = None) -> None:
+    """Cerrar el pool de una base de datos, o todos si no se indica ruta"""
+    with _pools_lock:
+        if db_path is None:
+            pools = list(_pools.values())
+            _pools.clear()
+        else:
+            pool = _pools.pop(_pool_key(db_path), None)
+            pools = [pool] if pool else []
+    for pool in pools:
+        pool.close()
+
+
+def close_connection():
+    """Cerrar todas las conexiones abiertas (apagado de la aplicación)"""
+    close_pool()
+
+def init_db(db_path: Union[str, sqlite3.Connection] = DEFAULT_DB_PATH) -> None:
+    """Inicializar la base de datos y aplicar las migraciones pendientes"""
+    if isinstance(db_path, sqlite3.Connection):
+        apply_migrations(db_path)
+        return
+    with get_pool(db_path).writer() as conn:
+        apply_migrations(conn)
+
+def get_table_versions(conn: sqlite3.Connection,
+                       tables: Sequence[str] = VERSIONED_TABLES) -> Dict[str, Tuple[int, int]]:
+    """Versión actual de cada tabla: (contador de UPDATE/DELETE, MAX(rowid)).
+
+    Cambia con cualquier escritura en la tabla, así que sirve de clave para
+    invalidar cachés. Una sola consulta, sin recorrer las tablas.
+    """
+    unknown = set(tables) - set(VERSIONED_TABLES)
+    if unknown:
+        raise ValueError(f"Tablas sin versión: {', '.join(sorted(unknown))}")
+    query = " UNION ALL ".join(
+        f"SELECT '{table}', (SELECT version FROM table_versions WHERE table_name = '{table}'), "
+        f"(SELECT MAX(rowid) FROM {table})"
+        for table in tables
+    )
+    return {name: (version or 0, max_rowid or 0) for name, version, max_rowid in conn.execute(query)}
+
+def save_business(conn: sqlite3.Connection, name: str, business_type: str, description: Optional[str] = None) -> None:
+    """Guardar un nuevo negocio en la base de datos"""
+    c = conn.cursor()
+    c.execute("INSERT INTO businesses (name, type, description, created_at) VALUES (?, ?, ?, ?)",
+             (name, business_type, description, datetime.now()))
+    conn.commit()
+
+def get_current_business(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+    """Obtener el negocio actual de la base de datos"""
+    c = conn.cursor()
+    c.execute("SELECT * FROM businesses ORDER BY id DESC LIMIT 1")
+    business = c.fetchone()
+    
+    if business:
+        return {
+            'id': business[0],
+            'name': business[1],
+            'type': business[2],
+            'description': business[3]
+        }
+    return None
+
+def log_event(conn: sqlite3.Connection, event_type: str, event_data: Any, user_id: Optional[int] = None) -> int:
+    """Registrar un evento en el sistema"""
+    event_id = EventStore(conn).append([(event_type, json.dumps(event_data), user_id, datetime.now())])
+    conn.commit()
+    return event_id
+
+def get_recent_events(conn: sqlite3.Connection, limit: int = 50) -> List[Any]:
+    """Obtener eventos recientes"""
+    return EventStore(conn).query(limit)
+
+def create_notification(conn: sqlite3.Connection, notif_type: str, title: str, message: str, 
+                       priority: str = "medium", user_id: Optional[int] = None) -> int:
+    """Crear una nueva notificación"""
+    c = conn.cursor()
+    c.execute('''INSERT INTO notifications 
+                (type, title, message, priority, read, user_id, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)''',
+             (notif_type, title, message, priority, False, user_id, datetime.now()))
+    conn.commit()
+    return c.lastrowid or 0
+
+def get_user_notifications(conn: sqlite3.Connection, user_id: int, unread_only: bool = True) -> List[Any]:
+    """Obtener notificaciones de un usuario"""
+    c = conn.cursor()
+    if unread_only:
+        c.execute('''SELECT * FROM notifications 
+                    WHERE user_id = ? AND read = FALSE ORDER BY created_at DESC''',
+                 (user_id,))
+    else:
+        c.execute('''SELECT * FROM notifications 
+                    WHERE user_id = ? ORDER BY created_at DESC''',
+                 (user_id,))
+    results = c.fetchall()
+    return results if results else []
+
+def mark_notification_as_read(conn: sqlite3.Connection, notification_id: int, user_id: int) -> bool:
+    """Marcar notificación como leída"""
+    c = conn.cursor()
+    c.execute('''UPDATE notifications SET read = TRUE 
+                WHERE id = ? AND user_id = ?''', (notification_id, user_id))
+    conn.commit()
     return c.rowcount > 0
\ No newline at end of file
@@ -1,19 +1,53 @@
-# sistema_pyme/database.pyi
-import sqlite3
-from typing import Optional, Dict, Any, List
-
-def init_db() -> sqlite3.Connection: ...
-
-def save_business(conn: sqlite3.Connection, name: str, business_type: str, description: Optional[str] = None) -> None: ...
-
-def get_current_business(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]: ...
-
-def log_event(conn: sqlite3.Connection, event_type: str, event_data: Any, user_id: Optional[int] = None) -> int: ...
-
-def get_recent_events(conn: sqlite3.Connection, limit: int = 50) -> List[Any]: ...
-
-def create_notification(conn: sqlite3.Connection, notif_type: str, title: str, message: str, priority: str = "medium", user_id: Optional[int] = None) -> int: ...
-
-def get_user_notifications(conn: sqlite3.Connection, user_id: int, unread_only: bool = True) -> List[Any]: ...
-
+# sistema_pyme/database.pyi
+import sqlite3
+from contextlib import AbstractContextManager
+from typing import Optional, Dict, Any, List, Sequence, Tuple, Union
+
+DEFAULT_DB_PATH: str
+
+class PoolTimeoutError(sqlite3.OperationalError): ...
+
+class ConnectionPool:
+    db_path: str
+    max_readers: int
+    timeout: float
+    is_memory: bool
+    def __init__(self, db_path: str = ..., max_readers: int = 8, timeout: float = 10.0, busy_timeout_ms: int = 5000, cache_size_kib: int = 20000, mmap_size: int = ...) -> None: ...
+    def dedicated_reader(self) -> sqlite3.Connection: ...
+    def dedicated_writer(self) -> sqlite3.Connection: ...
+    def writer(self, timeout: Optional[float] = None) -> AbstractContextManager[sqlite3.Connection]: ...
+    def reader(self, timeout: Optional[float] = None) -> AbstractContextManager[sqlite3.Connection]: ...
+    def stats(self) -> Dict[str, Any]: ...
+    def close(self) -> None: ...
+
+def get_pool(db_path: str = ..., **pool_options: Any) -> ConnectionPool: ...
+
+def open_connection(db_path: str = ...) -> sqlite3.Connection: ...
+
+def get_db_connection(db_path: str = ...) -> AbstractContextManager[sqlite3.Connection]: ...
+
+def get_read_connection(db_path: str = ...) -> AbstractContextManager[sqlite3.Connection]: ...
+
+def pool_stats() -> List[Dict[str, Any]]: ...
+
+def close_pool(db_path: Optional[str] = None) -> None: ...
+
+def close_connection() -> None: ...
+
+def init_db(db_path: Union[str, sqlite3.Connection] = ...) -> None: ...
+
+def get_table_versions(conn: sqlite3.Connection, tables: Sequence[str] = ...) -> Dict[str, Tuple[int, int]]: ...
+
+def save_business(conn: sqlite3.Connection, name: str, business_type: str, description: Optional[str] = None) -> None: ...
+
+def get_current_business(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]: ...
+
+def log_event(conn: sqlite3.Connection, event_type: str, event_data: Any, user_id: Optional[int] = None) -> int: ...
+
+def get_recent_events(conn: sqlite3.Connection, limit: int = 50) -> List[Any]: ...
+
+def create_notification(conn: sqlite3.Connection, notif_type: str, title: str, message: str, priority: str = "medium", user_id: Optional[int] = None) -> int: ...
+
+def get_user_notifications(conn: sqlite3.Connection, user_id: int, unread_only: bool = True) -> List[Any]: ...
+
 def mark_notification_as_read(conn: sqlite3.Connection, notification_id: int, user_id: int) -> bool: ...
\ No newline at end of file
@@ -0,0 +1,218 @@
+# sistema_pyme/event_store.py
+"""
+Almacenamiento de eventos del sistema particionado por mes.
+
+Cada mes vive en su propia tabla system_events_AAAAMM con created_at como
+entero (milisegundos desde epoch) y el tipo de evento internado como id
+entero en event_types. El catálogo event_partitions guarda el rango de
+cada partición y su número de filas, así que:
+
+- la retención elimina meses completos con DROP TABLE, sin reescribir nada;
+- las consultas recorren solo las particiones necesarias, de la más nueva
+  a la más antigua, hasta completar el límite pedido.
+"""
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+PARTITION_PREFIX = 'system_events_'
+
+# (event_type, event_data_json, created_by, created_at)
+EventRow = Tuple[str, Optional[str], Optional[int], datetime]
+
+
+def to_epoch_ms(value: datetime) -> int:
+    """Convertir un datetime (hora local si no tiene zona) a milisegundos epoch"""
+    return int(value.timestamp() * 1000)
+
+
+def month_bounds(value: datetime) -> Tuple[datetime, datetime]:
+    """Inicio del mes de value y del mes siguiente"""
+    start = value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def partition_name(value: datetime) -> str:
+    """Nombre de la partición mensual que contiene value"""
+    return f"{PARTITION_PREFIX}{value.year:04d}{value.month:02d}"
+
+
+def create_catalog(conn: sqlite3.Connection) -> None:
+    """Crear las tablas auxiliares del almacenamiento particionado"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS event_types
+                    (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS event_partitions
+                    (name TEXT PRIMARY KEY, start_ms INTEGER NOT NULL,
+                     end_ms INTEGER NOT NULL, row_count INTEGER NOT NULL DEFAULT 0)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS event_id_seq
+                    (id INTEGER PRIMARY KEY CHECK (id = 1), last_id INTEGER NOT NULL)''')
+    conn.execute("INSERT OR IGNORE INTO event_id_seq (id, last_id) VALUES (1, 0)")
+
+
+class EventStore:
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._type_ids: Dict[str, int] = {}
+        self._known_partitions: set = set()
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+    def type_id(self, event_type: str) -> int:
+        """Id entero del tipo de evento, creándolo si no existe"""
+        type_id = self._type_ids.get(event_type)
+        if type_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO event_types (name) VALUES (?)", (event_type,))
+            type_id = self.conn.execute("SELECT id FROM event_types WHERE name = ?",
+                                        (event_type,)).fetchone()[0]
+            self._type_ids[event_type] = type_id
+        return type_id
+
+    def ensure_partition(self, value: datetime) -> str:
+        """Crear (si hace falta) la partición del mes de value"""
+        name = partition_name(value)
+        if name in self._known_partitions:
+            return name
+        start, end = month_bounds(value)
+        self.conn.execute(f'''CREATE TABLE IF NOT EXISTS {name}
+                              (id INTEGER PRIMARY KEY, event_type_id INTEGER NOT NULL,
+                               event_data TEXT, created_by INTEGER, created_at INTEGER NOT NULL)''')
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_created ON {name}(created_at)")
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_type ON {name}(event_type_id, created_at)")
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_user ON {name}(created_by, created_at)")
+        self.conn.execute('''INSERT OR IGNORE INTO event_partitions (name, start_ms, end_ms, row_count)
+                             VALUES (?, ?, ?, 0)''', (name, to_epoch_ms(start), to_epoch_ms(end)))
+        self._known_partitions.add(name)
+        return name
+
+    def forget_cache(self) -> None:
+        """Olvidar tipos y particiones conocidos: tras un rollback pueden no existir"""
+        self._type_ids.clear()
+        self._known_partitions.clear()
+
+    def _allocate_ids(self, count: int) -> int:
+        """Reservar count ids globales consecutivos; devuelve el primero"""
+        self.conn.execute("UPDATE event_id_seq SET last_id = last_id + ? WHERE id = 1", (count,))
+        last_id = self.conn.execute("SELECT last_id FROM event_id_seq WHERE id = 1").fetchone()[0]
+        return last_id - count + 1
+
+    def append(self, rows: Iterable[EventRow]) -> int:
+        """Insertar eventos agrupados por partición (sin commit). Devuelve el último id"""
+        rows = list(rows)
+        if not rows:
+            return 0
+        next_id = self._allocate_ids(len(rows))
+        by_partition: Dict[str, List[Tuple[Any, ...]]] = {}
+        for event_type, event_data, created_by, created_at in rows:
+            name = self.ensure_partition(created_at)
+            by_partition.setdefault(name, []).append(
+                (next_id, self.type_id(event_type), event_data, created_by, to_epoch_ms(created_at)))
+            next_id += 1
+
+        for name, values in by_partition.items():
+            self.conn.executemany(f'''INSERT INTO {name}
+                                      (id, event_type_id, event_data, created_by, created_at)
+                                      VALUES (?, ?, ?, ?, ?)''', values)
+            self.conn.execute("UPDATE event_partitions SET row_count = row_count + ? WHERE name = ?",
+                              (len(values), name))
+        return next_id - 1
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+    def partitions(self) -> List[Tuple[str, int, int, int]]:
+        """Particiones (name, start_ms, end_ms, row_count) de la más nueva a la más antigua"""
+        return [tuple(row) for row in self.conn.execute(
+            "SELECT name, start_ms, end_ms, row_count FROM event_partitions ORDER BY start_ms DESC")]
+
+    def query(self, limit: int = 50, event_type: Optional[str] = None,
+              user_id: Optional[int] = None) -> List[Tuple[Any, ...]]:
+        """Eventos más recientes como (event_type, event_data, created_by, created_at)"""
+        conditions, params = [], []
+        if event_type is not None:
+            row = self.conn.execute("SELECT id FROM event_types WHERE name = ?", (event_type,)).fetchone()
+            if row is None:
+                return []
+            conditions.append("e.event_type_id = ?")
+            params.append(row[0])
+        if user_id is not None:
+            conditions.append("e.created_by = ?")
+            params.append(user_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        results: List[Tuple[Any, ...]] = []
+        for name, _, _, row_count in self.partitions():
+            if len(results) >= limit:
+                break
+            if row_count == 0:
+                continue
+            rows = self.conn.execute(
+                f'''SELECT t.name, e.event_data, e.created_by,
+                           strftime('%Y-%m-%d %H:%M:%f', e.created_at / 1000.0, 'unixepoch', 'localtime')
+                    FROM {name} e JOIN event_types t ON t.id = e.event_type_id
+                    {where} ORDER BY e.created_at DESC LIMIT ?''',
+                (*params, limit - len(results))).fetchall()
+            results.extend(tuple(row) for row in rows)
+        return results
+
+    # ------------------------------------------------------------------
+    # Retención
+    # ------------------------------------------------------------------
+    def drop_before(self, cutoff: datetime) -> int:
+        """Eliminar eventos anteriores a cutoff (sin commit). Devuelve las filas eliminadas.
+
+        Las particiones que terminan antes del corte se eliminan enteras; solo
+        la partición que contiene el corte se recorta con un DELETE por índice.
+        """
+        cutoff_ms = to_epoch_ms(cutoff)
+        removed = 0
+        for name, start_ms, end_ms, row_count in self.partitions():
+            if end_ms <= cutoff_ms:
+                self.conn.execute(f"DROP TABLE IF EXISTS {name}")
+                self.conn.execute("DELETE FROM event_partitions WHERE name = ?", (name,))
+                self._known_partitions.discard(name)
+                removed += row_count
+            elif start_ms < cutoff_ms:
+                c = self.conn.execute(f"DELETE FROM {name} WHERE created_at < ?", (cutoff_ms,))
+                self.conn.execute("UPDATE event_partitions SET row_count = row_count - ? WHERE name = ?",
+                                  (c.rowcount, name))
+                removed += c.rowcount
+        return removed
+
+
+def move_legacy_events(conn: sqlite3.Connection, limit: int = 5000) -> bool:
+    """Mover a particiones hasta limit filas de la tabla system_events original.
+
+    Las filas movidas se borran de system_events en la misma transacción, así
+    que la tabla es su propio cursor: tras un corte se sigue por donde iba.
+    Devuelve True (y elimina la tabla) cuando ya no quedan filas.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'system_events'").fetchone()
+    if not exists:
+        return True
+
+    chunk: Sequence[Any] = conn.execute(
+        "SELECT id, event_type, event_data, created_by, created_at FROM system_events "
+        "ORDER BY id LIMIT ?", (limit,)).fetchall()
+    if not chunk:
+        conn.execute("DROP TABLE system_events")
+        return True
+    EventStore(conn).append((row[1] or 'unknown', row[2], row[3], _parse_timestamp(row[4])) for row in chunk)
+    conn.execute("DELETE FROM system_events WHERE id <= ?", (chunk[-1][0],))
+    return False
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if value:
+        try:
+            return datetime.fromisoformat(str(value))
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(0)
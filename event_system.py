@@ -1,139 +1,336 @@
-# sistema_pyme/event_system.py
-import sqlite3
-from typing import Dict, List, Any, Optional, Union
-import json
-from datetime import datetime, timedelta
-
-class EventSystem:
-    def __init__(self, conn: sqlite3.Connection):
-        self.conn = conn
-        # ✅ CORREGIDO: Simplificar el type hint
-        self.subscribers: Dict[str, List[Any]] = {}
-        self.init_events_table()
-    
-    def init_events_table(self) -> None:
-        """Crear tabla para registro de eventos"""
-        c = self.conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS system_events
-                    (id INTEGER PRIMARY KEY, event_type TEXT, event_data TEXT,
-                     created_by INTEGER, created_at TIMESTAMP)''')
-        self.conn.commit()
-    
-    def subscribe(self, event_type: str, callback: Any) -> None:
-        """Suscribir una función a un tipo de evento"""
-        if event_type not in self.subscribers:
-            self.subscribers[event_type] = []
-        self.subscribers[event_type].append(callback)
-    
-    def publish(self, event_type: str, event_data: Any, user_id: Optional[int] = None) -> int:
-        """Publicar un evento y notificar a los suscriptores"""
-        # Registrar evento en base de datos
-        c = self.conn.cursor()
-        c.execute('''INSERT INTO system_events 
-                    (event_type, event_data, created_by, created_at)
-                    VALUES (?, ?, ?, ?)''',
-                 (event_type, json.dumps(event_data), user_id, datetime.now()))
-        self.conn.commit()
-        event_id = c.lastrowid or 0
-        
-        # Notificar a suscriptores
-        if event_type in self.subscribers:
-            for callback in self.subscribers[event_type]:
-                try:
-                    callback(event_data)
-                except Exception as e:
-                    print(f"Error en callback para evento {event_type}: {e}")
-        
-        return event_id
-    
-    def get_recent_events(self, limit: int = 50) -> List[Any]:
-        """Obtener eventos recientes"""
-        c = self.conn.cursor()
-        c.execute('''SELECT event_type, event_data, created_by, created_at 
-                    FROM system_events ORDER BY created_at DESC LIMIT ?''', (limit,))
-        results = c.fetchall()
-        return results if results else []
-    
-    def get_events_by_type(self, event_type: str, limit: int = 50) -> List[Any]:
-        """Obtener eventos por tipo"""
-        c = self.conn.cursor()
-        c.execute('''SELECT event_type, event_data, created_by, created_at 
-                    FROM system_events WHERE event_type = ? ORDER BY created_at DESC LIMIT ?''', 
-                 (event_type, limit))
-        results = c.fetchall()
-        return results if results else []
-    
-    def get_events_by_user(self, user_id: int, limit: int = 50) -> List[Any]:
-        """Obtener eventos por usuario"""
-        c = self.conn.cursor()
-        c.execute('''SELECT event_type, event_data, created_by, created_at 
-                    FROM system_events WHERE created_by = ? ORDER BY created_at DESC LIMIT ?''', 
-                 (user_id, limit))
-        results = c.fetchall()
-        return results if results else []
-    
-    def clear_old_events(self, days_old: int = 30) -> int:
-        """Eliminar eventos más antiguos que X días"""
-        cutoff_date = datetime.now() - timedelta(days=days_old)
-        c = self.conn.cursor()
-        c.execute('''DELETE FROM system_events WHERE created_at < ?''', 
-                 (cutoff_date,))
-        self.conn.commit()
-        return c.rowcount
-
-# Eventos predefinidos del sistema
-class EventTypes:
-    USER_LOGIN = 'user_login'
-    USER_LOGOUT = 'user_logout'
-    USER_CREATED = 'user_created'
-    USER_UPDATED = 'user_updated'
-    FILE_UPLOADED = 'file_uploaded'
-    FILE_PROCESSED = 'file_processed'
-    FILE_ERROR = 'file_error'
-    SALE_CREATED = 'sale_created'
-    SALE_UPDATED = 'sale_updated'
-    SALE_DELETED = 'sale_deleted'
-    CUSTOMER_CREATED = 'customer_created'
-    CUSTOMER_UPDATED = 'customer_updated'
-    INVENTORY_LOW = 'inventory_low'
-    INVENTORY_CRITICAL = 'inventory_critical'
-    INVENTORY_UPDATED = 'inventory_updated'
-    LEAD_CREATED = 'lead_created'
-    LEAD_CONVERTED = 'lead_converted'
-    FINANCIAL_ALERT = 'financial_alert'
-    BACKUP_CREATED = 'backup_created'
-    BACKUP_RESTORED = 'backup_restored'
-    SYSTEM_ERROR = 'system_error'
-    SYSTEM_WARNING = 'system_warning'
-    SYSTEM_INFO = 'system_info'
-
-# Alias para backwards compatibility
-EVENT_TYPES = EventTypes
-
-# Ejemplos de uso
-def setup_default_event_handlers(event_system: EventSystem) -> None:
-    """Configurar manejadores de eventos por defecto"""
-    
-    def log_event_to_console(event_data: Any) -> None:
-        """Manejador simple que loggea eventos a consola"""
-        print(f"📝 [Evento] {event_data}")
-    
-    def handle_inventory_alerts(event_data: Any) -> None:
-        """Manejador para alertas de inventario"""
-        if isinstance(event_data, dict) and event_data.get('type') == 'low_stock':
-            product = event_data.get('product', 'Desconocido')
-            stock = event_data.get('current_stock', 0)
-            print(f"⚠️  Alerta de inventario: {product} tiene solo {stock} unidades")
-    
-    def handle_financial_alerts(event_data: Any) -> None:
-        """Manejador para alertas financieras"""
-        if isinstance(event_data, dict):
-            alert_type = event_data.get('type', '')
-            message = event_data.get('message', '')
-            print(f"💰 Alerta financiera ({alert_type}): {message}")
-    
-    # Suscribir manejadores
-    event_system.subscribe(EventTypes.INVENTORY_LOW, handle_inventory_alerts)
-    event_system.subscribe(EventTypes.INVENTORY_CRITICAL, handle_inventory_alerts)
-    event_system.subscribe(EventTypes.FINANCIAL_ALERT, handle_financial_alerts)
+# sistema_pyme/event_system.py
+import sqlite3
+from typing import Dict, List, Any, Optional, Union
+import json
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from migrations import apply_migrations
+from event_store import EventStore
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+class EventSystem:
+    """Bus de eventos del sistema.
+
+    En modo síncrono (por defecto) publish() inserta el evento, hace commit
+    y ejecuta los callbacks en el hilo del llamador. Con async_dispatch=True
+    publish() solo encola: un hilo escritor persiste los eventos en lotes
+    (por tamaño o por tiempo) y un pool de workers entrega los eventos a
+    los suscriptores. La conexión debe ser propia del bus (db.open_connection())
+    y poder usarse desde otros hilos (check_same_thread=False): el bus hace
+    commit y rollback sobre ella.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, async_dispatch: bool = False,
+                 batch_size: int = 200, flush_interval: float = 0.5,
+                 dispatch_workers: int = 4, max_pending_per_subscriber: int = 1000):
+        self.conn = conn
+        # ✅ CORREGIDO: Simplificar el type hint
+        self.subscribers: Dict[str, List[Any]] = {}
+        self.init_events_table()
+        self.store = EventStore(conn)
+
+        self.async_dispatch = async_dispatch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending_per_subscriber = max_pending_per_subscriber
+        self._db_lock = threading.Lock()
+        # Serializa publish() con close(): nada se encola tras _STOP ni se
+        # envía a un pool ya detenido
+        self._publish_lock = threading.Lock()
+        self._metrics_lock = threading.Condition()
+        self._pending_by_subscriber: Dict[int, int] = {}
+        self._in_flight = 0
+        self._metrics = {
+            'published': 0,
+            'persisted': 0,
+            'batches': 0,
+            'persist_errors': 0,
+            'dispatched': 0,
+            'dropped': 0,
+            'callback_errors': 0,
+            'dispatch_latency_ms_total': 0.0,
+            'dispatch_latency_ms_max': 0.0,
+        }
+        self._closed = False
+
+        if async_dispatch:
+            self._queue: "queue.Queue[Any]" = queue.Queue()
+            self._executor = ThreadPoolExecutor(max_workers=dispatch_workers,
+                                                thread_name_prefix='event-dispatch')
+            self._writer = threading.Thread(target=self._writer_loop, name='event-writer', daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+    
+    def init_events_table(self) -> None:
+        """Crear el catálogo de eventos particionados (ver migrations.py)"""
+        apply_migrations(self.conn)
+    
+    def subscribe(self, event_type: str, callback: Any) -> None:
+        """Suscribir una función a un tipo de evento"""
+        if event_type not in self.subscribers:
+            self.subscribers[event_type] = []
+        self.subscribers[event_type].append(callback)
+    
+    def publish(self, event_type: str, event_data: Any, user_id: Optional[int] = None) -> int:
+        """Publicar un evento y notificar a los suscriptores.
+
+        Devuelve el id del evento; en modo asíncrono el id aún no existe y se devuelve 0.
+        """
+        if self.async_dispatch:
+            row = (event_type, json.dumps(event_data), user_id, datetime.now())
+            with self._publish_lock:
+                if self._closed:
+                    raise RuntimeError("El sistema de eventos está cerrado")
+                with self._metrics_lock:
+                    self._metrics['published'] += 1
+                self._queue.put(row)
+                self._dispatch_async(event_type, event_data)
+            return 0
+
+        # Registrar evento en la partición del mes
+        event_id = self._append([(event_type, json.dumps(event_data), user_id, datetime.now())])
+        
+        # Notificar a suscriptores
+        if event_type in self.subscribers:
+            for callback in self.subscribers[event_type]:
+                try:
+                    callback(event_data)
+                except Exception:
+                    logger.exception("Error en callback para evento %s", event_type)
+        
+        return event_id
+
+    def _append(self, rows: List[Any]) -> int:
+        """Insertar eventos en una transacción; si falla no queda nada a medias"""
+        with self._db_lock:
+            try:
+                event_id = self.store.append(rows)
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                # Las particiones o tipos creados en la transacción ya no existen
+                self.store.forget_cache()
+                raise
+        return event_id
+
+    # ------------------------------------------------------------------
+    # Modo asíncrono
+    # ------------------------------------------------------------------
+    def _writer_loop(self) -> None:
+        """Persistir eventos en lotes: cuando hay batch_size o pasa flush_interval"""
+        batch: List[Any] = []
+        waiters: List[threading.Event] = []
+        deadline: Optional[float] = None
+        running = True
+        while running:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                running = False
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            expired = deadline is not None and time.monotonic() >= deadline
+            if batch and (len(batch) >= self.batch_size or expired or waiters or not running):
+                self._persist_batch(batch)
+                batch = []
+                deadline = None
+            elif not batch:
+                deadline = None
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+
+    def _persist_batch(self, batch: List[Any]) -> None:
+        try:
+            self._append(batch)
+            with self._metrics_lock:
+                self._metrics['persisted'] += len(batch)
+                self._metrics['batches'] += 1
+        except Exception:
+            with self._metrics_lock:
+                self._metrics['persist_errors'] += len(batch)
+            logger.exception("Error persistiendo lote de %d eventos", len(batch))
+
+    def _dispatch_async(self, event_type: str, event_data: Any) -> None:
+        """Entregar el evento a cada suscriptor en el pool, con límite de pendientes por suscriptor"""
+        enqueued_at = time.perf_counter()
+        for callback in self.subscribers.get(event_type, []):
+            key = id(callback)
+            with self._metrics_lock:
+                pending = self._pending_by_subscriber.get(key, 0)
+                if pending >= self.max_pending_per_subscriber:
+                    # Backpressure: un suscriptor lento no acumula memoria sin límite
+                    self._metrics['dropped'] += 1
+                    continue
+                self._pending_by_subscriber[key] = pending + 1
+                self._in_flight += 1
+            self._executor.submit(self._run_callback, event_type, callback, event_data, enqueued_at)
+
+    def _run_callback(self, event_type: str, callback: Any, event_data: Any, enqueued_at: float) -> None:
+        failed = False
+        try:
+            callback(event_data)
+        except Exception:
+            failed = True
+            logger.exception("Error en callback para evento %s", event_type)
+        finally:
+            latency_ms = (time.perf_counter() - enqueued_at) * 1000
+            with self._metrics_lock:
+                key = id(callback)
+                self._pending_by_subscriber[key] -= 1
+                self._in_flight -= 1
+                self._metrics['dispatched'] += 1
+                if failed:
+                    self._metrics['callback_errors'] += 1
+                self._metrics['dispatch_latency_ms_total'] += latency_ms
+                self._metrics['dispatch_latency_ms_max'] = max(
+                    self._metrics['dispatch_latency_ms_max'], latency_ms)
+                self._metrics_lock.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Esperar a que los eventos encolados se persistan y se entreguen"""
+        if not self.async_dispatch or self._closed:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = threading.Event()
+        self._queue.put(done)
+        if not done.wait(timeout):
+            return False
+        with self._metrics_lock:
+            while self._in_flight > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._metrics_lock.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        """Vaciar las colas y detener el hilo escritor y el pool de workers"""
+        if not self.async_dispatch or self._closed:
+            return
+        self.flush()
+        with self._publish_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        # Lo publicado antes de _STOP se persiste y se entrega antes de salir
+        self._writer.join()
+        self._executor.shutdown(wait=True)
+        # atexit guarda una referencia al bus; sin esto nunca se liberaría
+        atexit.unregister(self.close)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas del bus: profundidad de cola, lotes y latencia de entrega"""
+        with self._metrics_lock:
+            metrics: Dict[str, Any] = dict(self._metrics)
+            metrics['in_flight'] = self._in_flight
+        metrics['queue_depth'] = self._queue.qsize() if self.async_dispatch else 0
+        dispatched = metrics['dispatched']
+        metrics['dispatch_latency_ms_avg'] = (
+            metrics['dispatch_latency_ms_total'] / dispatched if dispatched else 0.0)
+        return metrics
+    
+    def get_recent_events(self, limit: int = 50) -> List[Any]:
+        """Obtener eventos recientes"""
+        with self._db_lock:
+            return self.store.query(limit)
+    
+    def get_events_by_type(self, event_type: str, limit: int = 50) -> List[Any]:
+        """Obtener eventos por tipo"""
+        with self._db_lock:
+            return self.store.query(limit, event_type=event_type)
+    
+    def get_events_by_user(self, user_id: int, limit: int = 50) -> List[Any]:
+        """Obtener eventos por usuario"""
+        with self._db_lock:
+            return self.store.query(limit, user_id=user_id)
+    
+    def clear_old_events(self, days_old: int = 30) -> int:
+        """Eliminar eventos más antiguos que X días (los meses completos se eliminan con DROP)"""
+        cutoff_date = datetime.now() - timedelta(days=days_old)
+        with self._db_lock:
+            try:
+                removed = self.store.drop_before(cutoff_date)
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                self.store.forget_cache()
+                raise
+        return removed
+
+# Eventos predefinidos del sistema
+class EventTypes:
+    USER_LOGIN = 'user_login'
+    USER_LOGOUT = 'user_logout'
+    USER_CREATED = 'user_created'
+    USER_UPDATED = 'user_updated'
+    FILE_UPLOADED = 'file_uploaded'
+    FILE_PROCESSED = 'file_processed'
+    FILE_ERROR = 'file_error'
+    SALE_CREATED = 'sale_created'
+    SALE_UPDATED = 'sale_updated'
+    SALE_DELETED = 'sale_deleted'
+    CUSTOMER_CREATED = 'customer_created'
+    CUSTOMER_UPDATED = 'customer_updated'
+    INVENTORY_LOW = 'inventory_low'
+    INVENTORY_CRITICAL = 'inventory_critical'
+    INVENTORY_UPDATED = 'inventory_updated'
+    LEAD_CREATED = 'lead_created'
+    LEAD_CONVERTED = 'lead_converted'
+    FINANCIAL_ALERT = 'financial_alert'
+    BACKUP_CREATED = 'backup_created'
+    BACKUP_RESTORED = 'backup_restored'
+    SYSTEM_ERROR = 'system_error'
+    SYSTEM_WARNING = 'system_warning'
+    SYSTEM_INFO = 'system_info'
+
+# Alias para backwards compatibility
+EVENT_TYPES = EventTypes
+
+# Ejemplos de uso
+def setup_default_event_handlers(event_system: EventSystem) -> None:
+    """Configurar manejadores de eventos por defecto"""
+    
+    def log_event_to_console(event_data: Any) -> None:
+        """Manejador simple que loggea eventos a consola"""
+        print(f"📝 [Evento] {event_data}")
+    
+    def handle_inventory_alerts(event_data: Any) -> None:
+        """Manejador para alertas de inventario"""
+        if isinstance(event_data, dict) and event_data.get('type') == 'low_stock':
+            product = event_data.get('product', 'Desconocido')
+            stock = event_data.get('current_stock', 0)
+            print(f"⚠️  Alerta de inventario: {product} tiene solo {stock} unidades")
+    
+    def handle_financial_alerts(event_data: Any) -> None:
+        """Manejador para alertas financieras"""
+        if isinstance(event_data, dict):
+            alert_type = event_data.get('type', '')
+            message = event_data.get('message', '')
+            print(f"💰 Alerta financiera ({alert_type}): {message}")
+    
+    # Suscribir manejadores
+    event_system.subscribe(EventTypes.INVENTORY_LOW, handle_inventory_alerts)
+    event_system.subscribe(EventTypes.INVENTORY_CRITICAL, handle_inventory_alerts)
+    event_system.subscribe(EventTypes.FINANCIAL_ALERT, handle_financial_alerts)
     event_system.subscribe(EventTypes.SYSTEM_ERROR, log_event_to_console)
\ No newline at end of file
@@ -0,0 +1,96 @@
+# sistema_pyme/lazy_imports.py
+"""
+Imports diferidos para las dependencias pesadas.
+
+    px = lazy_import('plotly.express')
+
+devuelve un módulo que se importa de verdad al leer su primer atributo
+(px.bar, ...). Así plotly, scikit-learn, bs4 o qrcode solo se cargan
+cuando se pinta la página o se llama a la función que los usa, y el
+arranque de Streamlit y de la API no paga por ellos.
+
+Si la distribución no está instalada el error salta igual que con un
+import normal, al importar el módulo que la declara.
+
+Medir qué cuesta importar un módulo (usa -X importtime):
+
+    python lazy_imports.py api.api_main
+"""
+import importlib
+import importlib.util
+import os
+import subprocess
+import sys
+import threading
+from types import ModuleType
+from typing import Dict, Optional
+
+_lock = threading.Lock()
+
+
+class LazyModule(ModuleType):
+    """Módulo que se importa al acceder al primero de sus atributos"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            # import_module toma el lock de importación: dos hilos que llegan
+            # a la vez reciben el mismo módulo ya ejecutado por completo
+            with _lock:
+                module = importlib.import_module(self.__name__)
+                self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'cargado' if self.__dict__['_module'] is not None else 'diferido'
+        return f"<módulo {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Módulo name, importado solo cuando se use (o ya importado si lo está)"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    # Solo se busca el paquete raíz: find_spec de un submódulo ejecutaría el paquete
+    if importlib.util.find_spec(name.partition('.')[0]) is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    return LazyModule(name)
+
+
+def import_times(statement: str, cwd: Optional[str] = None) -> Dict[str, int]:
+    """Tiempo acumulado (µs) de cada módulo importado al ejecutar statement.
+
+    Se ejecuta en un intérprete nuevo con -X importtime, así que mide un
+    arranque en frío (sin contar el bytecode que haya que compilar).
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=cwd or os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        times[name] = int(cumulative)
+    return times
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else 'api.api_main'
+    times = import_times(f"import {target}")
+    roots = {name: micros for name, micros in times.items() if '.' not in name}
+    print(f"⏱️  import {target}: {times.get(target, 0) / 1000:.0f} ms")
+    for name, micros in sorted(roots.items(), key=lambda item: -item[1])[:15]:
+        print(f"   {micros / 1000:8.1f} ms  {name}")
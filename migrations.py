@@ -0,0 +1,372 @@
+# sistema_pyme/migrations.py
+"""
+Migraciones versionadas del esquema de la base de datos.
+
+Todo el DDL del sistema vive aquí. Cada migración se aplica una sola vez,
+en su propia transacción corta (BEGIN IMMEDIATE), y queda registrada en la
+tabla schema_version. Con la base en modo WAL los lectores siguen
+trabajando mientras se aplica una migración, por lo que puede ejecutarse
+en caliente sobre data/sistema_pyme.db.
+
+Las migraciones que mueven datos (backfill) no lo hacen en esa transacción:
+tras el DDL, el backfill se llama en transacciones sucesivas de como mucho
+BACKFILL_CHUNK_ROWS filas, dejando el lock de escritura libre entre una y
+otra, y guarda su cursor en la propia base. Si el proceso se corta, la
+siguiente ejecución repite el DDL (idempotente) y sigue por donde iba; la
+versión se registra en la transacción del último tramo.
+
+    python migrations.py [ruta_db]
+"""
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from event_store import create_catalog, move_legacy_events
+
+MigrationStep = Union[str, Callable[[sqlite3.Connection], None]]
+# backfill(conn, limit): procesa hasta limit filas y devuelve True al terminar
+MigrationBackfill = Callable[[sqlite3.Connection, int], bool]
+
+# Filas por transacción de backfill y pausa entre transacciones (segundos)
+BACKFILL_CHUNK_ROWS = 5000
+BACKFILL_PAUSE = 0.01
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    steps: Sequence[MigrationStep]
+    backfill: Optional[MigrationBackfill] = None
+
+
+def _dedupe(table: str, key_columns: str) -> str:
+    """SQL que elimina filas duplicadas conservando la de menor id"""
+    return (f"DELETE FROM {table} WHERE id NOT IN "
+            f"(SELECT MIN(id) FROM {table} GROUP BY {key_columns})")
+
+
+# Tablas de negocio cuya versión se lleva en table_versions (ver database.get_table_versions)
+VERSIONED_TABLES = ('sales', 'customers', 'inventory', 'finances', 'employees')
+
+
+def _version_tracking(table: str) -> List[str]:
+    """Triggers que cambian la versión de table en cada UPDATE o DELETE.
+
+    Las inserciones no llevan trigger (cualquier trigger AFTER INSERT duplica
+    el tiempo de una importación masiva): las detecta el MAX(rowid) de la
+    tabla, que siempre crece salvo al insertar con un id explícito en un hueco.
+    """
+    bump = f"UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}'"
+    return [
+        f"INSERT OR IGNORE INTO table_versions (table_name) VALUES ('{table}')",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_update AFTER UPDATE ON {table} BEGIN {bump}; END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_version_delete AFTER DELETE ON {table} BEGIN {bump}; END",
+    ]
+
+
+# Rollups de ventas (ver utils/rollups.py): columnas clave y su expresión sobre
+# una fila de sales ({row} es sales, OLD o NEW)
+SALES_ROLLUPS: Dict[str, Dict[str, str]] = {
+    'sales_daily': {
+        'business_id': "COALESCE({row}.business_id, 0)",
+        'day': "substr({row}.date, 1, 10)",
+    },
+    'sales_monthly_product': {
+        'business_id': "COALESCE({row}.business_id, 0)",
+        'month': "substr({row}.date, 1, 7)",
+        'product': "COALESCE({row}.product, '')",
+    },
+}
+# Solo se agregan las ventas con fecha 'AAAA-MM-DD[...]'
+SALES_DATE_PATTERN = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*"
+# Ventas que el backfill en curso aún no ha sumado ({id} es su id): los triggers
+# y add_sales las ignoran y el backfill las suma con su valor del momento
+SALES_ROLLUP_PENDING = ("{id} BETWEEN COALESCE((SELECT next_id FROM sales_rollup_backfill), 1) "
+                        "AND COALESCE((SELECT end_id FROM sales_rollup_backfill), 0)")
+
+
+def _rollup_delta(rollup: str, row: str, sign: int) -> str:
+    """Sumar (sign=1) o restar (sign=-1) la fila row de sales en rollup"""
+    keys = SALES_ROLLUPS[rollup]
+    columns = ', '.join(keys)
+    negate = '-' if sign < 0 else ''
+    match = ' AND '.join(f"{key} = {expression.format(row=row)}" for key, expression in keys.items())
+    return (f"INSERT INTO {rollup} ({columns}, amount, quantity, sales_count) "
+            f"SELECT {', '.join(expression.format(row=row) for expression in keys.values())}, "
+            f"{negate}COALESCE({row}.amount, 0), {negate}COALESCE({row}.quantity, 0), {sign} "
+            f"WHERE {row}.date GLOB '{SALES_DATE_PATTERN}' "
+            f"ON CONFLICT ({columns}) DO UPDATE SET amount = amount + excluded.amount, "
+            f"quantity = quantity + excluded.quantity, sales_count = sales_count + excluded.sales_count; "
+            f"DELETE FROM {rollup} WHERE sales_count = 0 AND {match};")
+
+
+def _rollup_table(rollup: str) -> str:
+    keys = SALES_ROLLUPS[rollup]
+    key_columns = ', '.join(f"{key} {'INTEGER' if key == 'business_id' else 'TEXT'} NOT NULL" for key in keys)
+    return (f"CREATE TABLE IF NOT EXISTS {rollup} ({key_columns}, amount REAL NOT NULL DEFAULT 0, "
+            f"quantity REAL NOT NULL DEFAULT 0, sales_count INTEGER NOT NULL DEFAULT 0, "
+            f"PRIMARY KEY ({', '.join(keys)})) WITHOUT ROWID")
+
+
+# Columnas que rellena la importación (utils.ingestion.TARGET_TABLES): el hash
+# de una fila importada deja de valer si se borra o se edita una de ellas
+IMPORTED_COLUMNS: Dict[str, Sequence[str]] = {
+    'sales': ('date', 'product', 'quantity', 'amount'),
+    'customers': ('name', 'company', 'email', 'phone', 'status', 'value', 'last_purchase'),
+    'inventory': ('product', 'category', 'current_stock', 'min_stock', 'unit_cost'),
+    'finances': ('date', 'type', 'category', 'amount', 'description'),
+}
+
+
+def _row_hash_tracking(table: str) -> List[str]:
+    """Triggers que olvidan el hash importado de una fila borrada o editada"""
+    forget = f"DELETE FROM import_row_hashes WHERE table_name = '{table}' AND row_id = OLD.id"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_row_hash_delete AFTER DELETE ON {table} BEGIN {forget}; END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_row_hash_update "
+        f"AFTER UPDATE OF {', '.join(IMPORTED_COLUMNS[table])} ON {table} BEGIN {forget}; END",
+    ]
+
+
+def _start_sales_rollups(conn: sqlite3.Connection) -> None:
+    # Si ya hay un backfill a medias (ejecución cortada) se continúa, no se reinicia
+    if conn.execute("SELECT 1 FROM sales_rollup_backfill").fetchone() is None:
+        from utils.rollups import start_rollup_backfill
+        start_rollup_backfill(conn)
+
+
+def _backfill_sales_rollups(conn: sqlite3.Connection, limit: int) -> bool:
+    from utils.rollups import add_rollup_backfill_chunk
+    return add_rollup_backfill_chunk(conn, limit)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Tablas base del sistema", [
+        '''CREATE TABLE IF NOT EXISTS businesses
+           (id INTEGER PRIMARY KEY, name TEXT, type TEXT,
+            description TEXT, created_at TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS system_events
+           (id INTEGER PRIMARY KEY, event_type TEXT, event_data TEXT,
+            created_by INTEGER, created_at TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS notifications
+           (id INTEGER PRIMARY KEY, type TEXT, title TEXT, message TEXT,
+            priority TEXT, read BOOLEAN, user_id INTEGER, created_at TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS users
+           (id INTEGER PRIMARY KEY, username TEXT UNIQUE,
+            email TEXT UNIQUE, password_hash TEXT, role TEXT,
+            is_active INTEGER, created_at TIMESTAMP,
+            last_login TIMESTAMP, two_factor_secret TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS sessions
+           (id INTEGER PRIMARY KEY, user_id INTEGER, session_token TEXT,
+            created_at TIMESTAMP, expires_at TIMESTAMP,
+            FOREIGN KEY(user_id) REFERENCES users(id))''',
+        '''CREATE TABLE IF NOT EXISTS permissions
+           (id INTEGER PRIMARY KEY, role TEXT, module TEXT,
+            can_view INTEGER, can_edit INTEGER, can_delete INTEGER)''',
+        '''CREATE TABLE IF NOT EXISTS plugins
+           (id INTEGER PRIMARY KEY, name TEXT, version TEXT,
+            enabled BOOLEAN, config TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS imported_files
+           (id INTEGER PRIMARY KEY, filename TEXT, file_type TEXT, status TEXT,
+            records INTEGER, insights TEXT, uploaded_at TIMESTAMP,
+            processed_at TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS sales
+           (id INTEGER PRIMARY KEY, date TEXT, product TEXT, quantity INTEGER,
+            amount REAL, business_id INTEGER)''',
+        '''CREATE TABLE IF NOT EXISTS customers
+           (id INTEGER PRIMARY KEY, name TEXT, company TEXT, email TEXT,
+            phone TEXT, status TEXT, segment TEXT, value REAL,
+            last_purchase TEXT, notes TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS employees
+           (id INTEGER PRIMARY KEY, name TEXT, position TEXT, department TEXT,
+            salary REAL, hire_date TEXT, evaluation REAL, vacation_days INTEGER,
+            is_active INTEGER DEFAULT 1)''',
+        '''CREATE TABLE IF NOT EXISTS inventory
+           (id INTEGER PRIMARY KEY, product TEXT, category TEXT,
+            current_stock INTEGER, min_stock INTEGER, unit_cost REAL,
+            business_id INTEGER, updated_at TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS finances
+           (id INTEGER PRIMARY KEY, date TEXT, type TEXT, category TEXT,
+            amount REAL, description TEXT, business_id INTEGER)''',
+    ]),
+    Migration(2, "Índices para las consultas frecuentes", [
+        # INSERT OR IGNORE / OR REPLACE nunca deduplicaban por falta de restricción única
+        _dedupe('permissions', 'role, module'),
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_permissions_role_module ON permissions(role, module)",
+        _dedupe('plugins', 'name'),
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_plugins_name ON plugins(name)",
+        # validate_session: WHERE session_token = ? AND expires_at > ? -> user_id (índice cubriente)
+        "CREATE INDEX IF NOT EXISTS idx_sessions_token ON sessions(session_token, expires_at, user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications(user_id, read, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_events_type_created ON system_events(event_type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_events_user_created ON system_events(created_by, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_events_created ON system_events(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_sales_date ON sales(date)",
+        "CREATE INDEX IF NOT EXISTS idx_sales_business_date ON sales(business_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_customers_name ON customers(name)",
+        "CREATE INDEX IF NOT EXISTS idx_inventory_product ON inventory(product)",
+        "CREATE INDEX IF NOT EXISTS idx_imported_files_uploaded ON imported_files(uploaded_at)",
+    ]),
+    Migration(3, "Eventos particionados por mes (ver event_store.py)", [
+        create_catalog,
+    ], backfill=move_legacy_events),
+    Migration(4, "Token de sesión único (ver session_store.py)", [
+        "DELETE FROM sessions WHERE id NOT IN (SELECT MAX(id) FROM sessions GROUP BY session_token)",
+        "DROP INDEX IF EXISTS idx_sessions_token",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_token_unique ON sessions(session_token)",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id, id)",
+    ]),
+    Migration(5, "Cola de importaciones sobre imported_files (ver utils/import_jobs.py)", [
+        "ALTER TABLE imported_files ADD COLUMN progress REAL DEFAULT 0",
+        "ALTER TABLE imported_files ADD COLUMN error TEXT",
+        "ALTER TABLE imported_files ADD COLUMN attempts INTEGER DEFAULT 0",
+        "ALTER TABLE imported_files ADD COLUMN stored_path TEXT",
+        "ALTER TABLE imported_files ADD COLUMN cancel_requested INTEGER DEFAULT 0",
+        "ALTER TABLE imported_files ADD COLUMN started_at TIMESTAMP",
+        "CREATE INDEX IF NOT EXISTS idx_imported_files_status ON imported_files(status)",
+    ]),
+    Migration(6, "Hashes de filas importadas para deduplicar (ver utils/dedup.py)", [
+        '''CREATE TABLE IF NOT EXISTS import_row_hashes
+           (table_name TEXT NOT NULL, row_hash INTEGER NOT NULL,
+            PRIMARY KEY (table_name, row_hash)) WITHOUT ROWID''',
+    ]),
+    Migration(7, "Cliente de cada venta para el cálculo de LTV (ver utils/ltv.py)", [
+        "ALTER TABLE sales ADD COLUMN customer_id INTEGER REFERENCES customers(id)",
+        "CREATE INDEX IF NOT EXISTS idx_sales_customer_date ON sales(customer_id, date)",
+    ]),
+    Migration(8, "Versiones de tablas para invalidar cachés (ver utils/kpi_engine.py)", [
+        '''CREATE TABLE IF NOT EXISTS table_versions
+           (table_name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID''',
+        *[step for table in VERSIONED_TABLES for step in _version_tracking(table)],
+    ]),
+    # Las inserciones actualizan los rollups desde su propio camino (create_sale
+    # y la importación, ver utils/rollups.add_sales): un trigger AFTER INSERT
+    # duplicaría el tiempo de las importaciones masivas
+    Migration(9, "Rollups de ventas por día y por mes y producto (ver utils/rollups.py)", [
+        *[_rollup_table(rollup) for rollup in SALES_ROLLUPS],
+        "CREATE INDEX IF NOT EXISTS idx_sales_daily_day ON sales_daily(day)",
+        "CREATE INDEX IF NOT EXISTS idx_sales_monthly_product_month ON sales_monthly_product(month, product)",
+        '''CREATE TABLE IF NOT EXISTS sales_rollup_backfill
+           (id INTEGER PRIMARY KEY CHECK (id = 1), next_id INTEGER NOT NULL, end_id INTEGER NOT NULL)''',
+        "CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_delete AFTER DELETE ON sales "
+        f"WHEN NOT ({SALES_ROLLUP_PENDING.format(id='OLD.id')}) BEGIN "
+        + ' '.join(_rollup_delta(rollup, 'OLD', -1) for rollup in SALES_ROLLUPS) + " END",
+        "CREATE TRIGGER IF NOT EXISTS trg_sales_rollup_update "
+        "AFTER UPDATE OF date, product, quantity, amount, business_id ON sales "
+        f"WHEN NOT ({SALES_ROLLUP_PENDING.format(id='OLD.id')}) BEGIN "
+        + ' '.join(_rollup_delta(rollup, row, sign) for row, sign in (('OLD', -1), ('NEW', 1))
+                   for rollup in SALES_ROLLUPS) + " END",
+        _start_sales_rollups,
+    ], backfill=_backfill_sales_rollups),
+    # Sin la fila de cada hash, una fila borrada o editada fuera del importador
+    # seguía contando como importada y volver a importarla la omitía. Los
+    # hashes anteriores no saben a qué fila pertenecen y se descartan
+    # (utils.ingestion.backfill_row_hashes los registra de nuevo)
+    Migration(10, "Hashes importados ligados a su fila (ver utils/dedup.py)", [
+        "DELETE FROM import_row_hashes",
+        "ALTER TABLE import_row_hashes ADD COLUMN row_id INTEGER",
+        "CREATE INDEX IF NOT EXISTS idx_import_row_hashes_row ON import_row_hashes(table_name, row_id)",
+        *[step for table in IMPORTED_COLUMNS for step in _row_hash_tracking(table)],
+    ]),
+]
+
+
+def _ensure_version_table(conn: sqlite3.Connection) -> None:
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version
+                    (version INTEGER PRIMARY KEY, description TEXT, applied_at TIMESTAMP)''')
+    conn.commit()
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Obtener la última versión de esquema aplicada (0 si no hay ninguna)"""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row and row[0] is not None else 0
+
+
+def latest_version() -> int:
+    """Versión más reciente definida en MIGRATIONS"""
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def _record(conn: sqlite3.Connection, migration: Migration) -> None:
+    conn.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                 (migration.version, migration.description, datetime.now()))
+
+
+def _run_backfill(conn: sqlite3.Connection, migration: Migration, chunk_rows: int, pause: float) -> bool:
+    """Llamar al backfill de migration tramo a tramo; False si otro proceso la terminó antes"""
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= migration.version:
+                conn.rollback()
+                return False
+            done = migration.backfill(conn, chunk_rows)
+            if done:
+                _record(conn, migration)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if done:
+            return True
+        # Entre tramos el lock de escritura queda libre para la aplicación
+        time.sleep(pause)
+
+
+def apply_migrations(conn: sqlite3.Connection, target: Optional[int] = None,
+                     chunk_rows: int = BACKFILL_CHUNK_ROWS, pause: float = BACKFILL_PAUSE) -> List[int]:
+    """Aplicar las migraciones pendientes y devolver las versiones aplicadas"""
+    target = latest_version() if target is None else target
+    if get_schema_version(conn) >= target:
+        return []
+
+    if conn.in_transaction:
+        # Confirmar aquí escribiría a medias el trabajo pendiente de quien llama
+        raise sqlite3.ProgrammingError("apply_migrations necesita una conexión sin transacción abierta")
+    _ensure_version_table(conn)
+
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version > target:
+            break
+        # BEGIN IMMEDIATE toma el lock de escritura; si otro proceso aplicó la
+        # migración mientras esperábamos, la versión ya figura y se omite
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= migration.version:
+                conn.rollback()
+                continue
+            for step in migration.steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            if migration.backfill is None:
+                _record(conn, migration)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if migration.backfill is not None and not _run_backfill(conn, migration, chunk_rows, pause):
+            continue
+        applied.append(migration.version)
+    return applied
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'data/sistema_pyme.db'
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA busy_timeout = 5000")
+    before = get_schema_version(connection)
+    versions = apply_migrations(connection)
+    print(f"📦 Esquema de {db_path}: versión {before} -> {get_schema_version(connection)}")
+    for version in versions:
+        print(f"✅ Migración {version} aplicada")
+    connection.close()
@@ -1,3 +1,3 @@
-"""
-Módulos del Sistema de Gestión PYME
+"""
+Módulos del Sistema de Gestión PYME
 """
\ No newline at end of file
@@ -0,0 +1,203 @@
+# sistema_pyme/password_hasher.py
+"""
+Hashing de contraseñas fuera del hilo de la petición.
+
+bcrypt es deliberadamente lento; ejecutarlo en el hilo de Streamlit hace que
+cada login ocupe un núcleo y serialice el servidor. PasswordHasher envía
+los hashes a un pool de procesos (esquiva el GIL), con una cola acotada que
+rechaza al instante cuando está saturada, limitación de intentos por
+usuario/IP y detección de hashes con un coste distinto al configurado.
+
+Las claves de los intentos (usuario, IP) las elige quien intenta entrar:
+cada clave guarda como mucho max_attempts marcas de tiempo, las claves sin
+intentos vigentes se eliminan y el total está acotado por max_tracked_keys
+(se descartan las usadas hace más tiempo).
+"""
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Deque, Dict, Iterable, Optional
+
+import bcrypt
+
+DEFAULT_ROUNDS = 12
+
+
+class HasherSaturatedError(Exception):
+    """La cola de hashing está llena; el llamador debe reintentar más tarde"""
+
+
+class LoginThrottledError(Exception):
+    """Demasiados intentos de login para un usuario o IP"""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Demasiados intentos para {key}; reintente en {retry_after:.0f}s")
+        self.key = key
+        self.retry_after = retry_after
+
+
+def _hash_password(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check_password(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Coste de un hash bcrypt ($2b$12$...) o None si no tiene ese formato"""
+    parts = hashed_password.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int = DEFAULT_ROUNDS, max_workers: Optional[int] = None,
+                 max_pending: int = 32, timeout: float = 30.0, use_processes: bool = True,
+                 max_attempts: int = 5, attempt_window: float = 300.0,
+                 max_tracked_keys: int = 10000):
+        self.rounds = rounds
+        self.max_workers = max_workers or max(1, multiprocessing.cpu_count() - 1)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.use_processes = use_processes
+        self.max_attempts = max_attempts
+        self.attempt_window = attempt_window
+        self.max_tracked_keys = max_tracked_keys
+
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # Orden de uso: las claves del principio son las tocadas hace más tiempo
+        self._attempts: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._attempts_lock = threading.Lock()
+        # Los contadores se actualizan desde los callbacks del pool y desde cada petición
+        self._stats = {'hashed': 0, 'verified': 0, 'rejected': 0, 'throttled': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    # ------------------------------------------------------------------
+    # Pool de hashing
+    # ------------------------------------------------------------------
+    def _get_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                if self.use_processes:
+                    # spawn: hacer fork de un servidor con hilos (Streamlit, uvicorn) no es seguro
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context('spawn'))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='password-hasher')
+            return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise HasherSaturatedError("Servidor ocupado procesando inicios de sesión")
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def hash(self, password: str) -> str:
+        """Generar el hash bcrypt de una contraseña con el coste configurado"""
+        hashed = self._run(_hash_password, password.encode('utf-8'), self.rounds)
+        self._count('hashed')
+        return hashed.decode('utf-8')
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        """Verificar una contraseña contra su hash"""
+        result = self._run(_check_password, password.encode('utf-8'), hashed_password.encode('utf-8'))
+        self._count('verified')
+        return result
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True si el hash se generó con un coste distinto al configurado"""
+        return hash_rounds(hashed_password) != self.rounds
+
+    # ------------------------------------------------------------------
+    # Limitación de intentos
+    # ------------------------------------------------------------------
+    def check_throttle(self, keys: Iterable[str]) -> None:
+        """Lanzar LoginThrottledError si alguna clave superó los intentos permitidos"""
+        now = time.monotonic()
+        with self._attempts_lock:
+            for key in keys:
+                attempts = self._attempts.get(key)
+                if attempts is None:
+                    continue
+                while attempts and now - attempts[0] > self.attempt_window:
+                    attempts.popleft()
+                if not attempts:
+                    del self._attempts[key]
+                elif len(attempts) >= self.max_attempts:
+                    self._count('throttled')
+                    raise LoginThrottledError(key, self.attempt_window - (now - attempts[0]))
+
+    def register_failure(self, keys: Iterable[str]) -> None:
+        """Registrar un intento fallido para cada clave (usuario, IP)"""
+        now = time.monotonic()
+        with self._attempts_lock:
+            for key in keys:
+                attempts = self._attempts.get(key)
+                if attempts is None:
+                    # Solo importan los últimos max_attempts intentos de cada clave
+                    attempts = self._attempts[key] = deque(maxlen=self.max_attempts)
+                attempts.append(now)
+                self._attempts.move_to_end(key)
+            self._prune_attempts(now)
+
+    def _prune_attempts(self, now: float) -> None:
+        """Eliminar las claves sin intentos vigentes y aplicar max_tracked_keys"""
+        # Las claves están por orden de último intento: basta mirar el principio
+        while self._attempts:
+            oldest_key, attempts = next(iter(self._attempts.items()))
+            if now - attempts[-1] <= self.attempt_window and len(self._attempts) <= self.max_tracked_keys:
+                break
+            del self._attempts[oldest_key]
+
+    def reset_attempts(self, keys: Iterable[str]) -> None:
+        """Olvidar los intentos fallidos tras un login correcto"""
+        with self._attempts_lock:
+            for key in keys:
+                self._attempts.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de uso del hasher"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._attempts_lock:
+            stats['tracked_keys'] = len(self._attempts)
+        stats['max_pending'] = self.max_pending
+        return stats
+
+    def shutdown(self) -> None:
+        """Detener el pool de hashing"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+_default_hasher: Optional[PasswordHasher] = None
+_default_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Hasher compartido por todo el proceso"""
+    global _default_hasher
+    with _default_hasher_lock:
+        if _default_hasher is None:
+            _default_hasher = PasswordHasher()
+        return _default_hasher
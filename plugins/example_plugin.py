@@ -1,52 +1,52 @@
-# sistema_pyme/plugins/example_plugin.py
-from plugins.base import Plugin
-import sqlite3
-from typing import Dict, Any
-
-class AdvancedAnalyticsPlugin(Plugin):
-    """Plugin de análisis avanzado para el sistema PYME"""
-    
-    description = "Proporciona análisis avanzados y predicciones para el negocio"
-    
-    def initialize(self):
-        """Inicializar el plugin"""
-        print(f"Inicializando plugin: {self.name}")
-        # Aquí puedes crear tablas adicionales, configurar recursos, etc.
-    
-    def cleanup(self):
-        """Limpiar recursos del plugin"""
-        print(f"Limpiando plugin: {self.name}")
-    
-    def sales_forecast(self, months: int = 6):
-        """Generar forecast de ventas"""
-        # Implementar lógica de forecast
-        return {"forecast": []}
-    
-    def customer_segmentation(self):
-        """Realizar segmentación avanzada de clientes"""
-        # Implementar algoritmo de segmentación
-        return {"segments": []}
-    
-    def inventory_optimization(self):
-        """Optimizar niveles de inventario"""
-        # Implementar algoritmo de optimización
-        return {"recommendations": []}
-
-class EmailMarketingPlugin(Plugin):
-    """Plugin de email marketing integrado"""
-    
-    description = "Sistema de email marketing para clientes"
-    
-    def initialize(self):
-        """Inicializar el plugin"""
-        print(f"Inicializando plugin: {self.name}")
-    
-    def send_bulk_emails(self, template_name: str, segment: str = "all"):
-        """Enviar emails masivos a un segmento de clientes"""
-        # Implementar envío masivo de emails
-        return {"sent": 0, "failed": 0}
-    
-    def create_campaign(self, name: str, template: str, target_segment: str):
-        """Crear una campaña de marketing"""
-        # Implementar gestión de campañas
+# sistema_pyme/plugins/example_plugin.py
+from plugins.base import Plugin
+import sqlite3
+from typing import Dict, Any
+
+class AdvancedAnalyticsPlugin(Plugin):
+    """Plugin de análisis avanzado para el sistema PYME"""
+    
+    description = "Proporciona análisis avanzados y predicciones para el negocio"
+    
+    def initialize(self):
+        """Inicializar el plugin"""
+        print(f"Inicializando plugin: {self.name}")
+        # Aquí puedes crear tablas adicionales, configurar recursos, etc.
+    
+    def cleanup(self):
+        """Limpiar recursos del plugin"""
+        print(f"Limpiando plugin: {self.name}")
+    
+    def sales_forecast(self, months: int = 6):
+        """Generar forecast de ventas"""
+        # Implementar lógica de forecast
+        return {"forecast": []}
+    
+    def customer_segmentation(self):
+        """Realizar segmentación avanzada de clientes"""
+        # Implementar algoritmo de segmentación
+        return {"segments": []}
+    
+    def inventory_optimization(self):
+        """Optimizar niveles de inventario"""
+        # Implementar algoritmo de optimización
+        return {"recommendations": []}
+
+class EmailMarketingPlugin(Plugin):
+    """Plugin de email marketing integrado"""
+    
+    description = "Sistema de email marketing para clientes"
+    
+    def initialize(self):
+        """Inicializar el plugin"""
+        print(f"Inicializando plugin: {self.name}")
+    
+    def send_bulk_emails(self, template_name: str, segment: str = "all"):
+        """Enviar emails masivos a un segmento de clientes"""
+        # Implementar envío masivo de emails
+        return {"sent": 0, "failed": 0}
+    
+    def create_campaign(self, name: str, template: str, target_segment: str):
+        """Crear una campaña de marketing"""
+        # Implementar gestión de campañas
         return {"campaign_id": 1}
\ No newline at end of file
@@ -0,0 +1,180 @@
+# sistema_pyme/session_store.py
+"""
+Almacén de sesiones de usuario.
+
+- session_token tiene índice único (migración 4), así que validar es una
+  búsqueda por índice y no un recorrido de la tabla.
+- Expiración deslizante: una sesión usada cuando le queda menos de la
+  mitad de su vida se renueva por otro periodo completo.
+- Límite de sesiones por usuario: al crear una sesión nueva se eliminan
+  las más antiguas que excedan el máximo.
+- Un hilo barrendero elimina las sesiones expiradas en lotes pequeños,
+  con una transacción corta por lote para no retener el lock de escritura.
+- generation aumenta cada vez que se eliminan sesiones (revocación, límite
+  por usuario o barrido): quien cachee validaciones (AuthSystem) descarta
+  las entradas de una generación anterior.
+"""
+import secrets
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+
+class SessionStore:
+    def __init__(self, conn: sqlite3.Connection, ttl: timedelta = timedelta(hours=24),
+                 sliding: bool = True, max_sessions_per_user: int = 5,
+                 sweep_interval: float = 300.0, sweep_batch_size: int = 500,
+                 sweep_pause: float = 0.01, lock: Optional[threading.RLock] = None):
+        self.conn = conn
+        self.ttl = ttl
+        self.sliding = sliding
+        self.max_sessions_per_user = max_sessions_per_user
+        self.sweep_interval = sweep_interval
+        self.sweep_batch_size = sweep_batch_size
+        self.sweep_pause = sweep_pause
+
+        # Quien comparte la conexión (AuthSystem) pasa su lock para no mezclar transacciones
+        self._lock = lock or threading.RLock()
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        self.generation = 0
+        self._metrics = {
+            'sweeps': 0,
+            'swept_total': 0,
+            'last_sweep_deleted': 0,
+            'last_sweep_duration_ms': 0.0,
+            'last_sweep_at': None,
+        }
+
+    def create(self, user_id: int) -> str:
+        """Crear una sesión y aplicar el límite de sesiones del usuario"""
+        session_token = secrets.token_urlsafe(32)
+        now = datetime.now()
+        with self._lock:
+            c = self.conn.cursor()
+            c.execute('''INSERT INTO sessions 
+                        (user_id, session_token, created_at, expires_at)
+                        VALUES (?, ?, ?, ?)''',
+                     (user_id, session_token, now, now + self.ttl))
+            if self.max_sessions_per_user:
+                c.execute('''DELETE FROM sessions WHERE user_id = ? AND id NOT IN
+                             (SELECT id FROM sessions WHERE user_id = ?
+                              ORDER BY id DESC LIMIT ?)''',
+                         (user_id, user_id, self.max_sessions_per_user))
+                self._removed(c.rowcount)
+            self.conn.commit()
+        return session_token
+
+    def validate(self, session_token: str) -> Optional[Tuple[int, datetime]]:
+        """Devolver (user_id, expires_at) de una sesión vigente, renovándola si corresponde"""
+        now = datetime.now()
+        with self._lock:
+            c = self.conn.cursor()
+            c.execute('''SELECT user_id, expires_at FROM sessions 
+                         WHERE session_token = ? AND expires_at > ?''',
+                     (session_token, now))
+            session = c.fetchone()
+            if not session:
+                return None
+
+            expires_at = _parse_timestamp(session[1])
+            if self.sliding and expires_at - now < self.ttl / 2:
+                expires_at = now + self.ttl
+                c.execute('UPDATE sessions SET expires_at = ? WHERE session_token = ?',
+                         (expires_at, session_token))
+                self.conn.commit()
+        return session[0], expires_at
+
+    def revoke(self, session_token: str) -> bool:
+        """Eliminar una sesión"""
+        with self._lock:
+            c = self.conn.cursor()
+            c.execute('DELETE FROM sessions WHERE session_token = ?', (session_token,))
+            self.conn.commit()
+            self._removed(c.rowcount)
+        return c.rowcount > 0
+
+    def revoke_user(self, user_id: int) -> int:
+        """Eliminar todas las sesiones de un usuario"""
+        with self._lock:
+            c = self.conn.cursor()
+            c.execute('DELETE FROM sessions WHERE user_id = ?', (user_id,))
+            self.conn.commit()
+            self._removed(c.rowcount)
+        return c.rowcount
+
+    def _removed(self, count: int) -> None:
+        """Invalidar las validaciones cacheadas si se eliminaron sesiones (con el lock tomado)"""
+        if count > 0:
+            self.generation += 1
+
+    # ------------------------------------------------------------------
+    # Barrido de sesiones expiradas
+    # ------------------------------------------------------------------
+    def sweep_expired(self) -> int:
+        """Eliminar sesiones expiradas en lotes; devuelve el total eliminado"""
+        started = time.perf_counter()
+        now = datetime.now()
+        deleted = 0
+        while not self._stop.is_set():
+            with self._lock:
+                c = self.conn.cursor()
+                c.execute('''DELETE FROM sessions WHERE id IN
+                             (SELECT id FROM sessions WHERE expires_at <= ? LIMIT ?)''',
+                         (now, self.sweep_batch_size))
+                self.conn.commit()
+                self._removed(c.rowcount)
+            deleted += c.rowcount
+            if c.rowcount < self.sweep_batch_size:
+                break
+            # Ceder el lock de escritura entre lotes
+            time.sleep(self.sweep_pause)
+
+        with self._lock:
+            self._metrics['sweeps'] += 1
+            self._metrics['swept_total'] += deleted
+            self._metrics['last_sweep_deleted'] = deleted
+            self._metrics['last_sweep_duration_ms'] = (time.perf_counter() - started) * 1000
+            self._metrics['last_sweep_at'] = datetime.now().isoformat()
+        return deleted
+
+    def _sweeper_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep_expired()
+            except sqlite3.Error as e:
+                print(f"Error barriendo sesiones expiradas: {e}")
+
+    def start_sweeper(self) -> None:
+        """Iniciar el hilo barrendero (idempotente)"""
+        with self._lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._stop.clear()
+            self._sweeper = threading.Thread(target=self._sweeper_loop, name='session-sweeper',
+                                             daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """Detener el hilo barrendero"""
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Sesiones activas y estadísticas del último barrido"""
+        with self._lock:
+            c = self.conn.cursor()
+            c.execute('SELECT COUNT(*) FROM sessions WHERE expires_at > ?', (datetime.now(),))
+            metrics = dict(self._metrics)
+            metrics['active_sessions'] = c.fetchone()[0]
+        return metrics
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
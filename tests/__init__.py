@@ -1,4 +1,4 @@
-# sistema_pyme/tests/__init__.py
-"""
-Paquete de tests para el Sistema de Gestión PYME
+# sistema_pyme/tests/__init__.py
+"""
+Paquete de tests para el Sistema de Gestión PYME
 """
\ No newline at end of file
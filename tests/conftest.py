@@ -1,27 +1,55 @@
-# sistema_pyme/tests/conftest.py
-"""
-Archivo de configuración de pytest - se ejecuta automáticamente antes de los tests
-"""
-import sys
-import os
-from pathlib import Path
-
-# Obtener el directorio raíz del proyecto
-project_root = Path(__file__).parent.parent
-print(f"📍 Directorio raíz del proyecto: {project_root}")
-
-# Añadir el directorio raíz al path de Python
-if str(project_root) not in sys.path:
-    sys.path.insert(0, str(project_root))
-    print(f"✅ Añadido al sys.path: {project_root}")
-
-# Verificar que los módulos existen
-modules_to_check = ['auth.py', 'database.py']
-for module in modules_to_check:
-    module_path = project_root / module
-    if module_path.exists():
-        print(f"✅ Módulo encontrado: {module_path}")
-    else:
-        print(f"❌ Módulo no encontrado: {module_path}")
-
-print(f"📋 Sys.path actual: {sys.path}")
\ No newline at end of file
+# sistema_pyme/tests/conftest.py
+"""
+Archivo de configuración de pytest - se ejecuta automáticamente antes de los tests
+"""
+import sys
+import os
+from pathlib import Path
+
+# Obtener el directorio raíz del proyecto
+project_root = Path(__file__).parent.parent
+print(f"📍 Directorio raíz del proyecto: {project_root}")
+
+# Añadir el directorio raíz al path de Python
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+    print(f"✅ Añadido al sys.path: {project_root}")
+
+# Verificar que los módulos existen
+modules_to_check = ['auth.py', 'database.py']
+for module in modules_to_check:
+    module_path = project_root / module
+    if module_path.exists():
+        print(f"✅ Módulo encontrado: {module_path}")
+    else:
+        print(f"❌ Módulo no encontrado: {module_path}")
+
+print(f"📋 Sys.path actual: {sys.path}")
+
+# Los módulos del proyecto se importan una vez añadido el directorio raíz
+import pytest
+
+import cache
+import database as db
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Base de datos temporal migrada; al terminar se liberan sus recursos compartidos"""
+    path = str(tmp_path / "sistema_pyme.db")
+    db.init_db(path)
+    yield path
+    cache.clear_resources()
+    db.close_pool(path)
+
+
+@pytest.fixture
+def execute(db_path):
+    """Ejecutar SQL en db_path con el escritor del pool (con una lista de filas, executemany)"""
+    def run(sql, params=()):
+        with db.get_pool(db_path).writer() as conn:
+            if isinstance(params, list):
+                conn.executemany(sql, params)
+            else:
+                conn.execute(sql, params)
+    return run
@@ -0,0 +1,102 @@
+# sistema_pyme/tests/test_anomalies.py
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+import database as db
+from event_system import EventTypes
+from utils.anomalies import SalesAnomalyMonitor, detect_anomalies
+from utils.data_processor import DataProcessor
+
+
+def _insert_sales(db_path, rows):
+    with db.get_pool(db_path).writer() as conn:
+        conn.executemany("INSERT INTO sales (date, product, quantity, amount) VALUES (?, ?, ?, ?)", rows)
+
+
+def test_single_column_api_keeps_format_and_adds_indices():
+    """Test de compatibilidad de detect_anomalies de una columna"""
+    df = pd.DataFrame({"amount": [10, 11, 12, 10, 11, 500, None]}, index=list("abcdefg"))
+    result = DataProcessor().detect_anomalies(df, "amount")
+
+    assert result["total_values"] == 6
+    assert result["anomalies_count"] == 1
+    assert result["anomalies"] == [500]
+    assert list(result["indices"]) == ["f"]
+    assert result["lower_bound"] < 10 < result["upper_bound"]
+
+
+def test_iqr_evaluates_all_numeric_columns_per_group():
+    """Test de límites IQR por grupo en todas las columnas numéricas"""
+    df = pd.DataFrame({
+        "product": ["A"] * 8 + ["B"] * 8,
+        "amount": [10, 11, 10, 12, 11, 10, 11, 12] + [1000, 1010, 990, 1000, 1005, 995, 1000, 10],
+        "quantity": [1, 1, 2, 1, 2, 1, 50, 1] + [5] * 8,
+        "label": ["x"] * 16,
+    })
+
+    overall = detect_anomalies(df, method='iqr')
+    grouped = detect_anomalies(df, method='iqr', by='product')
+
+    assert overall.columns == ["amount", "quantity"]
+    # Sin agrupar, la venta de 10 en B pasa por normal (se parece a las de A)
+    assert 15 not in overall.indices("amount")
+    assert list(grouped.indices("amount")) == [15]
+    assert list(grouped.indices("quantity")) == [6]
+    assert list(grouped.indices()) == [6, 15]
+    assert grouped.summary()["amount"]["anomalies_count"] == 1
+
+
+def test_robust_z_ignores_the_outlier_itself():
+    """Test de la z robusta (mediana/MAD) y del caso de MAD cero"""
+    values = [100.0] * 20 + [101.0] * 10 + [5000.0]
+    df = pd.DataFrame({"amount": values, "constant": [3.0] * 30 + [4.0]})
+    report = detect_anomalies(df, method='mad')
+
+    assert list(report.indices("amount")) == [30]
+    assert report.scores["amount"].iloc[0] < 1
+    # Grupo constante salvo un valor: MAD 0, se usa la desviación media absoluta
+    assert list(report.indices("constant")) == [30]
+
+
+def test_rolling_follows_trend_and_respects_order():
+    """Test del detector por ventana móvil sobre una serie con tendencia"""
+    days = pd.date_range("2024-01-01", periods=60, freq="D")
+    amount = np.arange(60, dtype=float) * 10 + np.tile([0.0, 3.0, -3.0], 20)
+    amount[45] += 200
+    df = pd.DataFrame({"date": days, "amount": amount}).sample(frac=1, random_state=1)
+
+    report = detect_anomalies(df, columns=["amount"], method='rolling', window=7, order_by='date')
+
+    assert list(report.indices("amount")) == [45]
+    # La serie crece mucho, pero la regla IQR global no ve el salto
+    assert 45 not in detect_anomalies(df, columns=["amount"]).indices()
+
+
+def test_sales_monitor_alerts_only_on_new_anomalous_sales(db_path):
+    """Test del monitor incremental que publica FINANCIAL_ALERT"""
+    class Bus:
+        def __init__(self):
+            self.events = []
+
+        def publish(self, event_type, data, user_id=None):
+            self.events.append((event_type, data))
+
+    rng = np.random.default_rng(0)
+    _insert_sales(db_path, [("2024-01-01", f"P{i % 2}", 1, float(100 + 900 * (i % 2) + rng.normal(0, 5)))
+                            for i in range(100)])
+    bus = Bus()
+    monitor = SalesAnomalyMonitor(db_path, event_system=bus, max_alerts=1)
+
+    assert monitor.check() == []  # la primera llamada solo carga la referencia
+
+    _insert_sales(db_path, [("2024-02-01", "P0", 1, 102.0), ("2024-02-01", "P0", 1, 950.0),
+                            ("2024-02-01", "P1", 1, 100.0), ("2024-02-01", "P1", 1, 1001.0),
+                            ("2024-02-01", "Nuevo", 1, 1e6)])
+    alerts = monitor.check()
+
+    assert sorted((a["product"], a["amount"]) for a in alerts) == [("P0", 950.0), ("P1", 100.0)]
+    assert [event_type for event_type, _ in bus.events] == [EventTypes.FINANCIAL_ALERT] * 2
+    assert bus.events[1][1]["type"] == "sales_anomaly_summary"
+    assert monitor.check() == []
@@ -0,0 +1,58 @@
+# sistema_pyme/tests/test_api_database.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+import database as db
+from api.api_database import AsyncDatabase
+
+
+@pytest.fixture
+def async_db(tmp_path):
+    """Fixture de AsyncDatabase sobre una base temporal"""
+    path = str(tmp_path / 'api.db')
+    with db.get_db_connection(path) as conn:
+        conn.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, product TEXT, amount REAL)")
+    adb = AsyncDatabase(path)
+    yield adb
+    adb.close()
+    db.close_pool(path)
+
+
+def test_execute_and_fetch(async_db):
+    """Test de escritura y lectura asíncronas"""
+    async def scenario():
+        result = await async_db.execute("INSERT INTO sales (product, amount) VALUES (?, ?)", ("Pan", 2.5))
+        rows = await async_db.fetch_all("SELECT product, amount FROM sales")
+        row = await async_db.fetch_one("SELECT COUNT(*) AS total FROM sales")
+        return result, rows, row
+
+    result, rows, row = asyncio.run(scenario())
+    assert result["lastrowid"] == 1
+    assert rows == [{"product": "Pan", "amount": 2.5}]
+    assert row == {"total": 1}
+
+
+def test_slow_query_does_not_block_event_loop(async_db):
+    """Test de que una consulta lenta no bloquea el event loop"""
+    release = threading.Event()
+
+    def slow_query(conn):
+        release.wait(2)
+        return conn.execute("SELECT 1").fetchone()[0]
+
+    async def scenario():
+        slow = asyncio.create_task(async_db.run_read(slow_query))
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        fast = await async_db.fetch_one("SELECT COUNT(*) AS total FROM sales")
+        elapsed = time.perf_counter() - started
+        release.set()
+        return await slow, fast, elapsed
+
+    slow_result, fast_result, elapsed = asyncio.run(scenario())
+    assert slow_result == 1
+    assert fast_result == {"total": 0}
+    assert elapsed < 1
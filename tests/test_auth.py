@@ -1,82 +1,185 @@
-# sistema_pyme/tests/test_auth.py
-import pytest
-import sqlite3
-
-# Import absoluto desde el paquete raíz
-from auth import AuthSystem
-
-@pytest.fixture
-def auth_system():
-    """Fixture para sistema de autenticación"""
-    conn = sqlite3.connect(':memory:')
-    return AuthSystem(conn)
-
-def test_auth_initialization(auth_system):
-    """Test de inicialización del sistema de autenticación"""
-    # Verificar que las tablas se crearon
-    c = auth_system.conn.cursor()
-    c.execute("SELECT name FROM sqlite_master WHERE type='table'")
-    tables = [table[0] for table in c.fetchall()]
-    
-    assert 'users' in tables
-    assert 'sessions' in tables
-    assert 'permissions' in tables
-
-def test_user_creation(auth_system):
-    """Test de creación de usuario"""
-    result = auth_system.create_user('testuser', 'test@example.com', 'password123')
-    assert result == True
-    
-    # Verificar que el usuario existe
-    c = auth_system.conn.cursor()
-    c.execute("SELECT username FROM users WHERE username = 'testuser'")
-    user = c.fetchone()
-    assert user is not None
-
-def test_user_authentication(auth_system):
-    """Test de autenticación de usuario"""
-    auth_system.create_user('testuser', 'test@example.com', 'password123')
-    
-    # Autenticación exitosa
-    user = auth_system.authenticate_user('testuser', 'password123')
-    assert user is not None
-    assert user['username'] == 'testuser'
-    
-    # Autenticación fallida
-    user = auth_system.authenticate_user('testuser', 'wrongpassword')
-    assert user is None
-
-def test_password_hashing(auth_system):
-    """Test de hashing de contraseñas"""
-    password = "mysecurepassword"
-    hashed = auth_system.hash_password(password)
-    
-    # Verificar que el hash es diferente a la contraseña original
-    assert password != hashed
-    
-    # Verificar que la verificación funciona
-    assert auth_system.verify_password(password, hashed) == True
-    assert auth_system.verify_password("wrongpassword", hashed) == False
-
-def test_session_management(auth_system):
-    """Test de gestión de sesiones"""
-    auth_system.create_user('testuser', 'test@example.com', 'password123')
-    user = auth_system.authenticate_user('testuser', 'password123')
-    
-    # Crear sesión
-    session_token = auth_system.create_session(user['id'])
-    assert session_token is not None
-    
-    # Validar sesión
-    user_id = auth_system.validate_session(session_token)
-    assert user_id == user['id']
-
-def test_permission_system(auth_system):
-    """Test del sistema de permisos"""
-    # Verificar permisos de admin
-    assert auth_system.has_permission('admin', 'finance', 'can_view') == True
-    assert auth_system.has_permission('admin', 'finance', 'can_edit') == True
-    
-    # Verificar permisos de usuario regular
-    assert auth_system.has_permission('user', 'dashboard', 'can_view') == True
-    assert auth_system.has_permission('user', 'finance', 'can_edit') == False
\ No newline at end of file
+# sistema_pyme/tests/test_auth.py
+import pytest
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+# Import absoluto desde el paquete raíz
+from auth import AuthSystem
+from password_hasher import LoginThrottledError, PasswordHasher
+
+@pytest.fixture
+def auth_system():
+    """Fixture para sistema de autenticación"""
+    conn = sqlite3.connect(':memory:')
+    hasher = PasswordHasher(rounds=4, max_workers=2)
+    yield AuthSystem(conn, hasher=hasher)
+    hasher.shutdown()
+
+def test_auth_initialization(auth_system):
+    """Test de inicialización del sistema de autenticación"""
+    # Verificar que las tablas se crearon
+    c = auth_system.conn.cursor()
+    c.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    tables = [table[0] for table in c.fetchall()]
+    
+    assert 'users' in tables
+    assert 'sessions' in tables
+    assert 'permissions' in tables
+
+def test_user_creation(auth_system):
+    """Test de creación de usuario"""
+    result = auth_system.create_user('testuser', 'test@example.com', 'password123')
+    assert result == True
+    
+    # Verificar que el usuario existe
+    c = auth_system.conn.cursor()
+    c.execute("SELECT username FROM users WHERE username = 'testuser'")
+    user = c.fetchone()
+    assert user is not None
+
+def test_user_authentication(auth_system):
+    """Test de autenticación de usuario"""
+    auth_system.create_user('testuser', 'test@example.com', 'password123')
+    
+    # Autenticación exitosa
+    user = auth_system.authenticate_user('testuser', 'password123')
+    assert user is not None
+    assert user['username'] == 'testuser'
+    
+    # Autenticación fallida
+    user = auth_system.authenticate_user('testuser', 'wrongpassword')
+    assert user is None
+
+def test_password_hashing(auth_system):
+    """Test de hashing de contraseñas"""
+    password = "mysecurepassword"
+    hashed = auth_system.hash_password(password)
+    
+    # Verificar que el hash es diferente a la contraseña original
+    assert password != hashed
+    
+    # Verificar que la verificación funciona
+    assert auth_system.verify_password(password, hashed) == True
+    assert auth_system.verify_password("wrongpassword", hashed) == False
+
+def test_session_management(auth_system):
+    """Test de gestión de sesiones"""
+    auth_system.create_user('testuser', 'test@example.com', 'password123')
+    user = auth_system.authenticate_user('testuser', 'password123')
+    
+    # Crear sesión
+    session_token = auth_system.create_session(user['id'])
+    assert session_token is not None
+    
+    # Validar sesión
+    user_id = auth_system.validate_session(session_token)
+    assert user_id == user['id']
+
+def test_permission_system(auth_system):
+    """Test del sistema de permisos"""
+    # Verificar permisos de admin
+    assert auth_system.has_permission('admin', 'finance', 'can_view') == True
+    assert auth_system.has_permission('admin', 'finance', 'can_edit') == True
+    
+    # Verificar permisos de usuario regular
+    assert auth_system.has_permission('user', 'dashboard', 'can_view') == True
+    assert auth_system.has_permission('user', 'finance', 'can_edit') == False
+
+def test_session_cache_avoids_repeated_queries(auth_system):
+    """Test de caché de sesiones validadas"""
+    auth_system.create_user('testuser', 'test@example.com', 'password123')
+    user = auth_system.authenticate_user('testuser', 'password123')
+    session_token = auth_system.create_session(user['id'])
+
+    assert auth_system.validate_session(session_token) == user['id']
+
+    # Aunque la fila desaparezca, la sesión sigue en caché hasta su TTL...
+    auth_system.conn.execute("DELETE FROM sessions")
+    assert auth_system.validate_session(session_token) == user['id']
+
+    # ...salvo que se revoque explícitamente
+    auth_system.revoke_session(session_token)
+    assert auth_system.validate_session(session_token) is None
+
+
+def test_session_cache_drops_revoked_and_swept_sessions(auth_system):
+    """Test de que revocar sesiones de un usuario o barrerlas invalida la caché"""
+    auth_system.create_user('testuser', 'test@example.com', 'password123')
+    user = auth_system.authenticate_user('testuser', 'password123')
+    first = auth_system.create_session(user['id'])
+    second = auth_system.create_session(user['id'])
+    assert auth_system.validate_session(first) == user['id']
+    assert auth_system.validate_session(second) == user['id']
+
+    assert auth_system.revoke_user_sessions(user['id']) == 2
+    assert auth_system.validate_session(first) is None
+    assert auth_system.validate_session(second) is None
+
+    # El barrendero elimina la sesión por debajo de AuthSystem
+    token = auth_system.create_session(user['id'])
+    assert auth_system.validate_session(token) == user['id']
+    auth_system.conn.execute("UPDATE sessions SET expires_at = ?",
+                             (datetime.now() - timedelta(seconds=1),))
+    assert auth_system.sessions.sweep_expired() == 1
+    assert auth_system.validate_session(token) is None
+
+
+def test_session_cache_does_not_skip_sliding_refresh(auth_system):
+    """Test de que la caché no sirve una sesión que ya debería renovarse"""
+    auth_system.session_cache_ttl = 3600
+    auth_system.sessions.ttl = timedelta(seconds=0.6)
+    auth_system.create_user('testuser', 'test@example.com', 'password123')
+    user = auth_system.authenticate_user('testuser', 'password123')
+    token = auth_system.create_session(user['id'])
+    assert auth_system.validate_session(token) == user['id']
+
+    # Pasada la mitad de su vida, la validación renueva la sesión en la BD
+    time.sleep(0.4)
+    assert auth_system.validate_session(token) == user['id']
+    time.sleep(0.4)
+    assert auth_system.validate_session(token) == user['id']
+
+
+
+def test_allowed_modules_and_permission_invalidation(auth_system):
+    """Test de matriz de permisos materializada e invalidación en escrituras"""
+    assert set(auth_system.get_allowed_modules('manager')) == {'dashboard', 'finance', 'crm'}
+    assert auth_system.has_permission('manager', 'hr', 'can_view') == False
+
+    auth_system.set_permission('manager', 'hr', 1, 0, 0)
+
+    assert auth_system.has_permission('manager', 'hr', 'can_view') == True
+    assert 'hr' in auth_system.get_allowed_modules('manager')
+    with pytest.raises(ValueError):
+        auth_system.has_permission('manager', 'hr', 'role; DROP TABLE users')
+
+
+def test_rehash_on_login_when_cost_changes(auth_system):
+    """Test de rehash automático al cambiar el coste configurado"""
+    auth_system.create_user('testuser', 'test@example.com', 'password123')
+    auth_system.hasher.rounds = 5
+
+    assert auth_system.authenticate_user('testuser', 'password123') is not None
+
+    c = auth_system.conn.cursor()
+    c.execute("SELECT password_hash FROM users WHERE username = 'testuser'")
+    assert c.fetchone()[0].startswith('$2b$05$')
+
+
+def test_successful_login_keeps_ip_throttle():
+    """Test de que un login correcto no vacía el contador de intentos de la IP"""
+    hasher = PasswordHasher(rounds=4, max_workers=1, use_processes=False, max_attempts=3)
+    auth_system = AuthSystem(sqlite3.connect(':memory:'), hasher=hasher)
+    try:
+        auth_system.create_user('atacante', 'a@example.com', 'propia123')
+        auth_system.create_user('victima', 'v@example.com', 'secreta123')
+        for guess in ('uno', 'dos'):
+            assert auth_system.authenticate_user('victima', guess, client_ip='10.0.0.5') is None
+        assert auth_system.authenticate_user('atacante', 'propia123', client_ip='10.0.0.5') is not None
+
+        assert auth_system.authenticate_user('otra', 'tres', client_ip='10.0.0.5') is None
+        with pytest.raises(LoginThrottledError):
+            auth_system.authenticate_user('victima', 'cuatro', client_ip='10.0.0.5')
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,184 @@
+# sistema_pyme/tests/test_backup_scheduler.py
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import database as db
+from backup.backup_scheduler import (BackupScheduler, CronSchedule, IntervalSchedule,
+                                     RetentionPolicy, cron_for_interval, get_backup_scheduler,
+                                     schedule_for_interval, select_backups_to_keep,
+                                     stop_backup_scheduler)
+from backup.backup_system import BackupSystem
+
+
+def test_cron_next_after():
+    """Test del cálculo de la siguiente ejecución cron"""
+    every_15 = CronSchedule("*/15 * * * *")
+    assert every_15.next_after(datetime(2024, 1, 1, 10, 7, 30)) == datetime(2024, 1, 1, 10, 15)
+    assert every_15.next_after(datetime(2024, 1, 1, 10, 15)) == datetime(2024, 1, 1, 10, 30)
+
+    nightly = CronSchedule("30 2 * * *")
+    assert nightly.next_after(datetime(2024, 1, 31, 3, 0)) == datetime(2024, 2, 1, 2, 30)
+
+    # 2024-01-01 es lunes; domingo a las 00:00
+    weekly = CronSchedule("0 0 * * 0")
+    assert weekly.next_after(datetime(2024, 1, 1)) == datetime(2024, 1, 7)
+
+    year_end = CronSchedule("0 0 1 1 *")
+    assert year_end.next_after(datetime(2024, 6, 1)) == datetime(2025, 1, 1)
+
+
+def test_cron_day_of_month_or_weekday():
+    """Test de la semántica OR de cron entre día del mes y día de la semana"""
+    schedule = CronSchedule("0 0 15 * 1")
+    # El siguiente lunes (8 de enero) llega antes que el día 15
+    assert schedule.next_after(datetime(2024, 1, 2)) == datetime(2024, 1, 8)
+
+
+@pytest.mark.parametrize("expression", ["* * *", "60 * * * *", "* * * 13 *", "*/0 * * * *"])
+def test_cron_rejects_invalid_expressions(expression):
+    """Test de expresiones cron inválidas"""
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_cron_for_interval():
+    """Test de la conversión de intervalos en horas a cron"""
+    assert cron_for_interval(6) == "0 */6 * * *"
+    assert cron_for_interval(24) == "0 0 * * *"
+    assert cron_for_interval(168) == "0 0 * * 0"
+
+
+@pytest.mark.parametrize("hours", [0, 5, 7, 36, 48, 100])
+def test_cron_for_interval_rejects_inexact_intervals(hours):
+    """Test de intervalos sin cron exacto: */5 deja un hueco a medianoche, */2 días reinicia el día 1"""
+    with pytest.raises(ValueError):
+        cron_for_interval(hours)
+
+
+def test_schedule_for_interval_accepts_any_interval():
+    """Test de intervalos sin cron exacto: se cuentan desde la ejecución anterior"""
+    assert isinstance(schedule_for_interval(6), CronSchedule)
+
+    every_36 = schedule_for_interval(36)
+    assert isinstance(every_36, IntervalSchedule)
+    assert every_36.next_after(datetime(2024, 1, 1, 23, 0)) == datetime(2024, 1, 3, 11, 0)
+
+    with pytest.raises(ValueError):
+        schedule_for_interval(0)
+
+
+def _manifest(name, created, base=None):
+    return {'name': name, 'created': created.isoformat(), 'base': base}
+
+
+def test_gfs_retention_keeps_one_backup_per_period():
+    """Test de retención GFS por horas y días"""
+    now = datetime(2024, 3, 10, 12, 0)
+    manifests = [_manifest(f"b{i}", now - timedelta(hours=i)) for i in range(72)]
+
+    keep = select_backups_to_keep(manifests, RetentionPolicy(hourly=3, daily=2, weekly=0, monthly=0))
+
+    # Últimas 3 horas más el último backup de cada uno de los 2 últimos días
+    assert keep == {"b0", "b1", "b2", "b13"}
+
+
+def test_gfs_retention_keeps_incremental_bases():
+    """Test de retención que conserva la cadena de bases de un incremental"""
+    now = datetime(2024, 3, 10, 12, 0)
+    manifests = [
+        _manifest("full", now - timedelta(days=3)),
+        _manifest("inc1", now - timedelta(days=2), base="full"),
+        _manifest("inc2", now, base="inc1"),
+    ]
+
+    keep = select_backups_to_keep(manifests, RetentionPolicy(hourly=1, daily=0, weekly=0, monthly=0))
+
+    assert keep == {"full", "inc1", "inc2"}
+
+
+@pytest.fixture
+def backup_system(tmp_path):
+    path = str(tmp_path / "origen.db")
+    db.init_db(path)
+    yield BackupSystem(path, backup_dir=str(tmp_path / "backups"), step_pause=0)
+    db.close_pool(path)
+
+
+def test_scheduler_alternates_full_and_incremental(backup_system):
+    """Test de ejecuciones programadas: completo, incrementales y retención"""
+    scheduler = BackupScheduler(backup_system, full_every=3, retention=RetentionPolicy(hourly=1))
+    archives = [scheduler.run_once() for _ in range(4)]
+
+    assert [a.split('.')[-2] for a in archives] == ['db', 'pages', 'pages', 'db']
+    assert scheduler.get_status()['runs'] == 4
+    # Todos caen en la misma hora: solo queda el último completo
+    assert [b['path'] for b in backup_system.list_backups()] == [archives[-1]]
+
+
+def test_scheduler_is_single_across_instances(backup_system):
+    """Test del lock de archivo: solo un programador por directorio"""
+    first = BackupScheduler(backup_system)
+    second = BackupScheduler(backup_system)
+    try:
+        assert first.start() is True
+        assert first.start() is True
+        assert second.start() is False
+    finally:
+        first.stop()
+        second.stop()
+
+    assert not first.running
+
+
+def test_scheduler_interval_counts_from_last_backup(backup_system):
+    """Test de un intervalo inexacto: la siguiente ejecución es último backup + intervalo"""
+    backup_system.create_backup("manual")
+    created = backup_system.list_backups()[0]['created']
+    scheduler = BackupScheduler(backup_system, interval_hours=48)
+    try:
+        assert scheduler.start() is True
+        deadline = time.monotonic() + 5
+        while scheduler.next_run is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert scheduler.next_run == created + timedelta(hours=48)
+        assert scheduler.get_status()['cron'] == "cada 48 horas"
+    finally:
+        scheduler.stop()
+
+
+def test_scheduler_retries_lock_until_released(backup_system):
+    """Test del relevo: el programador sin lock lo reintenta y arranca al liberarse"""
+    first = BackupScheduler(backup_system)
+    second = BackupScheduler(backup_system, lock_retry=0.05)
+    try:
+        assert first.start() is True
+        assert second.start() is False
+        assert second.get_status()['waiting_lock'] is True
+
+        first.stop()
+        deadline = time.monotonic() + 5
+        while not second.running and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert second.running
+        assert second.get_status()['waiting_lock'] is False
+    finally:
+        first.stop()
+        second.stop()
+
+
+def test_get_backup_scheduler_rejects_other_settings(backup_system):
+    """Test del programador único: otras opciones no se ignoran en silencio"""
+    try:
+        scheduler = backup_system.start_automatic_backups(interval_hours=5)
+        assert isinstance(scheduler.schedule, IntervalSchedule)
+        assert backup_system.start_automatic_backups(interval_hours=5) is scheduler
+
+        with pytest.raises(ValueError, match="schedule"):
+            backup_system.start_automatic_backups(interval_hours=24)
+        with pytest.raises(ValueError, match="retention"):
+            get_backup_scheduler(backup_system, interval_hours=5,
+                                 retention=RetentionPolicy(hourly=1))
+    finally:
+        stop_backup_scheduler()
@@ -0,0 +1,247 @@
+# sistema_pyme/tests/test_backup_system.py
+import gzip
+import json
+import os
+import sqlite3
+import zipfile
+
+import pytest
+
+import database as db
+from backup import backup_system
+from backup.backup_system import BackupInProgressError, BackupSystem, FileLock, file_sha256
+
+
+@pytest.fixture
+def source_db(tmp_path):
+    """Base de datos de origen con algunas filas"""
+    path = str(tmp_path / "origen.db")
+    db.init_db(path)
+    with db.get_pool(path).writer() as conn:
+        conn.executemany(
+            "INSERT INTO sales (date, product, quantity, amount) VALUES (?, ?, ?, ?)",
+            [('2024-01-01', f'Producto {i}', i, i * 10.0) for i in range(500)]
+        )
+    yield path
+    db.close_pool(path)
+
+
+def test_full_backup_writes_archive_and_manifest(source_db, tmp_path):
+    """Test de backup completo con manifiesto y checksum"""
+    backups = BackupSystem(source_db, backup_dir=str(tmp_path / "backups"), pages_per_step=2)
+    archive = backups.create_backup("manual")
+
+    assert archive.endswith(".db.gz")
+    listed = backups.list_backups()
+    assert len(listed) == 1
+    assert listed[0]['type'] == 'full'
+    assert listed[0]['path'] == archive
+
+    manifest = backups.get_manifest(listed[0]['name'])
+    assert manifest['archive_sha256'] == file_sha256(archive)
+
+    restored = str(tmp_path / "copia.db")
+    with gzip.open(archive, 'rb') as src, open(restored, 'wb') as dst:
+        dst.write(src.read())
+    conn = sqlite3.connect(restored)
+    assert conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 500
+    assert conn.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+    conn.close()
+
+
+def test_incremental_backup_stores_only_changed_pages(source_db, tmp_path):
+    """Test de backup incremental contra el backup anterior"""
+    backups = BackupSystem(source_db, backup_dir=str(tmp_path / "backups"))
+    backups.create_backup("manual")
+
+    with db.get_pool(source_db).writer() as conn:
+        conn.execute("UPDATE sales SET amount = 999 WHERE id = 1")
+
+    backups.create_backup("manual", incremental=True)
+    latest, full = backups.list_backups()
+
+    assert latest['type'] == 'incremental'
+    assert latest['base'] == full['name']
+    manifest = backups.get_manifest(latest['name'])
+    assert 0 < manifest['changed_pages'] < manifest['page_count']
+
+
+def test_incremental_without_previous_backup_is_full(source_db, tmp_path):
+    """Test de incremental sin backup previo"""
+    backups = BackupSystem(source_db, backup_dir=str(tmp_path / "backups"))
+    backups.create_backup("manual", incremental=True)
+
+    assert backups.list_backups()[0]['type'] == 'full'
+
+
+def test_list_backups_skips_invalid_manifests(source_db, tmp_path):
+    """Test de manifiestos corruptos ignorados al listar"""
+    backup_dir = tmp_path / "backups"
+    backups = BackupSystem(source_db, backup_dir=str(backup_dir))
+    backups.create_backup("manual")
+    (backup_dir / "backup_roto.manifest.json").write_text("{no es json")
+
+    assert len(backups.list_backups()) == 1
+
+
+def test_restore_full_backup_replaces_database(source_db, tmp_path):
+    """Test de restauración de un backup completo"""
+    backups = BackupSystem(source_db, backup_dir=str(tmp_path / "backups"))
+    archive = backups.create_backup("manual")
+
+    with db.get_pool(source_db).writer() as conn:
+        conn.execute("DELETE FROM sales")
+
+    assert backups.restore_backup(archive) is True
+    with db.get_read_connection(source_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 500
+
+    stats = backups.last_restore_stats
+    assert stats['chain'] == [backups.list_backups()[0]['name']]
+    assert stats['duration_s'] >= 0
+    assert not os.path.exists(source_db + ".restore")
+
+
+def test_restore_keeps_open_connections_usable(source_db, tmp_path):
+    """Test de restauración con conexiones abiertas: siguen válidas y ven los datos restaurados"""
+    backups = BackupSystem(source_db, backup_dir=str(tmp_path / "backups"))
+    archive = backups.create_backup("manual")
+    live = db.open_connection(source_db)  # como los recursos de larga vida de main.py
+    try:
+        live.execute("DELETE FROM sales")
+        live.commit()
+        with db.get_read_connection(source_db) as conn:
+            before = db.get_table_versions(conn, ['sales'])['sales']
+
+        assert backups.restore_backup(archive) is True
+
+        assert live.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 500
+        live.execute("INSERT INTO sales (date, amount) VALUES ('2024-02-01', 1)")
+        live.commit()
+        with db.get_read_connection(source_db) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 501
+            # La versión nunca vuelve a un valor que una caché pudiera tener guardado
+            assert db.get_table_versions(conn, ['sales'])['sales'][0] > before[0]
+    finally:
+        live.close()
+
+
+def test_restore_incremental_applies_chain(source_db, tmp_path):
+    """Test de restauración de un incremental sobre su backup base"""
+    backups = BackupSystem(source_db, backup_dir=str(tmp_path / "backups"))
+    backups.create_backup("manual")
+    with db.get_pool(source_db).writer() as conn:
+        conn.execute("UPDATE sales SET amount = 999 WHERE id = 1")
+    incremental = backups.create_backup("manual", incremental=True)
+
+    with db.get_pool(source_db).writer() as conn:
+        conn.execute("DELETE FROM sales")
+
+    assert backups.restore_backup(incremental, verify="full") is True
+    assert len(backups.last_restore_stats['chain']) == 2
+    with db.get_read_connection(source_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 500
+        assert conn.execute("SELECT amount FROM sales WHERE id = 1").fetchone()[0] == 999
+
+
+def test_restore_grown_chain_in_one_pass(source_db, tmp_path, monkeypatch):
+    """Test de cadena con la base crecida: páginas nuevas añadidas y checksum sin releer el staging"""
+    backups = BackupSystem(source_db, backup_dir=str(tmp_path / "backups"))
+    backups.create_backup("manual")
+    with db.get_pool(source_db).writer() as conn:
+        conn.executemany("INSERT INTO sales (date, product, amount) VALUES ('2024-03-01', ?, 1)",
+                         [(f"Producto {i}" * 20,) for i in range(3000)])
+    incremental = backups.create_backup("manual", incremental=True)
+    with db.get_pool(source_db).writer() as conn:
+        conn.execute("DELETE FROM sales")
+
+    monkeypatch.setattr(backup_system, "file_sha256", lambda path: pytest.fail(f"relectura de {path}"))
+    assert backups.restore_backup(incremental) is True
+    with db.get_read_connection(source_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 3500
+
+
+def test_restore_rejects_corrupted_archive(source_db, tmp_path):
+    """Test de backup corrupto: la base activa no se toca"""
+    backups = BackupSystem(source_db, backup_dir=str(tmp_path / "backups"))
+    archive = backups.create_backup("manual")
+    with gzip.open(archive, 'wb') as f:
+        f.write(b'no es una base de datos')
+
+    with db.get_pool(source_db).writer() as conn:
+        conn.execute("DELETE FROM sales WHERE id > 10")
+
+    assert backups.restore_backup(archive) is False
+    with db.get_read_connection(source_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 10
+
+
+def _legacy_backup(db_path, backup_dir):
+    """Backup con el formato anterior a los manifiestos: volcado SQL en un zip"""
+    dump = os.path.join(backup_dir, "backup_20240101_120000_manual.db")
+    conn = sqlite3.connect(db_path)
+    with open(dump, 'w', encoding='utf-8') as f:
+        for line in conn.iterdump():
+            f.write('%s\n' % line)
+    conn.close()
+    with zipfile.ZipFile(f"{dump}.zip", 'w', zipfile.ZIP_DEFLATED) as zipf:
+        zipf.write(dump, os.path.basename(dump))
+    os.remove(dump)
+    os.utime(f"{dump}.zip", (0, 0))
+    return f"{dump}.zip"
+
+
+def test_legacy_zip_backups_are_listed_and_restorable(source_db, tmp_path):
+    """Test de backups .zip anteriores a los manifiestos"""
+    backups = BackupSystem(source_db, backup_dir=str(tmp_path / "backups"))
+    legacy = _legacy_backup(source_db, backups.backup_dir)
+    archive = backups.create_backup("manual")
+
+    listed = backups.list_backups()
+    assert [b['path'] for b in listed] == [archive, legacy]
+    assert listed[1]['type'] == 'legacy'
+    assert listed[1]['name'] == os.path.basename(legacy)
+
+    with db.get_pool(source_db).writer() as conn:
+        conn.execute("DELETE FROM sales WHERE id > 10")
+
+    assert backups.restore_backup(legacy) is True
+    assert backups.last_restore_stats['backup'] == os.path.basename(legacy)
+    with db.get_read_connection(source_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 500
+        assert conn.execute("PRAGMA quick_check").fetchone()[0] == 'ok'
+
+    backups.delete_backup(listed[1]['name'])
+    assert [b['path'] for b in backups.list_backups()] == [archive]
+
+
+def test_restore_unknown_backup_fails(source_db, tmp_path):
+    """Test de restauración de un backup inexistente"""
+    backups = BackupSystem(source_db, backup_dir=str(tmp_path / "backups"))
+
+    assert backups.restore_backup(str(tmp_path / "no_existe.db.gz")) is False
+
+
+
+def test_create_backup_does_not_overlap(source_db, tmp_path):
+    """Test de exclusión mutua entre backups del mismo directorio"""
+    backup_dir = tmp_path / "backups"
+    backups = BackupSystem(source_db, backup_dir=str(backup_dir))
+
+    with FileLock(str(backup_dir / ".backup.lock")):
+        with pytest.raises(BackupInProgressError):
+            backups.create_backup("manual", wait=False)
+
+    assert backups.create_backup("manual", wait=False)
+
+
+def test_latency_budget_throttles_backup(source_db, tmp_path):
+    """Test del throttling adaptativo con un presupuesto de latencia imposible"""
+    backups = BackupSystem(source_db, backup_dir=str(tmp_path / "backups"), pages_per_step=4,
+                           step_pause=0, latency_budget_ms=0, max_step_pause=0.01)
+    backups.create_backup("manual")
+
+    throttle = backups.get_manifest(backups.list_backups()[0]['name'])['throttle']
+    assert throttle['probes'] > 0
+    assert throttle['over_budget'] == throttle['probes']
+    assert throttle['paused_s'] > 0
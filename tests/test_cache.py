@@ -0,0 +1,94 @@
+# sistema_pyme/tests/test_cache.py
+import threading
+import time
+
+import pytest
+
+import cache
+import database as db
+from cache import QueryCache, TableVersionTracker, get_resource, resource, tables_in
+
+
+def test_resources_are_created_once_per_process():
+    """Test del registro de recursos con varios hilos y con la función redefinida"""
+    calls = []
+
+    def slow_factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_resource("test.slow", slow_factory)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and len({id(result) for result in results}) == 1
+
+    def define():
+        # Como en un rerun de Streamlit: misma función, objeto nuevo
+        @resource
+        def get_thing():
+            return object()
+        return get_thing
+    assert define()() is define()()
+
+    closed = []
+    get_resource("test.closable", lambda: "valor", close=closed.append)
+    cache.drop_resource("test.closable")
+    assert closed == ["valor"]
+    cache.clear_resources()
+
+
+def test_tracker_rereads_versions_only_after_writes(db_path, execute):
+    """Test de PRAGMA data_version: sin escrituras no se consulta table_versions"""
+    tracker = TableVersionTracker(db_path)
+    first = tracker.versions(['sales', 'customers'])
+    tracker.versions(['sales'])
+    assert tracker.refreshes == 1
+
+    execute("INSERT INTO sales (date, amount) VALUES ('2024-01-01', 5)")
+    second = tracker.versions(['sales', 'customers'])
+    assert tracker.refreshes == 2
+    assert second['sales'] != first['sales'] and second['customers'] == first['customers']
+    tracker.close()
+
+
+def test_query_cache_invalidated_per_table(db_path, execute, monkeypatch):
+    """Test de la caché de consultas: aciertos sin tocar la base e invalidación por tabla"""
+    query_cache = QueryCache(db_path, tracker=TableVersionTracker(db_path))
+    execute("INSERT INTO sales (date, amount) VALUES ('2024-01-01', 5)")
+    sql = "SELECT TOTAL(amount) FROM sales WHERE date >= ?"
+
+    assert query_cache.fetch_all(sql, ('2024-01-01',)) == [(5.0,)]
+
+    # Con la caché caliente y sin escrituras no se abre ninguna conexión de lectura
+    with monkeypatch.context() as patch:
+        patch.setattr(db, "get_read_connection", lambda *a, **k: pytest.fail("consulta a la base"))
+        patch.setattr(db, "get_table_versions", lambda *a, **k: pytest.fail("consulta de versiones"))
+        assert query_cache.fetch_all(sql, ('2024-01-01',)) == [(5.0,)]
+    assert (query_cache.hits, query_cache.misses) == (1, 1)
+
+    # Escribir en otra tabla no invalida el resultado
+    execute("INSERT INTO customers (name) VALUES ('Ana')")
+    query_cache.fetch_all(sql, ('2024-01-01',))
+    assert query_cache.hits == 2
+
+    execute("UPDATE sales SET amount = 7")
+    assert query_cache.fetch_all(sql, ('2024-01-01',)) == [(7.0,)]
+    assert query_cache.misses == 2
+
+    def total(conn, since, scale=1):
+        return scale * conn.execute(sql, (since,)).fetchone()[0]
+    assert query_cache.call(total, '2024-01-01', scale=2, tables=('sales',)) == 14.0
+    assert query_cache.call(total, '2024-01-01', scale=2, tables=('sales',)) == 14.0
+    assert query_cache.misses == 3
+
+
+def test_tables_in_detects_versioned_tables():
+    """Test de la detección de tablas en FROM/JOIN"""
+    sql = "SELECT * FROM Sales s JOIN customers c ON c.id = s.customer_id JOIN users u ON 1"
+    assert tables_in(sql) == ('customers', 'sales')
+    assert tables_in("SELECT * FROM sales_daily") == ()
@@ -0,0 +1,76 @@
+# sistema_pyme/tests/test_data_processor.py
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from utils.data_processor import DataProcessor
+
+
+@pytest.fixture
+def processor():
+    return DataProcessor()
+
+
+def test_infer_data_types_converts_from_sample(processor):
+    """Test de inferencia de tipos por muestra con formatos de fecha explícitos"""
+    df = pd.DataFrame({
+        'cantidad': ['1', '2', '3', '4'] * 250,
+        'fecha': ['31/01/2024', '01/02/2024', '15/02/2024', None] * 250,
+        'region': ['Norte', 'Sur', 'Este', 'Oeste'] * 250,
+        'cliente': [f'Cliente {i}' for i in range(1000)],
+    })
+    result = processor.infer_data_types(df)
+
+    assert result['cantidad'].dtype == np.int8
+    assert pd.api.types.is_datetime64_any_dtype(result['fecha'])
+    assert result['fecha'].iloc[0] == pd.Timestamp(2024, 1, 31)
+    assert result['fecha'].isna().sum() == 250
+    assert isinstance(result['region'].dtype, pd.CategoricalDtype)
+    assert not isinstance(result['cliente'].dtype, pd.CategoricalDtype)
+
+    report = processor.last_type_report
+    assert set(report['conversions']) == {'cantidad', 'fecha', 'region'}
+    assert report['memory_after'] < report['memory_before']
+
+
+def test_infer_data_types_keeps_column_when_full_conversion_loses_values(processor):
+    """Test de columna cuya muestra parece numérica pero el resto no"""
+    values = [str(i) for i in range(5000)] + ['N/D']
+    df = pd.DataFrame({'codigo': values})
+    result = processor.infer_data_types(df, sample_size=10)
+
+    assert (result['codigo'] == pd.Series(values)).all()
+    assert 'codigo' not in processor.last_type_report['conversions']
+
+
+def test_infer_data_types_downcasts_numerics_without_loss(processor):
+    """Test de reducción de dtypes numéricos"""
+    df = pd.DataFrame({'pequeno': np.arange(30, dtype='int64'),
+                       'exacto': np.array([0.5, 1.25, np.nan] * 10),
+                       'preciso': np.array([0.1, 0.2, 0.3] * 10)})
+    result = processor.infer_data_types(df)
+
+    assert result['pequeno'].dtype == np.int8
+    assert result['exacto'].dtype == np.float32
+    assert result['preciso'].dtype == np.float64
+
+
+def test_clean_data_removes_empty_and_duplicate_rows_without_mutating(processor):
+    """Test de limpieza con deduplicación por hash sin modificar el original"""
+    df = pd.DataFrame({'Producto A': ['x', 'y', 'x', None], 'Monto ($)': [1, 2, 1, None]})
+    result = processor.clean_data(df)
+
+    assert list(result.columns) == ['producto_a', 'monto']
+    assert len(result) == 2
+    assert list(df.columns) == ['Producto A', 'Monto ($)']
+    assert len(df) == 4
+
+
+def test_clean_chunks_deduplicates_across_chunks(processor):
+    """Test de deduplicación entre bloques de un mismo archivo"""
+    df = pd.DataFrame({'a': [1, 2, 3, 1, 2, 4], 'b': list('xyzxyw')})
+    chunks = [df.iloc[:3], df.iloc[3:]]
+    cleaned = pd.concat(processor.clean_chunks(chunks))
+
+    assert cleaned['a'].tolist() == [1, 2, 3, 4]
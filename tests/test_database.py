@@ -1,87 +1,181 @@
-# sistema_pyme/tests/test_database.py
-import pytest
-import sqlite3
-
-# Import absoluto desde el paquete raíz  
-import database as db
-
-def test_database_initialization():
-    """Test de inicialización de la base de datos"""
-    conn = sqlite3.connect(':memory:')
-    db.init_db(conn)
-    
-    # Verificar que las tablas se crearon
-    c = conn.cursor()
-    c.execute("SELECT name FROM sqlite_master WHERE type='table'")
-    tables = [table[0] for table in c.fetchall()]
-    
-    expected_tables = ['businesses', 'imported_files', 'sales', 'customers', 
-                      'employees', 'inventory', 'finances']
-    
-    for table in expected_tables:
-        assert table in tables
-
-def test_business_operations():
-    """Test de operaciones de negocio"""
-    conn = sqlite3.connect(':memory:')
-    db.init_db(conn)
-    
-    # Guardar negocio
-    db.save_business(conn, "Mi Negocio", "restaurante", "Descripción de prueba")  # type: ignore
-    
-    # Obtener negocio actual
-    business = db.get_current_business(conn)  # type: ignore
-    assert business is not None
-    assert business['name'] == "Mi Negocio"
-    assert business['type'] == "restaurante"
-
-def test_multiple_businesses():
-    """Test con múltiples negocios"""
-    conn = sqlite3.connect(':memory:')
-    db.init_db(conn)
-    
-    # Guardar múltiples negocios
-    db.save_business(conn, "Negocio 1", "tienda", "Descripción 1")  # type: ignore
-    db.save_business(conn, "Negocio 2", "restaurante", "Descripción 2")  # type: ignore
-    
-    # Debería obtener el último negocio
-    business = db.get_current_business(conn)  # type: ignore
-    assert business is not None
-    assert business['name'] == "Negocio 2"
-
-def test_get_current_business_none():
-    """Test para verificar que get_current_business retorna None cuando no hay negocios"""
-    conn = sqlite3.connect(':memory:')
-    db.init_db(conn)
-    
-    # Cuando no hay negocios, debería retornar None
-    business = db.get_current_business(conn)  # type: ignore
-    assert business is None
-
-def test_save_business_with_none_values():
-    """Test para verificar el manejo de valores None"""
-    conn = sqlite3.connect(':memory:')
-    db.init_db(conn)
-    
-    # Probar con valores None/empty
-    db.save_business(conn, "Test Business", "tienda", None)  # type: ignore
-    
-    business = db.get_current_business(conn)  # type: ignore
-    assert business is not None
-    assert business['name'] == "Test Business"
-    assert business['type'] == "tienda"
-
-def test_business_fields_completeness():
-    """Test para verificar que todos los campos del negocio están presentes"""
-    conn = sqlite3.connect(':memory:')
-    db.init_db(conn)
-    
-    db.save_business(conn, "Negocio Completo", "restaurante", "Descripción completa")  # type: ignore
-    
-    business = db.get_current_business(conn)  # type: ignore
-    assert business is not None
-    
-    # Verificar que todos los campos esperados están presentes
-    expected_fields = ['id', 'name', 'type', 'description']
-    for field in expected_fields:
-        assert field in business, f"El campo {field} debería estar en el negocio"
\ No newline at end of file
+# sistema_pyme/tests/test_database.py
+import pytest
+import sqlite3
+
+# Import absoluto desde el paquete raíz  
+import database as db
+
+def test_database_initialization():
+    """Test de inicialización de la base de datos"""
+    conn = sqlite3.connect(':memory:')
+    db.init_db(conn)
+    
+    # Verificar que las tablas se crearon
+    c = conn.cursor()
+    c.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    tables = [table[0] for table in c.fetchall()]
+    
+    expected_tables = ['businesses', 'imported_files', 'sales', 'customers', 
+                      'employees', 'inventory', 'finances']
+    
+    for table in expected_tables:
+        assert table in tables
+
+def test_business_operations():
+    """Test de operaciones de negocio"""
+    conn = sqlite3.connect(':memory:')
+    db.init_db(conn)
+    
+    # Guardar negocio
+    db.save_business(conn, "Mi Negocio", "restaurante", "Descripción de prueba")  # type: ignore
+    
+    # Obtener negocio actual
+    business = db.get_current_business(conn)  # type: ignore
+    assert business is not None
+    assert business['name'] == "Mi Negocio"
+    assert business['type'] == "restaurante"
+
+def test_multiple_businesses():
+    """Test con múltiples negocios"""
+    conn = sqlite3.connect(':memory:')
+    db.init_db(conn)
+    
+    # Guardar múltiples negocios
+    db.save_business(conn, "Negocio 1", "tienda", "Descripción 1")  # type: ignore
+    db.save_business(conn, "Negocio 2", "restaurante", "Descripción 2")  # type: ignore
+    
+    # Debería obtener el último negocio
+    business = db.get_current_business(conn)  # type: ignore
+    assert business is not None
+    assert business['name'] == "Negocio 2"
+
+def test_get_current_business_none():
+    """Test para verificar que get_current_business retorna None cuando no hay negocios"""
+    conn = sqlite3.connect(':memory:')
+    db.init_db(conn)
+    
+    # Cuando no hay negocios, debería retornar None
+    business = db.get_current_business(conn)  # type: ignore
+    assert business is None
+
+def test_save_business_with_none_values():
+    """Test para verificar el manejo de valores None"""
+    conn = sqlite3.connect(':memory:')
+    db.init_db(conn)
+    
+    # Probar con valores None/empty
+    db.save_business(conn, "Test Business", "tienda", None)  # type: ignore
+    
+    business = db.get_current_business(conn)  # type: ignore
+    assert business is not None
+    assert business['name'] == "Test Business"
+    assert business['type'] == "tienda"
+
+def test_business_fields_completeness():
+    """Test para verificar que todos los campos del negocio están presentes"""
+    conn = sqlite3.connect(':memory:')
+    db.init_db(conn)
+    
+    db.save_business(conn, "Negocio Completo", "restaurante", "Descripción completa")  # type: ignore
+    
+    business = db.get_current_business(conn)  # type: ignore
+    assert business is not None
+    
+    # Verificar que todos los campos esperados están presentes
+    expected_fields = ['id', 'name', 'type', 'description']
+    for field in expected_fields:
+        assert field in business, f"El campo {field} debería estar en el negocio"
+
+def test_connection_pool_wal_and_pragmas(tmp_path):
+    """Test de configuración WAL y pragmas del pool de conexiones"""
+    pool = db.ConnectionPool(str(tmp_path / 'pool.db'), max_readers=2)
+    try:
+        with pool.writer() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+        with pool.reader() as reader:
+            assert reader.execute("PRAGMA query_only").fetchone()[0] == 1
+            with pytest.raises(sqlite3.OperationalError):
+                reader.execute("CREATE TABLE t (id INTEGER)")
+    finally:
+        pool.close()
+
+
+def test_connection_pool_readers_see_writer_commits(tmp_path):
+    """Test de lectura de datos confirmados por el escritor"""
+    pool = db.ConnectionPool(str(tmp_path / 'pool.db'), max_readers=2)
+    try:
+        with pool.writer() as conn:
+            conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+            conn.execute("INSERT INTO items (name) VALUES ('a')")
+
+        with pool.reader() as reader:
+            assert reader.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+    finally:
+        pool.close()
+
+
+def test_connection_pool_checkout_timeout_and_stats(tmp_path):
+    """Test de límite de lectores, timeout de checkout y estadísticas"""
+    pool = db.ConnectionPool(str(tmp_path / 'pool.db'), max_readers=1)
+    try:
+        with pool.reader():
+            with pytest.raises(db.PoolTimeoutError):
+                with pool.reader(timeout=0.05):
+                    pass
+
+        with pool.reader():
+            pass
+
+        stats = pool.stats()
+        assert stats['readers_created'] == 1
+        assert stats['readers_in_use'] == 0
+        assert stats['reader_checkouts'] == 2
+        assert stats['reader_timeouts'] == 1
+    finally:
+        pool.close()
+
+
+def test_get_pool_is_shared_per_path(tmp_path):
+    """Test de pool compartido por ruta de base de datos"""
+    path = str(tmp_path / 'shared.db')
+    try:
+        assert db.get_pool(path) is db.get_pool(path)
+    finally:
+        db.close_pool(path)
+
+
+def test_pool_closes_the_connections_it_opened(tmp_path):
+    """Test de open_connection: una conexión nueva por llamada que el pool cierra al cerrarse"""
+    path = str(tmp_path / 'owned.db')
+    first = db.open_connection(path)
+    second = db.open_connection(path)
+    assert first is not second
+    second.close()
+    assert db.get_pool(path).stats()['dedicated_writers'] == 1
+
+    db.close_pool(path)
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.execute("SELECT 1")
+
+
+def test_writer_batch_isolated_from_dedicated_connections(tmp_path):
+    """Test de que un commit en otra conexión no confirma un lote de writer() que falla"""
+    path = str(tmp_path / 'isolated.db')
+    pool = db.get_pool(path)
+    other = db.open_connection(path)
+    try:
+        with pool.writer() as conn:
+            conn.execute("CREATE TABLE items (name TEXT)")
+
+        with pytest.raises(RuntimeError):
+            with pool.writer() as conn:
+                conn.execute("INSERT INTO items (name) VALUES ('lote')")
+                other.commit()  # otro hilo confirmando su propio trabajo
+                raise RuntimeError("fallo a mitad del lote")
+
+        assert other.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+    finally:
+        other.close()
+        db.close_pool(path)
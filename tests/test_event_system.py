@@ -0,0 +1,190 @@
+# sistema_pyme/tests/test_event_system.py
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from event_system import EventSystem, EventTypes
+import migrations
+
+
+@pytest.fixture
+def conn():
+    """Conexión en memoria utilizable desde los hilos del bus"""
+    connection = sqlite3.connect(':memory:', check_same_thread=False)
+    yield connection
+    connection.close()
+
+
+def test_sync_publish_persists_and_notifies(conn):
+    """Test del modo síncrono por defecto"""
+    events = EventSystem(conn)
+    received = []
+    events.subscribe(EventTypes.SALE_CREATED, received.append)
+
+    event_id = events.publish(EventTypes.SALE_CREATED, {"amount": 10}, user_id=1)
+
+    assert event_id > 0
+    assert received == [{"amount": 10}]
+    assert len(events.get_events_by_user(1)) == 1
+
+
+def test_async_publish_batches_and_flushes(conn):
+    """Test de persistencia en lotes y entrega en modo asíncrono"""
+    events = EventSystem(conn, async_dispatch=True, batch_size=50, flush_interval=10)
+    received = []
+    events.subscribe(EventTypes.USER_LOGIN, received.append)
+
+    for i in range(120):
+        events.publish(EventTypes.USER_LOGIN, {"n": i}, user_id=1)
+    assert events.flush(timeout=5)
+
+    metrics = events.get_metrics()
+    assert metrics['persisted'] == 120
+    assert metrics['batches'] == 3
+    assert metrics['queue_depth'] == 0
+    assert len(received) == 120
+    assert sum(p[3] for p in events.store.partitions()) == 120
+    events.close()
+
+
+def test_async_isolates_errors_and_applies_backpressure(conn):
+    """Test de aislamiento de errores y límite de pendientes por suscriptor"""
+    events = EventSystem(conn, async_dispatch=True, dispatch_workers=2,
+                         max_pending_per_subscriber=1)
+    gate = threading.Event()
+    received = []
+
+    def slow_handler(data):
+        gate.wait(5)
+
+    def failing_handler(data):
+        raise ValueError("fallo")
+
+    events.subscribe(EventTypes.SYSTEM_INFO, slow_handler)
+    events.subscribe(EventTypes.SYSTEM_ERROR, failing_handler)
+    events.subscribe(EventTypes.SYSTEM_ERROR, received.append)
+
+    events.publish(EventTypes.SYSTEM_INFO, {})
+    events.publish(EventTypes.SYSTEM_INFO, {})  # descartado: el suscriptor lento está ocupado
+    events.publish(EventTypes.SYSTEM_ERROR, {"x": 1})
+    gate.set()
+    assert events.flush(timeout=5)
+
+    metrics = events.get_metrics()
+    assert metrics['dropped'] == 1
+    assert metrics['callback_errors'] == 1
+    assert received == [{"x": 1}]
+    events.close()
+
+
+def test_close_races_with_publishers(conn, monkeypatch):
+    """Test de publish() concurrente con close(): ningún evento aceptado se pierde"""
+    unregistered = []
+    monkeypatch.setattr('event_system.atexit.unregister', unregistered.append)
+    events = EventSystem(conn, async_dispatch=True, batch_size=10, flush_interval=0.01)
+    received = []
+    events.subscribe(EventTypes.USER_LOGIN, received.append)
+    accepted = [0] * 4
+    errors = []
+    start = threading.Barrier(5)
+
+    def publisher(slot):
+        start.wait()
+        while True:
+            try:
+                events.publish(EventTypes.USER_LOGIN, {"slot": slot}, user_id=1)
+            except RuntimeError:
+                return
+            except Exception as e:
+                errors.append(e)
+                return
+            accepted[slot] += 1
+
+    threads = [threading.Thread(target=publisher, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    events.close()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == []
+    metrics = events.get_metrics()
+    assert metrics['persisted'] == metrics['published'] == sum(accepted)
+    assert len(received) == sum(accepted)
+    assert unregistered == [events.close]
+
+
+def test_failed_batch_is_rolled_back(conn, caplog):
+    """Test de un lote que falla a mitad: rollback, caché de particiones limpia y log"""
+    events = EventSystem(conn)
+    old_month = datetime(2020, 1, 5)
+
+    with caplog.at_level("ERROR", logger="event_system"):
+        events._persist_batch([(EventTypes.SYSTEM_INFO, "{}", None, old_month),
+                               (EventTypes.SYSTEM_INFO, "{}", None, "sin fecha")])
+
+    assert events.get_metrics()['persist_errors'] == 2
+    assert "lote de 2 eventos" in caplog.text
+    assert not conn.in_transaction
+    assert events.store.partitions() == []
+
+    # La partición de enero de 2020 se vuelve a crear en el siguiente lote
+    events._persist_batch([(EventTypes.SYSTEM_INFO, "{}", None, old_month)])
+    assert [p[3] for p in events.store.partitions()] == [1]
+
+
+def test_events_are_partitioned_by_month(conn):
+    """Test de particiones mensuales y consultas que cruzan particiones"""
+    events = EventSystem(conn)
+    now = datetime.now()
+    old = now - timedelta(days=70)
+    events.store.append([
+        (EventTypes.SALE_CREATED, '{"n": 1}', 1, old),
+        (EventTypes.USER_LOGIN, '{"n": 2}', 2, now),
+        (EventTypes.SALE_CREATED, '{"n": 3}', 1, now),
+    ])
+    conn.commit()
+
+    assert len(events.store.partitions()) == 2
+    recent = events.get_recent_events(limit=10)
+    assert [r[1] for r in recent] == ['{"n": 3}', '{"n": 2}', '{"n": 1}']
+    assert len(events.get_events_by_type(EventTypes.SALE_CREATED)) == 2
+    assert len(events.get_events_by_user(2)) == 1
+    assert events.get_events_by_type(EventTypes.BACKUP_CREATED) == []
+
+
+def test_clear_old_events_drops_whole_partitions(conn):
+    """Test de retención: los meses antiguos se eliminan completos"""
+    events = EventSystem(conn)
+    now = datetime.now()
+    events.store.append([
+        (EventTypes.SYSTEM_INFO, '{}', None, now - timedelta(days=100)),
+        (EventTypes.SYSTEM_INFO, '{}', None, now - timedelta(days=95)),
+        (EventTypes.SYSTEM_INFO, '{}', None, now),
+    ])
+    conn.commit()
+
+    assert events.clear_old_events(days_old=30) == 2
+    assert len(events.store.partitions()) == 1
+    assert len(events.get_recent_events()) == 1
+
+
+def test_legacy_events_are_migrated(conn):
+    """Test de migración de la tabla system_events original"""
+    conn.execute('''CREATE TABLE system_events
+                    (id INTEGER PRIMARY KEY, event_type TEXT, event_data TEXT,
+                     created_by INTEGER, created_at TIMESTAMP)''')
+    conn.execute("INSERT INTO system_events (event_type, event_data, created_by, created_at) "
+                 "VALUES ('user_login', '{}', 1, '2025-08-20 10:00:00.000000')")
+    conn.commit()
+
+    migrations.apply_migrations(conn)
+    events = EventSystem(conn)
+
+    tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    assert 'system_events' not in tables
+    assert 'system_events_202508' in tables
+    assert events.get_events_by_user(1)[0][0] == 'user_login'
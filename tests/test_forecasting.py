@@ -0,0 +1,70 @@
+# sistema_pyme/tests/test_forecasting.py
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+pytest.importorskip("sklearn")
+
+from utils.analytics import AnalyticsEngine
+from utils.forecasting import ForecastEngine, moving_average_forecast
+
+
+def _legacy_moving_average(values, periods):
+    """Cálculo original de forecast_sales, como referencia"""
+    series = pd.Series(values, dtype=float)
+    forecast = []
+    for _ in range(periods):
+        last_values = series[-3:] if len(series) >= 3 else series
+        forecast.append(last_values.mean())
+        series = pd.concat([series, pd.Series([forecast[-1]])])
+    return forecast
+
+
+def test_moving_average_matches_legacy_loop():
+    """Test de equivalencia con el promedio móvil original, también con 2 puntos"""
+    for values in ([10.0, 20.0], [5.0, 7.0, 9.0, 30.0, 12.0]):
+        batch = moving_average_forecast(np.array([values]), 6)
+        assert np.allclose(batch[0], _legacy_moving_average(values, 6))
+
+    result = AnalyticsEngine().forecast_sales(pd.DataFrame({"sales": [5.0, 7.0, 9.0, 30.0]}), periods=4)
+    assert result["method"] == "moving_average"
+    assert np.allclose(result["forecast"], _legacy_moving_average([5.0, 7.0, 9.0, 30.0], 4))
+
+
+def test_holt_winters_uses_detected_season():
+    """Test de Holt-Winters con el periodo que da detect_seasonality"""
+    pattern = np.array([10.0, 20.0, 30.0, 20.0])
+    sales = np.tile(pattern, 8) + np.arange(32) * 0.5
+    engine = AnalyticsEngine()
+
+    result = engine.forecast_sales(pd.DataFrame({"sales": sales}), periods=4, method='auto')
+
+    assert result["season_length"] == 4
+    assert result["method"] == "holt_winters"
+    expected = pattern + np.arange(32, 36) * 0.5
+    assert np.allclose(result["forecast"], expected, atol=1.5)
+
+
+def test_batch_forecast_groups_models_and_caches_fits():
+    """Test de pronóstico por lotes y de la caché por huella de serie"""
+    rng = np.random.default_rng(0)
+    seasonal = np.tile([5.0, 15.0, 25.0, 15.0, 10.0, 5.0], 4) + rng.normal(0, 0.2, (50, 24))
+    trending = 100 + np.arange(24) * 3.0 + rng.normal(0, 0.5, (50, 24))
+    values = np.vstack([seasonal, trending])
+    seasons = [6] * 50 + [1] * 50
+    engine = ForecastEngine()
+
+    first = engine.forecast(values, 6, method='auto', season_lengths=seasons)
+    assert set(first["method"][:50]) == {"holt_winters"}
+    assert set(first["method"][50:]) == {"holt"}
+    assert np.allclose(first["forecast"][50:, 0], 100 + 24 * 3.0, atol=3)
+    assert np.allclose(first["forecast"][:50, :3], [5.0, 15.0, 25.0], atol=2)
+    assert (engine.hits, engine.misses) == (0, 100)
+
+    again = engine.forecast(values, 6, method='auto', season_lengths=seasons)
+    assert np.array_equal(again["forecast"], first["forecast"])
+    assert (engine.hits, engine.misses) == (100, 100)
+
+    values[0, -1] += 1.0  # una serie con datos nuevos se vuelve a ajustar
+    engine.forecast(values, 6, method='auto', season_lengths=seasons)
+    assert (engine.hits, engine.misses) == (199, 101)
@@ -0,0 +1,134 @@
+# sistema_pyme/tests/test_import_jobs.py
+import io
+
+import pytest
+
+pytest.importorskip("pandas")
+
+import database as db
+from utils.ingestion import StreamingImporter
+from utils.import_jobs import (STATUS_CANCELLED, STATUS_DONE, STATUS_ERROR, STATUS_QUEUED,
+                               ImportJobQueue, run_import_job)
+
+
+def _sales_csv(rows, start=0):
+    lines = ["Fecha,Producto,Cantidad,Monto"]
+    lines += [f"2024-03-{i % 28 + 1:02d},Producto {i % 7},{i % 5 + 1},{i}.5"
+              for i in range(start, start + rows)]
+    return io.BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+
+
+@pytest.fixture
+def queue(db_path, tmp_path):
+    queue = ImportJobQueue(db_path, upload_dir=str(tmp_path / "uploads"), max_workers=2,
+                           use_processes=False, chunksize=100)
+    yield queue
+    queue.shutdown()
+
+
+def _sales_count(db_path):
+    with db.get_read_connection(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+
+
+def test_enqueued_job_is_processed(queue, db_path):
+    """Test de un trabajo que pasa de 'En cola' a 'Procesado'"""
+    job_id = queue.enqueue("ventas.csv", _sales_csv(450))
+    job = queue.wait(job_id, timeout=30)
+
+    assert job['status'] == STATUS_DONE
+    assert job['records'] == 450
+    assert job['progress'] == 1.0
+    assert job['attempts'] == 1
+    assert job['started_at'] is not None
+    assert _sales_count(db_path) == 450
+
+
+def test_failed_job_records_error_and_can_be_retried(queue, db_path):
+    """Test de error en un trabajo y reintento"""
+    job_id = queue.enqueue("roto.xlsx", io.BytesIO(b"esto no es un excel"))
+    job = queue.wait(job_id, timeout=30)
+    assert job['status'] == STATUS_ERROR
+    assert job['error']
+
+    with open(job['stored_path'], 'wb') as f:
+        f.write(_sales_csv(10).getvalue())
+    with db.get_pool(db_path).writer() as conn:
+        conn.execute("UPDATE imported_files SET file_type = 'CSV' WHERE id = ?", (job_id,))
+
+    assert queue.retry(job_id) is True
+    job = queue.wait(job_id, timeout=30)
+    assert job['status'] == STATUS_DONE
+    assert job['attempts'] == 2
+    assert queue.retry(job_id) is False
+
+
+def test_cancel_running_job_rolls_back_inserted_rows(queue, db_path, tmp_path, monkeypatch):
+    """Test de cancelación entre bloques: se deshacen las filas ya insertadas"""
+    path = tmp_path / "ventas.csv"
+    path.write_bytes(_sales_csv(500).getvalue())
+    with db.get_pool(db_path).writer() as conn:
+        job_id = conn.execute(
+            "INSERT INTO imported_files (filename, file_type, status, stored_path, cancel_requested) "
+            "VALUES ('ventas.csv', 'CSV', ?, ?, 0)", (STATUS_QUEUED, str(path))
+        ).lastrowid
+
+    # Pedir la cancelación en cuanto se inserta el primer bloque
+    original_insert = StreamingImporter._insert
+
+    def insert_then_cancel(self, *args):
+        inserted = original_insert(self, *args)
+        queue.cancel(job_id)
+        return inserted
+
+    monkeypatch.setattr(StreamingImporter, "_insert", insert_then_cancel)
+
+    assert run_import_job(db_path, job_id, chunksize=100) == STATUS_CANCELLED
+    job = queue.get_job(job_id)
+    assert job['status'] == STATUS_CANCELLED
+    assert 0 < job['records'] < 500
+    assert _sales_count(db_path) == 0
+
+
+def test_cancel_queued_job(queue, db_path):
+    """Test de cancelación de un trabajo que aún no empezó"""
+    with db.get_pool(db_path).writer() as conn:
+        job_id = conn.execute(
+            "INSERT INTO imported_files (filename, file_type, status, stored_path, cancel_requested) "
+            "VALUES ('x.csv', 'CSV', ?, 'x.csv', 1)", (STATUS_QUEUED,)
+        ).lastrowid
+
+    assert run_import_job(db_path, job_id) == STATUS_CANCELLED
+    assert queue.cancel(job_id) is False
+
+
+def test_recover_requeues_pending_and_fails_interrupted(queue, db_path, tmp_path):
+    """Test de recuperación de trabajos tras reiniciar el proceso"""
+    path = tmp_path / "pendiente.csv"
+    path.write_bytes(_sales_csv(20).getvalue())
+    with db.get_pool(db_path).writer() as conn:
+        pending = conn.execute(
+            "INSERT INTO imported_files (filename, file_type, status, stored_path) "
+            "VALUES ('pendiente.csv', 'CSV', 'En cola', ?)", (str(path),)
+        ).lastrowid
+        interrupted = conn.execute(
+            "INSERT INTO imported_files (filename, file_type, status, stored_path) "
+            "VALUES ('cortado.csv', 'CSV', 'En análisis', ?)", (str(path),)
+        ).lastrowid
+
+    assert queue.recover() == [pending]
+    assert queue.wait(pending, timeout=30)['status'] == STATUS_DONE
+    assert queue.get_job(interrupted)['status'] == STATUS_ERROR
+
+
+def test_process_pool_runs_jobs_in_parallel(db_path, tmp_path):
+    """Test de la cola con procesos worker"""
+    queue = ImportJobQueue(db_path, upload_dir=str(tmp_path / "uploads"), max_workers=2)
+    try:
+        job_ids = [queue.enqueue(f"ventas_{i}.csv", _sales_csv(200, start=i * 200)) for i in range(2)]
+        jobs = [queue.wait(job_id, timeout=120) for job_id in job_ids]
+    finally:
+        queue.shutdown()
+
+    assert [job['status'] for job in jobs] == [STATUS_DONE, STATUS_DONE]
+    assert _sales_count(db_path) == 400
@@ -0,0 +1,53 @@
+# sistema_pyme/tests/test_import_time.py
+import os
+
+import pytest
+
+from lazy_imports import import_times, lazy_import
+
+# Dependencias que solo deben cargarse al pintar o llamar a quien las usa
+# (plotly.graph_objects no cuenta: es diferido en plotly y streamlit ya lo importa)
+HEAVY = ('sklearn', 'plotly.express', 'bs4', 'qrcode')
+
+# Arranque en frío de la API: ~0,5 s medidos. El tiempo absoluto depende de la
+# máquina, así que solo se comprueba con PYME_BENCHMARKS=1
+API_BUDGET_US = 1_000_000
+benchmark = pytest.mark.skipif(not os.environ.get("PYME_BENCHMARKS"),
+                               reason="medición de tiempos: activar con PYME_BENCHMARKS=1")
+
+
+def test_lazy_import_defers_until_first_attribute():
+    """Test del módulo diferido: no se importa hasta usarlo"""
+    times = import_times("from lazy_imports import lazy_import; json = lazy_import('json')")
+    assert 'json' not in times
+
+    module = lazy_import('colorsys')
+    assert module.rgb_to_hsv(1, 0, 0) == (0.0, 1.0, 1.0)
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import('modulo_que_no_existe.submodulo')
+
+
+def test_api_cold_start():
+    """Test del arranque de la API: sin pandas ni dependencias pesadas"""
+    pytest.importorskip("fastapi")
+    times = import_times("import api.api_main")
+
+    loaded = [name for name in HEAVY + ('pandas',) if name in times]
+    assert loaded == []
+
+
+@benchmark
+def test_api_cold_start_budget():
+    """Test del tiempo de arranque en frío de la API frente a su presupuesto"""
+    pytest.importorskip("fastapi")
+    assert import_times("import api.api_main")['api.api_main'] < API_BUDGET_US
+
+
+def test_streamlit_modules_defer_heavy_dependencies():
+    """Test de los módulos de la app: importarlos no carga plotly, scikit-learn, bs4 ni qrcode"""
+    for dependency in ("streamlit", "pandas", "pyotp"):
+        pytest.importorskip(dependency)
+    times = import_times("import auth, modules.crm, modules.finance, modules.hr, modules.inventory, "
+                         "templates.report_templates, utils.analytics")
+
+    assert [name for name in HEAVY if name in times] == []
@@ -0,0 +1,158 @@
+# sistema_pyme/tests/test_ingestion.py
+import io
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+import database as db
+from migrations import IMPORTED_COLUMNS
+from utils.ingestion import (TARGET_TABLES, IncrementalInsights, StreamingImporter, backfill_row_hashes,
+                             detect_target_table,
+                             iter_chunks, map_columns)
+
+
+def _sales_csv(rows):
+    lines = ["Fecha,Producto,Cantidad,Monto"]
+    lines += [f"2024-01-{i % 28 + 1:02d},Producto {i % 7},{i % 5 + 1},{i * 1.5}" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def test_detect_target_table_from_spanish_headers():
+    """Test de detección de tabla destino por encabezados"""
+    columns = ["Fecha", "Producto", "Cantidad", "Monto"]
+    assert detect_target_table(columns) == "sales"
+    assert map_columns(columns, "sales") == {
+        "Fecha": "date", "Producto": "product", "Cantidad": "quantity", "Monto": "amount"
+    }
+    assert detect_target_table(["Nombre", "Correo", "Teléfono"]) == "customers"
+    assert detect_target_table(["columna", "otra"]) is None
+
+
+def test_iter_chunks_reads_csv_in_blocks():
+    """Test de lectura de CSV por bloques con posición en bytes"""
+    data = _sales_csv(1000)
+    position = {}
+    sizes = [len(chunk) for chunk in iter_chunks(io.BytesIO(data), "csv", chunksize=300,
+                                                  position=position)]
+
+    assert sizes == [300, 300, 300, 100]
+    assert position["done"] == len(data)
+
+
+def test_incremental_insights_match_full_dataframe():
+    """Test de insights incrementales equivalentes al cálculo completo"""
+    df = pd.DataFrame({"a": range(10), "b": [1.0, None] * 5, "c": list("abcdefghij")})
+    insights = IncrementalInsights()
+    for start in range(0, 10, 3):
+        insights.update(df.iloc[start:start + 3])
+
+    assert insights.rows == 10
+    assert insights.numeric["a"]["sum"] == df["a"].sum()
+    assert insights.numeric["b"]["count"] == 5
+    assert insights.nulls["b"] == 5
+    assert insights.insights()[0] == "Archivo contiene 10 registros y 3 columnas"
+
+
+def test_streaming_importer_inserts_sales_in_batches(db_path):
+    """Test de importación por bloques con progreso"""
+    progress = []
+    importer = StreamingImporter(db_path, chunksize=250, batch_size=100,
+                                 progress=lambda rows, fraction: progress.append((rows, fraction)))
+    data = _sales_csv(1000)
+    result = importer.ingest(io.BytesIO(data), "csv", total_bytes=len(data))
+
+    assert result.table == "sales"
+    assert result.records == result.inserted == 1000
+    assert [rows for rows, _ in progress] == [250, 500, 750, 1000]
+    assert progress[-1][1] == 1.0
+
+    with db.get_read_connection(db_path) as conn:
+        count, total = conn.execute("SELECT COUNT(*), SUM(amount) FROM sales").fetchone()
+        first = conn.execute("SELECT date, product, quantity FROM sales ORDER BY id LIMIT 1").fetchone()
+    assert count == 1000
+    assert total == pytest.approx(sum(i * 1.5 for i in range(1000)))
+    assert tuple(first) == ("2024-01-01", "Producto 0", 1)
+
+
+def test_streaming_importer_reads_xlsx(db_path, tmp_path):
+    """Test de importación de Excel con el iterador read-only de openpyxl"""
+    pytest.importorskip("openpyxl")
+    path = tmp_path / "ventas.xlsx"
+    pd.DataFrame({"Fecha": ["2024-02-01", "2024-02-02", "2024-02-03"],
+                  "Producto": ["A", "B", "C"],
+                  "Importe": [10.0, 20.0, 30.0]}).to_excel(path, index=False)
+
+    result = StreamingImporter(db_path, chunksize=2).ingest(str(path), "xlsx")
+
+    assert result.table == "sales"
+    assert result.inserted == 3
+
+
+def test_reimport_skips_rows_already_imported(db_path):
+    """Test de deduplicación contra importaciones anteriores"""
+    importer = StreamingImporter(db_path, chunksize=64)
+    first = importer.ingest(io.BytesIO(_sales_csv(300)), "csv")
+    again = importer.ingest(io.BytesIO(_sales_csv(300)), "csv")
+    overlapping = importer.ingest(io.BytesIO(_sales_csv(400)), "csv")
+
+    assert first.inserted == 300
+    assert again.inserted == 0 and again.duplicates == 300
+    assert overlapping.inserted == 100
+    with db.get_read_connection(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 400
+
+
+def test_identical_rows_within_a_file_are_kept(db_path):
+    """Test de filas idénticas legítimas dentro de una misma exportación"""
+    data = b"Fecha,Producto,Monto\n" + b"2024-01-01,Cafe,2.5\n" * 5
+    importer = StreamingImporter(db_path, chunksize=2)
+
+    assert importer.ingest(io.BytesIO(data), "csv").inserted == 5
+    assert importer.ingest(io.BytesIO(data), "csv").inserted == 0
+    more = b"Fecha,Producto,Monto\n" + b"2024-01-01,Cafe,2.5\n" * 7
+    assert importer.ingest(io.BytesIO(more), "csv").inserted == 2
+
+
+def test_rollback_also_forgets_row_hashes(db_path):
+    """Test de rollback de una importación: se puede volver a importar"""
+    importer = StreamingImporter(db_path)
+    importer.ingest(io.BytesIO(_sales_csv(50)), "csv")
+    assert importer.rollback_inserted() == 50
+
+    assert importer.ingest(io.BytesIO(_sales_csv(50)), "csv").inserted == 50
+
+
+def test_backfill_row_hashes_matches_imported_rows(db_path):
+    """Test de registro de hashes para filas cargadas sin importador"""
+    with db.get_pool(db_path).writer() as conn:
+        conn.executemany("INSERT INTO sales (date, product, quantity, amount) VALUES (?, ?, ?, ?)",
+                         [(f"2024-01-{i % 28 + 1:02d}", f"Producto {i % 7}", i % 5 + 1, i * 1.5)
+                          for i in range(100)])
+
+    assert backfill_row_hashes(db_path, "sales") == 100
+    result = StreamingImporter(db_path).ingest(io.BytesIO(_sales_csv(120)), "csv")
+    assert result.inserted == 20
+
+
+def test_deleted_or_edited_rows_can_be_imported_again(db_path):
+    """Test de hashes ligados a su fila: borrar o editar fuera del importador los olvida"""
+    importer = StreamingImporter(db_path)
+    assert importer.ingest(io.BytesIO(_sales_csv(30)), "csv").inserted == 30
+    with db.get_pool(db_path).writer() as conn:
+        conn.execute("DELETE FROM sales WHERE id <= 5")
+        conn.execute("UPDATE sales SET amount = amount + 1 WHERE id = 10")
+        # Una columna que no viene del archivo no invalida el hash
+        conn.execute("UPDATE sales SET customer_id = 1 WHERE id = 11")
+
+    result = importer.ingest(io.BytesIO(_sales_csv(30)), "csv")
+
+    assert (result.inserted, result.duplicates) == (6, 24)
+    with db.get_read_connection(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0] == 31
+
+
+def test_row_hash_triggers_cover_imported_columns():
+    """Test de que los triggers de hashes vigilan todas las columnas importables"""
+    assert {table: set(columns) for table, columns in IMPORTED_COLUMNS.items()} == \
+        {table: set(columns) for table, columns in TARGET_TABLES.items()}
@@ -0,0 +1,111 @@
+# sistema_pyme/tests/test_kpi_engine.py
+import os
+from datetime import date
+
+import pytest
+
+import database as db
+from utils.kpi_engine import DASHBOARD_METRICS, FINANCE_METRICS, KPIEngine, get_kpi_engine, period_params
+
+TODAY = date(2024, 3, 15)
+
+
+def test_period_params_clamp_previous_month():
+    """Test de los parámetros de fecha a final de mes"""
+    params = period_params(date(2024, 3, 31))
+    assert params['month_start'] == '2024-03-01'
+    assert params['prev_month_start'] == '2024-02-01'
+    assert params['prev_month_tomorrow'] == '2024-03-01'
+    assert period_params(date(2024, 1, 10))['prev_month_start'] == '2023-12-01'
+
+
+def test_table_versions_change_on_every_kind_of_write(db_path, execute):
+    """Test de las versiones de tabla: inserción, actualización, borrado y rowid reutilizado"""
+    def version():
+        with db.get_read_connection(db_path) as conn:
+            return db.get_table_versions(conn, ['sales'])['sales']
+
+    seen = [version()]
+    execute("INSERT INTO sales (date, amount) VALUES ('2024-03-15', 10)")
+    seen.append(version())
+    execute("UPDATE sales SET amount = 20")
+    seen.append(version())
+    execute("DELETE FROM sales")
+    seen.append(version())
+    execute("INSERT INTO sales (date, amount) VALUES ('2024-03-15', 30)")
+    seen.append(version())
+
+    assert len(set(seen)) == len(seen)
+    with pytest.raises(ValueError):
+        with db.get_read_connection(db_path) as conn:
+            db.get_table_versions(conn, ['users'])
+
+
+def test_dashboard_metrics_from_sql(db_path, execute):
+    """Test de los KPIs del dashboard calculados en SQLite"""
+    execute("INSERT INTO sales (date, product, quantity, amount) VALUES (?, ?, ?, ?)", [
+        ('2024-03-15 10:30:00', 'Pan', 2, 150.0),
+        ('2024-03-15', 'Pan', 1, 50.0),
+        ('2024-03-14', 'Café', 1, 100.0),
+        ('2024-01-02', 'Café', 1, 999.0),
+    ])
+    execute("INSERT INTO customers (name, last_purchase) VALUES (?, ?)",
+            [('Ana', '2024-03-01'), ('Luis', '2023-01-01'), ('Eva', '2024-02-20')])
+    execute("INSERT INTO inventory (product, current_stock, min_stock) VALUES (?, ?, ?)",
+            [('Pan', 5, 10), ('Café', 50, 10), ('Té', 20, 10), ('Azúcar', 8, 5)])
+
+    engine = KPIEngine(db_path)
+    values = engine.values(DASHBOARD_METRICS, today=TODAY)
+
+    assert values == {'sales_today': 200.0, 'customers_active': 2, 'restock_pending': 1, 'stock_health': 75.0}
+    assert engine.display(['sales_today', 'stock_dead'], today=TODAY) == [
+        ("Ventas Hoy", "$200", "+100%"),
+        # Té y Azúcar no se han vendido en 90 días
+        ("Stock Muerto", "2", None),
+    ]
+
+
+def test_shared_scans_and_write_invalidation(db_path, execute):
+    """Test de recorridos compartidos por tabla y de la caché invalidada por escrituras"""
+    execute("INSERT INTO finances (date, type, amount) VALUES (?, ?, ?)", [
+        ('2024-03-02', 'Ingreso', 1000.0), ('2024-03-05', 'Gasto', 400.0),
+        ('2024-02-03', 'income', 500.0), ('2024-02-20', 'expense', 100.0),
+    ])
+    engine = KPIEngine(db_path)
+
+    rows = engine.display(FINANCE_METRICS, today=TODAY)
+    assert rows[0] == ("Flujo de Caja", "$600", "+20%")  # febrero hasta el día 15: 500
+    assert rows[3] == ("Margen", "60%", None)
+    assert engine.scans == 2  # una consulta para sales y otra para todo finances
+
+    engine.values(FINANCE_METRICS, today=TODAY)
+    assert engine.scans == 2
+
+    # Solo se vuelve a leer la tabla modificada
+    execute("UPDATE finances SET amount = 600 WHERE type = 'Gasto'")
+    assert engine.values(['cash_flow'], today=TODAY)['cash_flow'] == 400.0
+    assert engine.scans == 3
+
+    execute("INSERT INTO sales (date, amount) VALUES ('2024-03-10', 100)")
+    assert engine.values(['cash_flow'], today=TODAY)['cash_flow'] == 500.0
+    assert engine.scans == 4
+
+    # Otro día: mismos datos, otros parámetros
+    engine.values(['cash_flow'], today=date(2024, 3, 16))
+    assert engine.scans == 6
+
+
+def test_empty_tables_show_placeholder(db_path):
+    """Test de métricas sin datos"""
+    rows = KPIEngine(db_path).display(['evaluation_avg', 'employees_active', 'avg_ticket'], today=TODAY)
+    assert rows == [("Evaluación Promedio", "N/D", None), ("Empleados Activos", "0", None),
+                    ("Ticket Promedio", "N/D", None)]
+
+
+def test_engine_per_database(db_path, monkeypatch):
+    """Test del registro de motores: uno por base de datos, sea cual sea la ruta usada"""
+    monkeypatch.chdir(os.path.dirname(db_path))
+    first = get_kpi_engine(os.path.basename(db_path))
+    assert get_kpi_engine(db_path) is first
+    assert get_kpi_engine("otra.db") is not first
+    assert get_kpi_engine("otra.db").db_path == "otra.db"
@@ -0,0 +1,97 @@
+# sistema_pyme/tests/test_ltv.py
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+import database as db
+from utils.ltv import LTVEngine, cohort_lifetimes, rank_segments, summarize_periods
+
+NOW = 2024 * 12 + 11  # diciembre de 2024
+
+
+def _insert_sales(db_path, rows):
+    with db.get_pool(db_path).writer() as conn:
+        conn.executemany("INSERT INTO sales (date, product, quantity, amount, customer_id) "
+                         "VALUES (?, 'Producto', 1, ?, ?)", rows)
+
+
+def test_rank_segments_never_fails_on_repeated_edges():
+    """Test de segmentos por rango con muchos empates (pd.qcut lanzaría error)"""
+    values = np.array([0.0] * 70 + [10.0] * 20 + [50.0] * 9 + [np.nan, 999.0])
+    with pytest.raises(ValueError):
+        pd.qcut(values, q=4, labels=['Bajo', 'Medio', 'Alto', 'VIP'])
+
+    segments = rank_segments(values)
+
+    assert pd.Series(segments).value_counts().to_dict() == {'Bajo': 25, 'Medio': 25, 'Alto': 25, 'VIP': 25}
+    assert segments[99] is None and segments[100] == 'VIP'
+
+
+def test_calculate_customer_lifetime_value_on_tied_frame():
+    """Test del LTV por columnas sin modificar la entrada"""
+    from utils.analytics import AnalyticsEngine
+
+    customers = pd.DataFrame({
+        'avg_purchase_value': [0.0] * 6 + [100.0, 200.0],
+        'purchase_frequency': [1.0] * 8,
+        'expected_lifetime': [2.0] * 8,
+    })
+    result = AnalyticsEngine().calculate_customer_lifetime_value(customers)
+
+    assert 'ltv' not in customers.columns
+    assert result['ltv'].tolist() == [0.0] * 6 + [200.0, 400.0]
+    assert result['ltv_segment'].tolist() == ['Bajo', 'Bajo', 'Medio', 'Medio', 'Alto', 'Alto', 'VIP', 'VIP']
+    assert result['ltv_segment'].cat.ordered
+
+
+def test_cohort_lifetimes_fill_unobserved_ages_with_pooled_curve():
+    """Test de retención por cohortes con edades aún no observadas"""
+    periods = pd.DataFrame({
+        # Cohorte 0: clientes 1 y 2; el 1 vuelve en las edades 1 y 2
+        # Cohorte 2: cliente 3, observado solo hasta la edad 0
+        'customer_id': [1, 1, 1, 2, 3],
+        'period': [0, 1, 2, 0, 2],
+        'purchases': [1] * 5,
+        'amount': [10.0] * 5,
+    })
+    first = summarize_periods(periods)['first']
+
+    lifetimes = cohort_lifetimes(periods, first, now=2, horizon=3)
+
+    assert lifetimes[0] == pytest.approx(1 + 0.5 + 0.5)
+    # Edades 1 y 2 de la cohorte 2: curva combinada (solo la cohorte 0 llegó a ellas)
+    assert lifetimes[2] == pytest.approx(1 + 0.5 + 0.5)
+
+
+def test_ltv_engine_scores_and_incremental_update(db_path):
+    """Test del LTV desde sales (BG/NBD y cohortes) y de la actualización incremental"""
+    rng = np.random.default_rng(0)
+    rows = []
+    for customer in range(1, 301):
+        start = int(rng.integers(0, 12))
+        # Clientes 1-100 compran cada mes hasta hoy; 101-300 compran dos meses y desaparecen
+        months = range(start, 24) if customer <= 100 else range(start, start + 2)
+        rows += [(f"{2023 + m // 12}-{m % 12 + 1:02d}-15", float(rng.uniform(50, 150)), customer)
+                 for m in months]
+    _insert_sales(db_path, rows)
+
+    engine = LTVEngine(db_path, horizon=12).fit(now=NOW)
+    scores = engine.scores(now=NOW)
+
+    assert len(scores) == 300 and engine.params is not None
+    loyal, lapsed = scores.loc[1:100], scores.loc[101:300]
+    assert loyal['p_alive'].min() > lapsed['p_alive'].max()
+    assert loyal['ltv_bgnbd'].median() > 10 * lapsed['ltv_bgnbd'].median()
+    assert (scores.loc[1:100, 'ltv_segment'] == 'VIP').sum() >= 70
+    assert scores['ltv_cohort'].notna().all()
+
+    _insert_sales(db_path, [("2024-12-20", 80.0, 150), ("2024-12-21", 20.0, 150), ("2024-12-01", 30.0, 5),
+                            ("2024-12-05", 500.0, 301)])
+    updated = engine.update(now=NOW)
+
+    assert sorted(updated.index) == [5, 150, 301]
+    fresh = LTVEngine(db_path, horizon=12).fit(now=NOW)
+    pd.testing.assert_frame_equal(engine.summary, fresh.summary, check_dtype=False)
+    assert engine.update(now=NOW).empty
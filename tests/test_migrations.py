@@ -0,0 +1,96 @@
+# sistema_pyme/tests/test_migrations.py
+import sqlite3
+
+import pytest
+
+import migrations
+
+
+def test_apply_migrations_on_empty_database():
+    """Test de aplicación de todas las migraciones sobre una base vacía"""
+    conn = sqlite3.connect(':memory:')
+    applied = migrations.apply_migrations(conn)
+
+    assert applied == [m.version for m in migrations.MIGRATIONS]
+    assert migrations.get_schema_version(conn) == migrations.latest_version()
+
+    # Volver a aplicar no hace nada
+    assert migrations.apply_migrations(conn) == []
+
+
+def test_apply_migrations_refuses_open_transaction():
+    """Test de que las migraciones no confirman el trabajo pendiente de quien llama"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE notas (texto TEXT)")
+    conn.execute("INSERT INTO notas VALUES ('pendiente')")
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        migrations.apply_migrations(conn)
+    conn.rollback()
+    assert conn.execute("SELECT COUNT(*) FROM notas").fetchone()[0] == 0
+
+
+def test_migration_deduplicates_legacy_permissions():
+    """Test de migración sobre una base existente con permisos duplicados"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''CREATE TABLE permissions
+                    (id INTEGER PRIMARY KEY, role TEXT, module TEXT,
+                     can_view INTEGER, can_edit INTEGER, can_delete INTEGER)''')
+    for _ in range(3):
+        conn.execute("INSERT INTO permissions (role, module, can_view, can_edit, can_delete) "
+                     "VALUES ('admin', 'finance', 1, 1, 1)")
+    conn.commit()
+
+    migrations.apply_migrations(conn)
+
+    assert conn.execute("SELECT COUNT(*) FROM permissions").fetchone()[0] == 1
+    conn.execute("INSERT OR IGNORE INTO permissions (role, module, can_view, can_edit, can_delete) "
+                 "VALUES ('admin', 'finance', 1, 1, 1)")
+    assert conn.execute("SELECT COUNT(*) FROM permissions").fetchone()[0] == 1
+
+
+def test_hot_queries_use_indexes():
+    """Test de que las consultas frecuentes usan índices en vez de recorrer la tabla"""
+    conn = sqlite3.connect(':memory:')
+    migrations.apply_migrations(conn)
+
+    queries = [
+        ("SELECT user_id, expires_at FROM sessions WHERE session_token = ? AND expires_at > ?", ('t', 'x')),
+        ("SELECT can_view FROM permissions WHERE role = ? AND module = ?", ('admin', 'crm')),
+        ("SELECT * FROM notifications WHERE user_id = ? AND read = FALSE ORDER BY created_at DESC", (1,)),
+    ]
+    for query, params in queries:
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+        assert "USING" in plan and "INDEX" in plan, plan
+
+
+def test_legacy_events_move_in_resumable_chunks(monkeypatch):
+    """Test del traslado de eventos antiguos por tramos, retomado tras un corte"""
+    conn = sqlite3.connect(':memory:')
+    migrations.apply_migrations(conn, target=2)
+    conn.executemany("INSERT INTO system_events (event_type, event_data, created_by, created_at) "
+                     "VALUES ('user_login', '{}', ?, '2025-08-20 10:00:00')", [(i,) for i in range(7)])
+    conn.commit()
+
+    chunks = []
+
+    def interrupted(conn, limit):
+        chunks.append(limit)
+        if len(chunks) == 3:
+            raise RuntimeError("corte")
+        return migrations.move_legacy_events(conn, limit)
+
+    legacy = migrations.MIGRATIONS
+    monkeypatch.setattr(migrations, 'MIGRATIONS', [
+        m._replace(backfill=interrupted) if m.version == 3 else m for m in legacy])
+    with pytest.raises(RuntimeError):
+        migrations.apply_migrations(conn, target=3, chunk_rows=2, pause=0)
+    monkeypatch.setattr(migrations, 'MIGRATIONS', legacy)
+    # Los dos tramos confirmados ya no están en la tabla original
+    assert conn.execute("SELECT COUNT(*) FROM system_events").fetchone()[0] == 3
+    assert migrations.get_schema_version(conn) == 2
+
+    assert migrations.apply_migrations(conn, target=3, chunk_rows=2, pause=0) == [3]
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    assert 'system_events' not in tables
+    assert conn.execute("SELECT SUM(row_count) FROM event_partitions").fetchone()[0] == 7
@@ -0,0 +1,81 @@
+# sistema_pyme/tests/test_password_hasher.py
+import threading
+
+import pytest
+
+from password_hasher import (PasswordHasher, HasherSaturatedError, LoginThrottledError,
+                             hash_rounds)
+
+
+@pytest.fixture
+def hasher():
+    """Hasher con coste mínimo en hilos para tests rápidos"""
+    instance = PasswordHasher(rounds=4, max_workers=1, use_processes=False,
+                              max_attempts=2, attempt_window=60)
+    yield instance
+    instance.shutdown()
+
+
+def test_hash_and_verify(hasher):
+    """Test de hash, verificación y detección de coste"""
+    hashed = hasher.hash("secreto")
+
+    assert hasher.verify("secreto", hashed)
+    assert not hasher.verify("otro", hashed)
+    assert hash_rounds(hashed) == 4
+    assert not hasher.needs_rehash(hashed)
+
+    hasher.rounds = 6
+    assert hasher.needs_rehash(hashed)
+
+
+def test_saturated_queue_rejects_immediately(hasher):
+    """Test de rechazo inmediato cuando la cola está llena"""
+    hasher.max_pending = 1
+    hasher._slots = threading.BoundedSemaphore(1)
+    gate = threading.Event()
+    hasher._get_executor().submit(gate.wait)  # ocupa el único worker
+    worker = threading.Thread(target=hasher.hash, args=("a",))
+    worker.start()
+
+    try:
+        with pytest.raises(HasherSaturatedError):
+            hasher.hash("b")
+    finally:
+        gate.set()
+        worker.join()
+    assert hasher.stats()['rejected'] == 1
+
+
+def test_throttle_by_key(hasher):
+    """Test de limitación de intentos fallidos por clave"""
+    keys = ["user:ana", "ip:10.0.0.1"]
+    hasher.register_failure(keys)
+    hasher.check_throttle(keys)
+    hasher.register_failure(keys)
+
+    with pytest.raises(LoginThrottledError):
+        hasher.check_throttle(["ip:10.0.0.1"])
+
+    hasher.reset_attempts(keys)
+    hasher.check_throttle(keys)
+
+
+def test_attempts_are_pruned_and_bounded(hasher, monkeypatch):
+    """Test de que las claves de intentos no crecen sin límite"""
+    clock = [1000.0]
+    monkeypatch.setattr("password_hasher.time.monotonic", lambda: clock[0])
+    hasher.max_tracked_keys = 100
+
+    for i in range(1000):
+        hasher.register_failure([f"user:atacante{i}", "ip:10.0.0.9"])
+    assert hasher.stats()['tracked_keys'] == 100
+    # La clave usada en cada intento sigue registrada y limitada
+    with pytest.raises(LoginThrottledError):
+        hasher.check_throttle(["ip:10.0.0.9"])
+
+    # Pasada la ventana, las claves expiradas desaparecen
+    clock[0] += 61
+    hasher.check_throttle(["ip:10.0.0.9"])
+    hasher.register_failure(["user:nuevo"])
+    assert hasher.stats()['tracked_keys'] == 1
@@ -0,0 +1,97 @@
+# sistema_pyme/tests/test_profiling.py
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from utils.data_processor import DataProcessor
+from utils.profiling import DataProfiler, DistinctCounter, profile_chunks
+
+
+@pytest.fixture
+def sample_df():
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        'monto': rng.normal(100, 15, 5000),
+        'cantidad': rng.integers(1, 10, 5000),
+        'producto': rng.choice(['A', 'B', 'C', None], 5000),
+    })
+    df.loc[::50, 'monto'] = np.nan
+    return pd.concat([df, df.iloc[:100]], ignore_index=True)
+
+
+def test_profile_matches_pandas(sample_df):
+    """Test del perfil en una pasada contra los cálculos de pandas"""
+    profile = DataProcessor().generate_data_profile(sample_df)
+    general = profile['general']
+
+    assert general['total_rows'] == len(sample_df)
+    assert general['missing_values'] == sample_df.isnull().sum().sum()
+    assert general['duplicate_rows'] == sample_df.duplicated().sum()
+
+    monto = profile['columns']['monto']
+    assert monto['missing_values'] == sample_df['monto'].isnull().sum()
+    assert monto['mean'] == pytest.approx(sample_df['monto'].mean())
+    assert monto['std'] == pytest.approx(sample_df['monto'].std())
+    assert monto['min'] == sample_df['monto'].min()
+    assert monto['median'] == pytest.approx(sample_df['monto'].median())
+    assert profile['columns']['producto']['unique_values'] == sample_df['producto'].nunique()
+
+
+def test_chunked_profile_equals_single_pass(sample_df):
+    """Test de perfil por bloques equivalente al de un único bloque"""
+    whole = DataProfiler().update(sample_df).profile()
+    chunks = (sample_df.iloc[i:i + 700] for i in range(0, len(sample_df), 700))
+    chunked = profile_chunks(chunks)
+
+    assert chunked['general'] == whole['general']
+    for col in ('monto', 'cantidad'):
+        for stat in ('mean', 'std', 'min', 'max', 'median', 'unique_values'):
+            assert chunked['columns'][col][stat] == pytest.approx(whole['columns'][col][stat])
+
+
+def test_profilers_merge(sample_df):
+    """Test de combinación de perfiles calculados por separado"""
+    left = DataProfiler().update(sample_df.iloc[:2000])
+    right = DataProfiler().update(sample_df.iloc[2000:])
+    merged = left.merge(right).profile()
+
+    assert merged['general']['total_rows'] == len(sample_df)
+    assert merged['columns']['monto']['mean'] == pytest.approx(sample_df['monto'].mean())
+
+
+def test_distinct_counter_switches_to_hyperloglog():
+    """Test de conteo aproximado de distintos por encima del límite exacto"""
+    counter = DistinctCounter(precision=12, exact_limit=1000)
+    values = pd.Series(np.arange(200_000))
+    for start in range(0, len(values), 50_000):
+        chunk = values.iloc[start:start + 50_000]
+        counter.add_hashes(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+
+    assert not counter.exact
+    assert counter.count() == pytest.approx(200_000, rel=0.05)
+
+
+def test_duplicate_rows_exact_beyond_distinct_limit():
+    """Test de filas duplicadas exactas con más filas únicas que exact_limit"""
+    rng = np.random.default_rng(7)
+    unique = pd.DataFrame({'id': np.arange(30_000), 'valor': rng.random(30_000)})
+    df = pd.concat([unique, unique.iloc[::200]], ignore_index=True)
+
+    profiler = DataProfiler(exact_limit=1000)
+    for start in range(0, len(df), 4000):
+        profiler.update(df.iloc[start:start + 4000])
+    profile = profiler.profile()
+
+    assert profile['columns']['id']['unique_values_exact'] is False
+    assert profile['general']['duplicate_rows'] == df.duplicated().sum() == 150
+    assert DataProfiler(exact_limit=1000).update(unique).profile()['general']['duplicate_rows'] == 0
+
+
+def test_median_is_approximate_beyond_sample():
+    """Test de mediana aproximada con muestra bottom-k"""
+    values = pd.DataFrame({'x': np.arange(100_000, dtype=float)})
+    summary = DataProfiler(sample_size=5000).update(values).profile()['columns']['x']
+
+    assert summary['median_exact'] is False
+    assert summary['median'] == pytest.approx(50_000, rel=0.05)
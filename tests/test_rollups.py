@@ -0,0 +1,142 @@
+# sistema_pyme/tests/test_rollups.py
+import io
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+import database as db
+from utils.ingestion import StreamingImporter
+from utils.rollups import (add_rollup_backfill_chunk, add_sales, backfill_sales_rollups, check_sales_rollups,
+                           daily_sales, monthly_sales, product_sales, start_rollup_backfill)
+
+
+def _random_sales(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    days = pd.Timestamp("2023-11-01") + pd.to_timedelta(rng.integers(0, 150, n), unit="D")
+    return pd.DataFrame({
+        "date": days.strftime("%Y-%m-%d").to_numpy(),
+        "product": rng.choice(["Pan", "Café", "Té", None], n),
+        "quantity": rng.integers(1, 5, n),
+        "amount": rng.uniform(1, 100, n).round(2),
+        "business_id": rng.choice([1, 2], n),
+    })
+
+
+def _insert(db_path, frame, rollups=True):
+    rows = list(frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None))
+    with db.get_pool(db_path).writer() as conn:
+        first = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM sales").fetchone()[0]
+        conn.executemany("INSERT INTO sales (date, product, quantity, amount, business_id) "
+                         "VALUES (?, ?, ?, ?, ?)", rows)
+        if rollups:
+            add_sales(conn, first, first + len(rows) - 1)
+
+
+def test_insert_path_and_triggers_keep_rollups_consistent(db_path):
+    """Test de add_sales y de los triggers de UPDATE/DELETE frente al checker"""
+    _insert(db_path, _random_sales())
+    assert check_sales_rollups(db_path) == {'sales_daily': [], 'sales_monthly_product': []}
+
+    with db.get_pool(db_path).writer() as conn:
+        conn.execute("UPDATE sales SET amount = amount * 2, product = 'Pan' WHERE id % 7 = 0")
+        conn.execute("UPDATE sales SET date = '2024-06-01' WHERE id % 11 = 0")
+        conn.execute("DELETE FROM sales WHERE id % 5 = 0")
+        # Una venta sin fecha válida no entra en los rollups
+        conn.execute("UPDATE sales SET date = 'sin fecha' WHERE id = 1")
+        conn.execute("UPDATE sales SET customer_id = 3")
+    assert check_sales_rollups(db_path) == {'sales_daily': [], 'sales_monthly_product': []}
+
+    with db.get_read_connection(db_path) as conn:
+        empty = conn.execute("SELECT COUNT(*) FROM sales_daily WHERE sales_count = 0").fetchone()[0]
+    assert empty == 0
+
+
+def test_checker_reports_drift_and_backfill_repairs_it(db_path):
+    """Test del checker con una inserción fuera del camino de rollups y del backfill"""
+    _insert(db_path, _random_sales(50))
+    _insert(db_path, pd.DataFrame({"date": ["2024-02-10"], "product": ["Nuevo"], "quantity": [1],
+                                   "amount": [10.0], "business_id": [1]}), rollups=False)
+
+    problems = check_sales_rollups(db_path)
+    assert problems['sales_monthly_product'] == [(1, "2024-02", "Nuevo", None, (10.0, 1.0, 1))]
+    assert len(problems['sales_daily']) == 1
+
+    backfill_sales_rollups(db_path)
+    assert check_sales_rollups(db_path) == {'sales_daily': [], 'sales_monthly_product': []}
+
+
+def test_importer_updates_rollups(db_path):
+    """Test de la importación por bloques manteniendo los rollups"""
+    frame = _random_sales(500).drop(columns="business_id")
+    source = io.BytesIO(frame.to_csv(index=False).encode())
+
+    StreamingImporter(db_path, chunksize=120, batch_size=50).ingest(source, "csv")
+
+    assert check_sales_rollups(db_path) == {'sales_daily': [], 'sales_monthly_product': []}
+    with db.get_read_connection(db_path) as conn:
+        months = monthly_sales(conn, "2023-01", "2025-12")
+    expected = frame.groupby(frame["date"].str[:7])["amount"].sum()
+    np.testing.assert_allclose(months["amount"], expected.to_numpy())
+
+
+def test_range_queries_match_raw_aggregation(db_path):
+    """Test de las consultas por día y por producto contra agregar sales directamente"""
+    frame = _random_sales()
+    _insert(db_path, frame)
+    frame["product"] = frame["product"].fillna("")
+
+    with db.get_read_connection(db_path) as conn:
+        days = daily_sales(conn, "2023-12-10", "2024-01-05", business_id=2)
+        for start, end in [("2023-11-15", "2024-02-20"), ("2023-12-01", "2024-01-31"),
+                           ("2024-01-03", "2024-01-09"), ("2023-11-30", "2023-12-01")]:
+            totals = product_sales(conn, start, end).set_index("product")["amount"]
+            selected = frame[(frame["date"] >= start) & (frame["date"] <= end)]
+            expected = selected.groupby("product")["amount"].sum()
+            pd.testing.assert_series_equal(totals.sort_index(), expected.sort_index(),
+                                           check_names=False, check_dtype=False)
+
+    selected = frame[(frame["date"] >= "2023-12-10") & (frame["date"] <= "2024-01-05") & (frame["business_id"] == 2)]
+    expected = selected.groupby("date")["amount"].sum()
+    assert list(days["day"]) == list(expected.index)
+    np.testing.assert_allclose(days["amount"], expected.to_numpy())
+
+
+def test_sales_report_from_rollups(db_path):
+    """Test del reporte de ventas generado desde los rollups"""
+    pytest.importorskip("jinja2")
+    pytest.importorskip("plotly")
+    from templates.report_templates import ReportTemplateSystem
+
+    frame = _random_sales(300)
+    _insert(db_path, frame)
+    report = ReportTemplateSystem().generate_sales_report_from_db("2023-12-01", "2023-12-31", db_path)
+
+    selected = frame[frame["date"].str.startswith("2023-12")]
+    assert report["success"]
+    assert report["report_data"]["total_ventas"] == pytest.approx(selected["amount"].sum())
+    assert report["report_data"]["venta_promedio"] == pytest.approx(selected["amount"].mean())
+
+
+def test_chunked_backfill_counts_concurrent_writes_once(db_path):
+    """Test del backfill por tramos con ventas modificadas e insertadas entre tramos"""
+    _insert(db_path, _random_sales(300), rollups=False)
+    pool = db.get_pool(db_path)
+    with pool.writer() as conn:
+        start_rollup_backfill(conn)
+
+    step = 0
+    while True:
+        with pool.writer() as conn:
+            if add_rollup_backfill_chunk(conn, 40):
+                break
+        step += 1
+        # Cambios sobre ventas ya sumadas y aún pendientes, y ventas nuevas
+        with pool.writer() as conn:
+            conn.execute("UPDATE sales SET amount = amount + 1 WHERE id % 50 = ?", (step,))
+            conn.execute("DELETE FROM sales WHERE id = ?", (step * 37,))
+        _insert(db_path, _random_sales(5, seed=step))
+
+    assert step > 5
+    assert check_sales_rollups(db_path) == {'sales_daily': [], 'sales_monthly_product': []}
@@ -0,0 +1,69 @@
+# sistema_pyme/tests/test_seasonality.py
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+pytest.importorskip("sklearn")
+
+from utils.analytics import AnalyticsEngine
+from utils.seasonality import acf, seasonality_scan
+
+
+def _direct_acf(values, max_lag):
+    centered = values - values.mean()
+    denominator = np.dot(centered, centered)
+    return np.array([np.dot(centered[:len(centered) - lag], centered[lag:]) / denominator
+                     for lag in range(max_lag + 1)])
+
+
+def test_fft_acf_matches_direct_sum_for_every_row():
+    """Test de la ACF por FFT frente a la suma directa, fila a fila"""
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(5, 97)).cumsum(axis=1)
+
+    result = acf(values, 40)
+
+    assert result.shape == (5, 41)
+    for row in range(5):
+        assert np.allclose(result[row], _direct_acf(values[row], 40))
+
+
+def test_daily_series_with_weekly_and_yearly_cycles():
+    """Test de retardos configurables: ciclo semanal y anual en datos diarios"""
+    rng = np.random.default_rng(1)
+    days = np.arange(3 * 365)
+    weekly = np.where(days % 7 >= 5, 30.0, 0.0)
+    yearly = 40 * np.sin(2 * np.pi * days / 365)
+    catalogue = np.vstack([weekly + yearly + rng.normal(0, 3, len(days)),
+                           rng.normal(0, 3, len(days))])
+
+    scan = seasonality_scan(catalogue, max_lag=400, min_correlation=0.3)
+
+    assert scan["acf"].shape == (2, 401)
+    assert scan["season_length"].tolist() == [7, 1]
+    assert scan["significant"][0, 7]
+    assert scan["acf"][0, 364] > 0.4 and scan["acf"][0, 182] < -0.4
+    assert not scan["significant"][1].any()
+    # Las bandas de Bartlett se ensanchan con la autocorrelación acumulada
+    assert scan["bands"][0, 300] > scan["bands"][0, 1] > 0
+
+
+def test_detect_seasonality_keeps_output_format():
+    """Test del formato de detect_seasonality y de la versión por lotes"""
+    series = pd.Series(np.tile([10.0, 20.0, 30.0, 20.0], 6))
+    engine = AnalyticsEngine()
+
+    result = engine.detect_seasonality(series)
+
+    assert [ac["lag"] for ac in result["autocorrelation"]] == list(range(1, 13))
+    assert result["has_seasonality"]
+    assert 4 in [ac["lag"] for ac in result["significant_lags"]]
+    assert result["season_length"] == 4
+    assert len(result["confidence_bands"]) == 12
+    assert "error" in engine.detect_seasonality(series[:8])
+
+    batch = engine.detect_seasonality_batch(pd.DataFrame([series.to_numpy(), series.to_numpy()[::-1]],
+                                                         index=["A", "B"]))
+    assert batch["season_length"].to_dict() == {"A": 4, "B": 4}
+    assert np.allclose(batch["acf"].loc["A", 1:].to_numpy(),
+                       [ac["correlation"] for ac in result["autocorrelation"]])
@@ -0,0 +1,79 @@
+# sistema_pyme/tests/test_segmentation.py
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+pytest.importorskip("sklearn")
+
+import database as db
+from utils.analytics import AnalyticsEngine
+from utils.segmentation import CustomerSegmenter, segment_and_store
+
+
+def _customers(n=300, seed=0):
+    """Tres grupos bien separados de gasto, frecuencia y recencia"""
+    rng = np.random.default_rng(seed)
+    centers = np.array([[100, 1, 200], [1000, 5, 60], [10000, 20, 10]], dtype=float)
+    group = np.arange(n) % 3
+    values = centers[group] * rng.normal(1, 0.05, (n, 3))
+    frame = pd.DataFrame(values, columns=['total_spent', 'purchase_frequency', 'last_purchase_days'])
+    return frame, group
+
+
+def test_segment_customers_returns_arrays_and_named_segments():
+    """Test de segmentación con arrays compactos en lugar de registros"""
+    customers, group = _customers()
+    customers.loc[5, 'total_spent'] = np.nan
+
+    result = AnalyticsEngine().segment_customers(customers)
+
+    assert result["success"] and result["n_clusters"] == 3
+    assert len(result["labels"]) == len(result["index"]) == 299
+    assert 5 not in result["index"]
+    assert "customers_segmented" not in result
+    expected = np.array(['Básico', 'Regular', 'Premium'], dtype=object)[group[result["index"]]]
+    assert (result["segments"] == expected).all()
+    assert sum(c["size"] for c in result["clusters"].values()) == 299
+    assert "error" in AnalyticsEngine().segment_customers(customers.head(2))
+
+
+def test_model_persists_and_assigns_without_retraining(tmp_path):
+    """Test de persistencia del modelo, asignación O(k) y partial_fit"""
+    customers, group = _customers()
+    path = str(tmp_path / "models" / "segments.joblib")
+    segmenter = CustomerSegmenter(model_path=path).fit(customers)
+    segmenter.save()
+
+    loaded = CustomerSegmenter.load(path)
+    new_customers, new_group = _customers(30, seed=1)
+    labels = loaded.predict(new_customers)
+
+    assert np.array_equal(labels, segmenter.predict(new_customers))
+    assert np.array_equal(loaded.kmeans.predict(loaded.scaler.transform(new_customers.to_numpy())), labels)
+    assert (loaded.segment_names()[labels] == loaded.segment_names()[loaded.predict(customers)][new_group]).all()
+
+    before = loaded.kmeans.cluster_centers_.copy()
+    loaded.partial_fit(new_customers)
+    assert not np.array_equal(before, loaded.kmeans.cluster_centers_)
+    assert CustomerSegmenter.load(str(tmp_path / "missing.joblib")) is None
+
+
+def test_segment_and_store_writes_customers_segment(tmp_path):
+    """Test de escritura masiva en customers.segment"""
+    db_path = str(tmp_path / "segments.db")
+    db.init_db(db_path)
+    customers, group = _customers(30)
+    with db.get_pool(db_path).writer() as conn:
+        conn.executemany("INSERT INTO customers (id, name) VALUES (?, ?)",
+                         [(i + 1, f"Cliente {i}") for i in range(30)])
+    customers.index = np.arange(1, 31)
+
+    segmenter = CustomerSegmenter(model_path=str(tmp_path / "segments.joblib"))
+    segment_and_store(db_path, customers, segmenter)
+
+    with db.get_read_connection(db_path) as conn:
+        stored = dict(tuple(row) for row in conn.execute("SELECT id, segment FROM customers"))
+    db.close_pool(db_path)
+    names = ['Básico', 'Regular', 'Premium']
+    assert stored == {i + 1: names[group[i]] for i in range(30)}
+    assert (tmp_path / "segments.joblib").exists()
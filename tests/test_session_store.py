@@ -0,0 +1,71 @@
+# sistema_pyme/tests/test_session_store.py
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+import migrations
+from session_store import SessionStore
+
+
+@pytest.fixture
+def store():
+    """Fixture de SessionStore sobre una base en memoria migrada"""
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    migrations.apply_migrations(conn)
+    return SessionStore(conn, ttl=timedelta(hours=2), max_sessions_per_user=2,
+                        sweep_batch_size=10, sweep_pause=0)
+
+
+def test_create_and_validate(store):
+    """Test de creación, validación y revocación de sesiones"""
+    token = store.create(7)
+    user_id, _ = store.validate(token)
+
+    assert user_id == 7
+    assert store.revoke(token)
+    assert store.validate(token) is None
+
+
+def test_token_is_unique(store):
+    """Test de índice único sobre session_token"""
+    token = store.create(1)
+    with pytest.raises(sqlite3.IntegrityError):
+        store.conn.execute("INSERT INTO sessions (user_id, session_token, created_at, expires_at) "
+                           "VALUES (2, ?, ?, ?)", (token, datetime.now(), datetime.now()))
+
+
+def test_sliding_expiration(store):
+    """Test de renovación de sesiones con menos de la mitad de vida restante"""
+    token = store.create(1)
+    store.conn.execute("UPDATE sessions SET expires_at = ?", (datetime.now() + timedelta(minutes=10),))
+
+    _, expires_at = store.validate(token)
+
+    assert expires_at - datetime.now() > timedelta(hours=1)
+
+
+def test_per_user_session_cap(store):
+    """Test de límite de sesiones por usuario"""
+    first = store.create(1)
+    store.create(1)
+    store.create(1)
+
+    assert store.validate(first) is None
+    assert store.conn.execute("SELECT COUNT(*) FROM sessions WHERE user_id = 1").fetchone()[0] == 2
+
+
+def test_sweep_expired_in_batches(store):
+    """Test de barrido de sesiones expiradas y métricas"""
+    past = datetime.now() - timedelta(days=1)
+    store.conn.executemany("INSERT INTO sessions (user_id, session_token, created_at, expires_at) "
+                           "VALUES (?, ?, ?, ?)",
+                           [(100 + i, f"old-{i}", past, past) for i in range(25)])
+    store.conn.commit()
+    store.create(1)
+
+    assert store.sweep_expired() == 25
+    metrics = store.get_metrics()
+    assert metrics['active_sessions'] == 1
+    assert metrics['last_sweep_deleted'] == 25
+    assert metrics['sweeps'] == 1
@@ -1,157 +1,223 @@
-# sistema_pyme/utils/analytics.py
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-import warnings
-warnings.filterwarnings('ignore')
-
-class AnalyticsEngine:
-    def __init__(self):
-        self.scaler = StandardScaler()
-    
-    def calculate_financial_ratios(self, financial_data: Dict[str, Any]) -> Dict[str, float]:
-        """Calcular ratios financieros clave"""
-        ratios = {}
-        
-        try:
-            # Ratio de liquidez corriente
-            if 'current_assets' in financial_data and 'current_liabilities' in financial_data:
-                ratios['liquidity_ratio'] = financial_data['current_assets'] / financial_data['current_liabilities']
-            
-            # Margen de beneficio neto
-            if 'net_income' in financial_data and 'revenue' in financial_data and financial_data['revenue'] > 0:
-                ratios['profit_margin'] = (financial_data['net_income'] / financial_data['revenue']) * 100
-            
-            # ROI (Return on Investment)
-            if 'net_income' in financial_data and 'total_assets' in financial_data and financial_data['total_assets'] > 0:
-                ratios['roi'] = (financial_data['net_income'] / financial_data['total_assets']) * 100
-            
-            # Ratio de endeudamiento
-            if 'total_debt' in financial_data and 'total_assets' in financial_data and financial_data['total_assets'] > 0:
-                ratios['debt_ratio'] = financial_data['total_debt'] / financial_data['total_assets']
-            
-            # Rotación de inventario
-            if 'cogs' in financial_data and 'average_inventory' in financial_data and financial_data['average_inventory'] > 0:
-                ratios['inventory_turnover'] = financial_data['cogs'] / financial_data['average_inventory']
-                
-        except ZeroDivisionError:
-            pass
-        
-        return ratios
-    
-    def forecast_sales(self, sales_data: pd.DataFrame, periods: int = 6) -> Dict[str, Any]:
-        """Predecir ventas futuras usando promedio móvil simple"""
-        try:
-            if len(sales_data) < 2:
-                return {"error": "Se necesitan al menos 2 puntos de datos para forecasting"}
-            
-            # Usar promedio móvil simple de 3 periodos
-            sales_series = sales_data['sales']
-            forecast = []
-            
-            for i in range(periods):
-                last_values = sales_series[-3:] if len(sales_series) >= 3 else sales_series
-                next_value = last_values.mean()
-                forecast.append(next_value)
-                sales_series = pd.concat([sales_series, pd.Series([next_value])])
-            
-            return {
-                "forecast": forecast,
-                "method": "moving_average",
-                "periods": periods,
-                "last_actual_value": sales_data['sales'].iloc[-1] if len(sales_data) > 0 else None
-            }
-            
-        except Exception as e:
-            return {"error": f"Error en forecasting: {str(e)}"}
-    
-    def segment_customers(self, customers_data: pd.DataFrame, n_clusters: int = 3) -> Dict[str, Any]:
-        """Segmentar clientes usando K-Means clustering"""
-        try:
-            # Seleccionar características para clustering
-            features = customers_data[['total_spent', 'purchase_frequency', 'last_purchase_days']].copy()
-            features = features.dropna()
-            
-            if len(features) < n_clusters:
-                return {"error": f"Se necesitan al menos {n_clusters} clientes para segmentación"}
-            
-            # Estandarizar características
-            scaled_features = self.scaler.fit_transform(features)
-            
-            # Aplicar K-Means
-            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-            clusters = kmeans.fit_predict(scaled_features)
-            
-            # Añadir clusters al DataFrame original
-            customers_segmented = customers_data.copy()
-            customers_segmented = customers_segmented.loc[features.index]
-            customers_segmented['cluster'] = clusters
-            
-            # Analizar clusters
-            cluster_analysis = {}
-            for cluster_id in range(n_clusters):
-                cluster_data = customers_segmented[customers_segmented['cluster'] == cluster_id]
-                cluster_analysis[cluster_id] = {
-                    "size": len(cluster_data),
-                    "avg_spent": cluster_data['total_spent'].mean(),
-                    "avg_frequency": cluster_data['purchase_frequency'].mean(),
-                    "avg_recency": cluster_data['last_purchase_days'].mean()
-                }
-            
-            return {
-                "success": True,
-                "n_clusters": n_clusters,
-                "clusters": cluster_analysis,
-                "customers_segmented": customers_segmented.to_dict('records')
-            }
-            
-        except Exception as e:
-            return {"error": f"Error en segmentación: {str(e)}"}
-    
-    def detect_seasonality(self, time_series: pd.Series) -> Dict[str, Any]:
-        """Detectar patrones estacionales en series temporales"""
-        try:
-            if len(time_series) < 12:  # Mínimo 12 puntos para análisis estacional
-                return {"error": "Se necesitan al menos 12 puntos de datos"}
-            
-            # Análisis de autocorrelación simple
-            autocorr = []
-            for lag in range(1, 13):  # Lags de 1 a 12 meses
-                if lag < len(time_series):
-                    corr = time_series.autocorr(lag=lag)
-                    autocorr.append({"lag": lag, "correlation": corr})
-            
-            # Encontrar lag con mayor autocorrelación
-            significant_lags = [ac for ac in autocorr if abs(ac['correlation']) > 0.5]
-            
-            return {
-                "autocorrelation": autocorr,
-                "significant_lags": significant_lags,
-                "has_seasonality": len(significant_lags) > 0
-            }
-            
-        except Exception as e:
-            return {"error": f"Error en detección de estacionalidad: {str(e)}"}
-    
-    def calculate_customer_lifetime_value(self, customers_data: pd.DataFrame) -> pd.DataFrame:
-        """Calcular Customer Lifetime Value (LTV)"""
-        try:
-            df = customers_data.copy()
-            
-            # Fórmula simple de LTV: Valor promedio por compra × Frecuencia de compra × Vida útil del cliente
-            df['ltv'] = df['avg_purchase_value'] * df['purchase_frequency'] * df['expected_lifetime']
-            
-            # Clasificar clientes por LTV
-            df['ltv_segment'] = pd.qcut(df['ltv'], q=4, labels=['Bajo', 'Medio', 'Alto', 'VIP'])
-            
-            return df
-            
-        except Exception as e:
-            print(f"Error calculando LTV: {e}")
-            return customers_data
-
-# Instancia global para uso fácil
+# sistema_pyme/utils/analytics.py
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+import warnings
+
+import database as db
+from utils.forecasting import ForecastEngine
+from utils.ltv import SEGMENT_LABELS, LTVEngine, rank_segments, simple_ltv
+from utils.segmentation import FEATURES, CustomerSegmenter
+from utils.seasonality import seasonality_report, seasonality_scan
+
+warnings.filterwarnings('ignore')
+
+class AnalyticsEngine:
+    def __init__(self):
+        self._scaler = None
+        self.forecaster = ForecastEngine()
+
+    @property
+    def scaler(self):
+        """StandardScaler creado al primer uso: importar scikit-learn cuesta más de un segundo"""
+        if self._scaler is None:
+            from sklearn.preprocessing import StandardScaler
+            self._scaler = StandardScaler()
+        return self._scaler
+    
+    def calculate_financial_ratios(self, financial_data: Dict[str, Any]) -> Dict[str, float]:
+        """Calcular ratios financieros clave"""
+        ratios = {}
+        
+        try:
+            # Ratio de liquidez corriente
+            if 'current_assets' in financial_data and 'current_liabilities' in financial_data:
+                ratios['liquidity_ratio'] = financial_data['current_assets'] / financial_data['current_liabilities']
+            
+            # Margen de beneficio neto
+            if 'net_income' in financial_data and 'revenue' in financial_data and financial_data['revenue'] > 0:
+                ratios['profit_margin'] = (financial_data['net_income'] / financial_data['revenue']) * 100
+            
+            # ROI (Return on Investment)
+            if 'net_income' in financial_data and 'total_assets' in financial_data and financial_data['total_assets'] > 0:
+                ratios['roi'] = (financial_data['net_income'] / financial_data['total_assets']) * 100
+            
+            # Ratio de endeudamiento
+            if 'total_debt' in financial_data and 'total_assets' in financial_data and financial_data['total_assets'] > 0:
+                ratios['debt_ratio'] = financial_data['total_debt'] / financial_data['total_assets']
+            
+            # Rotación de inventario
+            if 'cogs' in financial_data and 'average_inventory' in financial_data and financial_data['average_inventory'] > 0:
+                ratios['inventory_turnover'] = financial_data['cogs'] / financial_data['average_inventory']
+                
+        except ZeroDivisionError:
+            pass
+        
+        return ratios
+    
+    def forecast_sales(self, sales_data: pd.DataFrame, periods: int = 6,
+                       method: str = 'moving_average', season_length: Optional[int] = None) -> Dict[str, Any]:
+        """Predecir ventas futuras (promedio móvil por defecto; ver utils.forecasting)"""
+        try:
+            if len(sales_data) < 2:
+                return {"error": "Se necesitan al menos 2 puntos de datos para forecasting"}
+            
+            sales_series = sales_data['sales']
+            if season_length is None and method in ('holt_winters', 'auto'):
+                season_length = self.season_length(sales_series)
+            
+            result = self.forecaster.forecast(sales_series.to_numpy(dtype=np.float64), periods, method=method,
+                                              season_lengths=[season_length or 1])
+            
+            return {
+                "forecast": result["forecast"][0].tolist(),
+                "method": result["method"][0],
+                "periods": periods,
+                "season_length": season_length,
+                "last_actual_value": sales_data['sales'].iloc[-1] if len(sales_data) > 0 else None
+            }
+            
+        except Exception as e:
+            return {"error": f"Error en forecasting: {str(e)}"}
+    
+    def forecast_sales_batch(self, series: pd.DataFrame, periods: int = 6, method: str = 'auto',
+                             season_lengths: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Pronosticar muchas series a la vez (filas = productos, columnas = periodos).
+
+        Los huecos se toman como 0 ventas. Si no se dan season_lengths se
+        detectan con detect_seasonality.
+        """
+        try:
+            values = series.to_numpy(dtype=np.float64, na_value=0.0)
+            if season_lengths is None and method in ('holt_winters', 'auto'):
+                season_lengths = seasonality_scan(values, min_correlation=0.5)["season_length"] \
+                    if values.shape[1] >= 12 else None
+            
+            result = self.forecaster.forecast(values, periods, method=method, season_lengths=season_lengths)
+            
+            return {
+                "forecast": pd.DataFrame(result["forecast"], index=series.index,
+                                         columns=[f"t+{step}" for step in range(1, periods + 1)]),
+                "method": pd.Series(result["method"], index=series.index),
+                "periods": periods
+            }
+            
+        except Exception as e:
+            return {"error": f"Error en forecasting: {str(e)}"}
+    
+    def season_length(self, time_series: pd.Series) -> int:
+        """Periodo estacional según detect_seasonality (1 si no hay estacionalidad)"""
+        return self.detect_seasonality(time_series).get("season_length", 1)
+    
+    def segment_customers(self, customers_data: pd.DataFrame, n_clusters: int = 3,
+                          segmenter: Optional[CustomerSegmenter] = None,
+                          return_records: bool = False) -> Dict[str, Any]:
+        """Segmentar clientes con MiniBatchKMeans (ver utils.segmentation).
+
+        Devuelve las asignaciones como arrays alineados con index; la lista
+        de registros completa solo se construye con return_records=True.
+        Con un segmenter ya entrenado solo se asignan clusters, sin reentrenar.
+        """
+        try:
+            features = customers_data[list(FEATURES)]
+            valid = features.notna().all(axis=1).to_numpy()
+            
+            if valid.sum() < n_clusters:
+                return {"error": f"Se necesitan al menos {n_clusters} clientes para segmentación"}
+            
+            if segmenter is None:
+                segmenter = CustomerSegmenter(n_clusters=n_clusters, model_path=None).fit(features)
+            labels = segmenter.predict(features)[valid]
+            summary = segmenter.summarize(features[valid], labels)
+            
+            # Analizar clusters
+            cluster_analysis = {
+                cluster_id: {
+                    "size": stats["size"],
+                    "avg_spent": stats["total_spent"],
+                    "avg_frequency": stats["purchase_frequency"],
+                    "avg_recency": stats["last_purchase_days"]
+                }
+                for cluster_id, stats in summary.items()
+            }
+            
+            result = {
+                "success": True,
+                "n_clusters": segmenter.n_clusters,
+                "clusters": cluster_analysis,
+                "index": customers_data.index[valid],
+                "labels": labels,
+                "segments": segmenter.segment_names()[labels]
+            }
+            if return_records:
+                result["customers_segmented"] = customers_data[valid].assign(cluster=labels).to_dict('records')
+            return result
+            
+        except Exception as e:
+            return {"error": f"Error en segmentación: {str(e)}"}
+    
+    def detect_seasonality(self, time_series: pd.Series, max_lag: int = 12, min_lag: int = 1,
+                           alpha: float = 0.05, min_correlation: float = 0.5) -> Dict[str, Any]:
+        """Detectar patrones estacionales en series temporales (ACF por FFT, ver utils.seasonality)"""
+        try:
+            if len(time_series) < 12:  # Mínimo 12 puntos para análisis estacional
+                return {"error": "Se necesitan al menos 12 puntos de datos"}
+            
+            # Significativo: fuera de la banda de Bartlett y con |r| > min_correlation
+            return seasonality_report(time_series.to_numpy(dtype=np.float64, na_value=np.nan),
+                                      max_lag=max_lag, min_lag=min_lag, alpha=alpha,
+                                      min_correlation=min_correlation)
+            
+        except Exception as e:
+            return {"error": f"Error en detección de estacionalidad: {str(e)}"}
+    
+    def detect_seasonality_batch(self, series: pd.DataFrame, max_lag: int = 12, min_lag: int = 1,
+                                 alpha: float = 0.05, min_correlation: float = 0.5) -> Dict[str, Any]:
+        """ACF de muchas series a la vez (filas = productos/sucursales, columnas = periodos).
+
+        Para datos diarios, max_lag=400 cubre a la vez el ciclo semanal y el anual.
+        """
+        try:
+            if series.shape[1] < 12:
+                return {"error": "Se necesitan al menos 12 puntos de datos"}
+            
+            scan = seasonality_scan(series.to_numpy(dtype=np.float64, na_value=np.nan), max_lag=max_lag,
+                                    min_lag=min_lag, alpha=alpha, min_correlation=min_correlation)
+            
+            return {
+                "acf": pd.DataFrame(scan["acf"], index=series.index, columns=scan["lags"]),
+                "bands": pd.DataFrame(scan["bands"], index=series.index, columns=scan["lags"]),
+                "significant": pd.DataFrame(scan["significant"], index=series.index, columns=scan["lags"]),
+                "season_length": pd.Series(scan["season_length"], index=series.index),
+                "has_seasonality": pd.Series(scan["significant"].any(axis=1), index=series.index)
+            }
+            
+        except Exception as e:
+            return {"error": f"Error en detección de estacionalidad: {str(e)}"}
+    
+    def calculate_customer_lifetime_value(self, customers_data: pd.DataFrame) -> pd.DataFrame:
+        """Calcular Customer Lifetime Value (LTV)"""
+        try:
+            # Fórmula simple de LTV: Valor promedio por compra × Frecuencia de compra × Vida útil del cliente
+            ltv = simple_ltv(customers_data['avg_purchase_value'].to_numpy(dtype=np.float64, na_value=np.nan),
+                             customers_data['purchase_frequency'].to_numpy(dtype=np.float64, na_value=np.nan),
+                             customers_data['expected_lifetime'].to_numpy(dtype=np.float64, na_value=np.nan))
+            
+            # Clasificar clientes por cuantil de rango (pd.qcut falla con cortes repetidos)
+            segments = pd.Categorical(rank_segments(ltv), categories=list(SEGMENT_LABELS), ordered=True)
+            
+            # Con copy-on-write, assign no copia las columnas existentes
+            return customers_data.assign(ltv=ltv, ltv_segment=segments)
+            
+        except Exception as e:
+            print(f"Error calculando LTV: {e}")
+            return customers_data
+    
+    def calculate_ltv_from_sales(self, db_path: str = db.DEFAULT_DB_PATH, horizon: int = 12,
+                                 margin: float = 1.0) -> pd.DataFrame:
+        """LTV por cliente desde la tabla sales (cohortes y BG/NBD, ver utils.ltv)"""
+        return LTVEngine(db_path, horizon=horizon, margin=margin).fit().scores()
+
+# Instancia global para uso fácil
 analytics_engine = AnalyticsEngine()
\ No newline at end of file
@@ -0,0 +1,322 @@
+# sistema_pyme/utils/anomalies.py
+"""
+Detección de anomalías vectorizada sobre varias columnas a la vez.
+
+Los detectores evalúan todas las columnas numéricas (y, si se indica by,
+cada grupo por separado, p. ej. por producto o negocio) con operaciones
+de columna de pandas/NumPy, sin bucles por fila ni por grupo:
+
+- 'iqr': fuera de [Q1 - k·IQR, Q3 + k·IQR].
+- 'mad': z robusta 0.6745·|x - mediana| / MAD, insensible a los propios
+  valores atípicos (si la MAD es 0 se usa la desviación media absoluta).
+- 'rolling': z respecto a la media y desviación de las window
+  observaciones anteriores, para series temporales con tendencia.
+
+El resultado son máscaras e índices de fila, no listas de valores.
+SalesAnomalyMonitor aplica la z robusta a las ventas nuevas a medida que
+se insertan y publica FINANCIAL_ALERT.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+import database as db
+
+METHODS = ('iqr', 'mad', 'rolling')
+DEFAULT_THRESHOLDS = {'iqr': 1.5, 'mad': 3.5, 'rolling': 3.0}
+
+# 0.6745 = cuantil 0.75 de la normal: hace la MAD comparable a la desviación típica
+_MAD_SCALE = 0.6745
+# Desviación media absoluta -> desviación típica (sqrt(pi/2)) cuando la MAD es 0
+_MEAN_AD_SCALE = 1.2533
+
+GroupKeys = Optional[Union[str, Sequence[str]]]
+
+
+@dataclass
+class AnomalyReport:
+    """Resultado de detect_anomalies: una columna de mask/scores por columna evaluada"""
+    method: str
+    threshold: float
+    mask: pd.DataFrame
+    scores: pd.DataFrame
+    lower: Optional[pd.DataFrame] = None
+    upper: Optional[pd.DataFrame] = None
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.mask.columns)
+
+    def indices(self, column: Optional[str] = None) -> pd.Index:
+        """Índices de las filas anómalas en column (en cualquiera si es None)"""
+        flags = self.mask[column] if column is not None else self.mask.any(axis=1)
+        return self.mask.index[flags.to_numpy()]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Conteos por columna, con el mismo vocabulario que el detector de una columna"""
+        valid = self.scores.notna().sum()
+        counts = self.mask.sum()
+        return {
+            col: {
+                "total_values": int(valid[col]),
+                "anomalies_count": int(counts[col]),
+                "anomalies_percentage": (counts[col] / valid[col]) * 100 if valid[col] else 0.0,
+            }
+            for col in self.columns
+        }
+
+
+def _numeric_columns(df: pd.DataFrame, columns: Optional[Sequence[str]], keys: List[str]) -> List[str]:
+    if columns is not None:
+        return list(columns)
+    return [col for col in df.columns
+            if col not in keys and pd.api.types.is_numeric_dtype(df[col])
+            and not pd.api.types.is_bool_dtype(df[col])]
+
+
+def _group_codes(df: pd.DataFrame, keys: List[str]) -> np.ndarray:
+    """Código de grupo de cada fila (todas en el grupo 0 si no hay claves)"""
+    if not keys:
+        return np.zeros(len(df), dtype=np.intp)
+    return df.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+
+
+def _per_group(values: pd.DataFrame, codes: np.ndarray, stat: str, **kwargs: Any) -> np.ndarray:
+    """Estadístico por grupo repartido a cada fila (matriz filas x columnas)"""
+    grouped = getattr(values.groupby(codes, sort=True), stat)(**kwargs)
+    return grouped.reindex(np.arange(codes.max() + 1 if len(codes) else 0)).to_numpy()[codes]
+
+
+def _iqr(values: pd.DataFrame, codes: np.ndarray, k: float):
+    q1 = _per_group(values, codes, 'quantile', q=0.25)
+    q3 = _per_group(values, codes, 'quantile', q=0.75)
+    iqr = q3 - q1
+    lower, upper = q1 - k * iqr, q3 + k * iqr
+    data = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    outside = (data < lower) | (data > upper)
+    # Puntuación: distancia a la caja Q1-Q3 en unidades de IQR
+    distance = np.maximum(q1 - data, data - q3).clip(min=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(iqr > 0, distance / iqr, np.where(distance > 0, np.inf, 0.0))
+    return np.where(np.isnan(data), np.nan, scores), outside, lower, upper
+
+
+def robust_z_scores(values: pd.DataFrame, codes: np.ndarray) -> np.ndarray:
+    """|z| robusta de cada celda respecto a la mediana y la MAD de su grupo"""
+    data = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    deviation = np.abs(data - _per_group(values, codes, 'median'))
+    deviations = pd.DataFrame(deviation, index=values.index, columns=values.columns)
+    mad = _per_group(deviations, codes, 'median') / _MAD_SCALE
+    mean_ad = _per_group(deviations, codes, 'mean') * _MEAN_AD_SCALE
+    scale = np.where(mad > 0, mad, mean_ad)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = deviation / scale
+    # Escala 0: grupo constante; cualquier desviación es anómala
+    return np.where(scale > 0, scores, np.where(deviation > 0, np.inf, np.where(np.isnan(data), np.nan, 0.0)))
+
+
+def _rolling(values: pd.DataFrame, codes: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+    grouped = values.groupby(codes, sort=False)
+    # Ventana de las observaciones anteriores: la actual no entra en su propia referencia
+    previous = grouped.shift(1)
+    rolling = previous.groupby(codes, sort=False).rolling(window, min_periods=min_periods)
+    mean = rolling.mean().reset_index(level=0, drop=True).reindex(values.index)
+    std = rolling.std().reset_index(level=0, drop=True).reindex(values.index)
+    data = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    mean, std = mean.to_numpy(), std.to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.abs(data - mean) / std
+    return np.where(std > 0, scores, np.where(np.isnan(std) | (data == mean), np.nan, np.inf))
+
+
+def detect_anomalies(df: pd.DataFrame, columns: Optional[Sequence[str]] = None,
+                     method: str = 'iqr', by: GroupKeys = None, threshold: Optional[float] = None,
+                     window: int = 30, min_periods: Optional[int] = None,
+                     order_by: Optional[str] = None) -> AnomalyReport:
+    """Detectar anomalías en todas las columnas numéricas en una pasada.
+
+    by agrupa las filas (cada grupo tiene sus propios límites) y order_by
+    ordena la serie temporal para 'rolling' (si no, se usa el orden de df).
+    threshold es k para 'iqr' y el |z| mínimo para 'mad' y 'rolling'.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Método desconocido: {method} (use {', '.join(METHODS)})")
+    keys = [by] if isinstance(by, str) else list(by or [])
+    cols = _numeric_columns(df, columns, keys)
+    threshold = DEFAULT_THRESHOLDS[method] if threshold is None else threshold
+
+    frame = df.sort_values(order_by, kind='stable') if order_by else df
+    values = frame[cols].astype(np.float64)
+    codes = _group_codes(frame, keys)
+    lower = upper = None
+
+    if method == 'iqr':
+        scores, mask, low, up = _iqr(values, codes, threshold)
+        lower = pd.DataFrame(low, index=frame.index, columns=cols).reindex(df.index)
+        upper = pd.DataFrame(up, index=frame.index, columns=cols).reindex(df.index)
+    elif method == 'mad':
+        scores = robust_z_scores(values, codes)
+        mask = scores > threshold
+    else:
+        scores = _rolling(values, codes, window, min_periods or max(3, window // 2))
+        mask = scores > threshold
+
+    return AnomalyReport(
+        method=method,
+        threshold=threshold,
+        mask=pd.DataFrame(mask, index=frame.index, columns=cols).reindex(df.index),
+        scores=pd.DataFrame(scores, index=frame.index, columns=cols).reindex(df.index),
+        lower=lower,
+        upper=upper,
+    )
+
+
+class SalesAnomalyMonitor:
+    """Vigilancia incremental de las ventas nuevas con la z robusta por grupo.
+
+    Cada check() lee solo las filas de sales con id mayor que la última vista
+    y las compara con la referencia (las últimas history_size ventas de su
+    grupo). Las anómalas se publican como FINANCIAL_ALERT. start() repite
+    check() en un hilo cada interval segundos.
+    """
+
+    def __init__(self, db_path: str = db.DEFAULT_DB_PATH, event_system: Any = None,
+                 by: str = 'product', column: str = 'amount', threshold: float = 3.5,
+                 history_size: int = 200, min_history: int = 10, batch_size: int = 50_000,
+                 max_alerts: int = 20):
+        self.db_path = db_path
+        self.event_system = event_system
+        self.by = by
+        self.column = column
+        self.threshold = threshold
+        self.history_size = history_size
+        self.min_history = min_history
+        self.batch_size = batch_size
+        self.max_alerts = max_alerts
+
+        self.last_id: Optional[int] = None
+        self._history = pd.DataFrame({by: pd.Series(dtype=object), column: pd.Series(dtype=np.float64)})
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _query(self, where: str, params: tuple) -> pd.DataFrame:
+        with db.get_read_connection(self.db_path) as conn:
+            rows = conn.execute(f"SELECT id, {self.by}, {self.column} FROM sales {where}", params).fetchall()
+        return pd.DataFrame([tuple(row) for row in rows], columns=['id', self.by, self.column])
+
+    def prime(self) -> None:
+        """Cargar la referencia con las ventas ya existentes; solo se vigilan las posteriores"""
+        with self._lock:
+            with db.get_read_connection(self.db_path) as conn:
+                self.last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM sales").fetchone()[0]
+            # Últimas history_size ventas de cada grupo, en una sola consulta
+            with db.get_read_connection(self.db_path) as conn:
+                rows = conn.execute(
+                    f"SELECT {self.by}, {self.column} FROM "
+                    f"(SELECT id, {self.by}, {self.column}, ROW_NUMBER() OVER "
+                    f"(PARTITION BY {self.by} ORDER BY id DESC) AS position FROM sales) "
+                    f"WHERE position <= ? ORDER BY id", (self.history_size,)
+                ).fetchall()
+            self._remember(pd.DataFrame([tuple(row) for row in rows], columns=[self.by, self.column]))
+
+    def _remember(self, rows: pd.DataFrame) -> None:
+        history = pd.concat([self._history, rows[[self.by, self.column]]], ignore_index=True)
+        self._history = history.groupby(self.by, sort=False, dropna=False).tail(self.history_size) \
+            .reset_index(drop=True)
+
+    def score(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """Añadir a rows la mediana de referencia y la |z| robusta (NaN si falta historia)"""
+        history = self._history.groupby(self.by, sort=False, dropna=False)[self.column]
+        median = history.median()
+        mad = (self._history[self.column] - self._history[self.by].map(median)).abs() \
+            .groupby(self._history[self.by], sort=False, dropna=False).median() / _MAD_SCALE
+        counts = history.count()
+
+        expected = rows[self.by].map(median).astype(np.float64)
+        scale = rows[self.by].map(mad).astype(np.float64)
+        enough = rows[self.by].map(counts).fillna(0).to_numpy() >= self.min_history
+        deviation = (rows[self.column].astype(np.float64) - expected).abs()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(scale > 0, deviation / scale, np.where(deviation > 0, np.inf, 0.0))
+        return rows.assign(expected=expected, score=np.where(enough, scores, np.nan))
+
+    def check(self) -> List[Dict[str, Any]]:
+        """Evaluar las ventas insertadas desde la última llamada y publicar las alertas"""
+        if self.last_id is None:
+            self.prime()
+            return []
+        with self._lock:
+            alerts: List[Dict[str, Any]] = []
+            while True:
+                rows = self._query("WHERE id > ? ORDER BY id LIMIT ?", (self.last_id, self.batch_size))
+                if rows.empty:
+                    break
+                scored = self.score(rows)
+                anomalous = scored[scored['score'] > self.threshold]
+                alerts.extend(
+                    {
+                        'type': 'sales_anomaly',
+                        'message': (f"Venta {sale_id} de {group}: {amount:,.2f} "
+                                    f"(habitual {expected:,.2f}, z robusta {score:.1f})"),
+                        'sale_id': int(sale_id),
+                        self.by: group,
+                        self.column: float(amount),
+                        'expected': float(expected),
+                        'score': float(score),
+                    }
+                    for sale_id, group, amount, expected, score in anomalous[
+                        ['id', self.by, self.column, 'expected', 'score']].itertuples(index=False)
+                )
+                self._remember(rows)
+                self.last_id = int(rows['id'].iloc[-1])
+                if len(rows) < self.batch_size:
+                    break
+
+        self._publish(alerts)
+        return alerts
+
+    def _publish(self, alerts: List[Dict[str, Any]]) -> None:
+        if self.event_system is None or not alerts:
+            return
+        from event_system import EventTypes
+
+        for alert in alerts[:self.max_alerts]:
+            self.event_system.publish(EventTypes.FINANCIAL_ALERT, alert)
+        if len(alerts) > self.max_alerts:
+            # Una importación masiva no debe inundar el bus: el resto va resumido
+            self.event_system.publish(EventTypes.FINANCIAL_ALERT, {
+                'type': 'sales_anomaly_summary',
+                'message': f"{len(alerts) - self.max_alerts} ventas anómalas más sin detallar",
+                'count': len(alerts),
+            })
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 60.0) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,),
+                                        name="sales-anomaly-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Error vigilando anomalías de ventas: {e}")
+            if self._stop.wait(interval):
+                break
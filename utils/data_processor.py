@@ -1,162 +1,228 @@
-# sistema_pyme/utils/data_processor.py
-import pandas as pd
-import numpy as np
-from datetime import datetime
-import json
-from typing import Dict, List, Any, Optional
-import re
-
-class DataProcessor:
-    def __init__(self):
-        self.supported_formats = ['csv', 'xlsx', 'xls', 'json']
-    
-    def detect_file_type(self, file_path: str) -> str:
-        """Detectar el tipo de archivo basado en la extensión"""
-        if file_path.endswith('.csv'):
-            return 'csv'
-        elif file_path.endswith('.xlsx'):
-            return 'xlsx'
-        elif file_path.endswith('.xls'):
-            return 'xls'
-        elif file_path.endswith('.json'):
-            return 'json'
-        else:
-            raise ValueError(f"Formato no soportado: {file_path}")
-    
-    def read_file(self, file_path: str, **kwargs) -> pd.DataFrame:
-        """Leer archivo según su formato"""
-        file_type = self.detect_file_type(file_path)
-        
-        try:
-            if file_type == 'csv':
-                return pd.read_csv(file_path, **kwargs)
-            elif file_type in ['xlsx', 'xls']:
-                return pd.read_excel(file_path, **kwargs)
-            elif file_type == 'json':
-                return pd.read_json(file_path, **kwargs)
-        except Exception as e:
-            raise ValueError(f"Error leyendo archivo {file_path}: {str(e)}")
-    
-    def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Limpiar y preprocesar datos"""
-        # Hacer una copia para no modificar el original
-        df_clean = df.copy()
-        
-        # Eliminar filas completamente vacías
-        df_clean = df_clean.dropna(how='all')
-        
-        # Eliminar duplicados
-        df_clean = df_clean.drop_duplicates()
-        
-        # Limpiar nombres de columnas
-        df_clean.columns = [self.clean_column_name(col) for col in df_clean.columns]
-        
-        # Inferir tipos de datos
-        df_clean = self.infer_data_types(df_clean)
-        
-        return df_clean
-    
-    def clean_column_name(self, column_name: str) -> str:
-        """Limpiar nombre de columna"""
-        if pd.isna(column_name):
-            return 'unknown_column'
-        
-        # Convertir a string si no lo es
-        col_str = str(column_name)
-        
-        # Reemplazar caracteres especiales y espacios
-        col_clean = re.sub(r'[^\w]', '_', col_str.lower().strip())
-        
-        # Reemplazar múltiples underscores por uno solo
-        col_clean = re.sub(r'_+', '_', col_clean)
-        
-        # Eliminar underscores al inicio y final
-        col_clean = col_clean.strip('_')
-        
-        return col_clean if col_clean else 'unknown_column'
-    
-    def infer_data_types(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Inferir tipos de datos automáticamente"""
-        for col in df.columns:
-            # Intentar convertir a numérico
-            try:
-                df[col] = pd.to_numeric(df[col], errors='ignore')
-            except:
-                pass
-            
-            # Intentar convertir a fecha
-            try:
-                df[col] = pd.to_datetime(df[col], errors='ignore')
-            except:
-                pass
-        
-        return df
-    
-    def detect_anomalies(self, df: pd.DataFrame, column: str) -> Dict[str, Any]:
-        """Detectar anomalías en una columna numérica"""
-        if not pd.api.types.is_numeric_dtype(df[column]):
-            return {"error": "La columna debe ser numérica"}
-        
-        values = df[column].dropna()
-        
-        if len(values) == 0:
-            return {"error": "No hay datos válidos en la columna"}
-        
-        Q1 = values.quantile(0.25)
-        Q3 = values.quantile(0.75)
-        IQR = Q3 - Q1
-        
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        anomalies = values[(values < lower_bound) | (values > upper_bound)]
-        
-        return {
-            "total_values": len(values),
-            "anomalies_count": len(anomalies),
-            "anomalies_percentage": (len(anomalies) / len(values)) * 100,
-            "lower_bound": lower_bound,
-            "upper_bound": upper_bound,
-            "anomalies": anomalies.tolist()
-        }
-    
-    def generate_data_profile(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Generar perfil completo de los datos"""
-        profile = {
-            "general": {
-                "total_rows": len(df),
-                "total_columns": len(df.columns),
-                "missing_values": df.isnull().sum().sum(),
-                "missing_percentage": (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100,
-                "duplicate_rows": df.duplicated().sum()
-            },
-            "columns": {},
-            "data_types": {}
-        }
-        
-        # Información por columna
-        for col in df.columns:
-            profile["columns"][col] = {
-                "data_type": str(df[col].dtype),
-                "missing_values": df[col].isnull().sum(),
-                "missing_percentage": (df[col].isnull().sum() / len(df)) * 100,
-                "unique_values": df[col].nunique() if df[col].dtype == 'object' else None,
-            }
-            
-            if pd.api.types.is_numeric_dtype(df[col]):
-                profile["columns"][col].update({
-                    "min": df[col].min(),
-                    "max": df[col].max(),
-                    "mean": df[col].mean(),
-                    "median": df[col].median(),
-                    "std": df[col].std()
-                })
-        
-        # Distribución de tipos de datos
-        dtype_counts = df.dtypes.value_counts().to_dict()
-        profile["data_types"] = {str(k): int(v) for k, v in dtype_counts.items()}
-        
-        return profile
-
-# Instancia global para uso fácil
+# sistema_pyme/utils/data_processor.py
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import json
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Union
+import re
+
+from utils.anomalies import AnomalyReport, detect_anomalies
+from utils.dedup import RowDeduplicator, row_hashes
+from utils.ingestion import iter_chunks
+from utils.profiling import DataProfiler, profile_chunks
+
+# Formatos de fecha que se prueban (en orden) sobre la muestra de cada columna
+DATE_FORMATS = [
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%d/%m/%Y', '%d/%m/%Y %H:%M',
+    '%d-%m-%Y', '%m/%d/%Y', '%Y/%m/%d', '%d.%m.%Y',
+]
+
+class DataProcessor:
+    def __init__(self):
+        self.supported_formats = ['csv', 'xlsx', 'xls', 'json']
+        self.last_type_report: Dict[str, Any] = {}
+    
+    def detect_file_type(self, file_path: str) -> str:
+        """Detectar el tipo de archivo basado en la extensión"""
+        if file_path.endswith('.csv'):
+            return 'csv'
+        elif file_path.endswith('.xlsx'):
+            return 'xlsx'
+        elif file_path.endswith('.xls'):
+            return 'xls'
+        elif file_path.endswith('.json'):
+            return 'json'
+        else:
+            raise ValueError(f"Formato no soportado: {file_path}")
+    
+    def read_file(self, file_path: str, chunksize: Optional[int] = None,
+                  **kwargs) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+        """Leer archivo según su formato.
+
+        Con chunksize, los CSV/Excel se devuelven como iterador de bloques
+        (ver utils.ingestion.iter_chunks) en lugar de cargarse completos.
+        """
+        file_type = self.detect_file_type(file_path)
+        
+        try:
+            if chunksize is not None and file_type in ['csv', 'xlsx', 'xls']:
+                return iter_chunks(file_path, file_type, chunksize=chunksize, **kwargs)
+            if file_type == 'csv':
+                return pd.read_csv(file_path, **kwargs)
+            elif file_type in ['xlsx', 'xls']:
+                return pd.read_excel(file_path, **kwargs)
+            elif file_type == 'json':
+                return pd.read_json(file_path, **kwargs)
+        except Exception as e:
+            raise ValueError(f"Error leyendo archivo {file_path}: {str(e)}")
+    
+    def clean_data(self, df: pd.DataFrame,
+                   deduplicator: Optional[RowDeduplicator] = None) -> pd.DataFrame:
+        """Limpiar y preprocesar datos.
+
+        Filas vacías y duplicadas se eliminan con una sola máscara (una copia
+        como mucho, ninguna si no sobra nada). Los duplicados se detectan por
+        hash de fila; pasando el mismo deduplicator a varios bloques de un
+        archivo se eliminan también los repetidos entre bloques.
+        """
+        if deduplicator is None:
+            deduplicator = RowDeduplicator()
+
+        # Eliminar filas completamente vacías y duplicadas
+        keep = df.notna().any(axis=1).to_numpy(copy=True)
+        keep[keep] = deduplicator.mask_new(row_hashes(df[keep] if not keep.all() else df))
+        
+        # Sin filas que quitar basta una copia superficial (no se copian los datos)
+        df_clean = df.copy(deep=False) if keep.all() else df[keep].copy(deep=False)
+        
+        # Limpiar nombres de columnas
+        df_clean.columns = [self.clean_column_name(col) for col in df_clean.columns]
+        
+        # Inferir tipos de datos
+        df_clean = self.infer_data_types(df_clean)
+        
+        return df_clean
+
+    def clean_chunks(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Limpiar un archivo por bloques, deduplicando entre todos sus bloques"""
+        deduplicator = RowDeduplicator()
+        for chunk in chunks:
+            yield self.clean_data(chunk, deduplicator)
+    
+    def clean_column_name(self, column_name: str) -> str:
+        """Limpiar nombre de columna"""
+        if pd.isna(column_name):
+            return 'unknown_column'
+        
+        # Convertir a string si no lo es
+        col_str = str(column_name)
+        
+        # Reemplazar caracteres especiales y espacios
+        col_clean = re.sub(r'[^\w]', '_', col_str.lower().strip())
+        
+        # Reemplazar múltiples underscores por uno solo
+        col_clean = re.sub(r'_+', '_', col_clean)
+        
+        # Eliminar underscores al inicio y final
+        col_clean = col_clean.strip('_')
+        
+        return col_clean if col_clean else 'unknown_column'
+    
+    def infer_data_types(self, df: pd.DataFrame, sample_size: int = 1000,
+                         category_threshold: float = 0.5) -> pd.DataFrame:
+        """Inferir tipos de datos automáticamente.
+
+        Cada columna de texto se clasifica primero sobre una muestra
+        (numérica, fecha con un formato explícito, categoría o texto) y solo
+        entonces se convierte la columna completa; si la conversión completa
+        produce nulos nuevos se descarta. Los numéricos se reducen al dtype
+        más pequeño sin pérdida. El detalle queda en last_type_report.
+        """
+        memory_before = int(df.memory_usage(deep=True).sum())
+        conversions: Dict[str, str] = {}
+
+        for col in df.columns:
+            series = df[col]
+            converted = None
+
+            if pd.api.types.is_bool_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+                continue
+            if pd.api.types.is_numeric_dtype(series):
+                converted = self._downcast(series)
+            elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+                converted = self._convert_text_column(series, sample_size, category_threshold)
+
+            if converted is not None and converted.dtype != series.dtype:
+                df[col] = converted
+                conversions[str(col)] = f"{series.dtype} -> {converted.dtype}"
+
+        memory_after = int(df.memory_usage(deep=True).sum())
+        self.last_type_report = {
+            'conversions': conversions,
+            'memory_before': memory_before,
+            'memory_after': memory_after,
+            'memory_saved_percentage': (1 - memory_after / memory_before) * 100 if memory_before else 0.0,
+        }
+        return df
+
+    def _downcast(self, series: pd.Series) -> pd.Series:
+        """Reducir un numérico al dtype más pequeño que conserve los valores"""
+        if pd.api.types.is_integer_dtype(series):
+            return pd.to_numeric(series, downcast='integer')
+        if pd.api.types.is_float_dtype(series):
+            as_float32 = series.astype('float32')
+            # Solo si float32 representa exactamente todos los valores (NaN incluidos)
+            if ((as_float32.astype('float64') == series) | series.isna()).all():
+                return as_float32
+        return series
+
+    def _convert_text_column(self, series: pd.Series, sample_size: int,
+                             category_threshold: float) -> Optional[pd.Series]:
+        """Clasificar una columna de texto con una muestra y convertirla entera"""
+        non_null = series.dropna()
+        if non_null.empty:
+            return None
+        sample = non_null.sample(min(sample_size, len(non_null)), random_state=0).astype(str).str.strip()
+        original_nulls = int(series.isna().sum())
+
+        # Numérica
+        if pd.to_numeric(sample, errors='coerce').notna().all():
+            converted = pd.to_numeric(series, errors='coerce')
+            if int(converted.isna().sum()) == original_nulls:
+                return self._downcast(converted)
+
+        # Fecha, con el primer formato explícito que parsee toda la muestra
+        for date_format in DATE_FORMATS:
+            if pd.to_datetime(sample, format=date_format, errors='coerce').notna().all():
+                converted = pd.to_datetime(series, format=date_format, errors='coerce')
+                if int(converted.isna().sum()) == original_nulls:
+                    return converted
+                break
+
+        # Categoría si hay pocos valores distintos
+        if sample.nunique() / len(sample) <= category_threshold and \
+                non_null.nunique() / len(non_null) <= category_threshold:
+            return series.astype('category')
+        return None
+    
+    def detect_anomalies(self, df: pd.DataFrame, column: str) -> Dict[str, Any]:
+        """Detectar anomalías en una columna numérica (regla IQR)"""
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            return {"error": "La columna debe ser numérica"}
+        
+        values = df[column].dropna()
+        
+        if len(values) == 0:
+            return {"error": "No hay datos válidos en la columna"}
+        
+        report = detect_anomalies(values.to_frame(), method='iqr')
+        indices = report.indices(column)
+        
+        return {
+            **report.summary()[column],
+            "lower_bound": float(report.lower[column].iloc[0]),
+            "upper_bound": float(report.upper[column].iloc[0]),
+            "indices": indices,
+            "anomalies": values.loc[indices].tolist()
+        }
+    
+    def detect_anomalies_batch(self, df: pd.DataFrame, columns: Optional[List[str]] = None,
+                               method: str = 'iqr', by: Optional[Union[str, List[str]]] = None,
+                               **kwargs) -> AnomalyReport:
+        """Anomalías de todas las columnas numéricas (y por grupo) en una pasada.
+
+        Devuelve máscaras e índices de fila en lugar de listas de valores;
+        ver utils.anomalies.detect_anomalies para los métodos disponibles.
+        """
+        return detect_anomalies(df, columns=columns, method=method, by=by, **kwargs)
+    
+    def generate_data_profile(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Generar perfil completo de los datos (una sola pasada, ver utils.profiling)"""
+        return DataProfiler().update(df).profile()
+
+    def profile_file(self, file_path: str, chunksize: int = 100_000, **kwargs) -> Dict[str, Any]:
+        """Perfilar un CSV/Excel por bloques, sin cargarlo entero en memoria"""
+        return profile_chunks(self.read_file(file_path, chunksize=chunksize, **kwargs))
+
+# Instancia global para uso fácil
 data_processor = DataProcessor()
\ No newline at end of file
@@ -0,0 +1,135 @@
+# sistema_pyme/utils/dedup.py
+"""
+Deduplicación por hash de fila, válida entre bloques y entre importaciones.
+
+- RowDeduplicator: semántica de conjunto (como drop_duplicates) a lo largo
+  de todos los bloques de un archivo; guarda 8 bytes por fila distinta.
+- OccurrenceCounter: numera cada repetición de una fila dentro del archivo
+  y la mezcla en el hash, de modo que dos filas idénticas legítimas en una
+  exportación se conservan pero volver a subir la misma exportación no
+  inserta nada (semántica de multiconjunto).
+- ImportedRowHashes: hashes ya importados por tabla, en import_row_hashes,
+  cada uno con el id de su fila. Borrar la fila o editar una columna
+  importada borra el hash (triggers de la migración 10), así que volver a
+  importarla la inserta de nuevo.
+"""
+import sqlite3
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+_HASH_KEY = 'sistema_pyme_row'
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_QUERY_BATCH = 500
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Hash uint64 de cada fila (independiente del índice)"""
+    if len(df.columns) == 0:
+        return np.zeros(len(df), dtype=np.uint64)
+    return pd.util.hash_pandas_object(df, index=False, hash_key=_HASH_KEY).to_numpy(dtype=np.uint64)
+
+
+def _sorted_member(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """values[i] está en sorted_values (búsqueda binaria vectorizada)"""
+    if len(sorted_values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(sorted_values, values).clip(max=len(sorted_values) - 1)
+    return sorted_values[positions] == values
+
+
+def _merge_sorted(sorted_values: np.ndarray, new_values: np.ndarray) -> np.ndarray:
+    """Insertar new_values (sin repetidos ni presentes) en sorted_values.
+
+    np.union1d vuelve a ordenar y deduplicar todo lo acumulado en cada
+    bloque; aquí solo se ordenan los nuevos y se intercalan.
+    """
+    new_values = np.sort(new_values)
+    return np.insert(sorted_values, np.searchsorted(sorted_values, new_values), new_values)
+
+
+class RowDeduplicator:
+    """Filas nuevas de cada bloque: ni repetidas en el bloque ni vistas antes"""
+
+    def __init__(self):
+        self._seen = np.empty(0, dtype=np.uint64)
+
+    def mask_new(self, hashes: np.ndarray) -> np.ndarray:
+        mask = ~pd.Series(hashes).duplicated().to_numpy()
+        mask &= ~_sorted_member(self._seen, hashes)
+        self._seen = _merge_sorted(self._seen, hashes[mask])
+        return mask
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class OccurrenceCounter:
+    """Mezcla en cada hash el número de repetición de la fila en el archivo"""
+
+    def __init__(self):
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._counts = np.empty(0, dtype=np.int64)
+
+    def salt(self, hashes: np.ndarray) -> np.ndarray:
+        series = pd.Series(hashes)
+        occurrence = series.groupby(series, sort=False).cumcount().to_numpy(dtype=np.int64, copy=True)
+
+        # Sumar las repeticiones ya vistas en bloques anteriores
+        if len(self._hashes):
+            positions = np.searchsorted(self._hashes, hashes).clip(max=len(self._hashes) - 1)
+            known = self._hashes[positions] == hashes
+            occurrence[known] += self._counts[positions[known]]
+
+        unique, counts = np.unique(hashes, return_counts=True)
+        known_unique = _sorted_member(self._hashes, unique)
+        self._counts[np.searchsorted(self._hashes, unique[known_unique])] += counts[known_unique]
+        positions = np.searchsorted(self._hashes, unique[~known_unique])
+        self._hashes = np.insert(self._hashes, positions, unique[~known_unique])
+        self._counts = np.insert(self._counts, positions, counts[~known_unique])
+
+        # La primera aparición conserva el hash original
+        with np.errstate(over='ignore'):
+            salted = hashes ^ (occurrence.astype(np.uint64) * _GOLDEN)
+        return salted
+
+
+def to_sql_ints(hashes: np.ndarray) -> list:
+    """uint64 -> enteros con signo de 64 bits para columnas INTEGER de SQLite"""
+    return hashes.view(np.int64).tolist()
+
+
+class ImportedRowHashes:
+    """Hashes de las filas importadas en cada tabla (tabla import_row_hashes)"""
+
+    @staticmethod
+    def existing(conn: sqlite3.Connection, table: str, hashes: np.ndarray) -> np.ndarray:
+        """Máscara de los hashes que ya figuran como importados en table"""
+        values = to_sql_ints(hashes)
+        ordered = sorted(values)
+        found = set()
+        for start in range(0, len(ordered), _QUERY_BATCH):
+            batch = ordered[start:start + _QUERY_BATCH]
+            rows = conn.execute(
+                f"SELECT row_hash FROM import_row_hashes WHERE table_name = ? "
+                f"AND row_hash IN ({', '.join('?' for _ in batch)})", (table, *batch)
+            ).fetchall()
+            found.update(row[0] for row in rows)
+        return np.fromiter((value in found for value in values), dtype=bool, count=len(values))
+
+    @staticmethod
+    def add(conn: sqlite3.Connection, table: str, hashes: np.ndarray, row_ids: Sequence[int]) -> None:
+        """Registrar hashes[i] como la fila row_ids[i] de table"""
+        values = hashes.view(np.int64)
+        order = np.argsort(values)
+        # Insertar en orden de clave: las páginas del índice se recorren una vez
+        conn.executemany(
+            "INSERT OR IGNORE INTO import_row_hashes (table_name, row_hash, row_id) VALUES (?, ?, ?)",
+            ((table, value, row_id) for value, row_id in
+             zip(values[order].tolist(), np.asarray(row_ids, dtype=np.int64)[order].tolist())))
+
+    @staticmethod
+    def remove(conn: sqlite3.Connection, table: str, hashes: Iterable[int]) -> None:
+        conn.executemany("DELETE FROM import_row_hashes WHERE table_name = ? AND row_hash = ?",
+                         ((table, value) for value in hashes))
@@ -0,0 +1,229 @@
+# sistema_pyme/utils/forecasting.py
+"""
+Pronóstico de muchas series a la vez con arrays de NumPy.
+
+Las series llegan como una matriz (series x periodos) y cada paso de las
+recursiones se aplica a todas las filas de una vez: el coste en Python es
+proporcional al número de periodos, no al de productos.
+
+- moving_average: media de las últimas window observaciones, alimentándose
+  de sus propios pronósticos (como el cálculo original de forecast_sales).
+- ses / holt / holt_winters: suavizado exponencial simple, con tendencia
+  y con estacionalidad aditiva. Los parámetros se ajustan por búsqueda en
+  rejilla minimizando el error a un paso, evaluando todas las
+  combinaciones de la rejilla en la misma pasada.
+
+Los modelos ajustados se guardan en una caché LRU indexada por la huella
+de la serie (hash de sus valores) y el modelo, así que volver a pronosticar
+el mismo catálogo sin datos nuevos no reajusta nada.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+METHODS = ('moving_average', 'ses', 'holt', 'holt_winters', 'auto')
+
+ALPHAS = (0.1, 0.3, 0.5, 0.8)
+BETAS = (0.05, 0.2, 0.4)
+GAMMAS = (0.1, 0.3, 0.6)
+
+
+def moving_average_forecast(values: np.ndarray, periods: int, window: int = 3) -> np.ndarray:
+    """Media móvil recursiva de cada fila de values (series x periodos).
+
+    Con menos de window observaciones se promedian las que haya, como el
+    cálculo original: la ventana se rellena con NaN y se usa nanmean.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    width = min(window, values.shape[1])
+    buffer = np.full((values.shape[0], window + periods), np.nan)
+    buffer[:, window - width:window] = values[:, values.shape[1] - width:]
+    for step in range(periods):
+        buffer[:, window + step] = np.nanmean(buffer[:, step:window + step], axis=1)
+    return buffer[:, window:]
+
+
+@dataclass
+class FittedModel:
+    """Estado final de un modelo de suavizado ajustado a una serie"""
+    method: str
+    season_length: int
+    alpha: float
+    beta: float
+    gamma: float
+    level: float
+    trend: float
+    season: np.ndarray   # componente estacional por posición t % season_length
+    n_obs: int
+    sse: float
+
+    def forecast(self, periods: int) -> np.ndarray:
+        steps = np.arange(1, periods + 1)
+        positions = (self.n_obs + steps - 1) % self.season_length
+        return self.level + steps * self.trend + self.season[positions]
+
+
+def _initial_state(y: np.ndarray, m: int, with_trend: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """Nivel, tendencia y estacionalidad iniciales; devuelve también el primer t a suavizar"""
+    n_series, n = y.shape
+    if m > 1:
+        level = y[:, :m].mean(axis=1)
+        trend = (y[:, m:2 * m].mean(axis=1) - level) / m if with_trend and n >= 2 * m \
+            else np.zeros(n_series)
+        season = y[:, :m] - level[:, None]
+        return level, trend, season, m
+    trend = y[:, 1] - y[:, 0] if with_trend and n > 1 else np.zeros(n_series)
+    return y[:, 0].copy(), trend, np.zeros((n_series, 1)), 1
+
+
+def _smooth(y: np.ndarray, m: int, alpha: np.ndarray, beta: np.ndarray, gamma: np.ndarray,
+            with_trend: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Recursión de Holt-Winters aditivo sobre todas las filas a la vez.
+
+    alpha, beta y gamma tienen un valor por fila, de modo que una misma
+    pasada evalúa varias series y varias combinaciones de parámetros.
+    """
+    level, trend, season, start = _initial_state(y, m, with_trend)
+    sse = np.zeros(len(y))
+    for t in range(start, y.shape[1]):
+        position = t % m
+        previous_season = season[:, position]
+        error = y[:, t] - (level + trend + previous_season)
+        sse += error * error
+        new_level = alpha * (y[:, t] - previous_season) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, position] = gamma * (y[:, t] - new_level) + (1 - gamma) * previous_season
+        level = new_level
+    return sse, level, trend, season
+
+
+def _grid(method: str) -> List[Tuple[float, float, float]]:
+    betas = BETAS if method in ('holt', 'holt_winters') else (0.0,)
+    gammas = GAMMAS if method == 'holt_winters' else (0.0,)
+    return list(product(ALPHAS, betas, gammas))
+
+
+def fit_smoothing(values: np.ndarray, method: str = 'holt_winters',
+                  season_length: int = 1) -> List[FittedModel]:
+    """Ajustar ses/holt/holt_winters a cada fila de values en una sola pasada"""
+    y = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    m = season_length if method == 'holt_winters' else 1
+    with_trend = method != 'ses'
+    grid = np.array(_grid(method))
+    n_series, n_combos = len(y), len(grid)
+
+    # Filas: combinación 0 de todas las series, combinación 1 de todas, ...
+    tiled = np.tile(y, (n_combos, 1))
+    params = np.repeat(grid, n_series, axis=0)
+    sse, level, trend, season = _smooth(tiled, m, params[:, 0], params[:, 1], params[:, 2], with_trend)
+
+    best = sse.reshape(n_combos, n_series).argmin(axis=0)
+    rows = best * n_series + np.arange(n_series)
+    return [
+        FittedModel(method=method, season_length=m, alpha=float(params[row, 0]),
+                    beta=float(params[row, 1]), gamma=float(params[row, 2]),
+                    level=float(level[row]), trend=float(trend[row]),
+                    season=season[row].copy(), n_obs=y.shape[1], sse=float(sse[row]))
+        for row in rows
+    ]
+
+
+def series_fingerprint(values: np.ndarray) -> str:
+    """Huella de una serie: cambia si cambia cualquier valor o la longitud"""
+    return hashlib.blake2b(np.ascontiguousarray(values, dtype=np.float64).tobytes(),
+                           digest_size=16).hexdigest()
+
+
+class ForecastEngine:
+    """Pronósticos por lotes con caché LRU de modelos ajustados"""
+
+    def __init__(self, cache_size: int = 10_000):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, int, str], FittedModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key: Tuple[str, int, str]) -> Optional[FittedModel]:
+        with self._lock:
+            model = self._cache.get(key)
+            if model is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            return model
+
+    def _store(self, key: Tuple[str, int, str], model: FittedModel) -> None:
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = model
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    @staticmethod
+    def choose_method(n_obs: int, season_length: int) -> str:
+        """Modelo de 'auto': estacional con dos ciclos completos, si no con tendencia"""
+        if season_length > 1 and n_obs >= 2 * season_length:
+            return 'holt_winters'
+        if n_obs >= 3:
+            return 'holt'
+        return 'moving_average'
+
+    def fit(self, values: np.ndarray, method: str, season_length: int = 1) -> List[FittedModel]:
+        """Modelos ajustados de cada fila, reutilizando los de la caché"""
+        y = np.atleast_2d(np.asarray(values, dtype=np.float64))
+        m = season_length if method == 'holt_winters' else 1
+        keys = [(method, m, series_fingerprint(row)) for row in y]
+        models: List[Optional[FittedModel]] = [self._cached(key) for key in keys]
+        missing = [i for i, model in enumerate(models) if model is None]
+        if missing:
+            for i, model in zip(missing, fit_smoothing(y[missing], method, m)):
+                models[i] = model
+                self._store(keys[i], model)
+        return models
+
+    def forecast(self, values: np.ndarray, periods: int, method: str = 'auto',
+                 season_lengths: Optional[Sequence[int]] = None, window: int = 3) -> Dict[str, np.ndarray]:
+        """Pronosticar periods pasos de cada fila de values (series x periodos).
+
+        season_lengths da el periodo estacional de cada serie (1 = sin
+        estacionalidad). Las series se agrupan por modelo y periodo, y cada
+        grupo se ajusta como una sola matriz. Devuelve 'forecast' (series x
+        periods) y 'method' (modelo usado por serie).
+        """
+        if method not in METHODS:
+            raise ValueError(f"Método desconocido: {method} (use {', '.join(METHODS)})")
+        y = np.atleast_2d(np.nan_to_num(np.asarray(values, dtype=np.float64)))
+        n_series, n_obs = y.shape
+        seasons = np.ones(n_series, dtype=int) if season_lengths is None \
+            else np.asarray(season_lengths, dtype=int)
+
+        methods = np.array([self.choose_method(n_obs, s) if method == 'auto' else method for s in seasons],
+                           dtype=object)
+        # Holt-Winters necesita al menos dos ciclos para inicializarse
+        methods[(methods == 'holt_winters') & ((seasons < 2) | (n_obs < 2 * seasons))] = 'holt'
+        if n_obs < 2:
+            methods[:] = 'moving_average'
+
+        result = np.empty((n_series, periods))
+        for model_method in np.unique(methods):
+            selected = methods == model_method
+            if model_method == 'moving_average':
+                result[selected] = moving_average_forecast(y[selected], periods, window)
+                continue
+            group_seasons = seasons[selected] if model_method == 'holt_winters' else np.ones(selected.sum(), int)
+            indices = np.flatnonzero(selected)
+            for season in np.unique(group_seasons):
+                rows = indices[group_seasons == season]
+                for row, model in zip(rows, self.fit(y[rows], model_method, int(season))):
+                    result[row] = model.forecast(periods)
+        return {"forecast": result, "method": methods}
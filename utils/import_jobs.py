@@ -0,0 +1,252 @@
+# sistema_pyme/utils/import_jobs.py
+"""
+Cola persistente de importaciones sobre la tabla imported_files.
+
+La subida solo guarda el archivo en disco y crea la fila 'En cola'; el
+análisis y la inserción los hace un pool de procesos (el parseo de pandas
+es CPU y el GIL serializaría varias importaciones en hilos). El worker
+actualiza progress en la fila, atiende cancel_requested entre bloques y
+deja el estado final con el error si lo hubo, de modo que la UI solo
+tiene que leer la tabla.
+"""
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import IO, Any, Dict, List, Optional
+
+import database as db
+
+STATUS_QUEUED = "En cola"
+STATUS_RUNNING = "En análisis"
+STATUS_DONE = "Procesado"
+STATUS_ERROR = "Error"
+STATUS_CANCELLED = "Cancelado"
+
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+TABULAR_TYPES = ('csv', 'xlsx', 'xls')
+
+JOB_COLUMNS = ('id', 'filename', 'file_type', 'status', 'records', 'insights', 'uploaded_at',
+               'processed_at', 'progress', 'error', 'attempts', 'stored_path',
+               'cancel_requested', 'started_at')
+
+
+class ImportCancelledError(Exception):
+    """La importación se canceló a petición del usuario"""
+
+
+def _update_job(db_path: str, job_id: int, **fields: Any) -> None:
+    assignments = ', '.join(f"{name} = ?" for name in fields)
+    with db.get_pool(db_path).writer() as conn:
+        conn.execute(f"UPDATE imported_files SET {assignments} WHERE id = ?",
+                     (*fields.values(), job_id))
+
+
+def run_import_job(db_path: str, job_id: int, chunksize: int = 50_000) -> str:
+    """Procesar un trabajo de importación (se ejecuta en el proceso worker)"""
+    from utils.ingestion import StreamingImporter
+
+    with db.get_pool(db_path).writer() as conn:
+        row = conn.execute("SELECT file_type, stored_path, cancel_requested FROM imported_files "
+                           "WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return STATUS_ERROR
+        file_type, stored_path, cancel_requested = row[0].lower(), row[1], row[2]
+        if cancel_requested:
+            conn.execute("UPDATE imported_files SET status = ?, processed_at = ? WHERE id = ?",
+                         (STATUS_CANCELLED, datetime.now(), job_id))
+            return STATUS_CANCELLED
+        conn.execute("UPDATE imported_files SET status = ?, started_at = ?, progress = 0, "
+                     "error = NULL, attempts = COALESCE(attempts, 0) + 1 WHERE id = ?",
+                     (STATUS_RUNNING, datetime.now(), job_id))
+
+    def on_progress(rows: int, fraction: Optional[float]) -> None:
+        with db.get_pool(db_path).writer() as conn:
+            conn.execute("UPDATE imported_files SET records = ?, progress = ? WHERE id = ?",
+                         (rows, round(fraction, 4) if fraction is not None else None, job_id))
+            cancel = conn.execute("SELECT cancel_requested FROM imported_files WHERE id = ?",
+                                  (job_id,)).fetchone()[0]
+        if cancel:
+            raise ImportCancelledError()
+
+    importer = StreamingImporter(db_path, chunksize=chunksize, progress=on_progress)
+    try:
+        if file_type in TABULAR_TYPES:
+            result = importer.ingest(stored_path, file_type, total_bytes=os.path.getsize(stored_path))
+            records, insights = result.records, result.insights
+        elif file_type == 'pdf':
+            records, insights = 0, ["PDF procesado. Análisis de texto completado."]
+        else:
+            records, insights = 0, [f"Archivo {file_type.upper()} procesado correctamente."]
+    except ImportCancelledError:
+        importer.rollback_inserted()
+        _update_job(db_path, job_id, status=STATUS_CANCELLED, processed_at=datetime.now())
+        return STATUS_CANCELLED
+    except Exception as e:
+        importer.rollback_inserted()
+        _update_job(db_path, job_id, status=STATUS_ERROR, error=str(e),
+                    insights=json.dumps([f"Error al procesar archivo: {str(e)}"]),
+                    processed_at=datetime.now())
+        return STATUS_ERROR
+
+    _update_job(db_path, job_id, status=STATUS_DONE, records=records, progress=1.0,
+                insights=json.dumps(insights), processed_at=datetime.now())
+    return STATUS_DONE
+
+
+class ImportJobQueue:
+    """Cola de importaciones con workers en segundo plano, cancelación y reintento"""
+
+    def __init__(self, db_path: str = db.DEFAULT_DB_PATH, upload_dir: str = "data/uploads",
+                 max_workers: Optional[int] = None, use_processes: bool = True,
+                 chunksize: int = 50_000):
+        self.db_path = db_path
+        self.upload_dir = upload_dir
+        self.max_workers = max_workers or max(1, multiprocessing.cpu_count() - 1)
+        self.use_processes = use_processes
+        self.chunksize = chunksize
+        os.makedirs(upload_dir, exist_ok=True)
+
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+        self._futures: Dict[int, Future] = {}
+
+    def _get_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                if self.use_processes:
+                    # spawn: hacer fork de un servidor con hilos (Streamlit, uvicorn) no es seguro
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='import-job')
+            return self._executor
+
+    def _submit(self, job_id: int) -> None:
+        future = self._get_executor().submit(run_import_job, self.db_path, job_id, self.chunksize)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+
+    def _on_done(self, job_id: int, future: Future) -> None:
+        self._futures.pop(job_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            # El worker murió sin poder registrar el fallo (p. ej. BrokenProcessPool)
+            _update_job(self.db_path, job_id, status=STATUS_ERROR, error=str(error),
+                        processed_at=datetime.now())
+
+    def enqueue(self, filename: str, data: IO[bytes]) -> int:
+        """Guardar el archivo subido y encolar su importación; devuelve el id del trabajo"""
+        file_type = filename.rsplit('.', 1)[-1].lower()
+        stored_path = os.path.join(self.upload_dir, f"{uuid.uuid4().hex}_{os.path.basename(filename)}")
+        with open(stored_path, 'wb') as f:
+            shutil.copyfileobj(data, f, 1024 * 1024)
+
+        with db.get_pool(self.db_path).writer() as conn:
+            cursor = conn.execute(
+                '''INSERT INTO imported_files
+                   (filename, file_type, status, records, insights, uploaded_at, progress,
+                    attempts, stored_path, cancel_requested)
+                   VALUES (?, ?, ?, 0, ?, ?, 0, 0, ?, 0)''',
+                (filename, file_type.upper(), STATUS_QUEUED, json.dumps([]), datetime.now(), stored_path)
+            )
+            job_id = cursor.lastrowid
+        self._submit(job_id)
+        return job_id
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancelar un trabajo en cola o en curso (este se detiene en el siguiente bloque)"""
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            _update_job(self.db_path, job_id, status=STATUS_CANCELLED, processed_at=datetime.now())
+            return True
+        with db.get_pool(self.db_path).writer() as conn:
+            cursor = conn.execute(
+                f"UPDATE imported_files SET cancel_requested = 1 "
+                f"WHERE id = ? AND status IN ({', '.join('?' for _ in ACTIVE_STATUSES)})",
+                (job_id, *ACTIVE_STATUSES)
+            )
+        return cursor.rowcount > 0
+
+    def retry(self, job_id: int) -> bool:
+        """Volver a encolar un trabajo con error o cancelado"""
+        with db.get_pool(self.db_path).writer() as conn:
+            cursor = conn.execute(
+                "UPDATE imported_files SET status = ?, progress = 0, error = NULL, "
+                "cancel_requested = 0, processed_at = NULL WHERE id = ? AND status IN (?, ?) "
+                "AND stored_path IS NOT NULL",
+                (STATUS_QUEUED, job_id, STATUS_ERROR, STATUS_CANCELLED)
+            )
+        if cursor.rowcount == 0:
+            return False
+        self._submit(job_id)
+        return True
+
+    def recover(self) -> List[int]:
+        """Retomar los trabajos que dejó pendientes un proceso anterior.
+
+        Los que estaban 'En cola' se reencolan. Los que estaban 'En análisis'
+        pasan a 'Error': sus lotes ya confirmados no se pueden identificar,
+        así que reintentarlos es decisión del usuario.
+        """
+        with db.get_pool(self.db_path).writer() as conn:
+            conn.execute("UPDATE imported_files SET status = ?, error = ?, processed_at = ? "
+                         "WHERE status = ? AND stored_path IS NOT NULL",
+                         (STATUS_ERROR, "Importación interrumpida", datetime.now(), STATUS_RUNNING))
+            rows = conn.execute("SELECT id FROM imported_files WHERE status = ? "
+                                "AND stored_path IS NOT NULL ORDER BY id", (STATUS_QUEUED,)).fetchall()
+        job_ids = [row[0] for row in rows if row[0] not in self._futures]
+        for job_id in job_ids:
+            self._submit(job_id)
+        return job_ids
+
+    def get_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with db.get_read_connection(self.db_path) as conn:
+            row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM imported_files WHERE id = ?",
+                               (job_id,)).fetchone()
+        return dict(zip(JOB_COLUMNS, row)) if row else None
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with db.get_read_connection(self.db_path) as conn:
+            rows = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM imported_files "
+                                f"ORDER BY uploaded_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+    def wait(self, job_id: int, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Esperar a que termine un trabajo (útil en scripts y tests)"""
+        future = self._futures.get(job_id)
+        if future is not None:
+            try:
+                future.result(timeout)
+            except Exception:
+                pass
+        return self.get_job(job_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=not wait)
+                self._executor = None
+
+
+_default_queue: Optional[ImportJobQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def get_import_queue(db_path: str = db.DEFAULT_DB_PATH) -> ImportJobQueue:
+    """Cola de importaciones del proceso; al crearla se reencolan los trabajos pendientes"""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = ImportJobQueue(db_path)
+            _default_queue.recover()
+        return _default_queue
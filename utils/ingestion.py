@@ -0,0 +1,408 @@
+# sistema_pyme/utils/ingestion.py
+import io
+import math
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import database as db
+from utils.dedup import ImportedRowHashes, OccurrenceCounter, row_hashes, to_sql_ints
+from utils.rollups import add_sales
+
+ProgressCallback = Callable[[int, Optional[float]], None]
+
+# Columnas de cada tabla destino y los encabezados que se aceptan para ellas
+TARGET_TABLES: Dict[str, Dict[str, List[str]]] = {
+    'sales': {
+        'date': ['date', 'fecha', 'fecha_venta'],
+        'product': ['product', 'producto', 'articulo', 'item'],
+        'quantity': ['quantity', 'cantidad', 'unidades', 'qty'],
+        'amount': ['amount', 'monto', 'importe', 'total', 'venta', 'ventas'],
+    },
+    'customers': {
+        'name': ['name', 'nombre', 'cliente'],
+        'company': ['company', 'empresa'],
+        'email': ['email', 'correo', 'e_mail'],
+        'phone': ['phone', 'telefono'],
+        'status': ['status', 'estado'],
+        'value': ['value', 'valor'],
+        'last_purchase': ['last_purchase', 'ultima_compra'],
+    },
+    'inventory': {
+        'product': ['product', 'producto', 'articulo'],
+        'category': ['category', 'categoria'],
+        'current_stock': ['current_stock', 'stock', 'existencias', 'stock_actual'],
+        'min_stock': ['min_stock', 'stock_minimo'],
+        'unit_cost': ['unit_cost', 'costo_unitario', 'costo'],
+    },
+    'finances': {
+        'date': ['date', 'fecha'],
+        'type': ['type', 'tipo'],
+        'category': ['category', 'categoria'],
+        'amount': ['amount', 'monto', 'importe'],
+        'description': ['description', 'descripcion', 'concepto'],
+    },
+}
+
+# Columnas destino con afinidad numérica en SQLite
+NUMERIC_COLUMNS = {'quantity', 'amount', 'value', 'current_stock', 'min_stock', 'unit_cost'}
+
+# Columnas sin las que no se importa a la tabla
+REQUIRED_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    'sales': ('date', 'amount'),
+    'customers': ('name',),
+    'inventory': ('product', 'current_stock'),
+    'finances': ('date', 'type', 'amount'),
+}
+
+
+def normalize_header(name: Any) -> str:
+    """Encabezado en minúsculas, sin acentos y con guiones bajos"""
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+
+def map_columns(columns: List[Any], table: str) -> Dict[Any, str]:
+    """Columnas del archivo -> columnas de la tabla destino"""
+    aliases = {alias: target for target, names in TARGET_TABLES[table].items() for alias in names}
+    mapping: Dict[Any, str] = {}
+    for column in columns:
+        target = aliases.get(normalize_header(column))
+        if target is not None and target not in mapping.values():
+            mapping[column] = target
+    return mapping
+
+
+def detect_target_table(columns: List[Any]) -> Optional[str]:
+    """Tabla destino con más columnas reconocidas (entre las que tienen todas las obligatorias)"""
+    best, best_score = None, 0
+    for table in TARGET_TABLES:
+        mapped = set(map_columns(columns, table).values())
+        if set(REQUIRED_COLUMNS[table]) <= mapped and len(mapped) > best_score:
+            best, best_score = table, len(mapped)
+    return best
+
+
+class _CountingReader(io.RawIOBase):
+    """Envuelve un archivo binario y cuenta los bytes leídos (para el progreso)"""
+
+    def __init__(self, raw: IO[bytes]):
+        self._raw = raw
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        data = self._raw.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.bytes_read += size
+        return size
+
+
+def _iter_excel_chunks(source: Union[str, IO[bytes]], chunksize: int,
+                       position: Dict[str, float]) -> Iterator[pd.DataFrame]:
+    """Hoja activa de un .xlsx leída fila a fila con openpyxl en modo read-only"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [f"columna_{i}" if h is None else h for i, h in enumerate(header)]
+        position['total'] = max((sheet.max_row or 0) - 1, 0)
+
+        batch: List[tuple] = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunksize:
+                position['done'] += len(batch)
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            position['done'] += len(batch)
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_chunks(source: Union[str, IO[bytes]], file_type: str, chunksize: int = 50_000,
+                position: Optional[Dict[str, float]] = None, **read_kwargs: Any) -> Iterator[pd.DataFrame]:
+    """Leer un CSV/Excel por bloques de chunksize filas sin cargarlo entero.
+
+    position (opcional) se actualiza con 'done' y 'total' en las unidades que
+    permite cada formato: bytes para CSV, filas para Excel.
+    """
+    position = position if position is not None else {}
+    position.setdefault('done', 0)
+    file_type = file_type.lower()
+
+    if file_type == 'csv':
+        opened = isinstance(source, str)
+        raw = open(source, 'rb') if opened else source
+        try:
+            reader = _CountingReader(raw)
+            buffered = io.BufferedReader(reader, buffer_size=1024 * 1024)
+            for chunk in pd.read_csv(buffered, chunksize=chunksize, **read_kwargs):
+                position['done'] = reader.bytes_read
+                yield chunk
+        finally:
+            if opened:
+                raw.close()
+    elif file_type == 'xlsx':
+        yield from _iter_excel_chunks(source, chunksize, position)
+    elif file_type == 'xls':
+        # El formato binario antiguo no admite lectura por filas: se trocea en memoria
+        df = pd.read_excel(source, **read_kwargs)
+        position['total'] = len(df)
+        for start in range(0, len(df), chunksize):
+            position['done'] = min(start + chunksize, len(df))
+            yield df.iloc[start:start + chunksize]
+    else:
+        raise ValueError(f"Formato no soportado para importación por bloques: {file_type}")
+
+
+class IncrementalInsights:
+    """Estadísticas que se actualizan bloque a bloque con memoria O(columnas)"""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns: List[str] = []
+        self.nulls: Dict[str, int] = {}
+        self.numeric: Dict[str, Dict[str, float]] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if not self.columns:
+            self.columns = [str(c) for c in chunk.columns]
+        self.rows += len(chunk)
+
+        for column, count in chunk.isna().sum().items():
+            self.nulls[str(column)] = self.nulls.get(str(column), 0) + int(count)
+
+        for column in chunk.select_dtypes(include=['number']).columns:
+            values = chunk[column].dropna()
+            if values.empty:
+                continue
+            stats = self.numeric.setdefault(str(column), {
+                'count': 0, 'sum': 0.0, 'min': math.inf, 'max': -math.inf
+            })
+            stats['count'] += int(values.count())
+            stats['sum'] += float(values.sum())
+            stats['min'] = min(stats['min'], float(values.min()))
+            stats['max'] = max(stats['max'], float(values.max()))
+
+    def insights(self) -> List[str]:
+        insights = [f"Archivo contiene {self.rows} registros y {len(self.columns)} columnas"]
+        if self.numeric:
+            insights.append(f"Columnas numéricas detectadas: {', '.join(self.numeric)}")
+            for column, stats in self.numeric.items():
+                mean = stats['sum'] / stats['count']
+                insights.append(f"{column}: total {stats['sum']:,.2f}, promedio {mean:,.2f}, "
+                                f"rango {stats['min']:,.2f} - {stats['max']:,.2f}")
+        missing = {c: n for c, n in self.nulls.items() if n}
+        if missing:
+            worst = max(missing, key=missing.get)
+            insights.append(f"{len(missing)} columnas con valores faltantes "
+                            f"(máximo en '{worst}': {missing[worst]})")
+        return insights
+
+
+@dataclass
+class IngestionResult:
+    records: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    table: Optional[str] = None
+    insights: List[str] = field(default_factory=list)
+    duration_s: float = 0.0
+
+
+def _prepare_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Bloque con los valores tal como se insertan (fechas como texto, NaN/NaT -> None)"""
+    chunk = chunk.copy()
+    for column in chunk.columns:
+        if pd.api.types.is_datetime64_any_dtype(chunk[column]):
+            chunk[column] = chunk[column].dt.strftime('%Y-%m-%d %H:%M:%S').str.replace(' 00:00:00', '')
+    return chunk.astype(object).where(chunk.notna(), None)
+
+
+def canonical_row_hashes(table: str, prepared: pd.DataFrame) -> np.ndarray:
+    """Hash de cada fila sobre todas las columnas destino de la tabla, normalizadas.
+
+    prepared tiene columnas con los nombres de la tabla (las que falten
+    cuentan como vacías). Las columnas numéricas se comparan como float y
+    las de texto como str, igual que quedan guardadas en SQLite, de modo
+    que una fila importada y la misma fila leída de la base dan igual hash.
+    """
+    canonical = {}
+    for column in TARGET_TABLES[table]:
+        if column not in prepared.columns:
+            canonical[column] = pd.Series('', index=prepared.index)
+            continue
+        values = prepared[column]
+        present = values.notna()
+        if column in NUMERIC_COLUMNS:
+            numbers = pd.to_numeric(values, errors='coerce')
+            text = numbers.astype(str).where(numbers.notna(), values.astype(str))
+        else:
+            text = values.astype(str).str.strip()
+        canonical[column] = text.where(present, '')
+    return row_hashes(pd.DataFrame(canonical, index=prepared.index))
+
+
+def backfill_row_hashes(db_path: str, table: str, chunksize: int = 50_000) -> int:
+    """Registrar en import_row_hashes las filas que ya estaban en la tabla.
+
+    Permite deduplicar contra datos cargados antes de existir el registro
+    de hashes; devuelve cuántos hashes se registraron.
+    """
+    columns = list(TARGET_TABLES[table])
+    occurrences = OccurrenceCounter()
+    added = 0
+    with db.get_read_connection(db_path) as reader:
+        cursor = reader.execute(f"SELECT id, {', '.join(columns)} FROM {table} ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            prepared = pd.DataFrame([tuple(row) for row in rows], columns=['id'] + columns, dtype=object)
+            hashes = occurrences.salt(canonical_row_hashes(table, prepared[columns]))
+            with db.get_pool(db_path).writer() as conn:
+                ImportedRowHashes.add(conn, table, hashes, prepared['id'].to_numpy(dtype=np.int64))
+            added += len(hashes)
+    return added
+
+
+class StreamingImporter:
+    """Importación por bloques: lee, resume e inserta sin cargar el archivo entero.
+
+    Cada bloque se inserta con executemany en transacciones de batch_size
+    filas usando el escritor del pool, que se libera entre lotes para no
+    bloquear al resto de la aplicación durante una importación larga.
+
+    Como los lotes se confirman por separado, se anotan los rangos de ids
+    insertados (contiguos dentro de cada transacción) para poder deshacer
+    una importación cancelada o fallida con rollback_inserted().
+
+    Con deduplicate=True cada fila se identifica por su hash canónico más
+    su número de repetición en el archivo; las que ya figuran en
+    import_row_hashes (de importaciones anteriores) se omiten, así que
+    subir de nuevo una exportación solapada no duplica ventas. Solo cuentan
+    las filas importadas que siguen en la tabla sin editar; las omitidas se
+    informan en IngestionResult.duplicates y en los insights.
+    """
+
+    def __init__(self, db_path: str = db.DEFAULT_DB_PATH, chunksize: int = 50_000,
+                 batch_size: int = 5_000, progress: Optional[ProgressCallback] = None,
+                 deduplicate: bool = True):
+        self.db_path = db_path
+        self.chunksize = chunksize
+        self.batch_size = batch_size
+        self.progress = progress
+        self.deduplicate = deduplicate
+        self.inserted_ranges: List[Tuple[str, int, int]] = []
+        self._inserted_hashes: List[Tuple[str, List[int]]] = []
+
+    def ingest(self, source: Union[str, IO[bytes]], file_type: str, table: Optional[str] = None,
+               total_bytes: Optional[int] = None, detect_table: bool = True,
+               **read_kwargs: Any) -> IngestionResult:
+        started = time.perf_counter()
+        self.inserted_ranges = []
+        self._inserted_hashes = []
+        result = IngestionResult(table=table)
+        insights = IncrementalInsights()
+        occurrences = OccurrenceCounter()
+        position: Dict[str, float] = {'done': 0}
+        if file_type.lower() == 'csv' and total_bytes:
+            position['total'] = total_bytes
+
+        mapping: Optional[Dict[Any, str]] = None
+        for chunk in iter_chunks(source, file_type, self.chunksize, position, **read_kwargs):
+            insights.update(chunk)
+            result.records += len(chunk)
+
+            if mapping is None:
+                if result.table is None and detect_table:
+                    result.table = detect_target_table(list(chunk.columns))
+                mapping = map_columns(list(chunk.columns), result.table) if result.table else {}
+            if mapping:
+                prepared = _prepare_chunk(chunk[list(mapping)]).set_axis(list(mapping.values()), axis=1)
+                hashes = None
+                if self.deduplicate:
+                    hashes = occurrences.salt(canonical_row_hashes(result.table, prepared))
+                inserted = self._insert(result.table, prepared, hashes)
+                result.inserted += inserted
+                result.duplicates += len(prepared) - inserted
+
+            self._report(result.records, position)
+
+        result.insights = insights.insights()
+        if result.table:
+            result.insights.append(f"{result.inserted} registros importados en la tabla '{result.table}'")
+        if result.duplicates:
+            result.insights.append(f"{result.duplicates} registros ya importados anteriormente fueron omitidos")
+        result.duration_s = round(time.perf_counter() - started, 3)
+        return result
+
+    def _insert(self, table: str, prepared: pd.DataFrame, hashes: Optional[np.ndarray] = None) -> int:
+        columns = list(prepared.columns)
+        rows = list(prepared.itertuples(index=False, name=None))
+        sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' for _ in columns)})")
+        pool = db.get_pool(self.db_path)
+        inserted = 0
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            with pool.writer() as conn:
+                if hashes is not None:
+                    # Comprobar e insertar bajo el mismo lock de escritura: dos
+                    # importaciones simultáneas del mismo archivo no se cuelan
+                    conn.execute("BEGIN IMMEDIATE")
+                    batch_hashes = hashes[start:start + self.batch_size]
+                    new = ~ImportedRowHashes.existing(conn, table, batch_hashes)
+                    batch = [row for row, keep in zip(batch, new) if keep]
+                    batch_hashes = batch_hashes[new]
+                if not batch:
+                    continue
+                conn.executemany(sql, batch)
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                if hashes is not None:
+                    ImportedRowHashes.add(conn, table, batch_hashes, range(last_id - len(batch) + 1, last_id + 1))
+                if table == 'sales':
+                    add_sales(conn, last_id - len(batch) + 1, last_id)
+            self.inserted_ranges.append((table, last_id - len(batch) + 1, last_id))
+            if hashes is not None:
+                self._inserted_hashes.append((table, to_sql_ints(batch_hashes)))
+            inserted += len(batch)
+        return inserted
+
+    def rollback_inserted(self) -> int:
+        """Borrar las filas insertadas por la última importación (y sus hashes)"""
+        deleted = 0
+        with db.get_pool(self.db_path).writer() as conn:
+            for table, first_id, last_id in self.inserted_ranges:
+                deleted += conn.execute(f"DELETE FROM {table} WHERE id BETWEEN ? AND ?",
+                                        (first_id, last_id)).rowcount
+            for table, hashes in self._inserted_hashes:
+                ImportedRowHashes.remove(conn, table, hashes)
+        self.inserted_ranges = []
+        self._inserted_hashes = []
+        return deleted
+
+    def _report(self, rows: int, position: Dict[str, float]) -> None:
+        if self.progress is None:
+            return
+        total = position.get('total')
+        fraction = min(position['done'] / total, 1.0) if total else None
+        self.progress(rows, fraction)
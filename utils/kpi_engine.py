@@ -0,0 +1,326 @@
+# sistema_pyme/utils/kpi_engine.py
+"""
+KPIs calculados en SQLite a partir de un registro declarativo de métricas.
+
+Cada métrica es una expresión de agregación SQL (SUM/COUNT/AVG con
+FILTER) sobre una tabla. Las métricas de la misma tabla y el mismo
+filtro comparten un único recorrido: el dashboard entero son unas pocas
+consultas SELECT de una fila, sin cargar tablas en pandas. Las métricas
+derivadas (porcentajes, cocientes) se calculan en Python a partir de
+otras métricas.
+
+Cada valor se guarda en caché junto con la versión de las tablas que lee
+(ver database.get_table_versions) y los parámetros de fecha: mientras
+nadie escriba en esas tablas y no cambie el día, volver a pintar una
+página solo cuesta leer las versiones.
+"""
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import database as db
+from cache import TableVersionTracker, _path_key, get_resource, get_version_tracker
+
+MONEY = '${:,.0f}'
+COUNT = '{:,.0f}'
+PERCENT = '{:.0f}%'
+RATIO = '{:.1f}x'
+RATING = '{:.1f}/5'
+YEARS = '{:.1f} años'
+
+# Valores de finances.type que cuentan como ingreso o gasto
+INCOME_TYPES = ('ingreso', 'ingresos', 'income')
+EXPENSE_TYPES = ('gasto', 'gastos', 'egreso', 'egresos', 'expense')
+
+ACTIVE_DAYS = 90
+DEAD_STOCK_DAYS = 90
+
+
+@dataclass(frozen=True)
+class Metric:
+    """Definición de un KPI.
+
+    Una métrica base tiene table y sql (expresión de agregación que puede
+    usar los parámetros de period_params, p. ej. :today); where restringe
+    las filas del recorrido compartido. Una métrica derivada tiene inputs
+    y compute(valores) en su lugar. compare es la métrica del periodo
+    anterior con la que se calcula la variación.
+    """
+    name: str
+    label: str
+    fmt: str = COUNT
+    table: Optional[str] = None
+    sql: Optional[str] = None
+    where: Optional[str] = None
+    depends_on: Tuple[str, ...] = ()
+    inputs: Tuple[str, ...] = ()
+    compute: Optional[Callable[[Dict[str, Any]], Any]] = None
+    compare: Optional[str] = None
+
+    @property
+    def is_derived(self) -> bool:
+        return self.compute is not None
+
+    @property
+    def tables(self) -> Tuple[str, ...]:
+        return (self.table,) + self.depends_on if self.table else self.depends_on
+
+
+def _ratio(numerator: str, denominator: str, scale: float = 1.0) -> Callable[[Dict[str, Any]], Any]:
+    def compute(values: Dict[str, Any]) -> Optional[float]:
+        if not values[denominator]:
+            return None
+        return scale * (values[numerator] or 0) / values[denominator]
+    return compute
+
+
+def _difference(minuend: str, subtrahend: str) -> Callable[[Dict[str, Any]], Any]:
+    return lambda values: (values[minuend] or 0) - (values[subtrahend] or 0)
+
+
+def _sum(*names: str) -> Callable[[Dict[str, Any]], Any]:
+    return lambda values: sum(values[name] or 0 for name in names)
+
+
+def _in(values: Sequence[str]) -> str:
+    return "(" + ", ".join(f"'{value}'" for value in values) + ")"
+
+
+_MONTH = "date >= :month_start AND date < :tomorrow"
+_PREV_MONTH = "date >= :prev_month_start AND date < :prev_month_tomorrow"
+_RECENT = "date >= :prev_month_start"
+_INCOME = f"LOWER(type) IN {_in(INCOME_TYPES)}"
+_EXPENSE = f"LOWER(type) IN {_in(EXPENSE_TYPES)}"
+
+METRICS: Dict[str, Metric] = {}
+
+
+def register_metric(metric: Metric) -> Metric:
+    """Añadir (o reemplazar) una métrica en el registro"""
+    METRICS[metric.name] = metric
+    return metric
+
+
+for _metric in [
+    # Ventas: un recorrido de sales desde el inicio del mes anterior (idx_sales_date)
+    Metric('sales_today', "Ventas Hoy", MONEY, 'sales', where=_RECENT,
+           sql="TOTAL(amount) FILTER (WHERE date >= :today AND date < :tomorrow)", compare='sales_yesterday'),
+    Metric('sales_yesterday', "Ventas Ayer", MONEY, 'sales', where=_RECENT,
+           sql="TOTAL(amount) FILTER (WHERE date >= :yesterday AND date < :today)"),
+    Metric('sales_month', "Ventas del Mes", MONEY, 'sales', where=_RECENT,
+           sql=f"TOTAL(amount) FILTER (WHERE {_MONTH})", compare='sales_prev_month'),
+    Metric('sales_prev_month', "Ventas Mes Anterior", MONEY, 'sales', where=_RECENT,
+           sql=f"TOTAL(amount) FILTER (WHERE {_PREV_MONTH})"),
+    Metric('tickets_month', "Ventas Registradas", COUNT, 'sales', where=_RECENT,
+           sql=f"COUNT(*) FILTER (WHERE {_MONTH})"),
+    Metric('tickets_prev_month', "Ventas Registradas Mes Anterior", COUNT, 'sales', where=_RECENT,
+           sql=f"COUNT(*) FILTER (WHERE {_PREV_MONTH})"),
+    Metric('units_month', "Unidades Vendidas", COUNT, 'sales', where=_RECENT,
+           sql=f"TOTAL(quantity) FILTER (WHERE {_MONTH})"),
+    Metric('avg_ticket', "Ticket Promedio", MONEY, inputs=('sales_month', 'tickets_month'),
+           compute=_ratio('sales_month', 'tickets_month'), compare='avg_ticket_prev'),
+    Metric('avg_ticket_prev', "Ticket Promedio Mes Anterior", MONEY,
+           inputs=('sales_prev_month', 'tickets_prev_month'),
+           compute=_ratio('sales_prev_month', 'tickets_prev_month')),
+
+    # Clientes
+    Metric('customers_total', "Total Clientes", COUNT, 'customers', sql="COUNT(*)"),
+    Metric('customers_active', "Clientes Activos", COUNT, 'customers',
+           sql="COUNT(*) FILTER (WHERE last_purchase >= :active_since)"),
+    Metric('customers_vip', "Clientes VIP", COUNT, 'customers',
+           sql="COUNT(*) FILTER (WHERE status = 'VIP' OR segment = 'Premium')"),
+
+    # Inventario
+    Metric('products_total', "Total Productos", COUNT, 'inventory', sql="COUNT(*)"),
+    Metric('stock_low', "Stock Bajo", COUNT, 'inventory',
+           sql="COUNT(*) FILTER (WHERE current_stock < min_stock)"),
+    Metric('restock_pending', "Reposiciones Pendientes", COUNT, 'inventory',
+           sql="COUNT(*) FILTER (WHERE current_stock < min_stock)"),
+    Metric('stock_ok', "Productos con Stock", COUNT, 'inventory',
+           sql="COUNT(*) FILTER (WHERE current_stock >= min_stock OR min_stock IS NULL)"),
+    Metric('stock_units', "Unidades en Stock", COUNT, 'inventory', sql="TOTAL(current_stock)"),
+    Metric('stock_value', "Valor del Inventario", MONEY, 'inventory', sql="TOTAL(current_stock * unit_cost)"),
+    Metric('stock_dead', "Stock Muerto", COUNT, 'inventory', depends_on=('sales',),
+           sql="COUNT(*) FILTER (WHERE current_stock > 0 AND product NOT IN "
+               "(SELECT product FROM sales WHERE date >= :dead_since AND product IS NOT NULL))"),
+    Metric('stock_health', "Inventario", PERCENT, inputs=('stock_ok', 'products_total'),
+           compute=_ratio('stock_ok', 'products_total', 100)),
+    Metric('stock_rotation', "Rotación Mensual", RATIO, inputs=('units_month', 'stock_units'),
+           compute=_ratio('units_month', 'stock_units')),
+
+    # Finanzas: un recorrido de finances desde el inicio del mes anterior
+    Metric('income_month', "Ingresos del Mes", MONEY, 'finances', where=_RECENT,
+           sql=f"TOTAL(amount) FILTER (WHERE {_INCOME} AND {_MONTH})", compare='income_prev_month'),
+    Metric('income_prev_month', "Ingresos Mes Anterior", MONEY, 'finances', where=_RECENT,
+           sql=f"TOTAL(amount) FILTER (WHERE {_INCOME} AND {_PREV_MONTH})"),
+    Metric('expense_month', "Gastos del Mes", MONEY, 'finances', where=_RECENT,
+           sql=f"TOTAL(amount) FILTER (WHERE {_EXPENSE} AND {_MONTH})", compare='expense_prev_month'),
+    Metric('expense_prev_month', "Gastos Mes Anterior", MONEY, 'finances', where=_RECENT,
+           sql=f"TOTAL(amount) FILTER (WHERE {_EXPENSE} AND {_PREV_MONTH})"),
+    # Ingresos = ventas + otros ingresos de finances (como el gráfico de flujo de caja)
+    Metric('revenue_month', "Ingresos del Mes", MONEY, inputs=('sales_month', 'income_month'),
+           compute=_sum('sales_month', 'income_month'), compare='revenue_prev_month'),
+    Metric('revenue_prev_month', "Ingresos Mes Anterior", MONEY, inputs=('sales_prev_month', 'income_prev_month'),
+           compute=_sum('sales_prev_month', 'income_prev_month')),
+    Metric('cash_flow', "Flujo de Caja", MONEY, inputs=('revenue_month', 'expense_month'),
+           compute=_difference('revenue_month', 'expense_month'), compare='cash_flow_prev'),
+    Metric('cash_flow_prev', "Flujo de Caja Mes Anterior", MONEY,
+           inputs=('revenue_prev_month', 'expense_prev_month'),
+           compute=_difference('revenue_prev_month', 'expense_prev_month')),
+    Metric('profit_margin', "Margen", PERCENT, inputs=('cash_flow', 'revenue_month'),
+           compute=_ratio('cash_flow', 'revenue_month', 100)),
+
+    # Recursos humanos (salary es mensual)
+    Metric('employees_active', "Empleados Activos", COUNT, 'employees',
+           sql="COUNT(*) FILTER (WHERE is_active = 1)"),
+    Metric('payroll_month', "Nómina Mensual", MONEY, 'employees',
+           sql="TOTAL(salary) FILTER (WHERE is_active = 1)"),
+    Metric('evaluation_avg', "Evaluación Promedio", RATING, 'employees',
+           sql="AVG(evaluation) FILTER (WHERE is_active = 1)"),
+    Metric('tenure_avg', "Antigüedad Promedio", YEARS, 'employees',
+           sql="AVG((julianday(:today) - julianday(hire_date)) / 365.25) FILTER (WHERE is_active = 1)"),
+]:
+    register_metric(_metric)
+
+# Filas de KPIs de cada pantalla
+DASHBOARD_METRICS = ('sales_today', 'customers_active', 'restock_pending', 'stock_health')
+FINANCE_METRICS = ('cash_flow', 'revenue_month', 'expense_month', 'profit_margin')
+CRM_METRICS = ('customers_total', 'customers_vip', 'avg_ticket', 'customers_active')
+HR_METRICS = ('employees_active', 'payroll_month', 'evaluation_avg', 'tenure_avg')
+INVENTORY_METRICS = ('products_total', 'stock_rotation', 'stock_low', 'stock_dead')
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    last_day = (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)).day
+    return date(year, month, min(day.day, last_day))
+
+
+def period_params(today: Optional[date] = None) -> Dict[str, str]:
+    """Parámetros de fecha (ISO) que pueden usar las expresiones de las métricas.
+
+    El mes anterior se compara hasta el mismo día del mes (prev_month_tomorrow)
+    para que la variación del mes en curso no salga siempre negativa.
+    """
+    today = today or date.today()
+    month_start = today.replace(day=1)
+    return {
+        'today': today.isoformat(),
+        'tomorrow': (today + timedelta(days=1)).isoformat(),
+        'yesterday': (today - timedelta(days=1)).isoformat(),
+        'month_start': month_start.isoformat(),
+        'prev_month_start': _add_months(month_start, -1).isoformat(),
+        'prev_month_tomorrow': (_add_months(today, -1) + timedelta(days=1)).isoformat(),
+        'active_since': (today - timedelta(days=ACTIVE_DAYS)).isoformat(),
+        'dead_since': (today - timedelta(days=DEAD_STOCK_DAYS)).isoformat(),
+    }
+
+
+class KPIEngine:
+    """Cálculo y caché de las métricas del registro"""
+
+    def __init__(self, db_path: str = db.DEFAULT_DB_PATH, metrics: Optional[Dict[str, Metric]] = None,
+                 tracker: Optional[TableVersionTracker] = None):
+        self.db_path = db_path
+        self.metrics = METRICS if metrics is None else metrics
+        self.tracker = tracker or get_version_tracker(db_path)
+        # nombre -> ((versiones de sus tablas, parámetros), valor)
+        self._cache: Dict[str, Tuple[Tuple[Any, ...], Any]] = {}
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    def _base_metrics(self, names: Sequence[str]) -> List[Metric]:
+        """Métricas base de las que dependen names (incluidas las de comparación)"""
+        result: Dict[str, Metric] = {}
+        pending = list(names)
+        while pending:
+            metric = self.metrics[pending.pop()]
+            if metric.compare:
+                pending.append(metric.compare)
+            if metric.is_derived:
+                pending.extend(metric.inputs)
+            else:
+                result[metric.name] = metric
+        return list(result.values())
+
+    def _cache_key(self, metric: Metric, versions: Dict[str, Tuple[int, int]],
+                   params: Dict[str, str]) -> Tuple[Any, ...]:
+        return tuple(versions[table] for table in metric.tables), tuple(sorted(params.items()))
+
+    def _scan(self, conn, table: str, where: Optional[str], metrics: List[Metric],
+              params: Dict[str, str]) -> Dict[str, Any]:
+        """Una consulta con todas las agregaciones de metrics sobre table"""
+        query = f"SELECT {', '.join(metric.sql for metric in metrics)} FROM {table}"
+        if where:
+            query += f" WHERE {where}"
+        row = conn.execute(query, params).fetchone()
+        self.scans += 1
+        return {metric.name: value for metric, value in zip(metrics, tuple(row))}
+
+    def values(self, names: Sequence[str], today: Optional[date] = None) -> Dict[str, Any]:
+        """Valor de cada métrica de names, recalculando solo las que han cambiado"""
+        params = period_params(today)
+        base = self._base_metrics(names)
+        tables = sorted({table for metric in base for table in metric.tables})
+
+        # Las versiones se leen antes de recalcular: si alguien escribe en
+        # medio, el valor guardado es más nuevo que su clave y solo se
+        # recalcula de más en la siguiente llamada. Sin escrituras no se
+        # abre ninguna conexión (ver cache.TableVersionTracker)
+        versions = self.tracker.versions(tables)
+        with self._lock:
+            stale = [metric for metric in base
+                     if self._cache.get(metric.name, ((),))[0] != self._cache_key(metric, versions, params)]
+
+        # Recorridos compartidos: se recalculan todas las métricas registradas
+        # con la misma tabla y filtro, que salen gratis en la misma consulta
+        scans = {(metric.table, metric.where) for metric in stale}
+        fresh: Dict[str, Any] = {}
+        if scans:
+            with db.get_read_connection(self.db_path) as conn:
+                for table, where in sorted(scans, key=str):
+                    group = [metric for metric in self.metrics.values()
+                             if not metric.is_derived and (metric.table, metric.where) == (table, where)
+                             and set(metric.tables) <= set(versions)]
+                    fresh.update(self._scan(conn, table, where, group, params))
+
+        with self._lock:
+            for name, value in fresh.items():
+                metric = self.metrics[name]
+                self._cache[name] = (self._cache_key(metric, versions, params), value)
+            resolved = {metric.name: self._cache[metric.name][1] for metric in base}
+        return {name: self._resolve(name, resolved) for name in names}
+
+    def _resolve(self, name: str, values: Dict[str, Any]) -> Any:
+        if name not in values:
+            metric = self.metrics[name]
+            values[name] = metric.compute({key: self._resolve(key, values) for key in metric.inputs})
+        return values[name]
+
+    def display(self, names: Sequence[str], today: Optional[date] = None) -> List[Tuple[str, str, Optional[str]]]:
+        """(etiqueta, valor, variación) de cada métrica, listos para st.metric"""
+        compared = [self.metrics[name].compare for name in names if self.metrics[name].compare]
+        values = self.values(list(names) + compared, today)
+        rows = []
+        for name in names:
+            metric = self.metrics[name]
+            value = values[name]
+            text = "N/D" if value is None else metric.fmt.format(value)
+            delta = None
+            if metric.compare:
+                previous = values[metric.compare]
+                if previous and value is not None:
+                    delta = f"{(value - previous) / abs(previous) * 100:+.0f}%"
+            rows.append((metric.label, text, delta))
+        return rows
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+def get_kpi_engine(db_path: str = db.DEFAULT_DB_PATH) -> KPIEngine:
+    """Motor de KPIs de db_path (su caché se comparte entre sesiones)"""
+    return get_resource(f"kpi_engine:{_path_key(db_path)}", lambda: KPIEngine(db_path))
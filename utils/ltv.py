@@ -0,0 +1,297 @@
+# sistema_pyme/utils/ltv.py
+"""
+Valor de vida del cliente (LTV) por columnas, sin copias del DataFrame.
+
+Todo parte de una única agregación de sales por (cliente, mes) hecha en
+SQLite. De ella salen el resumen RFM de cada cliente (meses activos,
+primer y último mes, importe) y dos estimaciones de vida esperada:
+
+- Cohortes: curva de retención de la cohorte del primer mes; las edades
+  que la cohorte aún no ha vivido se completan con la curva combinada de
+  las cohortes más antiguas. La vida esperada es el área bajo la curva
+  hasta el horizonte (meses activos esperados desde la adquisición).
+- BG/NBD (Fader, Hardie y Lee, 2005) en tiempo mensual: se ajustan r,
+  alpha, a y b por máxima verosimilitud sobre los triples (x, t_x, T)
+  distintos, y se calculan P(vivo) y las compras esperadas en el horizonte
+  (con las medias a posteriori de la tasa y del abandono).
+
+Los segmentos se asignan por rango (percentil), así que nunca fallan por
+cortes repetidos como pd.qcut. update() incorpora las ventas nuevas (id
+mayor que el último visto) al estado sin volver a leer la tabla entera.
+"""
+from datetime import date
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import database as db
+
+SEGMENT_LABELS = ('Bajo', 'Medio', 'Alto', 'VIP')
+
+# Mes como entero (año·12 + mes - 1) calculado en SQLite. Las fechas se guardan
+# como 'AAAA-MM-DD[ hh:mm:ss]'; substr es bastante más rápido que strftime
+PERIOD_SQL = "CAST(substr(date, 1, 4) AS INTEGER) * 12 + CAST(substr(date, 6, 2) AS INTEGER) - 1"
+DATE_PATTERN = "[0-9][0-9][0-9][0-9]-[0-9][0-9]*"
+# Los meses caben en 20 bits (año < 87000): clave = cliente·2^20 + mes
+_KEY_SHIFT = np.int64(1 << 20)
+
+
+def simple_ltv(avg_purchase_value: Any, purchase_frequency: Any, expected_lifetime: Any) -> np.ndarray:
+    """LTV = valor medio × frecuencia × vida esperada, sobre arrays"""
+    return (np.asarray(avg_purchase_value, dtype=np.float64)
+            * np.asarray(purchase_frequency, dtype=np.float64)
+            * np.asarray(expected_lifetime, dtype=np.float64))
+
+
+def rank_segments(values: Any, labels: Sequence[str] = SEGMENT_LABELS) -> np.ndarray:
+    """Segmento por cuantil de rango: n/q clientes por segmento aunque haya empates.
+
+    Los empates se reparten por orden de aparición (como rank(method='first')),
+    así que no hay cortes repetidos; los NaN quedan sin segmento (None).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    result = np.full(len(values), None, dtype=object)
+    n_valid = int(valid.sum())
+    if n_valid == 0:
+        return result
+    order = np.argsort(values[valid], kind='stable')
+    ranks = np.empty(n_valid, dtype=np.int64)
+    ranks[order] = np.arange(n_valid)
+    buckets = ranks * len(labels) // n_valid
+    result[valid] = np.asarray(labels, dtype=object)[buckets]
+    return result
+
+
+def current_period(today: Optional[date] = None) -> int:
+    today = today or date.today()
+    return today.year * 12 + today.month - 1
+
+
+def load_customer_periods(db_path: str, after_id: int = 0, before_id: Optional[int] = None) -> pd.DataFrame:
+    """Ventas con after_id < id <= before_id agregadas por (cliente, mes) en una consulta"""
+    with db.get_read_connection(db_path) as conn:
+        rows = conn.execute(
+            f"SELECT customer_id, {PERIOD_SQL} AS period, COUNT(*), COALESCE(SUM(amount), 0) "
+            f"FROM sales WHERE customer_id IS NOT NULL AND id > ? AND id <= ? AND date GLOB ? "
+            f"GROUP BY customer_id, period",
+            (after_id, before_id if before_id is not None else 2 ** 63 - 1, DATE_PATTERN)
+        ).fetchall()
+    if not rows:
+        return _empty_periods()
+    frame = pd.DataFrame([tuple(row) for row in rows],
+                         columns=['customer_id', 'period', 'purchases', 'amount'])
+    return frame.astype({'customer_id': np.int64, 'period': np.int64,
+                         'purchases': np.int64, 'amount': np.float64})
+
+
+def summarize_periods(periods: pd.DataFrame) -> pd.DataFrame:
+    """Resumen por cliente: primer y último mes, meses activos, compras e importe"""
+    grouped = periods.groupby('customer_id', sort=True)
+    return pd.DataFrame({
+        'first': grouped['period'].min(),
+        'last': grouped['period'].max(),
+        'active': grouped['period'].count(),
+        'purchases': grouped['purchases'].sum(),
+        'amount': grouped['amount'].sum(),
+    })
+
+
+def cohort_lifetimes(periods: pd.DataFrame, first: pd.Series, now: int, horizon: int) -> pd.Series:
+    """Meses activos esperados en el horizonte para cada cohorte (mes de la primera compra)"""
+    cohort = periods['customer_id'].map(first).to_numpy()
+    age = periods['period'].to_numpy() - cohort
+    active = pd.crosstab(cohort, age).reindex(columns=range(horizon), fill_value=0)
+    sizes = first.value_counts().reindex(active.index).to_numpy(dtype=np.float64)
+
+    ages = np.arange(horizon)
+    observed = ages[None, :] <= (now - active.index.to_numpy())[:, None]
+    counts = active.to_numpy(dtype=np.float64)
+    # Curva combinada: activos / tamaño de las cohortes que ya llegaron a cada edad
+    pooled_sizes = (observed * sizes[:, None]).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pooled = np.where(pooled_sizes > 0, (counts * observed).sum(axis=0) / pooled_sizes, 0.0)
+        retention = np.where(observed, counts / sizes[:, None], pooled[None, :])
+    return pd.Series(retention.sum(axis=1), index=active.index)
+
+
+def _bgnbd_log_likelihood(params: np.ndarray, x: np.ndarray, t_x: np.ndarray, T: np.ndarray) -> np.ndarray:
+    from scipy.special import gammaln
+
+    r, alpha, a, b = params
+    a1 = gammaln(r + x) - gammaln(r) + r * np.log(alpha)
+    a2 = gammaln(a + b) + gammaln(b + x) - gammaln(b) - gammaln(a + b + x)
+    a3 = -(r + x) * np.log(alpha + T)
+    with np.errstate(divide='ignore'):
+        a4 = np.where(x > 0, np.log(a) - np.log(np.maximum(b + x - 1, 1e-12)) - (r + x) * np.log(alpha + t_x),
+                      -np.inf)
+    return a1 + a2 + np.logaddexp(a3, a4)
+
+
+def fit_bgnbd(x: np.ndarray, t_x: np.ndarray, T: np.ndarray, penalizer: float = 0.001) -> np.ndarray:
+    """Parámetros (r, alpha, a, b) por máxima verosimilitud.
+
+    Los clientes con el mismo (x, t_x, T) aportan lo mismo: se agrupan y
+    se ponderan, de modo que el coste depende de los triples distintos.
+    penalizer (sobre el logaritmo de los parámetros) evita que diverjan
+    cuando los datos no distinguen entre clientes, p. ej. compras cada mes.
+    """
+    from scipy.optimize import minimize
+
+    triples, weights = np.unique(np.column_stack([x, t_x, T]).astype(np.float64), axis=0, return_counts=True)
+    ux, ut_x, uT = triples.T
+
+    def objective(log_params: np.ndarray) -> float:
+        log_likelihood = np.dot(weights, _bgnbd_log_likelihood(np.exp(log_params), ux, ut_x, uT))
+        return -float(log_likelihood) / weights.sum() + penalizer * float(np.dot(log_params, log_params))
+
+    result = minimize(objective, np.zeros(4), method='Nelder-Mead',
+                      options={'maxiter': 4000, 'xatol': 1e-6, 'fatol': 1e-10})
+    return np.exp(result.x)
+
+
+def bgnbd_predict(params: np.ndarray, horizon: float, x: np.ndarray, t_x: np.ndarray,
+                  T: np.ndarray) -> Dict[str, np.ndarray]:
+    """P(vivo) y compras (meses activos) esperadas en los próximos horizon meses.
+
+    P(vivo) es la expresión cerrada del modelo. Para las compras esperadas
+    se sustituyen la tasa y la probabilidad de abandono por sus medias a
+    posteriori, λ = (r + x) / (alpha + T) y p = a / (a + b + x):
+    E = P(vivo) · (1 - exp(-λ·p·t)) / p. Evita la hipergeométrica 2F1 de
+    la fórmula exacta, inestable cuando r y alpha son grandes.
+    """
+    r, alpha, a, b = params
+    # ((alpha + T) / (alpha + t_x))^(r + x) en logaritmos, estable con alpha grande
+    log_ratio = (r + x) * np.log1p((T - t_x) / (alpha + t_x))
+    with np.errstate(over='ignore'):
+        odds = np.where(x > 0, a / (b + np.maximum(x, 1) - 1) * np.exp(log_ratio), 0.0)
+    p_alive = 1.0 / (1.0 + odds)
+    rate = (r + x) / (alpha + T)
+    dropout = a / (a + b + x)
+    expected = p_alive * -np.expm1(-rate * dropout * horizon) / dropout
+    return {'p_alive': p_alive, 'expected_purchases': expected}
+
+
+class LTVEngine:
+    """LTV por cliente a partir de sales, con actualización incremental.
+
+    fit() lee la agregación (cliente, mes), calcula la retención por
+    cohortes y ajusta BG/NBD. update() suma las ventas con id posterior a
+    la última vista: ajusta el resumen de los clientes afectados sin
+    reajustar los modelos (refit() los recalcula con todo lo acumulado).
+    """
+
+    def __init__(self, db_path: str = db.DEFAULT_DB_PATH, horizon: int = 12, margin: float = 1.0,
+                 labels: Sequence[str] = SEGMENT_LABELS):
+        self.db_path = db_path
+        self.horizon = horizon
+        self.margin = margin
+        self.labels = tuple(labels)
+
+        self.summary = summarize_periods(_empty_periods())
+        self.params: Optional[np.ndarray] = None
+        self.cohorts: Optional[pd.Series] = None
+        self.last_id = 0
+        self._pairs = _empty_periods()[['customer_id', 'period']]
+        self._keys = np.empty(0, dtype=np.int64)
+
+    def _max_sale_id(self) -> int:
+        with db.get_read_connection(self.db_path) as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM sales").fetchone()[0]
+
+    def fit(self, now: Optional[int] = None) -> 'LTVEngine':
+        """Cargar la agregación completa y ajustar cohortes y BG/NBD"""
+        self.last_id = self._max_sale_id()
+        periods = load_customer_periods(self.db_path, before_id=self.last_id)
+        self._pairs = periods[['customer_id', 'period']]
+        self._keys = np.sort(_period_keys(periods))
+        self.summary = summarize_periods(periods)
+        return self.refit(now)
+
+    def refit(self, now: Optional[int] = None) -> 'LTVEngine':
+        """Recalcular cohortes y parámetros BG/NBD con el resumen acumulado"""
+        now = current_period() if now is None else now
+        if self.summary.empty:
+            self.params, self.cohorts = None, None
+            return self
+        self.cohorts = cohort_lifetimes(self._pairs, self.summary['first'], now, self.horizon)
+        x, t_x, T = self._rfm(self.summary, now)
+        self.params = fit_bgnbd(x, t_x, T)
+        return self
+
+    def update(self, now: Optional[int] = None) -> pd.DataFrame:
+        """Incorporar las ventas nuevas y devolver las puntuaciones de los clientes afectados"""
+        last_id = self._max_sale_id()
+        new = load_customer_periods(self.db_path, after_id=self.last_id, before_id=last_id)
+        self.last_id = last_id
+        if new.empty:
+            return self.scores(now, customer_ids=[])
+
+        # Pares (cliente, mes) que no se habían visto: suman un mes activo
+        keys = _period_keys(new)
+        positions = np.searchsorted(self._keys, keys).clip(max=max(len(self._keys) - 1, 0))
+        seen = self._keys[positions] == keys if len(self._keys) else np.zeros(len(keys), dtype=bool)
+        fresh = new[~seen]
+        self._keys = np.sort(np.concatenate([self._keys, keys[~seen]]))
+        self._pairs = pd.concat([self._pairs, fresh[['customer_id', 'period']]], ignore_index=True)
+
+        delta = summarize_periods(new)
+        delta['active'] = fresh.groupby('customer_id')['period'].count().reindex(delta.index, fill_value=0)
+        summary = self.summary.reindex(self.summary.index.union(delta.index))
+        current = summary.loc[delta.index]
+        summary.loc[delta.index, 'first'] = np.fmin(current['first'], delta['first'])
+        summary.loc[delta.index, 'last'] = np.fmax(current['last'], delta['last'])
+        for column in ('active', 'purchases', 'amount'):
+            summary.loc[delta.index, column] = current[column].fillna(0) + delta[column]
+        self.summary = summary.astype({'first': np.int64, 'last': np.int64, 'active': np.int64,
+                                       'purchases': np.int64})
+        return self.scores(now, customer_ids=delta.index)
+
+    @staticmethod
+    def _rfm(summary: pd.DataFrame, now: int):
+        first = summary['first'].to_numpy(np.float64)
+        x = summary['active'].to_numpy(np.float64) - 1
+        t_x = summary['last'].to_numpy(np.float64) - first
+        T = np.maximum(now - first, t_x)
+        return x, t_x, T
+
+    def scores(self, now: Optional[int] = None,
+               customer_ids: Optional[Sequence[int]] = None) -> pd.DataFrame:
+        """LTV y segmento de cada cliente (columnas calculadas sobre arrays).
+
+        El segmento se calcula sobre todos los clientes aunque se pidan solo
+        algunos, porque es relativo (cuantil de rango).
+        """
+        now = current_period() if now is None else now
+        summary = self.summary
+        x, t_x, T = self._rfm(summary, now)
+        monetary = summary['amount'].to_numpy(np.float64) / np.maximum(summary['active'].to_numpy(), 1) \
+            * self.margin
+
+        columns: Dict[str, np.ndarray] = {'frequency': x, 'recency': t_x, 'T': T, 'monetary': monetary}
+        if self.cohorts is not None and len(self.cohorts):
+            # Cohortes posteriores al ajuste: vida de la cohorte más reciente conocida
+            lifetime = summary['first'].map(self.cohorts).fillna(self.cohorts.iloc[-1]).to_numpy()
+            columns['ltv_cohort'] = lifetime * monetary
+        if self.params is not None:
+            predicted = bgnbd_predict(self.params, self.horizon, x, t_x, T)
+            columns['p_alive'] = predicted['p_alive']
+            columns['expected_purchases'] = predicted['expected_purchases']
+            columns['ltv_bgnbd'] = predicted['expected_purchases'] * monetary
+        ltv = columns.get('ltv_bgnbd', columns.get('ltv_cohort', np.full(len(summary), np.nan)))
+        columns['ltv'] = ltv
+        columns['ltv_segment'] = rank_segments(ltv, self.labels)
+
+        result = pd.DataFrame(columns, index=summary.index)
+        return result if customer_ids is None else result.loc[list(customer_ids)]
+
+
+def _empty_periods() -> pd.DataFrame:
+    return pd.DataFrame({'customer_id': pd.Series(dtype=np.int64), 'period': pd.Series(dtype=np.int64),
+                         'purchases': pd.Series(dtype=np.int64), 'amount': pd.Series(dtype=np.float64)})
+
+
+def _period_keys(periods: pd.DataFrame) -> np.ndarray:
+    """Clave entera única de cada par (cliente, mes)"""
+    return periods['customer_id'].to_numpy(np.int64) * _KEY_SHIFT + periods['period'].to_numpy(np.int64)
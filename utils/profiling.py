@@ -0,0 +1,281 @@
+# sistema_pyme/utils/profiling.py
+"""
+Perfilado de datos en una pasada con acumuladores combinables.
+
+Cada bloque de un archivo (o un DataFrame entero, que es un único bloque)
+actualiza por columna: nulos, min/max, media y varianza (combinación de
+Chan/Welford), valores distintos (exactos hasta un límite y después
+HyperLogLog) y una muestra uniforme bottom-k para los cuantiles. Las filas
+duplicadas se cuentan siempre de forma exacta sobre el conjunto de hashes
+de 64 bits de cada fila (8 bytes por fila distinta): restar una estimación
+HyperLogLog del total de filas daría un número de duplicados sin sentido.
+Los acumuladores se combinan con merge(), de modo que se pueden perfilar
+archivos grandes por bloques o repartir los bloques entre procesos.
+"""
+import math
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+_HASH_KEY = '0123456789abcdef'
+
+
+def _hash_values(values: pd.Series) -> np.ndarray:
+    return pd.util.hash_pandas_object(values, index=False, hash_key=_HASH_KEY).to_numpy(dtype=np.uint64)
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """bit_length de enteros uint64 (exacto: frexp sobre mitades de 32 bits)"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+
+
+class DistinctCounter:
+    """Valores distintos: conjunto exacto de hashes hasta exact_limit, luego HyperLogLog"""
+
+    def __init__(self, precision: int = 12, exact_limit: int = 100_000):
+        self.precision = precision
+        self.exact_limit = exact_limit
+        self._hashes: Optional[np.ndarray] = np.empty(0, dtype=np.uint64)
+        self._registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def exact(self) -> bool:
+        return self._hashes is not None
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        hashes = pd.unique(hashes)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        remaining = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        rank = ((64 - self.precision) - _bit_length(remaining) + 1).astype(np.intp)
+
+        # Máximo rango por registro sin np.maximum.at: marcar (registro, rango)
+        # en una matriz de bits y tomar la última columna marcada de cada fila
+        seen = np.zeros((len(self._registers), 66 - self.precision), dtype=bool)
+        seen[index, rank] = True
+        has_rank = seen.any(axis=1)
+        highest = seen.shape[1] - 1 - np.argmax(seen[:, ::-1], axis=1)
+        np.maximum(self._registers, np.where(has_rank, highest, 0).astype(np.uint8), out=self._registers)
+
+        if self._hashes is not None:
+            if len(hashes) > self.exact_limit:
+                self._hashes = None
+            else:
+                self._hashes = np.union1d(self._hashes, hashes)
+                if len(self._hashes) > self.exact_limit:
+                    self._hashes = None
+
+    def merge(self, other: 'DistinctCounter') -> None:
+        np.maximum(self._registers, other._registers, out=self._registers)
+        if self._hashes is not None and other._hashes is not None:
+            self._hashes = np.union1d(self._hashes, other._hashes)
+            if len(self._hashes) > self.exact_limit:
+                self._hashes = None
+        else:
+            self._hashes = None
+
+    def count(self) -> int:
+        if self._hashes is not None:
+            return int(len(self._hashes))
+        m = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self._registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self._registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # corrección para rangos pequeños
+        return int(round(estimate))
+
+
+class HashSet:
+    """Conjunto exacto de hashes de 64 bits.
+
+    Los hashes de cada bloque se guardan aparte y se unen cuando ocupan
+    tanto como lo ya unido, así el coste total sigue siendo lineal.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._pending = 0
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        self._parts.append(pd.unique(hashes))
+        self._pending += len(self._parts[-1])
+        if len(self._parts) > 1 and self._pending >= len(self._parts[0]):
+            self._compact()
+
+    def merge(self, other: 'HashSet') -> None:
+        for part in other._parts:
+            self.add_hashes(part)
+
+    def _compact(self) -> None:
+        if len(self._parts) > 1:
+            self._parts = [pd.unique(np.concatenate(self._parts))]
+        self._pending = 0
+
+    def count(self) -> int:
+        self._compact()
+        return int(len(self._parts[0])) if self._parts else 0
+
+
+class ColumnAccumulator:
+    """Estadísticas de una columna que se actualizan por bloques y se combinan"""
+
+    def __init__(self, sample_size: int = 10_000, precision: int = 12,
+                 exact_limit: int = 100_000, seed: int = 0):
+        self.sample_size = sample_size
+        self.dtype: Optional[str] = None
+        self.count = 0
+        self.nulls = 0
+        self.numeric_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.distinct = DistinctCounter(precision, exact_limit)
+        self._rng = np.random.default_rng(seed)
+        self._sample = np.empty(0, dtype=np.float64)
+        self._sample_keys = np.empty(0, dtype=np.float64)
+
+    def update(self, series: pd.Series) -> None:
+        self.dtype = str(series.dtype)
+        nulls = series.isna().to_numpy()
+        self.count += len(series)
+        self.nulls += int(nulls.sum())
+        self.distinct.add_hashes(_hash_values(series[~nulls]))
+
+        if not pd.api.types.is_numeric_dtype(series):
+            return
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)[~nulls]
+        if len(values) == 0:
+            return
+
+        # Combinación de Chan: (n, media, M2) del bloque con los acumulados
+        n = len(values)
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(((values - chunk_mean) ** 2).sum())
+        self._combine(n, chunk_mean, chunk_m2, float(values.min()), float(values.max()))
+
+        # Muestra bottom-k: los sample_size valores con menor clave aleatoria
+        self._add_sample(values, self._rng.random(n))
+
+    def _combine(self, n: int, mean: float, m2: float, minimum: float, maximum: float) -> None:
+        total = self.numeric_count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.numeric_count * n / total
+        self.numeric_count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    def _add_sample(self, values: np.ndarray, keys: np.ndarray) -> None:
+        values = np.concatenate([self._sample, values])
+        keys = np.concatenate([self._sample_keys, keys])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            values, keys = values[keep], keys[keep]
+        self._sample, self._sample_keys = values, keys
+
+    def merge(self, other: 'ColumnAccumulator') -> None:
+        self.dtype = self.dtype or other.dtype
+        self.count += other.count
+        self.nulls += other.nulls
+        self.distinct.merge(other.distinct)
+        if other.numeric_count:
+            self._combine(other.numeric_count, other.mean, other.m2, other.min, other.max)
+            self._add_sample(other._sample, other._sample_keys)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Cuantil exacto si todos los valores caben en la muestra; aproximado si no"""
+        if len(self._sample) == 0:
+            return None
+        return float(np.quantile(self._sample, q))
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {
+            "data_type": self.dtype,
+            "missing_values": self.nulls,
+            "missing_percentage": (self.nulls / self.count) * 100 if self.count else 0.0,
+            "unique_values": self.distinct.count(),
+            "unique_values_exact": self.distinct.exact,
+        }
+        if self.numeric_count:
+            summary.update({
+                "min": self.min,
+                "max": self.max,
+                "mean": self.mean,
+                "median": self.quantile(0.5),
+                "std": math.sqrt(self.m2 / (self.numeric_count - 1)) if self.numeric_count > 1 else float('nan'),
+                "median_exact": self.numeric_count <= self.sample_size,
+            })
+        return summary
+
+
+class DataProfiler:
+    """Perfil de un conjunto de datos alimentado por bloques"""
+
+    def __init__(self, sample_size: int = 10_000, precision: int = 12,
+                 exact_limit: int = 100_000, seed: int = 0):
+        self._options = dict(sample_size=sample_size, precision=precision,
+                             exact_limit=exact_limit)
+        self._seed = seed
+        self.rows = 0
+        self.columns: Dict[str, ColumnAccumulator] = {}
+        self.row_hashes = HashSet()
+
+    def update(self, chunk: pd.DataFrame) -> 'DataProfiler':
+        self.rows += len(chunk)
+        for position, col in enumerate(chunk.columns):
+            accumulator = self.columns.get(col)
+            if accumulator is None:
+                accumulator = self.columns[col] = ColumnAccumulator(seed=self._seed + position,
+                                                                    **self._options)
+            accumulator.update(chunk[col])
+        if len(chunk.columns):
+            self.row_hashes.add_hashes(
+                pd.util.hash_pandas_object(chunk, index=False, hash_key=_HASH_KEY).to_numpy(dtype=np.uint64)
+            )
+        return self
+
+    def merge(self, other: 'DataProfiler') -> 'DataProfiler':
+        self.rows += other.rows
+        for col, accumulator in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(accumulator)
+            else:
+                self.columns[col] = accumulator
+        self.row_hashes.merge(other.row_hashes)
+        return self
+
+    def profile(self) -> Dict[str, Any]:
+        """Perfil con la misma estructura que DataProcessor.generate_data_profile"""
+        missing = sum(acc.nulls for acc in self.columns.values())
+        cells = self.rows * len(self.columns)
+        dtype_counts: Dict[str, int] = {}
+        for acc in self.columns.values():
+            dtype_counts[acc.dtype] = dtype_counts.get(acc.dtype, 0) + 1
+
+        return {
+            "general": {
+                "total_rows": self.rows,
+                "total_columns": len(self.columns),
+                "missing_values": missing,
+                "missing_percentage": (missing / cells) * 100 if cells else 0.0,
+                "duplicate_rows": max(self.rows - self.row_hashes.count(), 0),
+            },
+            "columns": {col: acc.summary() for col, acc in self.columns.items()},
+            "data_types": dtype_counts,
+        }
+
+
+def profile_chunks(chunks: Iterable[pd.DataFrame], **options: Any) -> Dict[str, Any]:
+    """Perfilar un iterable de bloques (p. ej. utils.ingestion.iter_chunks)"""
+    profiler = DataProfiler(**options)
+    for chunk in chunks:
+        profiler.update(chunk)
+    return profiler.profile()
@@ -0,0 +1,257 @@
+# sistema_pyme/utils/rollups.py
+"""
+Rollups materializados de ventas para las series temporales.
+
+sales_daily guarda importe, unidades y número de ventas por (negocio, día)
+y sales_monthly_product por (negocio, mes, producto). Las gráficas y
+reportes leen los rollups en lugar de reagrupar sales en cada render: un
+rango de años son unos cientos de filas por negocio.
+
+Mantenimiento incremental:
+- UPDATE y DELETE sobre sales: triggers de la migración 9.
+- INSERT: quien inserta llama a add_sales con el rango de ids insertados
+  dentro de la misma transacción (create_sale de la API y StreamingImporter).
+
+El backfill (migración 9 o el comando backfill) vacía los rollups y suma
+sales por tramos de ids, cada uno en su transacción. El tramo pendiente
+queda en sales_rollup_backfill: hasta que el backfill lo alcanza, los
+triggers y add_sales ignoran esas ventas, así que cada venta se cuenta una
+sola vez aunque la aplicación siga escribiendo durante el backfill.
+
+Las inserciones hechas por otros caminos quedan fuera hasta el siguiente
+backfill; check_sales_rollups detecta cualquier desviación:
+
+    python -m utils.rollups check [ruta_db]
+    python -m utils.rollups backfill [ruta_db]
+"""
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import database as db
+from lazy_imports import lazy_import
+from migrations import (BACKFILL_CHUNK_ROWS, BACKFILL_PAUSE, SALES_DATE_PATTERN, SALES_ROLLUP_PENDING,
+                        SALES_ROLLUPS)
+from utils.kpi_engine import EXPENSE_TYPES, INCOME_TYPES
+
+# pandas solo hace falta para las consultas de series: la API importa add_sales
+# y arranca sin cargarlo
+pd = lazy_import('pandas')
+
+DateLike = Union[str, date]
+
+
+def _keys(rollup: str, row: str = 'sales') -> Dict[str, str]:
+    return {key: expression.format(row=row) for key, expression in SALES_ROLLUPS[rollup].items()}
+
+
+def _aggregate_sql(rollup: str, where: str = "1") -> str:
+    """Agregación de sales con las claves de rollup"""
+    keys = _keys(rollup)
+    return (f"SELECT {', '.join(keys.values())}, TOTAL(amount), TOTAL(quantity), COUNT(*) FROM sales "
+            f"WHERE date GLOB '{SALES_DATE_PATTERN}' AND {where} "
+            f"GROUP BY {', '.join(str(position) for position in range(1, len(keys) + 1))}")
+
+
+def _upsert_sql(rollup: str, where: str = "1") -> str:
+    columns = ', '.join(SALES_ROLLUPS[rollup])
+    return (f"INSERT INTO {rollup} ({columns}, amount, quantity, sales_count) {_aggregate_sql(rollup, where)} "
+            f"ON CONFLICT ({columns}) DO UPDATE SET amount = amount + excluded.amount, "
+            f"quantity = quantity + excluded.quantity, sales_count = sales_count + excluded.sales_count")
+
+
+def add_sales(conn: sqlite3.Connection, first_id: int, last_id: int) -> None:
+    """Sumar a los rollups las ventas recién insertadas con id en [first_id, last_id]"""
+    where = f"id BETWEEN :first_id AND :last_id AND NOT ({SALES_ROLLUP_PENDING.format(id='sales.id')})"
+    for rollup in SALES_ROLLUPS:
+        conn.execute(_upsert_sql(rollup, where), {'first_id': first_id, 'last_id': last_id})
+
+
+def start_rollup_backfill(conn: sqlite3.Connection) -> None:
+    """Vaciar los rollups y dejar todas las ventas actuales pendientes de sumar"""
+    for rollup in SALES_ROLLUPS:
+        conn.execute(f"DELETE FROM {rollup}")
+    first_id, last_id = conn.execute("SELECT MIN(id), MAX(id) FROM sales").fetchone()
+    conn.execute("INSERT OR REPLACE INTO sales_rollup_backfill (id, next_id, end_id) VALUES (1, ?, ?)",
+                 (first_id or 1, last_id or 0))
+
+
+def add_rollup_backfill_chunk(conn: sqlite3.Connection, limit: int = BACKFILL_CHUNK_ROWS) -> bool:
+    """Sumar a los rollups las siguientes limit ventas pendientes (en la transacción de conn).
+
+    Devuelve True cuando no queda ninguna.
+    """
+    state = conn.execute("SELECT next_id, end_id FROM sales_rollup_backfill").fetchone()
+    if state is None:
+        return True
+    next_id, end_id = state
+    # Último id del tramo: la limit-ésima venta pendiente (los ids pueden tener huecos)
+    row = conn.execute("SELECT id FROM sales WHERE id BETWEEN ? AND ? ORDER BY id LIMIT 1 OFFSET ?",
+                       (next_id, end_id, limit - 1)).fetchone()
+    last_id = end_id if row is None else row[0]
+    for rollup in SALES_ROLLUPS:
+        conn.execute(_upsert_sql(rollup, "id BETWEEN :first_id AND :last_id"),
+                     {'first_id': next_id, 'last_id': last_id})
+    if last_id >= end_id:
+        conn.execute("DELETE FROM sales_rollup_backfill")
+        return True
+    conn.execute("UPDATE sales_rollup_backfill SET next_id = ?", (last_id + 1,))
+    return False
+
+
+def backfill_sales_rollups(db_path: str = db.DEFAULT_DB_PATH, chunk_rows: int = BACKFILL_CHUNK_ROWS,
+                           pause: float = BACKFILL_PAUSE) -> Dict[str, int]:
+    """Reconstruir los rollups por tramos de chunk_rows ventas; devuelve las filas de cada uno"""
+    pool = db.get_pool(db_path)
+    with pool.writer() as conn:
+        start_rollup_backfill(conn)
+    while True:
+        with pool.writer() as conn:
+            if add_rollup_backfill_chunk(conn, chunk_rows):
+                break
+        time.sleep(pause)
+    with pool.reader() as conn:
+        return {rollup: conn.execute(f"SELECT COUNT(*) FROM {rollup}").fetchone()[0] for rollup in SALES_ROLLUPS}
+
+
+def check_sales_rollups(db_path: str = db.DEFAULT_DB_PATH, tolerance: float = 0.005,
+                        limit: int = 100) -> Dict[str, List[Tuple[Any, ...]]]:
+    """Claves de cada rollup que no coinciden con una agregación nueva de sales.
+
+    Cada diferencia es (claves..., guardado, esperado) con las tuplas
+    (importe, unidades, ventas); None si la fila falta de un lado.
+    """
+    mismatches: Dict[str, List[Tuple[Any, ...]]] = {}
+    with db.get_read_connection(db_path) as conn:
+        for rollup in SALES_ROLLUPS:
+            keys = list(SALES_ROLLUPS[rollup])
+            aliases = ', '.join(keys + ['amount', 'quantity', 'sales_count'])
+            join = ' AND '.join(f"r.{key} = f.{key}" for key in keys)
+            query = (f"WITH fresh({aliases}) AS ({_aggregate_sql(rollup)}) "
+                     f"SELECT {', '.join(f'COALESCE(r.{key}, f.{key})' for key in keys)}, "
+                     f"r.amount, r.quantity, r.sales_count, f.amount, f.quantity, f.sales_count "
+                     f"FROM {rollup} r FULL OUTER JOIN fresh f ON {join} "
+                     f"WHERE r.sales_count IS NOT f.sales_count "
+                     f"OR ABS(r.amount - f.amount) > :tolerance OR ABS(r.quantity - f.quantity) > :tolerance "
+                     f"LIMIT :limit")
+            rows = conn.execute(query, {'tolerance': tolerance, 'limit': limit}).fetchall()
+            mismatches[rollup] = [
+                tuple(row[:len(keys)])
+                + (None if row[len(keys) + 2] is None else tuple(row[len(keys):len(keys) + 3]),
+                   None if row[len(keys) + 5] is None else tuple(row[len(keys) + 3:]))
+                for row in rows
+            ]
+    return mismatches
+
+
+# ----------------------------------------------------------------------
+# Consultas de series
+# ----------------------------------------------------------------------
+def _day(value: DateLike) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _quoted(values: Tuple[str, ...]) -> str:
+    return ", ".join(f"'{value}'" for value in values)
+
+
+def _business_filter(business_id: Optional[int], column: str = "business_id") -> str:
+    return "" if business_id is None else f" AND {column} = :business_id"
+
+
+def daily_sales(conn: sqlite3.Connection, start: DateLike, end: DateLike,
+                business_id: Optional[int] = None) -> 'pd.DataFrame':
+    """Importe, unidades y ventas de cada día de [start, end] (solo días con ventas)"""
+    query = ("SELECT day, TOTAL(amount) AS amount, TOTAL(quantity) AS quantity, "
+             "TOTAL(sales_count) AS sales_count FROM sales_daily WHERE day BETWEEN :start AND :end"
+             + _business_filter(business_id) + " GROUP BY day ORDER BY day")
+    params = {'start': _day(start).isoformat(), 'end': _day(end).isoformat(), 'business_id': business_id}
+    return pd.DataFrame([tuple(row) for row in conn.execute(query, params)],
+                        columns=['day', 'amount', 'quantity', 'sales_count'])
+
+
+def monthly_sales(conn: sqlite3.Connection, start_month: str, end_month: str,
+                  business_id: Optional[int] = None) -> 'pd.DataFrame':
+    """Importe, unidades y ventas de cada mes 'AAAA-MM' de [start_month, end_month]"""
+    query = ("SELECT month, TOTAL(amount) AS amount, TOTAL(quantity) AS quantity, "
+             "TOTAL(sales_count) AS sales_count FROM sales_monthly_product "
+             "WHERE month BETWEEN :start AND :end" + _business_filter(business_id)
+             + " GROUP BY month ORDER BY month")
+    params = {'start': start_month, 'end': end_month, 'business_id': business_id}
+    return pd.DataFrame([tuple(row) for row in conn.execute(query, params)],
+                        columns=['month', 'amount', 'quantity', 'sales_count'])
+
+
+def _month_start(day: date, months: int = 0) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def product_sales(conn: sqlite3.Connection, start: DateLike, end: DateLike,
+                  business_id: Optional[int] = None, limit: Optional[int] = None) -> 'pd.DataFrame':
+    """Totales por producto de [start, end], de mayor a menor importe.
+
+    Los meses completos del rango salen de sales_monthly_product; solo los
+    días sueltos de los extremos se leen de sales (por idx_sales_date).
+    """
+    start, end = _day(start), _day(end)
+    full_from = start if start.day == 1 else _month_start(start, 1)
+    full_to = _month_start(end + timedelta(days=1))  # primer día después del último mes completo
+    if full_from >= full_to:
+        full_from = full_to = _month_start(start, 1)
+        raw = "(date >= :start AND date < :end_next)"
+    else:
+        raw = "((date >= :start AND date < :full_from) OR (date >= :full_to AND date < :end_next))"
+    query = (
+        "SELECT product, TOTAL(amount) AS amount, TOTAL(quantity) AS quantity, TOTAL(sales_count) AS sales_count "
+        "FROM (SELECT product, amount, quantity, sales_count FROM sales_monthly_product "
+        "WHERE month >= :full_from_month AND month < :full_to_month" + _business_filter(business_id) + " "
+        "UNION ALL SELECT COALESCE(product, ''), amount, quantity, 1 FROM sales "
+        f"WHERE {raw} AND date GLOB '{SALES_DATE_PATTERN}'"
+        + _business_filter(business_id, "COALESCE(business_id, 0)") + ") "
+        "GROUP BY product ORDER BY amount DESC" + ("" if limit is None else " LIMIT :limit")
+    )
+    params = {
+        'start': start.isoformat(), 'end_next': (end + timedelta(days=1)).isoformat(),
+        'full_from': full_from.isoformat(), 'full_to': full_to.isoformat(),
+        'full_from_month': full_from.isoformat()[:7], 'full_to_month': full_to.isoformat()[:7],
+        'business_id': business_id, 'limit': limit,
+    }
+    return pd.DataFrame([tuple(row) for row in conn.execute(query, params)],
+                        columns=['product', 'amount', 'quantity', 'sales_count'])
+
+
+def finance_series(conn: sqlite3.Connection, start: DateLike, end: DateLike, period: str = 'day') -> 'pd.DataFrame':
+    """Ingresos y gastos de finances por día o por mes de [start, end].
+
+    finances es pequeña y no tiene rollup: se agrupa directamente.
+    """
+    width = {'day': 10, 'month': 7}[period]
+    query = (f"SELECT substr(date, 1, {width}) AS period, "
+             f"TOTAL(amount) FILTER (WHERE LOWER(type) IN ({_quoted(INCOME_TYPES)})) AS income, "
+             f"TOTAL(amount) FILTER (WHERE LOWER(type) IN ({_quoted(EXPENSE_TYPES)})) AS expense "
+             f"FROM finances WHERE date >= :start AND date < :end_next GROUP BY 1 ORDER BY 1")
+    params = {'start': _day(start).isoformat(), 'end_next': (_day(end) + timedelta(days=1)).isoformat()}
+    return pd.DataFrame([tuple(row) for row in conn.execute(query, params)],
+                        columns=['period', 'income', 'expense'])
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'check'
+    db_path = sys.argv[2] if len(sys.argv) > 2 else db.DEFAULT_DB_PATH
+    db.init_db(db_path)
+    if command == 'backfill':
+        for name, rows in backfill_sales_rollups(db_path).items():
+            print(f"✅ {name}: {rows} filas")
+    elif command == 'check':
+        problems = check_sales_rollups(db_path)
+        for name, rows in problems.items():
+            print(f"{'✅' if not rows else '❌'} {name}: {len(rows)} diferencias")
+            for row in rows[:10]:
+                print(f"   {row}")
+        sys.exit(1 if any(problems.values()) else 0)
+    else:
+        print(f"❌ Comando desconocido: {command} (use check o backfill)")
+        sys.exit(2)
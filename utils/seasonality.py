@@ -0,0 +1,107 @@
+# sistema_pyme/utils/seasonality.py
+"""
+Autocorrelación de muchas series a la vez por FFT.
+
+La ACF completa de una serie de n puntos sale de un único par FFT/IFFT
+del espectro de potencia (teorema de Wiener-Khinchin) en O(n log n), en
+lugar de una correlación completa por retardo. Las series se procesan
+como filas de una matriz, de modo que un catálogo entero es una sola
+llamada a numpy.fft.
+
+Las bandas de significación son las de Bartlett: bajo la hipótesis de
+que no hay autocorrelación más allá del retardo k-1, r_k tiene varianza
+(1 + 2·Σ r_j²) / n.
+"""
+from statistics import NormalDist
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def _as_matrix(values: Any) -> np.ndarray:
+    matrix = np.asarray(values, dtype=np.float64)
+    return matrix[None, :] if matrix.ndim == 1 else matrix
+
+
+def acf(values: Any, max_lag: int) -> np.ndarray:
+    """ACF de cada fila para los retardos 0..max_lag (series x (max_lag + 1)).
+
+    Los NaN se sustituyen por la media de su fila, así que no aportan
+    correlación.
+    """
+    y = _as_matrix(values)
+    n = y.shape[1]
+    means = np.nanmean(y, axis=1, keepdims=True) if np.isnan(y).any() else y.mean(axis=1, keepdims=True)
+    centered = np.nan_to_num(y - means)
+
+    # Relleno con ceros hasta >= 2n: evita que la correlación circular se solape
+    size = 1 << int(np.ceil(np.log2(max(2 * n - 1, 1))))
+    spectrum = np.fft.rfft(centered, n=size, axis=1)
+    autocov = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=1)[:, :max_lag + 1]
+    variance = autocov[:, :1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(variance > 0, autocov / variance, 0.0)
+
+
+def bartlett_bands(correlations: np.ndarray, n_obs: int, alpha: float = 0.05) -> np.ndarray:
+    """Semiancho de la banda de significación de cada retardo (misma forma que correlations)"""
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    squares = correlations[:, 1:] ** 2
+    # Var(r_k) = (1 + 2·Σ_{j<k} r_j²) / n
+    cumulative = np.concatenate([np.zeros((len(correlations), 1)), np.cumsum(squares, axis=1)[:, :-1]], axis=1)
+    bands = np.zeros_like(correlations)
+    bands[:, 1:] = z * np.sqrt((1 + 2 * cumulative) / n_obs)
+    return bands
+
+
+def seasonality_scan(values: Any, max_lag: int = 12, min_lag: int = 1, alpha: float = 0.05,
+                     min_correlation: float = 0.0) -> Dict[str, np.ndarray]:
+    """ACF, bandas, retardos significativos y periodo estacional de cada fila.
+
+    Un retardo es significativo si su |r| supera la banda de Bartlett y
+    min_correlation. El periodo estacional es el primer pico local positivo
+    y significativo a partir del retardo 2 (los múltiplos del periodo
+    también correlacionan); 1 si no hay ninguno.
+    """
+    y = _as_matrix(values)
+    max_lag = min(max_lag, y.shape[1] - 1)
+    # Un retardo más para poder decidir si max_lag es un pico
+    correlations = acf(y, max_lag + 1) if max_lag + 1 < y.shape[1] else acf(y, max_lag)
+    bands = bartlett_bands(correlations, y.shape[1], alpha)
+    significant = (np.abs(correlations) > np.maximum(bands, min_correlation))
+    significant[:, :max(min_lag, 1)] = False
+
+    padded = np.concatenate([correlations, np.full((len(y), 2), -np.inf)], axis=1)
+    lags = np.arange(correlations.shape[1])
+    peaks = significant & (correlations > 0) & (lags >= 2) \
+        & (correlations >= padded[:, lags - 1]) & (correlations >= padded[:, lags + 1])
+    peaks = peaks[:, :max_lag + 1]
+    season = np.where(peaks.any(axis=1), peaks.argmax(axis=1), 1)
+
+    return {
+        "lags": lags[:max_lag + 1],
+        "acf": correlations[:, :max_lag + 1],
+        "bands": bands[:, :max_lag + 1],
+        "significant": significant[:, :max_lag + 1],
+        "season_length": season,
+    }
+
+
+def seasonality_report(values: Any, max_lag: int = 12, min_lag: int = 1, alpha: float = 0.05,
+                       min_correlation: float = 0.5, scan: Optional[Dict[str, np.ndarray]] = None,
+                       row: int = 0) -> Dict[str, Any]:
+    """Resultado de una serie con el formato de AnalyticsEngine.detect_seasonality"""
+    if scan is None:
+        scan = seasonality_scan(values, max_lag, min_lag, alpha, min_correlation)
+    start = max(min_lag, 1)
+    autocorr = [{"lag": int(lag), "correlation": float(scan["acf"][row, lag])}
+                for lag in scan["lags"][start:]]
+    significant_lags = [ac for ac in autocorr if scan["significant"][row, ac["lag"]]]
+    return {
+        "autocorrelation": autocorr,
+        "significant_lags": significant_lags,
+        "has_seasonality": len(significant_lags) > 0,
+        "confidence_bands": [{"lag": int(lag), "band": float(scan["bands"][row, lag])}
+                             for lag in scan["lags"][start:]],
+        "season_length": int(scan["season_length"][row]),
+    }
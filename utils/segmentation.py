@@ -0,0 +1,168 @@
+# sistema_pyme/utils/segmentation.py
+"""
+Segmentación de clientes con MiniBatchKMeans y modelo persistente.
+
+El modelo se entrena una vez (fit) y se guarda en data/models junto con el
+escalador; después se actualiza con partial_fit a medida que cambian los
+clientes, sin reentrenar desde cero. El escalador queda fijo tras el
+primer entrenamiento para que los centroides sigan en el mismo espacio.
+
+Asignar un cliente nuevo es calcular su distancia a los k centroides
+(predict, O(k) por cliente con NumPy). Las asignaciones se devuelven como
+arrays y se escriben en customers.segment en una sola transacción.
+"""
+import os
+from typing import Any, Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+import database as db
+
+FEATURES = ('total_spent', 'purchase_frequency', 'last_purchase_days')
+DEFAULT_MODEL_PATH = os.path.join('data', 'models', 'customer_segments.joblib')
+SEGMENT_NAMES = {3: ['Básico', 'Regular', 'Premium']}
+
+Features = Union[pd.DataFrame, np.ndarray]
+
+
+class CustomerSegmenter:
+    """Modelo de segmentación: escalador + centroides de MiniBatchKMeans"""
+
+    def __init__(self, n_clusters: int = 3, model_path: Optional[str] = DEFAULT_MODEL_PATH,
+                 batch_size: int = 4096, random_state: int = 42,
+                 features: Sequence[str] = FEATURES):
+        self.n_clusters = n_clusters
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.random_state = random_state
+        self.features = list(features)
+        self.scaler = None
+        self.kmeans = None
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.kmeans is not None and hasattr(self.kmeans, 'cluster_centers_')
+
+    def _matrix(self, data: Features) -> np.ndarray:
+        if isinstance(data, pd.DataFrame):
+            data = data[self.features].to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.asarray(data, dtype=np.float64)
+
+    def _new_kmeans(self):
+        from sklearn.cluster import MiniBatchKMeans
+
+        return MiniBatchKMeans(n_clusters=self.n_clusters, batch_size=self.batch_size,
+                               random_state=self.random_state, n_init=3)
+
+    def fit(self, data: Features) -> 'CustomerSegmenter':
+        """Entrenar desde cero (las filas con valores faltantes se ignoran)"""
+        from sklearn.preprocessing import StandardScaler
+
+        X = self._matrix(data)
+        X = X[~np.isnan(X).any(axis=1)]
+        if len(X) < self.n_clusters:
+            raise ValueError(f"Se necesitan al menos {self.n_clusters} clientes para segmentación")
+        self.scaler = StandardScaler().fit(X)
+        self.kmeans = self._new_kmeans().fit(self.scaler.transform(X))
+        return self
+
+    def partial_fit(self, data: Features) -> 'CustomerSegmenter':
+        """Actualizar los centroides con clientes nuevos o modificados"""
+        X = self._matrix(data)
+        X = X[~np.isnan(X).any(axis=1)]
+        if not self.is_fitted:
+            return self.fit(X)
+        if len(X):
+            self.kmeans.partial_fit(self.scaler.transform(X))
+        return self
+
+    @property
+    def centroids(self) -> np.ndarray:
+        """Centroides en las unidades originales de las características"""
+        return self.scaler.inverse_transform(self.kmeans.cluster_centers_)
+
+    def predict(self, data: Features) -> np.ndarray:
+        """Cluster de cada fila por distancia a los k centroides (-1 si faltan valores)"""
+        X = self._matrix(data)
+        scaled = (X - self.scaler.mean_) / self.scaler.scale_
+        centers = self.kmeans.cluster_centers_
+        # |x - c|² = |x|² - 2·x·c + |c|²; |x|² no cambia el argmin
+        distances = (centers * centers).sum(axis=1) - 2 * np.nan_to_num(scaled) @ centers.T
+        labels = distances.argmin(axis=1)
+        labels[np.isnan(X).any(axis=1)] = -1
+        return labels
+
+    def segment_names(self) -> np.ndarray:
+        """Nombre de cada cluster, ordenados por la primera característica (gasto) del centroide"""
+        names = SEGMENT_NAMES.get(self.n_clusters) or [f"Segmento {i + 1}" for i in range(self.n_clusters)]
+        order = np.argsort(self.centroids[:, 0])
+        result = np.empty(self.n_clusters, dtype=object)
+        result[order] = names
+        return result
+
+    def summarize(self, data: Features, labels: np.ndarray) -> Dict[int, Dict[str, Any]]:
+        """Tamaño y media de cada característica por cluster (np.bincount, sin copiar el frame)"""
+        X = self._matrix(data)
+        valid = labels >= 0
+        sizes = np.bincount(labels[valid], minlength=self.n_clusters)
+        summary = {}
+        for cluster_id in range(self.n_clusters):
+            summary[cluster_id] = {"size": int(sizes[cluster_id])}
+        for position, feature in enumerate(self.features):
+            sums = np.bincount(labels[valid], weights=X[valid, position], minlength=self.n_clusters)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                means = sums / sizes
+            for cluster_id in range(self.n_clusters):
+                summary[cluster_id][feature] = float(means[cluster_id])
+        return summary
+
+    def save(self, path: Optional[str] = None) -> str:
+        """Guardar escalador y modelo (escritura atómica: tmp + os.replace)"""
+        import joblib
+
+        path = path or self.model_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        joblib.dump({'n_clusters': self.n_clusters, 'features': self.features,
+                     'scaler': self.scaler, 'kmeans': self.kmeans}, path + '.tmp')
+        os.replace(path + '.tmp', path)
+        return path
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH, **options: Any) -> Optional['CustomerSegmenter']:
+        """Modelo guardado en path, o None si no existe"""
+        if not os.path.exists(path):
+            return None
+        import joblib
+
+        state = joblib.load(path)
+        segmenter = cls(n_clusters=state['n_clusters'], model_path=path,
+                        features=state['features'], **options)
+        segmenter.scaler, segmenter.kmeans = state['scaler'], state['kmeans']
+        return segmenter
+
+
+def write_segments(db_path: str, customer_ids: Sequence[int], segments: Sequence[Optional[str]]) -> int:
+    """Escribir el segmento de cada cliente en customers.segment en una transacción"""
+    rows = [(segment, int(customer_id)) for customer_id, segment in zip(customer_ids, segments)]
+    with db.get_pool(db_path).writer() as conn:
+        conn.executemany("UPDATE customers SET segment = ? WHERE id = ?", rows)
+    return len(rows)
+
+
+def segment_and_store(db_path: str, features: pd.DataFrame,
+                      segmenter: Optional[CustomerSegmenter] = None) -> np.ndarray:
+    """Asignar segmento a los clientes de features (índice = customers.id) y guardarlo.
+
+    Usa el modelo guardado si existe (actualizándolo con partial_fit) o
+    entrena uno nuevo; devuelve el cluster de cada fila.
+    """
+    segmenter = segmenter or CustomerSegmenter.load() or CustomerSegmenter()
+    segmenter.partial_fit(features)
+    labels = segmenter.predict(features)
+    names = segmenter.segment_names()
+    valid = labels >= 0
+    write_segments(db_path, features.index[valid], names[labels[valid]])
+    if segmenter.model_path:
+        segmenter.save()
+    return labels
@@ -1,76 +1,80 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import time
-import random
-
-def scrape_potential_leads():
-    """
-    Función para hacer web scraping de leads potenciales
-    Nota: En producción, asegúrate de cumplir con robots.txt y términos de servicio
-    """
-    
-    # Simulación de datos (en producción aquí harías scraping real)
-    leads = [
-        {
-            'nombre': 'Laura Martínez',
-            'empresa': 'Cafetería Central',
-            'telefono': '+507 6123-4567',
-            'email': 'laura@cafeteria-central.com',
-            'fuente': 'Directorio Local',
-            'notas': 'Interesada en sistema de inventario para cafetería'
-        },
-        {
-            'nombre': 'Juan Pérez',
-            'empresa': 'Tienda de Ropa Fashion',
-            'telefono': '+507 6789-0123',
-            'email': 'juan@tiendafashion.com',
-            'fuente': 'Redes Sociales',
-            'notas': 'Busca solución de punto de venta y gestión de clientes'
-        },
-        {
-            'nombre': 'Marta Rodríguez',
-            'empresa': 'Farmacia Salud Total',
-            'telefono': '+507 6456-7890',
-            'email': 'marta@farmaciasalud.com',
-            'fuente': 'Recomendación',
-            'notas': 'Necesita control de inventario para medicamentos y productos'
-        }
-    ]
-    
-    # Simular delay de scraping
-    time.sleep(2)
-    
-    return leads
-
-# Ejemplo de función real de scraping (comentada por ética)
-"""
-def real_scrape_example():
-    # Ejemplo ético de scraping (solo para sitios que lo permitan)
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get('https://ejemplo.com/directorio-empresas', headers=headers)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Extraer información (ajustar selectores según el sitio)
-        companies = soup.find_all('div', class_='company-card')
-        
-        leads = []
-        for company in companies:
-            name = company.find('h2').text.strip()
-            # ... más extracción de datos
-            
-            leads.append({
-                'nombre': name,
-                # ... más campos
-            })
-        
-        return leads
-        
-    except Exception as e:
-        print(f"Error en scraping: {e}")
-        return []
+import pandas as pd
+import time
+import random
+
+from lazy_imports import lazy_import
+
+# requests y bs4 se importan al lanzar el scraping, no al abrir el CRM
+requests = lazy_import('requests')
+bs4 = lazy_import('bs4')
+
+def scrape_potential_leads():
+    """
+    Función para hacer web scraping de leads potenciales
+    Nota: En producción, asegúrate de cumplir con robots.txt y términos de servicio
+    """
+    
+    # Simulación de datos (en producción aquí harías scraping real)
+    leads = [
+        {
+            'nombre': 'Laura Martínez',
+            'empresa': 'Cafetería Central',
+            'telefono': '+507 6123-4567',
+            'email': 'laura@cafeteria-central.com',
+            'fuente': 'Directorio Local',
+            'notas': 'Interesada en sistema de inventario para cafetería'
+        },
+        {
+            'nombre': 'Juan Pérez',
+            'empresa': 'Tienda de Ropa Fashion',
+            'telefono': '+507 6789-0123',
+            'email': 'juan@tiendafashion.com',
+            'fuente': 'Redes Sociales',
+            'notas': 'Busca solución de punto de venta y gestión de clientes'
+        },
+        {
+            'nombre': 'Marta Rodríguez',
+            'empresa': 'Farmacia Salud Total',
+            'telefono': '+507 6456-7890',
+            'email': 'marta@farmaciasalud.com',
+            'fuente': 'Recomendación',
+            'notas': 'Necesita control de inventario para medicamentos y productos'
+        }
+    ]
+    
+    # Simular delay de scraping
+    time.sleep(2)
+    
+    return leads
+
+# Ejemplo de función real de scraping (comentada por ética)
+"""
+def real_scrape_example():
+    # Ejemplo ético de scraping (solo para sitios que lo permitan)
+    try:
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+        
+        response = requests.get('https://ejemplo.com/directorio-empresas', headers=headers)
+        soup = bs4.BeautifulSoup(response.content, 'html.parser')
+        
+        # Extraer información (ajustar selectores según el sitio)
+        companies = soup.find_all('div', class_='company-card')
+        
+        leads = []
+        for company in companies:
+            name = company.find('h2').text.strip()
+            # ... más extracción de datos
+            
+            leads.append({
+                'nombre': name,
+                # ... más campos
+            })
+        
+        return leads
+        
+    except Exception as e:
+        print(f"Error en scraping: {e}")
+        return []
 """
\ No newline at end of file
@@ -1,10 +1,10 @@
-"""
-Sistema de flujos de trabajo para el Sistema de Gestión PYME.
-
-Este paquete maneja flujos de trabajo personalizables y automatizaciones.
-"""
-
-# Este archivo puede estar vacío inicialmente o contener imports futuros
-__version__ = '1.0.0'
-__author__ = 'Sistema de Gestión PYME'
+"""
+Sistema de flujos de trabajo para el Sistema de Gestión PYME.
+
+Este paquete maneja flujos de trabajo personalizables y automatizaciones.
+"""
+
+# Este archivo puede estar vacío inicialmente o contener imports futuros
+__version__ = '1.0.0'
+__author__ = 'Sistema de Gestión PYME'
 __description__ = 'Sistema de flujos de trabajo automatizados'
\ No newline at end of file